@@ -1,14 +1,65 @@
+"""Local JSONL audit trail for agent decisions.
+
+``log_event`` only stamps the event and appends it to an in-memory deque
+(append/popleft are atomic, so the request path takes no lock). A daemon
+writer drains it in batches: one open, one write and one fsync per batch or
+per AGENT_AUDIT_FLUSH_INTERVAL_MS, with size-based rotation to ``<path>.1``.
+The queue holds at most AGENT_AUDIT_QUEUE_SIZE events; past that the
+``drop`` policy discards the new event and ``block`` waits up to
+AGENT_AUDIT_BLOCK_MS for room first. Both count what they drop.
+``shutdown_audit_log`` (gunicorn ``worker_exit``) writes out what is left.
+"""
+
 from __future__ import annotations
 
+import atexit
 import json
 import os
 import threading
+import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from utils.env import env_int, truthy
+
+
+_LOCK = threading.Lock()  # serializes batch writes, keeping file order
+_start_lock = threading.Lock()
+_queue: Deque[Tuple[Path, Dict[str, Any]]] = deque()
+_wake = threading.Event()
+_writer: Optional[threading.Thread] = None
+_stopping = False
+_stats: Dict[str, int] = {
+    "queued": 0, "written": 0, "dropped": 0, "blocked": 0,
+    "batches": 0, "fsyncs": 0, "rotations": 0, "write_errors": 0,
+}
+
+
+def _async_enabled() -> bool:
+    return truthy(os.getenv("AGENT_AUDIT_ASYNC", "true"))
+
+
+def _queue_size() -> int:
+    return env_int("AGENT_AUDIT_QUEUE_SIZE", 10000, minimum=1)
+
 
+def _batch_size() -> int:
+    return env_int("AGENT_AUDIT_BATCH_SIZE", 256, minimum=1)
 
-_LOCK = threading.Lock()
+
+def _flush_interval() -> float:
+    return env_int("AGENT_AUDIT_FLUSH_INTERVAL_MS", 200, minimum=10) / 1000.0
+
+
+def _max_bytes() -> int:
+    return env_int("AGENT_AUDIT_MAX_BYTES", 20 * 1024 * 1024)
+
+
+def _bump(name: str, count: int = 1) -> None:
+    # Counters are gauges only; a lost increment under a race is acceptable.
+    _stats[name] += count
 
 
 def log_event(event_type: str, payload: Dict[str, Any] | None = None) -> None:
@@ -23,14 +74,138 @@ def log_event(event_type: str, payload: Dict[str, Any] | None = None) -> None:
     event = {
         "ts": datetime.now().isoformat(timespec="seconds"),
         "event_type": str(event_type or "unknown"),
-        "payload": payload or {},
+        "payload": dict(payload or {}),
     }
 
-    try:
+    if not _async_enabled() or _stopping:
+        _write_batch([(path, event)], fsync=False)  # the old per-event append
+        return
+    if len(_queue) >= _queue_size() and not _wait_for_room():
+        _bump("dropped")
+        return
+    _queue.append((path, event))
+    _bump("queued")
+    _ensure_writer()
+    if len(_queue) >= _batch_size():
+        _wake.set()
+
+
+def _wait_for_room() -> bool:
+    if os.getenv("AGENT_AUDIT_OVERFLOW", "drop").strip().lower() != "block":
+        return False
+    _bump("blocked")
+    _wake.set()
+    deadline = time.monotonic() + env_int("AGENT_AUDIT_BLOCK_MS", 50) / 1000.0
+    while len(_queue) >= _queue_size():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.002)
+    return True
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is not None and _writer.is_alive():
+        return
+    with _start_lock:
+        if _writer is not None and _writer.is_alive():
+            return
+        _writer = threading.Thread(target=_run_writer, daemon=True, name="agent-audit-writer")
+        _writer.start()
+
+
+def _run_writer() -> None:
+    while not _stopping:
+        _wake.wait(_flush_interval())
+        _wake.clear()
+        flush_audit_log()
+
+
+def flush_audit_log() -> int:
+    """Write every queued event now; returns how many were written."""
+    written = 0
+    batch_size = _batch_size()
+    while _queue:
+        batch: List[Tuple[Path, Dict[str, Any]]] = []
         with _LOCK:
+            while _queue and len(batch) < batch_size:
+                batch.append(_queue.popleft())
+            written += _write_batch_locked(batch)
+    return written
+
+
+def _write_batch(batch: List[Tuple[Path, Dict[str, Any]]], fsync: Optional[bool] = None) -> int:
+    with _LOCK:
+        return _write_batch_locked(batch, fsync)
+
+
+def _write_batch_locked(batch: List[Tuple[Path, Dict[str, Any]]], fsync: Optional[bool] = None) -> int:
+    by_path: Dict[Path, List[str]] = {}
+    for path, event in batch:
+        try:
+            line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        except Exception:
+            _bump("write_errors")
+            continue
+        by_path.setdefault(path, []).append(line)
+
+    written = 0
+    if fsync is None:
+        fsync = truthy(os.getenv("AGENT_AUDIT_FSYNC", "true"))
+    for path, lines in by_path.items():
+        try:
             path.parent.mkdir(parents=True, exist_ok=True)
+            _rotate_if_needed(path)
             with path.open("a", encoding="utf-8") as f:
-                f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
-    except Exception:
+                f.write("".join(lines))
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    _bump("fsyncs")
+        except Exception:
+            _bump("write_errors")
+            continue
+        written += len(lines)
+    _bump("batches")
+    _bump("written", written)
+    return written
+
+
+def _rotate_if_needed(path: Path) -> None:
+    max_bytes = _max_bytes()
+    if max_bytes <= 0 or not path.exists() or path.stat().st_size < max_bytes:
         return
+    path.replace(path.with_name(path.name + ".1"))
+    _bump("rotations")
+
+
+def shutdown_audit_log(timeout: float = 5.0) -> None:
+    """Stop the writer and write out every queued event (clean worker exit)."""
+    global _stopping, _writer
+    _stopping = True
+    _wake.set()
+    writer = _writer
+    if writer is not None and writer is not threading.current_thread():
+        writer.join(timeout)
+    flush_audit_log()
+    _writer = None
+
+
+atexit.register(shutdown_audit_log)
+
+
+def audit_log_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = dict(_stats)
+    stats["pending"] = len(_queue)
+    stats["async"] = _async_enabled()
+    return stats
+
 
+def reset_audit_log_for_tests() -> None:
+    global _stopping
+    shutdown_audit_log()
+    _queue.clear()
+    _stopping = False
+    _wake.clear()
+    for name in _stats:
+        _stats[name] = 0
@@ -1,3 +1,15 @@
+"""Recent chat turns for prompt context.
+
+Turns are appended to a JSONL log and mirrored into an in-memory ring per
+(chat, user), so ``get_recent`` touches only the last ``limit`` turns of one
+ring. Each process follows the log by byte offset: a call first ingests what
+other gunicorn workers appended since the previous call, never the whole
+file. When the active segment reaches CONVERSATION_MEMORY_MAX_BYTES it is
+sealed as ``<path>.1`` and compacted down to the turns the rings still hold,
+and a fresh segment starts. A cold process reads only the tail of the log
+(CONVERSATION_MEMORY_LOAD_BYTES, newest segment first).
+"""
+
 from __future__ import annotations
 
 import json
@@ -7,13 +19,25 @@ import threading
 from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List
+from typing import Deque, Dict, List, Optional, Tuple
 
 
 _LOCK = threading.Lock()
 _VALID_ROLES = {"user", "bot"}
 
 
+class _Memory:
+    def __init__(self, path: Path):
+        self.path = path
+        self.rings: Dict[Tuple[str, str], Deque[Dict]] = {}
+        self.inode: Optional[int] = None  # active segment being followed
+        self.offset = 0  # bytes of it already ingested
+
+
+_memory: Optional[_Memory] = None
+_stats: Dict[str, int] = {"loads": 0, "loaded_bytes": 0, "followed_bytes": 0, "compactions": 0}
+
+
 def _enabled() -> bool:
     raw = os.getenv("CONVERSATION_MEMORY_ENABLED", "true").strip().lower()
     return raw in {"1", "true", "yes", "on"}
@@ -37,6 +61,20 @@ def _max_bytes() -> int:
         return 5 * 1024 * 1024
 
 
+def _ring_size() -> int:
+    try:
+        return max(1, int(os.getenv("CONVERSATION_MEMORY_RING_SIZE", "32")))
+    except (TypeError, ValueError):
+        return 32
+
+
+def _load_bytes() -> int:
+    try:
+        return max(0, int(os.getenv("CONVERSATION_MEMORY_LOAD_BYTES", str(1024 * 1024))))
+    except (TypeError, ValueError):
+        return 1024 * 1024
+
+
 def _parse_ts(value: str):
     try:
         parsed = datetime.fromisoformat(str(value or ""))
@@ -47,14 +85,124 @@ def _parse_ts(value: str):
     return parsed
 
 
-def _rotate_if_needed(path: Path) -> None:
-    max_bytes = _max_bytes()
-    if max_bytes <= 0 or not path.exists() or path.stat().st_size < max_bytes:
-        return
-    rotated = path.with_name(path.name + ".1")
-    if rotated.exists():
-        rotated.unlink()
-    path.replace(rotated)
+def _cutoff() -> Optional[datetime]:
+    ttl = _ttl_seconds()
+    return datetime.now() - timedelta(seconds=ttl) if ttl > 0 else None
+
+
+def _sealed_path(path: Path) -> Path:
+    return path.with_name(path.name + ".1")
+
+
+def _read_lines(path: Path, start: int) -> Tuple[bytes, int]:
+    """Complete lines of ``path`` from byte ``start``, and the offset after the last one."""
+    try:
+        with path.open("rb") as f:
+            f.seek(start)
+            data = f.read()
+    except OSError:
+        return b"", start
+    end = data.rfind(b"\n") + 1
+    return data[:end], start + end
+
+
+def _read_tail(path: Path, budget: int) -> Tuple[bytes, int]:
+    """Complete lines within the last ``budget`` bytes of ``path``, and its followed size."""
+    try:
+        size = path.stat().st_size
+    except OSError:
+        return b"", 0
+    start = max(0, size - budget)
+    data, end = _read_lines(path, start)
+    if start > 0:
+        data = data.partition(b"\n")[2]  # drop the line the budget cut through
+    return data, end
+
+
+def _ingest(memory: _Memory, data: bytes) -> None:
+    ring_size = _ring_size()
+    for line in data.splitlines():
+        try:
+            item = json.loads(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if not isinstance(item, dict) or item.get("role") not in _VALID_ROLES:
+            continue
+        key = (str(item.get("chat_id", "")), str(item.get("user_id", "")))
+        ring = memory.rings.get(key)
+        if ring is None:
+            ring = memory.rings[key] = deque(maxlen=ring_size)
+        ring.append(item)
+
+
+def _load(path: Path) -> _Memory:
+    memory = _Memory(path)
+    try:
+        memory.inode = path.stat().st_ino
+    except OSError:
+        pass
+    budget = _load_bytes()
+    active, memory.offset = _read_tail(path, budget)
+    sealed, _ = _read_tail(_sealed_path(path), budget - len(active)) if budget > len(active) else (b"", 0)
+    _ingest(memory, sealed)
+    _ingest(memory, active)
+    _stats["loads"] += 1
+    _stats["loaded_bytes"] += len(sealed) + len(active)
+    return memory
+
+
+def _sync() -> _Memory:
+    """The rings for the configured path, caught up with the log. Caller holds _LOCK."""
+    global _memory
+    path = _path()
+    memory = _memory
+    if memory is None or memory.path != path:
+        memory = _memory = _load(path)
+        return memory
+    try:
+        stat = path.stat()
+    except OSError:
+        if memory.inode is not None:  # sealed by another worker
+            memory = _memory = _load(path)
+        return memory
+    if memory.inode is None:
+        memory.inode, memory.offset = stat.st_ino, 0
+    elif stat.st_ino != memory.inode or stat.st_size < memory.offset:
+        memory = _memory = _load(path)  # sealed or rewritten elsewhere
+        return memory
+    if stat.st_size > memory.offset:
+        start = memory.offset
+        data, memory.offset = _read_lines(path, start)
+        _ingest(memory, data)
+        _stats["followed_bytes"] += memory.offset - start
+    return memory
+
+
+def _compact(memory: _Memory) -> None:
+    """Seal the active segment and rewrite it with only the turns still served."""
+    path = memory.path
+    sealed = _sealed_path(path)
+    path.replace(sealed)
+    # Lines another worker appended between the last sync and the rename.
+    data, _ = _read_lines(sealed, memory.offset)
+    _ingest(memory, data)
+
+    cutoff = _cutoff()
+    live = []
+    for key, ring in list(memory.rings.items()):
+        kept = [item for item in ring if not cutoff or ((_parse_ts(item.get("ts")) or cutoff) >= cutoff)]
+        if kept:
+            live.extend(kept)
+        else:
+            del memory.rings[key]
+    live.sort(key=lambda item: str(item.get("ts") or ""))  # newest last, for tail loads
+    tmp = sealed.with_name(sealed.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        for item in live:
+            f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+    tmp.replace(sealed)
+    memory.inode, memory.offset = None, 0
+    _stats["compactions"] += 1
 
 
 def _clean_text(text: str, limit: int = 800) -> str:
@@ -81,45 +229,41 @@ def record_message(chat_id: str, user_id: str, role: str, text: str) -> None:
         path = _path()
         with _LOCK:
             path.parent.mkdir(parents=True, exist_ok=True)
-            _rotate_if_needed(path)
+            memory = _sync()
+            max_bytes = _max_bytes()
+            if max_bytes > 0 and path.exists() and path.stat().st_size >= max_bytes:
+                _compact(memory)
             with path.open("a", encoding="utf-8") as f:
                 f.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            _sync()  # the ring picks the turn up from the log, like other workers do
     except Exception:
         return
 
 
 def get_recent(chat_id: str, user_id: str, limit: int = 6) -> List[Dict]:
+    """The last ``limit`` live turns of one chat/user, oldest first (at most the ring size)."""
     if not _enabled() or limit <= 0:
         return []
-    path = _path()
-    if not path.exists():
-        return []
-
-    target_chat = str(chat_id or "")
-    target_user = str(user_id or "")
-    ttl = _ttl_seconds()
-    cutoff = datetime.now() - timedelta(seconds=ttl) if ttl > 0 else None
-    recent = deque(maxlen=limit)
+    cutoff = _cutoff()
     try:
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    item = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-                if str(item.get("chat_id", "")) != target_chat:
-                    continue
-                if str(item.get("user_id", "")) != target_user:
-                    continue
-                if item.get("role") not in _VALID_ROLES:
-                    continue
+        with _LOCK:
+            ring = _sync().rings.get((str(chat_id or ""), str(user_id or "")))
+            if not ring:
+                return []
+            recent = []
+            for item in reversed(ring):
+                if len(recent) >= limit:
+                    break
                 ts = _parse_ts(item.get("ts"))
-                if cutoff and (not ts or ts < cutoff):
+                if cutoff and not ts:
                     continue
-                recent.append(item)
+                if cutoff and ts < cutoff:
+                    break
+                recent.append(dict(item))
     except Exception:
         return []
-    return list(recent)
+    recent.reverse()
+    return recent
 
 
 def render_for_prompt(messages: List[Dict]) -> str:
@@ -130,3 +274,20 @@ def render_for_prompt(messages: List[Dict]) -> str:
         if role in _VALID_ROLES and text:
             lines.append(f"{role}: {text}")
     return "\n".join(lines)
+
+
+def conversation_memory_stats() -> Dict[str, int]:
+    with _LOCK:
+        stats = dict(_stats)
+        memory = _memory
+        stats["chats"] = len(memory.rings) if memory else 0
+        stats["turns"] = sum(len(ring) for ring in memory.rings.values()) if memory else 0
+    return stats
+
+
+def reset_conversation_memory_for_tests() -> None:
+    global _memory
+    with _LOCK:
+        _memory = None
+        for name in _stats:
+            _stats[name] = 0
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import re
 from datetime import datetime
-from typing import Any, Dict, Iterable, List
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from utils.amounts import parse_money_token
 from utils.parsers import parse_revision_amount
@@ -12,6 +13,12 @@ ALLOWED_METRICS = {"sum", "count", "avg", "max", "min"}
 ALLOWED_FILTERS = {"project", "category", "tipe", "date_from", "date_to", "company", "dompet"}
 ALLOWED_GROUPS = {None, "project", "category", "tipe", "company", "dompet"}
 
+# Compiled predicates run in this order: the most selective filters first, so
+# most rows are rejected after one check. Text filters usually name a single
+# project/wallet, the date range is one cached ordinal lookup, and tipe keeps
+# roughly half the ledger.
+_FILTER_ORDER = ("project", "dompet", "company", "category", "date", "tipe")
+
 
 def _parse_date(value: str):
     value = str(value or "").strip()
@@ -58,10 +65,15 @@ def parse_ast(raw: Dict[str, Any]) -> Dict[str, Any]:
     return {"metric": metric, "filters": clean_filters, "group_by": group_by}
 
 
-def _amount(value: Any) -> int:
+def amount_value(value: Any) -> int:
+    """Rupiah amount of a ledger cell (int, "1.250.000", "50rb"); 0 when unparseable."""
     if isinstance(value, (int, float)):
         return int(value)
-    text = str(value or "").strip()
+    return _amount_text(str(value or "").strip())
+
+
+@lru_cache(maxsize=4096)
+def _amount_text(text: str) -> int:
     if not text:
         return 0
     if re.search(r"(?:rb|ribu|k|jt|juta|perak)\b", text, re.IGNORECASE):
@@ -80,7 +92,23 @@ def _amount(value: Any) -> int:
 
 
 def _norm(value: Any) -> str:
-    return " ".join(str(value or "").casefold().split())
+    return norm_text(str(value or ""))
+
+
+@lru_cache(maxsize=8192)
+def norm_text(text: str) -> str:
+    """Casefolded text with whitespace collapsed, as filters compare it."""
+    return " ".join(text.casefold().split())
+
+
+@lru_cache(maxsize=8192)
+def date_ordinal(text: str) -> Optional[int]:
+    """Day ordinal of a ledger date string, or None when it does not parse."""
+    try:
+        parsed = _parse_date(text)
+    except ValueError:
+        return None
+    return parsed.toordinal() if parsed else None
 
 
 def _row_date(row: Dict[str, Any]):
@@ -91,18 +119,11 @@ def _row_date(row: Dict[str, Any]):
 
 
 def _field(row: Dict[str, Any], key: str) -> str:
-    if key == "project":
-        return str(row.get("nama_projek") or row.get("project") or "")
-    if key == "category":
-        return str(row.get("kategori") or row.get("category") or "")
-    if key == "company":
-        return str(row.get("company_sheet") or row.get("company") or "")
-    if key == "dompet":
-        return str(row.get("sheet_name") or row.get("dompet") or row.get("company_sheet") or "")
-    return str(row.get(key) or "")
+    return _field_getter(key)(row)
 
 
 def _matches(row: Dict[str, Any], filters: Dict[str, str]) -> bool:
+    """Reference (interpreted) predicate; compiled plans must agree with it."""
     row_date = None
     for key, value in filters.items():
         if key == "date_from":
@@ -124,6 +145,87 @@ def _matches(row: Dict[str, Any], filters: Dict[str, str]) -> bool:
     return True
 
 
+def _field_getter(key: str) -> Callable[[Dict[str, Any]], str]:
+    if key == "project":
+        return lambda row: str(row.get("nama_projek") or row.get("project") or "")
+    if key == "category":
+        return lambda row: str(row.get("kategori") or row.get("category") or "")
+    if key == "company":
+        return lambda row: str(row.get("company_sheet") or row.get("company") or "")
+    if key == "dompet":
+        return lambda row: str(row.get("sheet_name") or row.get("dompet") or row.get("company_sheet") or "")
+    return lambda row: str(row.get(key) or "")
+
+
+def _text_predicate(key: str, needle: str, exact: bool) -> Callable[[Dict[str, Any]], bool]:
+    get = _field_getter(key)
+    if exact:
+        return lambda row: norm_text(get(row)) == needle
+    return lambda row: needle in norm_text(get(row))
+
+
+def _date_predicate(low: Optional[int], high: Optional[int]) -> Callable[[Dict[str, Any]], bool]:
+    def _in_range(row: Dict[str, Any]) -> bool:
+        ordinal = date_ordinal(str(row.get("tanggal") or row.get("date") or ""))
+        if ordinal is None:
+            return False
+        if low is not None and ordinal < low:
+            return False
+        return high is None or ordinal <= high
+
+    return _in_range
+
+
+@lru_cache(maxsize=128)
+def _plan_shape(filter_keys: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Predicate order for a set of filter keys, shared by every query of that shape."""
+    slots = {"date" if key in {"date_from", "date_to"} else key for key in filter_keys}
+    return tuple(slot for slot in _FILTER_ORDER if slot in slots)
+
+
+@lru_cache(maxsize=256)
+def _compile_predicate(filters: Tuple[Tuple[str, str], ...]) -> Callable[[Dict[str, Any]], bool]:
+    values = dict(filters)
+    predicates: List[Callable[[Dict[str, Any]], bool]] = []
+    for slot in _plan_shape(tuple(sorted(values))):
+        if slot == "date":
+            low = values.get("date_from")
+            high = values.get("date_to")
+            predicates.append(_date_predicate(
+                _parse_date(low).toordinal() if low else None,
+                _parse_date(high).toordinal() if high else None,
+            ))
+        else:
+            predicates.append(_text_predicate(slot, norm_text(values[slot]), exact=slot == "tipe"))
+
+    if not predicates:
+        return lambda row: True
+    if len(predicates) == 1:
+        return predicates[0]
+    checks = tuple(predicates)
+
+    def _all(row: Dict[str, Any]) -> bool:
+        for check in checks:
+            if not check(row):
+                return False
+        return True
+
+    return _all
+
+
+def compile_plan(parsed: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    """Row predicate for a parsed AST, compiled once and cached.
+
+    Filter dates become ordinals and filter strings are casefolded at compile
+    time; row dates, strings and amounts go through small value caches, since
+    a ledger repeats the same dates and project names on many rows.
+    """
+    return _compile_predicate(tuple(sorted(
+        (key, value if key in {"date_from", "date_to"} else norm_text(value))
+        for key, value in parsed["filters"].items()
+    )))
+
+
 def _metric(metric: str, values: List[int]) -> float:
     if metric == "count":
         return len(values)
@@ -140,10 +242,15 @@ def _metric(metric: str, values: List[int]) -> float:
     raise ValueError("Invalid metric")
 
 
+def _select_parsed(parsed: Dict[str, Any], rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    predicate = compile_plan(parsed)
+    return [row for row in rows or [] if isinstance(row, dict) and predicate(row)]
+
+
 def execute(ast: Dict[str, Any], rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     parsed = parse_ast(ast)
-    filtered = select_rows(parsed, rows)
-    values = [_amount(row.get("jumlah") or row.get("amount")) for row in filtered]
+    filtered = _select_parsed(parsed, rows)
+    values = [amount_value(row.get("jumlah") or row.get("amount")) for row in filtered]
     result = {
         "metric": parsed["metric"],
         "value": _metric(parsed["metric"], values),
@@ -153,10 +260,11 @@ def execute(ast: Dict[str, Any], rows: Iterable[Dict[str, Any]]) -> Dict[str, An
 
     group_by = parsed.get("group_by")
     if group_by:
+        label_of = _field_getter(group_by)
         buckets: Dict[str, List[int]] = {}
-        for row in filtered:
-            label = _field(row, group_by).strip() or "-"
-            buckets.setdefault(label, []).append(_amount(row.get("jumlah") or row.get("amount")))
+        for row, amount in zip(filtered, values):
+            label = label_of(row).strip() or "-"
+            buckets.setdefault(label, []).append(amount)
         result["groups"] = {
             label: _metric(parsed["metric"], bucket_values)
             for label, bucket_values in sorted(buckets.items())
@@ -166,11 +274,7 @@ def execute(ast: Dict[str, Any], rows: Iterable[Dict[str, Any]]) -> Dict[str, An
 
 def select_rows(ast: Dict[str, Any], rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Return the validated rows matching an AST, for evidence retrieval."""
-    parsed = parse_ast(ast)
-    return [
-        row for row in rows or []
-        if isinstance(row, dict) and _matches(row, parsed["filters"])
-    ]
+    return _select_parsed(parse_ast(ast), rows)
 
 
 def format_idr(amount: Any) -> str:
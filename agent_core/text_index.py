@@ -0,0 +1,206 @@
+"""Token-level inverted index over transaction descriptions and project names.
+
+Terms are the ``[a-z0-9]+`` runs of the casefolded text, so "token appears as a
+substring of the description" (what the query handlers have always checked)
+is exactly "token is a substring of one indexed term". A lookup scans the
+vocabulary, not the ledger, and then touches only the matching postings.
+Each term also gets its de-slanged form (``normalize_nyeleneh_text``: "tf" ->
+"transfer") as an alias. Postings are sorted by date, so a date window is a
+slice and results come back newest first.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right, insort
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from agent_core.query_engine import date_ordinal
+from agent_core.time_index import entry_block, row_identity
+
+
+TEXT_FIELDS = ("keterangan", "nama_projek")
+_TERM_RE = re.compile(r"[a-z0-9]+")
+
+
+def terms(text: Any) -> Set[str]:
+    return set(_TERM_RE.findall(" ".join(str(text or "").split()).casefold()))
+
+
+@lru_cache(maxsize=16384)
+def deslang(term: str) -> Tuple[str, ...]:
+    """De-slanged spellings of one term, excluding the term itself."""
+    from utils.normalizer import normalize_nyeleneh_text
+
+    return tuple(sorted(terms(normalize_nyeleneh_text(term)) - {term}))
+
+
+class TextIndex:
+    """Search rows by descriptor tokens (AND or OR), newest first."""
+
+    def __init__(self, *, fields: Tuple[str, ...] = TEXT_FIELDS, aliases: bool = True):
+        self.fields = fields
+        self.aliases = aliases
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._keys: Dict[int, Tuple[int, int]] = {}  # doc -> (day, doc), the posting sort key
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._by_identity: Dict[Tuple[str, int, str], int] = {}
+        self._days: List[int] = []  # sorted, for window counts
+        self._vocabulary: List[str] = []  # sorted, for prefix lookups
+        self._matches: Dict[Tuple[str, bool], Tuple[str, ...]] = {}
+        self._next_doc = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], **kwargs: Any) -> "TextIndex":
+        index = cls(**kwargs)
+        # Oldest first, so every add appends to the day list and postings.
+        for row in sorted(rows, key=lambda row: date_ordinal(str(row.get("tanggal") or "")) or 0):
+            index.add(row)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _doc_terms(self, row: Dict[str, Any]) -> Set[str]:
+        found: Set[str] = set()
+        for field in self.fields:
+            found |= terms(row.get(field))
+        if self.aliases:
+            for term in list(found):
+                found.update(deslang(term))
+        return found
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        day = date_ordinal(str(row.get("tanggal") or ""))
+        if day is None:
+            return False
+        identity = row_identity(row)
+        if identity is not None and identity in self._by_identity:
+            self._drop(self._by_identity.pop(identity))
+        doc = self._next_doc
+        self._next_doc += 1
+        key = (day, doc)
+        self._rows[doc] = dict(row)
+        self._keys[doc] = key
+        if identity is not None:
+            self._by_identity[identity] = doc
+        if not self._days or day >= self._days[-1]:
+            self._days.append(day)
+        else:
+            insort(self._days, day)
+        for term in self._doc_terms(row):
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = []
+                insort(self._vocabulary, term)
+                self._matches.clear()
+            if not postings or key > postings[-1]:
+                postings.append(key)
+            else:
+                insort(postings, key)
+        return True
+
+    def _drop(self, doc: int) -> None:
+        row = self._rows.pop(doc)
+        key = self._keys.pop(doc)
+        day = key[0]
+        del self._days[bisect_left(self._days, day)]
+        for term in self._doc_terms(row):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            pos = bisect_left(postings, key)
+            if pos < len(postings) and postings[pos] == key:
+                del postings[pos]
+
+    def set_amount(self, sheet: str, sheet_row: int, block: str, amount: int) -> bool:
+        identity = (sheet, int(sheet_row), entry_block(block, block, sheet))
+        doc = self._by_identity.get(identity)
+        if doc is None:
+            return False
+        if amount <= 0:
+            self._drop(self._by_identity.pop(identity))
+        else:
+            self._rows[doc]["jumlah"] = amount
+        return True
+
+    def remove(self, sheet: str, sheet_row: int, block: Optional[str] = None, *, shift: bool = True) -> int:
+        """Drop a row; with ``shift`` later rows move up like a Sheets delete."""
+        sheet_row = int(sheet_row)
+        removed = 0
+        for identity in [key for key in self._by_identity if key[0] == sheet and key[1] == sheet_row]:
+            if block and identity[2] != entry_block(block, block, sheet):
+                continue
+            self._drop(self._by_identity.pop(identity))
+            removed += 1
+        if shift:
+            moved = {}
+            for identity, doc in self._by_identity.items():
+                if identity[0] == sheet and identity[1] > sheet_row:
+                    identity = (sheet, identity[1] - 1, identity[2])
+                    self._rows[doc]["sheet_row"] = identity[1]
+                moved[identity] = doc
+            self._by_identity = moved
+        return removed
+
+    def rows_for(self, identities: Iterable[Tuple[str, int, str]]) -> Optional[List[Dict[str, Any]]]:
+        """Rows by (sheet, row, block) identity, in the given order; None if any is gone."""
+        rows = []
+        for identity in identities:
+            doc = self._by_identity.get(identity)
+            if doc is None:
+                return None
+            rows.append(self._rows[doc])
+        return rows
+
+    def count_since(self, start: Optional[int] = None) -> int:
+        return len(self._days) if start is None else len(self._days) - bisect_left(self._days, start)
+
+    def matching_terms(self, token: str, *, prefix: bool = False) -> Tuple[str, ...]:
+        token = token.casefold()
+        cache_key = (token, prefix)
+        found = self._matches.get(cache_key)
+        if found is None:
+            if prefix:
+                lo = bisect_left(self._vocabulary, token)
+                hi = bisect_right(self._vocabulary, token + "\uffff")
+                found = tuple(self._vocabulary[lo:hi])
+            else:
+                found = tuple(term for term in self._vocabulary if token in term)
+            self._matches[cache_key] = found
+        return found
+
+    def _token_docs(self, token: str, prefix: bool, start: Optional[int]) -> Set[Tuple[int, int]]:
+        # Postings are sorted by (day, doc), so "day >= start" is a suffix.
+        docs: Set[Tuple[int, int]] = set()
+        for term in self.matching_terms(token, prefix=prefix):
+            postings = self._postings[term]
+            docs.update(postings if start is None else postings[bisect_left(postings, (start, -1)):])
+        return docs
+
+    def search(
+        self,
+        tokens: Iterable[str],
+        *,
+        match_all: bool = True,
+        prefix: bool = False,
+        start: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Rows whose text contains all (or any) tokens, newest first."""
+        tokens = [token for token in dict.fromkeys(str(t).casefold() for t in tokens) if token]
+        if not tokens:
+            return []
+        # Smallest posting set first keeps the AND intersection cheap.
+        sets = sorted((self._token_docs(token, prefix, start) for token in tokens), key=len)
+        if match_all:
+            keys = set(sets[0])
+            for other in sets[1:]:
+                keys &= other
+                if not keys:
+                    break
+        else:
+            keys = set().union(*sets)
+        # Newest day first, ledger order within a day (what a stable
+        # date-descending sort of get_all_data() gives).
+        return [self._rows[doc] for _day, doc in sorted(keys, key=lambda key: (-key[0], key[1]))]
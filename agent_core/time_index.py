@@ -0,0 +1,261 @@
+"""Per-day prefix sums over ledger rows.
+
+Every row contributes to one series per subset of (dompet, company, project,
+tipe), so a total for any combination of those filters over any date range is
+two binary searches into one series, independent of how many rows or years the
+ledger holds. Series are sparse (one slot per day with activity) to keep memory
+proportional to the data rather than to the calendar.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agent_core.query_engine import amount_value, date_ordinal
+from config.constants import OPERASIONAL_SHEET_NAME
+
+
+DIMENSIONS = ("dompet", "company", "project", "tipe")
+OPERATIONAL_BLOCK = "operasional"
+_MARKER_RE = re.compile(r"\s*\((start|finish|selesai)\)\s*$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def _project_key_text(name: str) -> str:
+    return _MARKER_RE.sub("", " ".join(name.split())).casefold()
+
+
+def project_key(name: Any) -> str:
+    """Casefolded project name without (Start)/(Finish) markers."""
+    return _project_key_text(str(name or ""))
+
+
+def row_dimensions(row: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    return (
+        str(row.get("sheet_name") or row.get("dompet_sheet") or ""),
+        str(row.get("company_sheet") or row.get("company") or ""),
+        project_key(row.get("nama_projek")),
+        str(row.get("tipe") or ""),
+    )
+
+
+def row_identity(row: Dict[str, Any]) -> Optional[Tuple[str, int, str]]:
+    """(sheet, row, block) as used by the revision/delete write paths."""
+    try:
+        sheet_row = int(row.get("sheet_row") or 0)
+    except (TypeError, ValueError):
+        return None
+    sheet = str(row.get("sheet_name") or row.get("dompet_sheet") or "")
+    if not sheet or sheet_row <= 0:
+        return None
+    return sheet, sheet_row, entry_block(row.get("source_block"), row.get("tipe"), sheet)
+
+
+def entry_block(source_block: Any, tipe: Any, sheet: Any = None) -> str:
+    """Block part of a row identity.
+
+    Every row of the operational sheet is ``operasional``: write hooks say so
+    via ``source_block``, but ``get_all_data`` rows only carry ``tipe``.
+    """
+    block = str(source_block or "").strip().lower()
+    if block == OPERATIONAL_BLOCK or str(sheet or "") == OPERASIONAL_SHEET_NAME:
+        return OPERATIONAL_BLOCK
+    return str(tipe or "").strip().lower() or block
+
+
+def _rollups(dims: Tuple[str, ...]) -> Iterable[Tuple[Optional[str], ...]]:
+    # None is the wildcard: (dompet, None, None, "Pengeluaran") is the
+    # expense series of one dompet across every company and project.
+    return product(*((value, None) for value in dims))
+
+
+class _Series:
+    __slots__ = ("days", "amounts", "counts")
+
+    def __init__(self):
+        self.days: List[int] = []
+        self.amounts: List[int] = []  # cumulative
+        self.counts: List[int] = []   # cumulative
+
+    def add(self, day: int, amount: int, count: int) -> None:
+        days = self.days
+        if not days or day > days[-1]:
+            # Appends are almost always dated today: O(1).
+            days.append(day)
+            self.amounts.append((self.amounts[-1] if self.amounts else 0) + amount)
+            self.counts.append((self.counts[-1] if self.counts else 0) + count)
+            return
+        pos = bisect_left(days, day)
+        if days[pos] != day:
+            days.insert(pos, day)
+            self.amounts.insert(pos, self.amounts[pos - 1] if pos else 0)
+            self.counts.insert(pos, self.counts[pos - 1] if pos else 0)
+        for i in range(pos, len(days)):
+            self.amounts[i] += amount
+            self.counts[i] += count
+
+    def upto(self, day: Optional[int]) -> Tuple[int, int]:
+        """Cumulative (amount, count) for every day <= ``day``."""
+        if not self.days:
+            return 0, 0
+        pos = len(self.days) if day is None else bisect_right(self.days, day)
+        if pos == 0:
+            return 0, 0
+        return self.amounts[pos - 1], self.counts[pos - 1]
+
+
+class TimeIndex:
+    """Windowed totals by any subset of (dompet, company, project, tipe)."""
+
+    def __init__(self):
+        self._series: Dict[Tuple[Optional[str], ...], _Series] = {}
+        self._entries: Dict[Tuple[str, int, str], Tuple[Tuple[str, ...], int, int]] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "TimeIndex":
+        index = cls()
+        # Aggregate per (dims, day) cell first; cells are far fewer than rows,
+        # so the 16-way rollup fan-out runs per cell, not per row.
+        cells: Dict[Tuple[Tuple[str, ...], int], List[int]] = {}
+        for row in rows:
+            entry = index._entry(row)
+            if entry is None:
+                continue
+            dims, day, amount = entry
+            cell = cells.get((dims, day))
+            if cell is None:
+                cells[(dims, day)] = [amount, 1]
+            else:
+                cell[0] += amount
+                cell[1] += 1
+        per_day: Dict[Tuple[Optional[str], ...], Dict[int, List[int]]] = {}
+        for (dims, day), (amount, count) in cells.items():
+            for key in _rollups(dims):
+                slot = per_day.setdefault(key, {}).setdefault(day, [0, 0])
+                slot[0] += amount
+                slot[1] += count
+        for key, days in per_day.items():
+            series = _Series()
+            running_amount = running_count = 0
+            for day in sorted(days):
+                running_amount += days[day][0]
+                running_count += days[day][1]
+                series.days.append(day)
+                series.amounts.append(running_amount)
+                series.counts.append(running_count)
+            index._series[key] = series
+        return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, row: Dict[str, Any]) -> Optional[Tuple[Tuple[str, ...], int, int]]:
+        day = date_ordinal(str(row.get("tanggal") or ""))
+        amount = amount_value(row.get("jumlah", row.get("amount", 0)))
+        if day is None or amount <= 0:
+            return None
+        dims = row_dimensions(row)
+        identity = row_identity(row)
+        if identity is not None:
+            self._entries[identity] = (dims, day, amount)
+        return dims, day, amount
+
+    def _apply(self, dims: Tuple[str, ...], day: int, amount: int, count: int) -> None:
+        for key in _rollups(dims):
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+            series.add(day, amount, count)
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        identity = row_identity(row)
+        if identity is not None and identity in self._entries:
+            # Re-mirrored row: replace rather than double count.
+            self.remove(*identity, shift=False)
+        entry = self._entry(row)
+        if entry is None:
+            return False
+        self._apply(entry[0], entry[1], entry[2], 1)
+        return True
+
+    def set_amount(self, sheet: str, sheet_row: int, block: str, amount: int) -> bool:
+        identity = (sheet, int(sheet_row), entry_block(block, block, sheet))
+        entry = self._entries.get(identity)
+        if entry is None:
+            return False
+        dims, day, old_amount = entry
+        if amount <= 0:
+            self.remove(*identity, shift=False)
+            return True
+        self._apply(dims, day, amount - old_amount, 0)
+        self._entries[identity] = (dims, day, amount)
+        return True
+
+    def remove(self, sheet: str, sheet_row: int, block: Optional[str] = None, *, shift: bool = True) -> int:
+        """Drop a row; with ``shift`` later rows move up like a Sheets delete."""
+        sheet_row = int(sheet_row)
+        removed = 0
+        for identity in [key for key in self._entries if key[0] == sheet and key[1] == sheet_row]:
+            if block and identity[2] != entry_block(block, block, sheet):
+                continue
+            dims, day, amount = self._entries.pop(identity)
+            self._apply(dims, day, -amount, -1)
+            removed += 1
+        if shift:
+            moved = {
+                (key[0], key[1] - 1, key[2]) if key[0] == sheet and key[1] > sheet_row else key: value
+                for key, value in self._entries.items()
+            }
+            self._entries = moved
+        return removed
+
+    def total(
+        self,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        *,
+        dompet: Optional[str] = None,
+        company: Optional[str] = None,
+        project: Optional[str] = None,
+        tipe: Optional[str] = None,
+    ) -> Tuple[int, int]:
+        """(amount, count) for start <= day <= end (date ordinals, open-ended when None)."""
+        key = (dompet, company, project_key(project) if project is not None else None, tipe)
+        series = self._series.get(key)
+        if series is None:
+            return 0, 0
+        hi_amount, hi_count = series.upto(end)
+        if start is None:
+            return hi_amount, hi_count
+        lo_amount, lo_count = series.upto(start - 1)
+        return hi_amount - lo_amount, hi_count - lo_count
+
+    def breakdown(
+        self,
+        dimension: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        **filters: Optional[str],
+    ) -> Dict[str, Tuple[int, int]]:
+        """Windowed totals per value of ``dimension``; cost is per series, not per row."""
+        if dimension not in DIMENSIONS or dimension in filters:
+            raise ValueError(f"Unsupported breakdown dimension: {dimension}")
+        position = DIMENSIONS.index(dimension)
+        wanted = tuple(
+            project_key(filters[name]) if name == "project" and filters.get(name) is not None else filters.get(name)
+            for name in DIMENSIONS
+        )
+        out: Dict[str, Tuple[int, int]] = {}
+        for key in self._series:
+            if key[position] is None:
+                continue
+            if any(i != position and key[i] != wanted[i] for i in range(len(DIMENSIONS))):
+                continue
+            amount, count = self.total(start, end, **dict(zip(DIMENSIONS, key)))
+            if count:
+                out[key[position]] = (amount, count)
+        return out
@@ -0,0 +1,207 @@
+"""Bounded top-K operators for ranking queries.
+
+``TopK`` keeps the k best items of a stream in a heap: O(n log k) time and
+O(k) memory instead of a full sort, and partial results from separate
+partitions (companies, dompets) merge into one. Ties keep first-seen order,
+so results equal ``sorted(items, key=key, reverse=largest)[:k]``.
+
+``RankedRows`` is the incrementally maintained view behind "transaksi
+terbesar/terkecil": ledger rows ordered by amount, kept current by the same
+write hooks as the other ledger indexes.
+"""
+
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, insort
+from itertools import count
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agent_core.query_engine import amount_value, date_ordinal
+from agent_core.time_index import entry_block, row_identity
+
+
+class _Desc:
+    """Inverts ordering so one min-heap implementation serves both directions."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __lt__(self, other: "_Desc") -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Desc) and self.value == other.value
+
+
+class TopK:
+    """The k largest (or smallest) items seen so far, by ``key``."""
+
+    def __init__(self, k: int, key: Callable[[Any], Any] = lambda item: item, *, largest: bool = True):
+        self.k = max(0, int(k))
+        self.key = key
+        self.largest = largest
+        self._heap: List[Tuple[Any, int, Any]] = []
+        self._seq = count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, item: Any) -> None:
+        if not self.k:
+            return
+        rank = self.key(item)
+        # The heap root is the current worst: lowest rank, latest on ties.
+        entry = (rank if self.largest else _Desc(rank), -next(self._seq), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def extend(self, items: Iterable[Any]) -> "TopK":
+        for item in items:
+            self.push(item)
+        return self
+
+    def merge(self, other: "TopK") -> "TopK":
+        """Fold in another partition's result; merge partitions in stream order."""
+        return self.extend(other.results())
+
+    def results(self) -> List[Any]:
+        return [entry[2] for entry in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+
+def top_k(items: Iterable[Any], k: int, key: Callable[[Any], Any] = lambda item: item, *, largest: bool = True) -> List[Any]:
+    """One-shot ``TopK``; heapq's C selection has the same stable-slice semantics."""
+    k = max(0, int(k))
+    return heapq.nlargest(k, items, key=key) if largest else heapq.nsmallest(k, items, key=key)
+
+
+def _row_amount(row: Dict[str, Any]) -> int:
+    return amount_value(row.get("jumlah", 0))
+
+
+class RankedRows:
+    """Ledger rows ordered by amount, for windowed largest/smallest lookups."""
+
+    def __init__(self):
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        self._days: Dict[int, int] = {}
+        self._order: List[Tuple[int, int]] = []  # (amount, doc), ascending
+        self._by_identity: Dict[Tuple[str, int, str], int] = {}
+        self._next_doc = 0
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "RankedRows":
+        index = cls()
+        for row in rows:
+            # A repeated identity replaces the earlier row; _order is built once below.
+            index._store(row, index._forget)
+        index._order = sorted((_row_amount(row), doc) for doc, row in index._rows.items())
+        return index
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _store(self, row: Dict[str, Any], replace: Callable[[int], Any]) -> Optional[int]:
+        """Keep ``row`` under a new doc id; ``replace`` drops a row with the same identity."""
+        day = date_ordinal(str(row.get("tanggal") or ""))
+        if day is None:
+            return None
+        identity = row_identity(row)
+        if identity is not None and identity in self._by_identity:
+            replace(self._by_identity.pop(identity))
+        doc = self._next_doc
+        self._next_doc += 1
+        self._rows[doc] = dict(row)
+        self._days[doc] = day
+        if identity is not None:
+            self._by_identity[identity] = doc
+        return doc
+
+    def add(self, row: Dict[str, Any]) -> bool:
+        doc = self._store(row, self._drop)
+        if doc is None:
+            return False
+        insort(self._order, (_row_amount(self._rows[doc]), doc))
+        return True
+
+    def _forget(self, doc: int) -> Dict[str, Any]:
+        del self._days[doc]
+        return self._rows.pop(doc)
+
+    def _drop(self, doc: int) -> None:
+        entry = (_row_amount(self._forget(doc)), doc)
+        pos = bisect_left(self._order, entry)
+        if pos < len(self._order) and self._order[pos] == entry:
+            del self._order[pos]
+
+    def set_amount(self, sheet: str, sheet_row: int, block: str, amount: int) -> bool:
+        identity = (sheet, int(sheet_row), entry_block(block, block, sheet))
+        doc = self._by_identity.get(identity)
+        if doc is None:
+            return False
+        if amount <= 0:
+            self._drop(self._by_identity.pop(identity))
+            return True
+        row, day = self._rows[doc], self._days[doc]
+        self._drop(doc)
+        row["jumlah"] = amount
+        self._rows[doc] = row
+        self._days[doc] = day
+        insort(self._order, (amount, doc))
+        return True
+
+    def remove(self, sheet: str, sheet_row: int, block: Optional[str] = None, *, shift: bool = True) -> int:
+        """Drop a row; with ``shift`` later rows move up like a Sheets delete."""
+        sheet_row = int(sheet_row)
+        removed = 0
+        for identity in [key for key in self._by_identity if key[0] == sheet and key[1] == sheet_row]:
+            if block and identity[2] != entry_block(block, block, sheet):
+                continue
+            self._drop(self._by_identity.pop(identity))
+            removed += 1
+        if shift:
+            moved = {}
+            for identity, doc in self._by_identity.items():
+                if identity[0] == sheet and identity[1] > sheet_row:
+                    identity = (sheet, identity[1] - 1, identity[2])
+                    self._rows[doc]["sheet_row"] = identity[1]
+                moved[identity] = doc
+            self._by_identity = moved
+        return removed
+
+    def _descending(self) -> Iterator[Tuple[int, int]]:
+        # Runs of equal amounts are yielded in ledger order, like a stable
+        # reverse sort of get_all_data().
+        order = self._order
+        pos = len(order)
+        while pos:
+            lo = bisect_left(order, (order[pos - 1][0], -1))
+            yield from order[lo:pos]
+            pos = lo
+
+    def top(
+        self,
+        k: int,
+        *,
+        start: Optional[int] = None,
+        tipe: Optional[str] = None,
+        largest: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Up to k rows dated on/after ``start``; walks from the extreme and stops at k."""
+        out: List[Dict[str, Any]] = []
+        if k <= 0:
+            return out
+        for _amount, doc in (self._descending() if largest else iter(self._order)):
+            if start is not None and self._days[doc] < start:
+                continue
+            row = self._rows[doc]
+            if tipe is not None and row.get("tipe") != tipe:
+                continue
+            out.append(row)
+            if len(out) >= k:
+                break
+        return out
@@ -15,12 +15,12 @@ SECURITY: All inputs are sanitized before AI processing.
 import os
 import re
 import json
-import io
 import tempfile
 import threading
 import time
 import requests
 from datetime import datetime
+from functools import lru_cache
 from dotenv import load_dotenv
 from typing import Any, Callable, List, Dict, Optional, Union
 
@@ -55,6 +55,7 @@ from services.finance_agent import (
     plan_finance_message,
 )
 
+from services.llm_cache import cached_completion, json_object_response
 from services.text_transaction_fallback import (
     build_text_transaction_fallback,
     extract_single_text_amount,
@@ -1516,9 +1517,12 @@ def extract_receipt_amounts(ocr_text: str) -> dict:
 GROQ_API_KEY = (os.getenv('GROQ_API_KEY') or '').strip()
 GROQ_API_KEY_SECONDARY = (os.getenv('GROQ_API_KEY_SECONDARY') or '').strip()
 GROQ_API_KEYS = (os.getenv('GROQ_API_KEYS') or '').strip()
+# Optional: point every Groq call at a compatible server (e.g. scripts/llm_stub_server.py).
+GROQ_BASE_URL = (os.getenv('GROQ_BASE_URL') or '').strip()
 
 # Initialize Groq client(s)
 from groq import Groq, RateLimitError
+from services.groq_rate_limits import KeyBudgetScheduler, estimate_request_tokens
 
 
 def _build_groq_api_keys() -> List[str]:
@@ -1544,6 +1548,14 @@ def _build_groq_api_keys() -> List[str]:
     return unique
 
 
+def _groq_sdk_max_retries() -> int:
+    """SDK-level retries per key; 0 leaves 429 handling entirely to the key scheduler."""
+    try:
+        return max(0, int(os.getenv("GROQ_SDK_MAX_RETRIES", "2")))
+    except (TypeError, ValueError):
+        return 2
+
+
 def _is_rate_limit_error(err: Exception) -> bool:
     if isinstance(err, RateLimitError):
         return True
@@ -1565,6 +1577,11 @@ def _masked_key(api_key: str) -> str:
     return f"{api_key[:4]}...{api_key[-4:]}"
 
 
+def _error_headers(err: Exception):
+    response = getattr(err, "response", None)
+    return getattr(response, "headers", None)
+
+
 class _GroqCompletionsProxy:
     def __init__(self, router: "RotatingGroqClient"):
         self._router = router
@@ -1572,7 +1589,9 @@ class _GroqCompletionsProxy:
     def create(self, *args, **kwargs):
         return self._router._call_with_fallback(
             operation_name="chat.completions.create",
-            caller=lambda client: client.chat.completions.create(*args, **kwargs),
+            caller=lambda client: client.chat.completions.with_raw_response.create(*args, **kwargs),
+            est_tokens=estimate_request_tokens(kwargs),
+            model=str(kwargs.get("model") or ""),
         )
 
 
@@ -1588,7 +1607,8 @@ class _GroqTranscriptionsProxy:
     def create(self, *args, **kwargs):
         return self._router._call_with_fallback(
             operation_name="audio.transcriptions.create",
-            caller=lambda client: client.audio.transcriptions.create(*args, **kwargs),
+            caller=lambda client: client.audio.transcriptions.with_raw_response.create(*args, **kwargs),
+            model=str(kwargs.get("model") or ""),
         )
 
 
@@ -1599,7 +1619,11 @@ class _GroqAudioProxy:
 
 class RotatingGroqClient:
     """
-    Groq client wrapper with automatic key fallback on rate-limit errors.
+    Groq client wrapper that schedules keys from rate-limit response headers.
+    Each call goes to the key with the most remaining request/token budget for
+    its model (Groq limits are per model);
+    when every key is near exhaustion the call waits briefly for a reset, and
+    a 429 still falls back to the next key.
     Keeps backward compatibility with existing usage:
     - groq_client.chat.completions.create(...)
     - groq_client.audio.transcriptions.create(...)
@@ -1610,9 +1634,13 @@ class RotatingGroqClient:
             raise ValueError("GROQ API key is missing. Set GROQ_API_KEY in environment.")
 
         self._api_keys = api_keys
-        self._clients = [Groq(api_key=key) for key in api_keys]
+        self._clients = [
+            Groq(api_key=key, base_url=GROQ_BASE_URL or None, max_retries=_groq_sdk_max_retries())
+            for key in api_keys
+        ]
         self._active_index = 0
         self._lock = threading.Lock()
+        self._scheduler = KeyBudgetScheduler(len(api_keys))
 
         self.chat = _GroqChatProxy(self)
         self.audio = _GroqAudioProxy(self)
@@ -1627,29 +1655,30 @@ class RotatingGroqClient:
         with self._lock:
             self._active_index = idx
 
-    def _rotation_order(self) -> List[int]:
-        start = self._get_active_index()
-        return [(start + offset) % len(self._clients) for offset in range(len(self._clients))]
-
-    def _call_with_fallback(self, operation_name: str, caller: Callable[[Groq], Any]):
+    def _call_with_fallback(
+        self,
+        operation_name: str,
+        caller: Callable[[Groq], Any],
+        est_tokens: int = 0,
+        model: str = "",
+    ):
         last_rate_limit_error: Optional[Exception] = None
         initial_index = self._get_active_index()
+        tried: set = set()
 
-        for idx in self._rotation_order():
+        while len(tried) < len(self._clients):
+            idx = self._scheduler.acquire(est_tokens, preferred=self._get_active_index(), exclude=tried, model=model)
+            if idx is None:
+                break
+            tried.add(idx)
             client = self._clients[idx]
             started_at = time.perf_counter()
             try:
-                result = caller(client)
-                self._set_active_index(idx)
-                if idx != initial_index:
-                    secure_log(
-                        "INFO",
-                        f"Groq fallback switched active key for {operation_name} -> {_masked_key(self._api_keys[idx])}",
-                    )
-                log_timing("groq." + operation_name, started_at, key_index=idx, result="ok")
-                return result
+                raw = caller(client)
             except Exception as exc:
-                if not _is_rate_limit_error(exc):
+                rate_limited = _is_rate_limit_error(exc)
+                self._scheduler.release(idx, _error_headers(exc), rate_limited=rate_limited, model=model)
+                if not rate_limited:
                     log_timing("groq." + operation_name, started_at, key_index=idx, result="error")
                     raise
                 last_rate_limit_error = exc
@@ -1658,11 +1687,37 @@ class RotatingGroqClient:
                     "WARNING",
                     f"Groq rate limit on {operation_name} with key {_masked_key(self._api_keys[idx])}",
                 )
+                continue
+
+            headers = getattr(raw, "headers", None)
+            try:
+                result = raw.parse() if headers is not None and callable(getattr(raw, "parse", None)) else raw
+            finally:
+                self._scheduler.release(idx, headers, model=model)
+            self._set_active_index(idx)
+            if idx != initial_index:
+                secure_log(
+                    "INFO",
+                    f"Groq scheduler switched active key for {operation_name} -> {_masked_key(self._api_keys[idx])}",
+                )
+            log_timing("groq." + operation_name, started_at, key_index=idx, result="ok")
+            return result
 
         if last_rate_limit_error:
             raise last_rate_limit_error
         raise RuntimeError("No Groq client available.")
 
+    @property
+    def key_count(self) -> int:
+        return len(self._clients)
+
+    def budget_gauges(self) -> Dict[str, Any]:
+        """Per-key remaining budgets plus scheduler queue counters (keys masked)."""
+        return {
+            "keys": self._scheduler.snapshot([_masked_key(key) for key in self._api_keys]),
+            "queue": self._scheduler.queue_stats(),
+        }
+
     def __getattr__(self, attr: str):
         """Fallback passthrough for APIs not explicitly wrapped."""
         return getattr(self._clients[self._get_active_index()], attr)
@@ -2008,7 +2063,10 @@ def extract_from_text(text: str, sender_name: str, chat_id: str = None, user_id:
 
         if finance_agent_enabled():
             def _finance_agent_llm_call(messages):
-                return call_groq_api(
+                return cached_completion(
+                    "finance_agent",
+                    call_groq_api,
+                    validate=json_object_response,
                     model=FINANCE_AGENT_MODEL,
                     messages=messages,
                     temperature=0.0,
@@ -2064,7 +2122,10 @@ def extract_from_text(text: str, sender_name: str, chat_id: str = None, user_id:
             system_prompt = get_extraction_prompt(sender_name)
 
             try:
-                response = call_groq_api(
+                response = cached_completion(
+                    "extract_from_text",
+                    call_groq_api,
+                    validate=json_object_response,
                     model="openai/gpt-oss-20b",
                     messages=[
                         {"role": "system", "content": system_prompt},
@@ -2649,7 +2710,12 @@ USE_EASYOCR = os.getenv('USE_EASYOCR', 'false').lower() == 'true'
 
 # ===================== GROQ VISION OCR (ACTIVE) =====================
 import base64
-from PIL import Image
+
+from services import ocr_cache
+from services.hedged_requests import HedgedCallsFailed, latency_percentile, run_hedged
+from services import ocr_batch
+from services import audio_cache, audio_chunking
+from utils.image_preprocess import PreparedImage, prepare_images, read_unique_images
 
 # List of potential Groq Vision models to try (fallback mechanism)
 # Can be overridden via env: GROQ_VISION_MODELS="modelA,modelB"
@@ -2662,65 +2728,38 @@ _env_models = os.getenv("GROQ_VISION_MODELS", "").strip()
 if _env_models:
     VALID_VISION_MODELS = [m.strip() for m in _env_models.split(",") if m.strip()]
 
-def validate_financial_ocr(ocr_text: str) -> dict:
-    """
-    Validate and extract structured financial data from OCR output.
-    Returns dict with validation status and extracted amounts.
-    """
-    validation = {
-        "valid": False,
-        "amounts_found": [],
-        "account_numbers": [],
-        "warnings": []
-    }
-    
-    # Extract amounts (support both formats: Rp 1,000.00 and Rp 1.000,00)
-    amount_patterns = [
-        r'Rp\s*[\d.,]+',  # General pattern
-        r'(?:Jumlah|Nominal|Amount):\s*Rp\s*([\d.,]+)',
-        r'(?:Biaya|Fee):\s*Rp\s*([\d.,]+)'
-    ]
-    
-    for pattern in amount_patterns:
-        matches = re.findall(pattern, ocr_text, re.IGNORECASE)
-        validation["amounts_found"].extend(matches)
-    
-    # Extract account numbers (10-16 digits)
-    account_pattern = r'\b\d{10,16}\b'
-    validation["account_numbers"] = re.findall(account_pattern, ocr_text)
-    
-    # Validation checks
-    if not validation["amounts_found"]:
-        validation["warnings"].append("No amounts detected")
-    
-    if not validation["account_numbers"]:
-        validation["warnings"].append("No account numbers detected")
-    
-    if len(ocr_text) < 50:
-        validation["warnings"].append("OCR output suspiciously short")
-    
-    validation["valid"] = len(validation["warnings"]) == 0
-    
-    return validation
 
+def _ocr_hedge_enabled() -> bool:
+    return os.getenv("OCR_HEDGE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
 
-def ocr_image(image_source: Union[str, List[str]], on_model_attempt: Optional[Callable[[str], None]] = None) -> str:
-    """
-    Extract text from Single or Multiple images using Groq Vision.
-    Uses fallback mechanism to try multiple models if one is decommissioned.
-    Optimized for Indonesian financial receipts (BCA, Mandiri, BNI, BRI, etc.)
-    """
+
+def _ocr_hedge_delay_seconds() -> float:
+    """Delay before the next vision model is hedged in; off means fallback only."""
+    if not _ocr_hedge_enabled():
+        return _groq_timeout_seconds()
     try:
-        secure_log("INFO", "Running OCR via Groq Vision (Multi-Image)...")
-        
-        # Ensure list
-        paths = [image_source] if isinstance(image_source, str) else image_source
-        
-        if not paths:
-            return ""
+        return max(0.0, float(os.getenv("OCR_HEDGE_DELAY_SECONDS", "8")))
+    except (TypeError, ValueError):
+        return 8.0
+
+
+def _ocr_payload_known_slow(image_count: int, payload_bytes: int) -> bool:
+    """Multi-page, oversized, or slow-primary requests hedge without waiting."""
+    if not _ocr_hedge_enabled():
+        return False
+    try:
+        slow_bytes = int(os.getenv("OCR_HEDGE_IMMEDIATE_BYTES", str(3 * 1024 * 1024)))
+        slow_images = int(os.getenv("OCR_HEDGE_IMMEDIATE_IMAGES", "3"))
+    except (TypeError, ValueError):
+        slow_bytes, slow_images = 3 * 1024 * 1024, 3
+    if payload_bytes >= slow_bytes or image_count >= slow_images:
+        return True
+    primary_p50 = latency_percentile(VALID_VISION_MODELS[0], 50) if VALID_VISION_MODELS else None
+    return primary_p50 is not None and primary_p50 > _ocr_hedge_delay_seconds()
+
 
-        # ENHANCED OCR PROMPT - Optimized for Indonesian financial receipts
-        ocr_prompt = """You are a FINANCIAL OCR SPECIALIST for Indonesian bank transfer receipts.
+# ENHANCED OCR PROMPT - Optimized for Indonesian financial receipts
+OCR_PROMPT = """You are a FINANCIAL OCR SPECIALIST for Indonesian bank transfer receipts.
 
 CONTEXT: This is a BCA/Mandiri/BNI/BRI mobile banking transfer screenshot.
 
@@ -2792,99 +2831,238 @@ Date: 02 Feb 2026
 Remarks: operasional
 Status: Transfer Successful"""
 
-        content_payload = [
-            {
-                "type": "text",
-                "text": ocr_prompt
+
+def validate_financial_ocr(ocr_text: str) -> dict:
+    """
+    Validate and extract structured financial data from OCR output.
+    Returns dict with validation status and extracted amounts.
+    """
+    validation = {
+        "valid": False,
+        "amounts_found": [],
+        "account_numbers": [],
+        "warnings": []
+    }
+
+    # Extract amounts (support both formats: Rp 1,000.00 and Rp 1.000,00)
+    amount_patterns = [
+        r'Rp\s*[\d.,]+',  # General pattern
+        r'(?:Jumlah|Nominal|Amount):\s*Rp\s*([\d.,]+)',
+        r'(?:Biaya|Fee):\s*Rp\s*([\d.,]+)'
+    ]
+
+    for pattern in amount_patterns:
+        matches = re.findall(pattern, ocr_text, re.IGNORECASE)
+        validation["amounts_found"].extend(matches)
+
+    # Extract account numbers (10-16 digits)
+    account_pattern = r'\b\d{10,16}\b'
+    validation["account_numbers"] = re.findall(account_pattern, ocr_text)
+
+    # Validation checks
+    if not validation["amounts_found"]:
+        validation["warnings"].append("No amounts detected")
+
+    if not validation["account_numbers"]:
+        validation["warnings"].append("No account numbers detected")
+
+    if len(ocr_text) < 50:
+        validation["warnings"].append("OCR output suspiciously short")
+
+    validation["valid"] = len(validation["warnings"]) == 0
+
+    return validation
+
+
+def _vision_transcribe(prepared: List[PreparedImage], on_model_attempt: Optional[Callable[[str], None]] = None) -> tuple:
+    """Send prepared images in one vision request; returns ``(model, text)``.
+
+    Raises HedgedCallsFailed when every model failed or returned nothing.
+    """
+    content_payload = [
+        {
+            "type": "text",
+            "text": OCR_PROMPT
+        }
+    ]
+    for item in prepared:
+        image_data = base64.b64encode(item.data).decode('utf-8')
+        content_payload.append({
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:{item.mime_type};base64,{image_data}"
             }
-        ]
+        })
+
+    payload_bytes = sum(
+        len(part["image_url"]["url"]) for part in content_payload if part.get("type") == "image_url"
+    )
+
+    def _vision_attempt(model_name: str) -> str:
+        secure_log("INFO", f"Trying Vision Model: {model_name}")
+        request_kwargs = {
+            "model": model_name,
+            "messages": [{"role": "user", "content": content_payload}],
+            "temperature": 0.0,
+            "max_completion_tokens": 2048,
+        }
+        if model_name == "qwen/qwen3.6-27b":
+            request_kwargs.update(reasoning_effort="none", reasoning_format="hidden")
+        response = call_groq_api(**request_kwargs)
+        return sanitize_input(response.choices[0].message.content.strip())
+
+    # Primary model starts at once; the next one is hedged in after a delay
+    # (or immediately for payloads known to be slow) and the first valid
+    # transcription wins.
+    return run_hedged(
+        VALID_VISION_MODELS,
+        _vision_attempt,
+        hedge_delay=_ocr_hedge_delay_seconds(),
+        is_valid=lambda text: bool(str(text or "").strip()),
+        hedge_immediately=_ocr_payload_known_slow(len(prepared), payload_bytes),
+        on_launch=on_model_attempt,
+        stage="ocr.vision_model",
+    )
+
+
+def _ocr_pages_batch(images: List[tuple], prepared: List[PreparedImage],
+                     on_model_attempt: Optional[Callable[[str], None]] = None) -> tuple:
+    """OCR each page as its own request, bounded per Groq key, and merge in order.
+
+    Pages are cached individually so overlapping forwards reuse earlier pages.
+    Returns ``(models, merged_text)``. Raises ``ocr_batch.OcrPagesFailed`` if
+    any page failed on every model, after the readable pages were cached.
+    """
+    announced: set = set()
+    announce_lock = threading.Lock()
+    models: List[str] = []
+
+    def _announce_once(model_name: str) -> None:
+        with announce_lock:
+            if model_name in announced:
+                return
+            announced.add(model_name)
+        if on_model_attempt:
+            on_model_attempt(model_name)
+
+    def _ocr_page(index: int, page: tuple) -> str:
+        (_path, data), item = page
+        page_key = ocr_cache.key_for_image_bytes([data], namespace=OCR_PROMPT)
+        cached = ocr_cache.lookup(page_key)
+        if cached:
+            models.append(cached["model"])
+            return cached["text"]
+        try:
+            model_name, text = _vision_transcribe([item], _announce_once)
+        except HedgedCallsFailed as e:
+            last_error = e.last_error
+            secure_log(
+                "WARNING",
+                f"OCR page {index + 1} failed on all models: {type(last_error).__name__ if last_error else 'empty'}",
+            )
+            raise
+        models.append(model_name)
+        ocr_cache.store(page_key, model_name, text)
+        return text
+
+    started_at = time.perf_counter()
+    concurrency = ocr_batch.batch_concurrency(groq_client.key_count)
+    try:
+        texts = ocr_batch.run_pages(list(zip(images, prepared)), _ocr_page, concurrency)
+    except ocr_batch.OcrPagesFailed as e:
+        log_timing("ocr.batch", started_at, pages=len(prepared), failed_pages=len(e.pages), concurrency=concurrency)
+        raise
+    log_timing("ocr.batch", started_at, pages=len(prepared), failed_pages=0, concurrency=concurrency)
+    return ",".join(sorted(set(models))) or "-", ocr_batch.merge_page_texts(texts)
+
+
+def ocr_image(image_source: Union[str, List[str]], on_model_attempt: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Extract text from Single or Multiple images using Groq Vision.
+    Hedges across VALID_VISION_MODELS so a slow or failing primary model does
+    not hold the user for the whole provider timeout. Multi-image messages are
+    OCR'd page by page in parallel and merged in page order (OCR_BATCH_ENABLED);
+    if a page cannot be read, ``ocr_batch.OcrPagesFailed`` names it.
+    Optimized for Indonesian financial receipts (BCA, Mandiri, BNI, BRI, etc.)
+    """
+    try:
+        secure_log("INFO", "Running OCR via Groq Vision (Multi-Image)...")
         
-        # Build payload. WhatsApp receipt screenshots are often tiny thumbnails;
-        # upscaling them before the vision request makes table text legible.
-        for path in paths:
-            with Image.open(path) as image:
-                width, height = image.size
-                if max(width, height) < 1600:
-                    scale = min(4, 1600 / max(width, height))
-                    image = image.convert('RGB').resize(
-                        (round(width * scale), round(height * scale)),
-                        Image.Resampling.LANCZOS,
-                    )
-                    buffered = io.BytesIO()
-                    image.save(buffered, format='JPEG', quality=95, optimize=True)
-                    image_bytes = buffered.getvalue()
-                    mime_type = 'image/jpeg'
-                else:
-                    with open(path, 'rb') as img_file:
-                        image_bytes = img_file.read()
-                    ext = os.path.splitext(path)[1].lower()
-                    mime_types = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg',
-                                  '.png': 'image/png', '.webp': 'image/webp'}
-                    mime_type = mime_types.get(ext, 'image/jpeg')
-
-            image_data = base64.b64encode(image_bytes).decode('utf-8')
-            
-            content_payload.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:{mime_type};base64,{image_data}"
-                }
-            })
+        # Ensure list
+        paths = [image_source] if isinstance(image_source, str) else image_source
         
-        # Try models sequentially
-        last_error = None
-        for model_name in VALID_VISION_MODELS:
+        if not paths:
+            return ""
+
+        # Identical pages in one multi-image message are sent only once.
+        images = read_unique_images(paths)
+        if len(images) < len(paths):
+            secure_log("INFO", f"OCR dropped {len(paths) - len(images)} duplicate image(s)")
+
+        # Resent/forwarded screenshots and inbox replays skip the vision call.
+        cache_key = ocr_cache.key_for_image_bytes([data for _path, data in images], namespace=OCR_PROMPT)
+        cached = ocr_cache.lookup(cache_key)
+        if cached:
+            secure_log(
+                "INFO",
+                f"OCR cache hit [{cached['model']}]: {len(cached['text'])} chars",
+                match=cached["match"],
+            )
+            return cached["text"]
+
+        # Resize, grayscale and contrast-normalize off the request thread, then
+        # re-encode each page within OCR_IMAGE_BYTE_BUDGET. WhatsApp thumbnails
+        # are upscaled so table text stays legible.
+        started_at = time.perf_counter()
+        prepared = prepare_images(images)
+        log_timing(
+            "ocr.preprocess",
+            started_at,
+            images=len(prepared),
+            source_bytes=sum(item.source_bytes for item in prepared),
+            payload_bytes=sum(len(item.data) for item in prepared),
+        )
+
+        if len(prepared) > 1 and ocr_batch.batch_enabled():
+            # OcrPagesFailed propagates: a merge with a missing page could drop rows.
+            model_name, extracted_text = _ocr_pages_batch(images, prepared, on_model_attempt)
+        else:
             try:
-                secure_log("INFO", f"Trying Vision Model: {model_name}")
-                if on_model_attempt:
-                    try:
-                        on_model_attempt(model_name)
-                    except Exception:
-                        pass
-                request_kwargs = {
-                    "model": model_name,
-                    "messages": [{"role": "user", "content": content_payload}],
-                    "temperature": 0.0,
-                    "max_completion_tokens": 2048,
-                }
-                if model_name == "qwen/qwen3.6-27b":
-                    request_kwargs.update(reasoning_effort="none", reasoning_format="hidden")
-                response = call_groq_api(**request_kwargs)
-                
-                extracted_text = response.choices[0].message.content.strip()
-                extracted_text = sanitize_input(extracted_text)
-                
-                # Enhanced logging for financial data
-                secure_log("INFO", f"OCR Success [{model_name}]: {len(extracted_text)} chars")
-                
-                # Debug logging
-                if OCR_DEBUG:
-                    secure_log("INFO", f"OCR_PREVIEW: {extracted_text[:300]}...")
-                
-                # Validation check for key financial markers
-                if "Rp" in extracted_text or "rekening" in extracted_text.lower():
-                    secure_log("INFO", "✓ Financial markers detected in OCR")
-                else:
-                    secure_log("WARNING", "⚠ No financial markers found - verify image quality")
-                
-                # Post-OCR validation for financial data
-                validation = validate_financial_ocr(extracted_text)
-                if validation["warnings"]:
-                    for warning in validation["warnings"]:
-                        secure_log("WARNING", f"OCR Validation: {warning}")
-                
-                return extracted_text
-                
-            except Exception as e:
-                # Log error and try next model
-                secure_log("WARNING", f"Model {model_name} failed: {type(e).__name__}. Trying next...")
-                last_error = e
-                continue
-                    
-        # If all failed, return empty OCR text and let caller handle fallback
-        secure_log("ERROR", "All Vision Models failed.")
-        return ""
+                model_name, extracted_text = _vision_transcribe(prepared, on_model_attempt)
+            except HedgedCallsFailed as e:
+                # If all failed, return empty OCR text and let caller handle fallback
+                last_error = e.last_error
+                secure_log(
+                    "ERROR",
+                    f"All Vision Models failed. last_error={type(last_error).__name__ if last_error else 'empty'}",
+                )
+                return ""
 
+        # Enhanced logging for financial data
+        secure_log("INFO", f"OCR Success [{model_name}]: {len(extracted_text)} chars")
+
+        # Debug logging
+        if OCR_DEBUG:
+            secure_log("INFO", f"OCR_PREVIEW: {extracted_text[:300]}...")
+
+        # Validation check for key financial markers
+        if "Rp" in extracted_text or "rekening" in extracted_text.lower():
+            secure_log("INFO", "✓ Financial markers detected in OCR")
+        else:
+            secure_log("WARNING", "⚠ No financial markers found - verify image quality")
+
+        # Post-OCR validation for financial data
+        validation = validate_financial_ocr(extracted_text)
+        if validation["warnings"]:
+            for warning in validation["warnings"]:
+                secure_log("WARNING", f"OCR Validation: {warning}")
+
+        ocr_cache.store(cache_key, model_name, extracted_text)
+        return extracted_text
+
+    except ocr_batch.OcrPagesFailed as e:
+        secure_log("ERROR", f"OCR batch incomplete: pages {e.pages} unreadable")
+        raise
     except Exception as e:
         secure_log("ERROR", f"Groq Vision OCR failed: {type(e).__name__}: {str(e)}")
         return ""
@@ -2973,17 +3151,11 @@ def is_semantically_valid_project_name(text: str) -> bool:
         
     return True
 
-def get_extraction_prompt(sender_name: str) -> str:
-    """
-    Generate the SECURE system prompt for financial data extraction.
-    Includes guardrails against prompt injection.
-    
-    Args:
-        sender_name: Name of the person sending the transaction
-    """
-    current_date = datetime.now().strftime('%Y-%m-%d')
+@lru_cache(maxsize=1)
+def _extraction_prompt_static() -> str:
+    """Static body of the extraction prompt, built once so it stays byte-identical."""
     categories_str = ', '.join(ALLOWED_CATEGORIES)
-    
+
     return f"""You are a financial transaction extractor for Indonesian language.
 
 **GOAL:**
@@ -3109,7 +3281,21 @@ CRITICAL LOGIC RULES:
 7. DEBT SOURCE CONTEXT (IMPORTANT):
    - Phrases like "utang/pinjam dari TX SBY" are funding context for the MAIN transaction.
    - DO NOT create a separate transaction with description like "Pinjam TX SBY".
-   - Keep only the main expense/income transaction amount; debt logging is handled downstream.
+   - Keep only the main expense/income transaction amount; debt logging is handled downstream."""
+
+
+def get_extraction_prompt(sender_name: str) -> str:
+    """
+    Generate the SECURE system prompt for financial data extraction.
+    Includes guardrails against prompt injection.
+
+    Per-request values go last so the static prefix can be cached by the provider.
+
+    Args:
+        sender_name: Name of the person sending the transaction
+    """
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    return f"""{_extraction_prompt_static()}
 
 CONTEXT:
 - Today: {current_date}
@@ -3207,23 +3393,61 @@ def download_media(media_url: str, file_extension: str = None) -> str:
                 pass
 
 
+WHISPER_MODEL = "whisper-large-v3"
+WHISPER_LANGUAGE = "id"
+
+
+def _whisper_transcribe(filename: str, audio: bytes) -> str:
+    transcription = groq_client.audio.transcriptions.create(
+        file=(filename, audio),
+        model=WHISPER_MODEL,
+        language=WHISPER_LANGUAGE
+    )
+    return (transcription.text or "").strip()
+
+
 def transcribe_audio(audio_path: str) -> str:
-    """Transcribe audio using Groq Whisper."""
+    """
+    Transcribe audio using Groq Whisper.
+    Transcripts are cached by audio content hash, so forwarded voice notes are
+    free. Notes longer than AUDIO_CHUNK_MIN_SECONDS are split on silence and
+    the chunks transcribed concurrently, then stitched back in order.
+    """
     try:
         secure_log("INFO", "Transcribing audio...")
         
         with open(audio_path, 'rb') as audio_file:
-            transcription = groq_client.audio.transcriptions.create(
-                file=(os.path.basename(audio_path), audio_file.read()),
-                model="whisper-large-v3",
-                language="id"
-            )
-        
-        result = transcription.text.strip()
+            audio = audio_file.read()
+
+        cache_key = audio_cache.key_for_audio(audio, WHISPER_MODEL, WHISPER_LANGUAGE)
+        cached = audio_cache.lookup(cache_key)
+        if cached is not None:
+            secure_log("INFO", f"Transcription cache hit: {len(cached)} chars")
+            return cached
+
+        started_at = time.perf_counter()
+        result = None
+        chunks = audio_chunking.split_audio(audio)
+        if chunks:
+            concurrency = audio_chunking.chunk_concurrency(groq_client.key_count)
+            try:
+                texts = audio_chunking.transcribe_chunks(
+                    chunks,
+                    lambda index, chunk: _whisper_transcribe(f"chunk{index + 1}.wav", chunk.data),
+                    concurrency,
+                )
+                result = audio_chunking.stitch_transcripts(texts)
+            except Exception as e:
+                secure_log("WARNING", f"Chunked transcription failed, sending whole file: {type(e).__name__}")
+        chunk_count = len(chunks) if result is not None else 1
+        if result is None:
+            result = _whisper_transcribe(os.path.basename(audio_path), audio)
+        log_timing("audio.transcribe", started_at, chunks=chunk_count)
         
         # Sanitize transcription result
         result = sanitize_input(result)
         
+        audio_cache.store(cache_key, result)
         secure_log("INFO", f"Transcription complete: {len(result)} chars")
         return result
         
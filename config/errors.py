@@ -118,6 +118,10 @@ class UserErrors:
         "❓ Teks atau nominal pada gambar tidak terbaca.\n"
         "Kirim ulang gambar yang lebih jelas atau tambahkan caption transaksi."
     )
+    IMAGE_PAGES_NOT_READABLE = (
+        "❓ Halaman {pages} dari gambar yang dikirim gagal dibaca, jadi belum ada yang dicatat.\n"
+        "Kirim ulang semua gambarnya; halaman yang sudah terbaca tidak diproses ulang."
+    )
     IMAGE_NOT_RECEIPT = (
         "❗ Gambar tidak terdeteksi sebagai struk/transaksi.\n"
         "Kirim struk yang lebih jelas atau tambahkan keterangan transaksi."
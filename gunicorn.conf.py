@@ -5,3 +5,13 @@ def post_worker_init(_worker):
     from main import start_background_workers
 
     start_background_workers()
+
+
+def worker_exit(_server, _worker):
+    from agent_core.audit_log import shutdown_audit_log
+    from services.report_jobs import shutdown_report_jobs
+    from utils.image_preprocess import shutdown_preprocess_pool
+
+    shutdown_preprocess_pool()
+    shutdown_report_jobs()
+    shutdown_audit_log()
@@ -1,7 +1,8 @@
 """Agentic natural-language finance queries.
 
-Groq plans the question and writes the final prose. Python remains responsible
-for retrieving rows, filtering them, and calculating every number.
+Groq plans the question. Python retrieves rows, filters them and calculates
+every number; common answer shapes are then rendered from templates, and Groq
+only writes the prose for the rest.
 """
 
 from __future__ import annotations
@@ -15,10 +16,21 @@ from typing import Any, Dict, Iterable, List, Optional
 
 from ai_helper import call_groq_api
 from agent_core.audit_log import log_event
-from agent_core.query_engine import execute, parse_ast, select_rows
+from agent_core.query_engine import date_ordinal, execute, parse_ast, select_rows
+from agent_core.topk import top_k
 from config.wallets import resolve_dompet_from_text
 from security import detect_prompt_injection, log_timing
-from sheets_helper import find_open_hutang, get_all_data, get_hutang_summary, get_wallet_balances
+from services import query_cache, query_followup
+from services.answer_templates import render_answer
+from services.ledger_index import window_start
+from services.prompt_builder import fit_section, record_usage
+from sheets_helper import (
+    find_open_hutang,
+    get_all_data,
+    get_hutang_summary,
+    get_wallet_balances,
+    ledger_data_version,
+)
 from utils.amounts import parse_money_token
 from utils.parsers import parse_revision_amount
 
@@ -26,6 +38,7 @@ from utils.parsers import parse_revision_amount
 logger = logging.getLogger(__name__)
 QUERY_MODEL = os.getenv("QUERY_AGENT_MODEL", "openai/gpt-oss-20b")
 MAX_EVIDENCE_ROWS = 60
+MAX_TOP_ROWS = 5
 PROJECT_IGNORES = {"", "umum", "saldo umum", "operasional", "operasional kantor", "-"}
 
 
@@ -55,20 +68,16 @@ def _safe_text(value: Any, limit: int, *, fallback: str = "") -> str:
     return fallback if detect_prompt_injection(raw_text)[0] else raw_text[:limit]
 
 
-def _ask_llm_for_plan(question: str, default_days: Optional[int]) -> Dict[str, Any]:
-    today = datetime.now().date().isoformat()
-    default_period = "all_time" if default_days is None else default_days
-    system = f"""You route Indonesian finance questions into a safe retrieval plan.
-Today is {today}. The caller's default period is {default_period}.
+QUERY_PLAN_SYSTEM_PROMPT = """You route Indonesian finance questions into a safe retrieval plan.
 Return JSON only with this schema:
-{{
+{
   "intent": "project_activity|project_detail|summary|wallet|debt|comparison|category|ranking|transaction_search|unknown",
   "metric": "sum|count|avg|max|min",
-  "filters": {{"project": null, "category": null, "tipe": null, "company": null, "dompet": null, "date_from": null, "date_to": null}},
+  "filters": {"project": null, "category": null, "tipe": null, "company": null, "dompet": null, "date_from": null, "date_to": null},
   "group_by": null|"project"|"category"|"tipe"|"company"|"dompet",
-  "period_days": {default_period}|null,
+  "period_days": integer|null,
   "detail": false
-}}
+}
 
 Rules:
 - "project yang dikerjakan", "project aktif", "project apa saja" => project_activity, group_by project.
@@ -77,16 +86,28 @@ Rules:
 - period_days is an integer: 1 for today, 7 for this week, 30 for this month/30 days; null means all history.
 - Do not calculate amounts. Do not invent project names. Use unknown when the question is not a finance query.
 """
+
+
+def _ask_llm_for_plan(question: str, default_days: Optional[int]) -> Dict[str, Any]:
+    today = datetime.now().date().isoformat()
+    default_period = "all_time" if default_days is None else default_days
+    # Per-request values follow the static prompt so its prefix stays cacheable.
+    system = (
+        f"{QUERY_PLAN_SYSTEM_PROMPT}\nToday is {today}. "
+        f"The caller's default period is {default_period} (use it when the question names no period)."
+    )
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": json.dumps({"question": question}, ensure_ascii=False)},
+    ]
     response = call_groq_api(
         model=QUERY_MODEL,
         temperature=0,
         max_tokens=500,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": json.dumps({"question": question}, ensure_ascii=False)},
-        ],
+        messages=messages,
         response_format={"type": "json_object"},
     )
+    record_usage("query_plan", messages, response)
     return _extract_json_object(response.choices[0].message.content)
 
 
@@ -194,16 +215,37 @@ def _safe_hutang_row(row: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def _retrieval_context(question: str, plan: Dict[str, Any], supplied_rows: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Any]:
-    ast = plan["ast"]
-    days = plan["period_days"]
+def _question_inputs(question: str, plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Retrieval inputs read from the question text rather than the plan."""
     requested_dompet = resolve_dompet_from_text(
-        ast["filters"].get("dompet") or question
+        plan["ast"]["filters"].get("dompet") or question
     )
     question_norm = str(question or "").casefold()
-    needs_wallet_balance = any(word in question_norm for word in ("saldo", "balance", "sisa"))
+    return {
+        "requested_dompet": requested_dompet,
+        "needs_wallet_balance": any(word in question_norm for word in ("saldo", "balance", "sisa")),
+    }
+
+
+def _retrieval_context(
+    question: str,
+    plan: Dict[str, Any],
+    supplied_rows: Optional[Iterable[Dict[str, Any]]] = None,
+    *,
+    historical_fallback: bool = True,
+    data_version: Any = None,
+) -> Dict[str, Any]:
+    ast = plan["ast"]
+    days = plan["period_days"]
+    inputs = _question_inputs(question, plan)
+    requested_dompet = inputs["requested_dompet"]
+    needs_wallet_balance = inputs["needs_wallet_balance"]
+    if data_version is None:
+        # Read before the rows, so a racing write leaves the result set stale-tagged.
+        data_version = ledger_data_version()
 
     if plan["intent"] == "debt":
+        query_followup.remember(plan, None, data_version)
         debt_summary = get_hutang_summary(days=days or 0)
         debt_facts = {"summary": debt_summary}
         if requested_dompet:
@@ -218,8 +260,12 @@ def _retrieval_context(question: str, plan: Dict[str, Any], supplied_rows: Optio
                 "net": lender_total - borrower_total,
                 "borrower_count": len(borrower_rows),
                 "lender_count": len(lender_rows),
-                "borrower_rows": [_safe_hutang_row(row) for row in borrower_rows],
-                "lender_rows": [_safe_hutang_row(row) for row in lender_rows],
+                "borrower_rows": fit_section(
+                    "query_answer", "debt_rows", [_safe_hutang_row(row) for row in borrower_rows], 800
+                ),
+                "lender_rows": fit_section(
+                    "query_answer", "debt_rows", [_safe_hutang_row(row) for row in lender_rows], 800
+                ),
             }
         return {
             "intent": plan["intent"],
@@ -240,7 +286,7 @@ def _retrieval_context(question: str, plan: Dict[str, Any], supplied_rows: Optio
     period_selected = select_rows(ast, period_rows)
     historical_rows: List[Dict[str, Any]] = []
     historical_selected: List[Dict[str, Any]] = []
-    if days is not None and not period_selected:
+    if historical_fallback and days is not None and not period_selected:
         historical_rows = get_all_data(None)
         if plan["intent"] == "project_activity":
             historical_rows = [row for row in historical_rows if _is_real_project(row)]
@@ -261,9 +307,32 @@ def _retrieval_context(question: str, plan: Dict[str, Any], supplied_rows: Optio
         "period_stats": stats,
         "historical_row_count": len(historical_selected),
         "historical_stats": historical_stats,
-        "evidence": [_safe_row(row) for row in selected[:MAX_EVIDENCE_ROWS]],
+        # Newest rows first, so a tight budget drops the oldest evidence.
+        "evidence": fit_section(
+            "query_answer", "evidence", [_safe_row(row) for row in selected[:MAX_EVIDENCE_ROWS]], 2500
+        ),
         "question": question,
     }
+    if plan["intent"] == "ranking" and not ast.get("group_by"):
+        facts["top_rows"] = [
+            _safe_row(row)
+            for row in top_k(
+                period_selected or historical_selected,
+                MAX_TOP_ROWS,
+                key=lambda row: _safe_int(row.get("jumlah")),
+                largest=ast.get("metric") != "min",
+            )
+        ]
+    if plan["intent"] == "comparison" and days is not None and supplied_rows is None:
+        # The window just before this one, from the same day-granular cut.
+        start = window_start(days)
+        previous_rows = [
+            row for row in get_all_data(days * 2)
+            if (date_ordinal(str(row.get("tanggal") or "")) or start) < start
+        ]
+        facts["previous_period_stats"] = execute(ast, previous_rows)
+    narrowable = period_selected and plan["intent"] != "comparison" and not needs_wallet_balance
+    query_followup.remember(plan, period_selected if narrowable else None, data_version)
     if needs_wallet_balance:
         facts["wallet_balances"] = _safe_wallet_balances(
             get_wallet_balances(), requested_dompet=requested_dompet
@@ -271,8 +340,7 @@ def _retrieval_context(question: str, plan: Dict[str, Any], supplied_rows: Optio
     return facts
 
 
-def _answer_from_facts(question: str, facts: Dict[str, Any]) -> str:
-    system = """You answer an Indonesian finance question using only the supplied FACTS.
+QUERY_ANSWER_SYSTEM_PROMPT = """You answer an Indonesian finance question using only the supplied FACTS.
 The numbers in FACTS were calculated by Python and are authoritative.
 Never invent a transaction, amount, project, date, or explanation.
 If period_row_count is 0 but historical_row_count is positive, clearly say there is no activity in the requested period and label historical facts separately.
@@ -280,21 +348,59 @@ For saldo/balance questions, use wallet_balances as authoritative; do not derive
 For debt questions, use debt.summary or debt.position as authoritative; do not infer debt from transaction evidence.
 Answer naturally and directly in Indonesian for WhatsApp. Do not output a generic report template, do not say 'Hasil:', do not expose JSON/tags, and do not offer unrelated slash commands.
 Use short paragraphs or bullets only when they make the answer easier to read. Mention the evidence (date, amount, description) when the user asks for detail."""
+
+
+def _answer_from_facts(question: str, facts: Dict[str, Any]) -> str:
+    messages = [
+        {"role": "system", "content": QUERY_ANSWER_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": json.dumps({"question": question, "facts": facts}, ensure_ascii=False),
+        },
+    ]
     response = call_groq_api(
         model=QUERY_MODEL,
         temperature=0.1,
         max_tokens=800,
-        messages=[
-            {"role": "system", "content": system},
-            {
-                "role": "user",
-                "content": json.dumps({"question": question, "facts": facts}, ensure_ascii=False),
-            },
-        ],
+        messages=messages,
     )
+    record_usage("query_answer", messages, response)
     return response.choices[0].message.content.strip()
 
 
+def handle_nl_followup(question: str) -> Optional[str]:
+    """Answer a narrowing follow-up from the chat's previous result set, or None."""
+    if detect_prompt_injection(question or "")[0]:
+        return None
+    data_version = ledger_data_version()
+    cached = query_followup.lookup(data_version)
+    if cached is None:
+        return None
+    previous_plan, rows = cached
+    plan = query_followup.narrow_plan(question, previous_plan)
+    if plan is None:
+        return None
+
+    started = time.perf_counter()
+    try:
+        facts = _retrieval_context(
+            question, plan, supplied_rows=rows, historical_fallback=False, data_version=data_version
+        )
+        answer = render_answer(plan, facts) or _answer_from_facts(question, facts)
+    except Exception as exc:
+        logger.warning("Query agent follow-up failed: %s", type(exc).__name__)
+        return None
+    finally:
+        log_timing("query_agent.followup", started, intent=plan["intent"])
+    log_event("query_agent", {
+        "question": (question or "")[:120],
+        "intent": plan["intent"],
+        "period_rows": facts["period_row_count"],
+        "followup": True,
+    })
+    return answer or None
+
+
 def handle_nl_query(
     question: str,
     rows: Optional[Iterable[Dict[str, Any]]] = None,
@@ -305,9 +411,12 @@ def handle_nl_query(
         logger.warning("Query agent rejected prompt-injection input")
         return None
     plan_started = time.perf_counter()
+    plan = query_cache.lookup_plan(question, default_days)
     try:
-        raw_plan = _ask_llm_for_plan(question, default_days)
-        plan = _normalize_plan(raw_plan, default_days)
+        if plan is None:
+            raw_plan = _ask_llm_for_plan(question, default_days)
+            plan = _normalize_plan(raw_plan, default_days)
+            query_cache.store_plan(question, default_days, plan)
     except Exception as exc:
         logger.warning("Query agent planning failed: %s", type(exc).__name__)
         return None
@@ -317,6 +426,21 @@ def handle_nl_query(
     if plan["intent"] == "unknown":
         return None
 
+    # Caller-supplied rows are not covered by the ledger data version. The
+    # version is read before retrieval, so a write that lands mid-request
+    # files this answer under a version that is already stale.
+    answer_key = None
+    if rows is None:
+        answer_key = query_cache.answer_key(plan, _question_inputs(question, plan), ledger_data_version())
+    cached_answer = query_cache.lookup_answer(answer_key)
+    if cached_answer is not None:
+        log_event("query_agent", {
+            "question": (question or "")[:120],
+            "intent": plan["intent"],
+            "cached": True,
+        })
+        return cached_answer
+
     retrieval_started = time.perf_counter()
     try:
         facts = _retrieval_context(question, plan, supplied_rows=rows)
@@ -328,13 +452,18 @@ def handle_nl_query(
 
     answer_started = time.perf_counter()
     try:
-        answer = _answer_from_facts(question, facts)
+        answer = render_answer(plan, facts)
+        templated = answer is not None
+        if not templated:
+            answer = _answer_from_facts(question, facts)
         log_event("query_agent", {
             "question": (question or "")[:120],
             "intent": plan["intent"],
             "period_rows": facts["period_row_count"],
             "historical_rows": facts["historical_row_count"],
+            "templated": templated,
         })
+        query_cache.store_answer(answer_key, answer)
         return answer or None
     except Exception as exc:
         logger.warning("Query agent answer failed: %s", type(exc).__name__)
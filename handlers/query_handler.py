@@ -16,6 +16,7 @@ from collections import Counter
 from datetime import datetime
 from difflib import SequenceMatcher
 
+from agent_core.topk import top_k
 from ai_helper import groq_client
 from config.constants import OPERASIONAL_SHEET_NAME
 from config.wallets import resolve_dompet_from_text
@@ -27,7 +28,9 @@ from sheets_helper import (
     get_summary,
     get_wallet_balances,
     find_open_hutang,
+    ledger_snapshot,
 )
+from services.query_followup import followup_scope
 from utils.normalizer import normalize_nyeleneh_text
 from utils.parsers import extract_project_name_from_text
 
@@ -119,6 +122,28 @@ def _filter_rows_by_descriptors(rows: list, tokens: list) -> tuple:
     return rows, "none"
 
 
+def _indexed_descriptor_scope(tokens: list, days) -> tuple:
+    """
+    _filter_rows_by_descriptors over the get_all_data(days) window, via the text index.
+    Returns (rows, mode, window_size), or None when the index is disabled.
+    Mode 'none' comes back with no rows; callers fall back to the unfiltered path.
+    """
+    if not tokens:
+        return None
+    from services.ledger_index import search_rows, window_row_count
+
+    window_size = window_row_count(days)
+    if window_size is None:
+        return None
+    strict_rows = search_rows(tokens, days, match_all=True)
+    if strict_rows:
+        return strict_rows, "strict", window_size
+    loose_rows = search_rows(tokens, days, match_all=False)
+    if loose_rows:
+        return loose_rows, "loose", window_size
+    return [], "none", window_size
+
+
 def _format_evidence_line(d: dict) -> str:
     """Format a single transaction row as a readable evidence line."""
     amt = _format_idr(d.get("jumlah", 0))
@@ -269,8 +294,7 @@ def _strip_context_tags(ctx: str) -> str:
 def _recent_transactions(rows: list, limit: int = 3) -> list:
     if not rows:
         return []
-    sorted_rows = sorted(rows, key=lambda d: _parse_date(d.get("tanggal", "")), reverse=True)
-    return sorted_rows[:limit]
+    return top_k(rows, limit, key=lambda d: _parse_date(d.get("tanggal", "")))
 
 
 def _match_project_name(query: str, by_projek: dict) -> tuple:
@@ -807,8 +831,12 @@ def _handle_general_query(norm_text: str, days: int, period_label: str, raw_quer
     scoped_applied = False
 
     if descriptor_tokens:
-        data = get_all_data(days) if days is not None else get_all_data(None)
-        filtered, scope_mode = _filter_rows_by_descriptors(data, descriptor_tokens)
+        indexed = _indexed_descriptor_scope(descriptor_tokens, days)
+        if indexed is not None:
+            filtered, scope_mode, _window_size = indexed
+        else:
+            data = get_all_data(days) if days is not None else get_all_data(None)
+            filtered, scope_mode = _filter_rows_by_descriptors(data, descriptor_tokens)
         if scope_mode in {"strict", "loose"}:
             scoped_rows = filtered
             scoped_applied = True
@@ -901,11 +929,11 @@ def _handle_ranking_query(norm_text: str, days: int, period_label: str) -> str:
         return f"Belum ada data projek ({period_label})."
 
     if wants_loss:
-        sorted_p = sorted(by_projek.values(), key=lambda x: x.get("profit_loss", 0))
+        sorted_p = top_k(by_projek.values(), 10, key=lambda x: x.get("profit_loss", 0), largest=False)
     elif wants_profit:
-        sorted_p = sorted(by_projek.values(), key=lambda x: x.get("profit_loss", 0), reverse=True)
+        sorted_p = top_k(by_projek.values(), 10, key=lambda x: x.get("profit_loss", 0))
     else:
-        sorted_p = sorted(by_projek.values(), key=lambda x: x.get("expense", 0) + x.get("income", 0), reverse=True)
+        sorted_p = top_k(by_projek.values(), 10, key=lambda x: x.get("expense", 0) + x.get("income", 0))
 
     title = "paling untung" if wants_profit else "paling rugi" if wants_loss else "terbesar"
     lines = [f"🏆 Ranking Projek {title} ({period_label})"]
@@ -996,37 +1024,29 @@ def _handle_minmax_query(norm_text: str, days: int, period_label: str) -> str:
     wants_max = any(k in norm_text for k in ["terbesar", "tertinggi", "termahal", "paling besar", "paling mahal"])
     wants_min = any(k in norm_text for k in ["terkecil", "terendah", "termurah", "paling kecil", "paling murah"])
 
-    data = get_all_data(days) if days is not None else get_all_data(None)
-    if not data:
-        return f"Belum ada data transaksi ({period_label})."
-
     # Filter by type if specified
     wants_expense = any(k in norm_text for k in ["pengeluaran", "expense", "keluar"])
     wants_income = any(k in norm_text for k in ["pemasukan", "income", "masuk"])
 
     if wants_expense:
-        filtered = [d for d in data if d.get("tipe") == "Pengeluaran"]
-        type_label = "Pengeluaran"
+        tipe, type_label = "Pengeluaran", "Pengeluaran"
     elif wants_income:
-        filtered = [d for d in data if d.get("tipe") == "Pemasukan"]
-        type_label = "Pemasukan"
+        tipe, type_label = "Pemasukan", "Pemasukan"
     else:
-        filtered = data
-        type_label = "Transaksi"
+        tipe, type_label = None, "Transaksi"
 
-    if not filtered:
+    limit = _evidence_limit(norm_text)
+    top = _ranked_transactions(days, limit, tipe, largest=not wants_min)
+    if top is None:
+        return f"Belum ada data transaksi ({period_label})."
+    if not top:
         return f"Tidak ada data {type_label.lower()} ({period_label})."
 
     if wants_min:
-        sorted_data = sorted(filtered, key=lambda d: d.get("jumlah", 0))
         title = f"📉 {type_label} Terkecil ({period_label})"
     else:
-        sorted_data = sorted(filtered, key=lambda d: d.get("jumlah", 0), reverse=True)
         title = f"📈 {type_label} Terbesar ({period_label})"
 
-    limit = _evidence_limit(norm_text)
-    top = sorted_data[:limit]
-
     lines = [title]
     for i, d in enumerate(top, 1):
         lines.append(_format_evidence_line(d))
@@ -1034,25 +1054,53 @@ def _handle_minmax_query(norm_text: str, days: int, period_label: str) -> str:
     return "\n".join(lines)
 
 
-def _handle_cross_dompet_query(norm_text: str, days: int, period_label: str) -> str:
-    """Handle cross-dompet comparison queries."""
+def _ranked_transactions(days: int, limit: int, tipe: str = None, largest: bool = True) -> list:
+    """Top `limit` rows by amount in the window, or None when there is no data at all."""
+    from services.ledger_index import ranked_rows, window_row_count
+
+    window_size = window_row_count(days)
+    if window_size is not None:
+        return ranked_rows(limit, days, tipe=tipe, largest=largest) if window_size else None
+
     data = get_all_data(days) if days is not None else get_all_data(None)
     if not data:
-        return f"Belum ada data transaksi ({period_label})."
+        return None
+    rows = data if tipe is None else (d for d in data if d.get("tipe") == tipe)
+    return top_k(rows, limit, key=lambda d: d.get("jumlah", 0), largest=largest)
+
+
+def _indexed_dompet_totals(days: int) -> dict:
+    """Per-dompet income/expense/count from the ledger time index, or None."""
+    from services.ledger_index import window_totals
 
+    totals = window_totals("company", days)
+    if totals is None:
+        return None
+    income = window_totals("company", days, tipe="Pemasukan") or {}
     by_dompet = {}
-    for d in data:
-        comp = d.get("company_sheet", "Unknown")
-        if comp not in by_dompet:
-            by_dompet[comp] = {"income": 0, "expense": 0, "count": 0}
-        by_dompet[comp]["count"] += 1
-        if d.get("tipe") == "Pemasukan":
-            by_dompet[comp]["income"] += d.get("jumlah", 0)
-        else:
-            by_dompet[comp]["expense"] += d.get("jumlah", 0)
+    for comp, (amount, count) in totals.items():
+        comp_income = income.get(comp, (0, 0))[0]
+        by_dompet[comp] = {"income": comp_income, "expense": amount - comp_income, "count": count}
+    return by_dompet
 
+
+def _handle_cross_dompet_query(norm_text: str, days: int, period_label: str) -> str:
+    """Handle cross-dompet comparison queries."""
+    by_dompet = _indexed_dompet_totals(days)
+    if by_dompet is None:
+        data = get_all_data(days) if days is not None else get_all_data(None)
+        by_dompet = {}
+        for d in data:
+            comp = d.get("company_sheet", "Unknown")
+            if comp not in by_dompet:
+                by_dompet[comp] = {"income": 0, "expense": 0, "count": 0}
+            by_dompet[comp]["count"] += 1
+            if d.get("tipe") == "Pemasukan":
+                by_dompet[comp]["income"] += d.get("jumlah", 0)
+            else:
+                by_dompet[comp]["expense"] += d.get("jumlah", 0)
     if not by_dompet:
-        return f"Belum ada data dompet ({period_label})."
+        return f"Belum ada data transaksi ({period_label})."
 
     # Also get current balances
     balances = get_wallet_balances()
@@ -1081,12 +1129,17 @@ def _handle_person_query(query: str, norm_text: str, days: int, period_label: st
     if not descriptor_tokens:
         return _handle_general_query(norm_text, days, period_label, query)
 
-    data = get_all_data(days) if days is not None else get_all_data(None)
-    if not data:
+    indexed = _indexed_descriptor_scope(descriptor_tokens, days)
+    if indexed is not None:
+        filtered, scope_mode, window_size = indexed
+    else:
+        data = get_all_data(days) if days is not None else get_all_data(None)
+        window_size = len(data or [])
+        filtered, scope_mode = _filter_rows_by_descriptors(data or [], descriptor_tokens)
+    if not window_size:
         return f"Belum ada data transaksi ({period_label})."
 
-    filtered, scope_mode = _filter_rows_by_descriptors(data, descriptor_tokens)
-    if scope_mode == "none" or len(filtered) == len(data):
+    if scope_mode == "none" or len(filtered) == window_size:
         return _handle_general_query(norm_text, days, period_label, query)
 
     income = sum(d.get("jumlah", 0) for d in filtered if d.get("tipe") == "Pemasukan")
@@ -1283,13 +1336,19 @@ def _wallet_insight_lines(query: str, response: str) -> list:
         from sheets_helper import DOMPET_SHEETS as _SHEETS
         days, _ = _extract_days(norm_q)
         days_for_compare = days if days is not None else 30
-        data = get_all_data(days_for_compare) or []
-
         per_dompet_expense = Counter()
-        for d in data:
-            sheet = d.get("company_sheet", "")
-            if sheet in _SHEETS and d.get("tipe") == "Pengeluaran":
-                per_dompet_expense[sheet] += int(d.get("jumlah", 0) or 0)
+        from services.ledger_index import window_totals
+
+        indexed = window_totals("company", days_for_compare, tipe="Pengeluaran")
+        if indexed is not None:
+            for sheet, (amount, _count) in indexed.items():
+                if sheet in _SHEETS:
+                    per_dompet_expense[sheet] += amount
+        else:
+            for d in get_all_data(days_for_compare) or []:
+                sheet = d.get("company_sheet", "")
+                if sheet in _SHEETS and d.get("tipe") == "Pengeluaran":
+                    per_dompet_expense[sheet] += int(d.get("jumlah", 0) or 0)
 
         if len(per_dompet_expense) < 2:
             return []
@@ -1383,6 +1442,14 @@ def _enhance_query_response(query: str, response: str) -> str:
 
 
 def handle_query_command(query: str, user_id: str, chat_id: str, raw_query: str = None) -> str:
+    # One ledger snapshot per command: the router, the handler and the insight
+    # enhancers all read the same rows/summary/balances instead of re-reading.
+    # Follow-ups ("detailnya", "khusus proyek X") narrow this chat's last result.
+    with ledger_snapshot(), followup_scope(chat_id):
+        return _route_query_command(query, raw_query)
+
+
+def _route_query_command(query: str, raw_query: str = None) -> str:
     try:
         clean_query = sanitize_input(query)
         if not clean_query:
@@ -1403,9 +1470,9 @@ def handle_query_command(query: str, user_id: str, chat_id: str, raw_query: str
         }
         if query_agent_enabled:
             try:
-                from handlers.nl_query_handler import handle_nl_query
+                from handlers.nl_query_handler import handle_nl_followup, handle_nl_query
 
-                nl_answer = handle_nl_query(detect_query, default_days=days)
+                nl_answer = handle_nl_followup(detect_query) or handle_nl_query(detect_query, default_days=days)
                 if nl_answer:
                     return nl_answer
             except Exception as exc:
@@ -29,6 +29,7 @@ load_dotenv()
 # ===================== GLOBAL IMPORTS =====================
 # AI & Data Processing
 from ai_helper import extract_financial_data, RateLimitException, extract_source_wallet_from_ocr, split_ocr_user_text
+from ai_helper import groq_client
 
 # Google Sheets Integration
 from sheets_helper import (
@@ -36,6 +37,7 @@ from sheets_helper import (
     format_dashboard_message, get_dashboard_summary,
     get_wallet_balances,
     invalidate_dashboard_cache,
+    ledger_snapshot_stats,
     DOMPET_SHEETS, DOMPET_COMPANIES, SELECTION_OPTIONS,
     get_selection_by_idx, get_dompet_for_company,
     check_duplicate_transaction,
@@ -58,6 +60,21 @@ from sheets_helper import (
 from handlers.telegram_webhook import handle_telegram_webhook
 from handlers.wuzapi_webhook import handle_wuzapi_webhook
 from services.retry_service import process_retry_queue
+from services.hedged_requests import latency_stats as hedge_latency_stats
+from services.answer_templates import answer_template_stats
+from services.audio_cache import audio_cache_stats
+from services.fast_path_extractor import fast_path_stats
+from services.intent_cascade import intent_cascade_stats
+from services.ledger_index import ledger_index_stats
+from services.query_cache import query_cache_stats
+from services.query_followup import query_followup_stats
+from pdf_report import report_assets_stats
+from services.report_cache import report_cache_stats
+from services.report_jobs import report_jobs_stats
+from services.llm_cache import llm_cache_stats
+from services.prompt_builder import prompt_token_stats
+from services.ocr_batch import OcrPagesFailed
+from services.ocr_cache import ocr_cache_stats
 from services.durable_inbox import (
     claim_recovery_bundle,
     complete_bundle,
@@ -88,7 +105,8 @@ from services.transaction_queue import (
     merge_transaction_queue as _merge_transaction_queue,
 )
 from services.transaction_context import detect_transaction_context
-from agent_core.conversation_memory import record_message
+from agent_core.audit_log import audit_log_stats
+from agent_core.conversation_memory import conversation_memory_stats, record_message
 from agent_core.intent_router import record_intent_shadow
 from services.state_manager import (
     pending_key, pending_is_expired,
@@ -344,6 +362,37 @@ def _shadow_compare_narrow_resolver(original_text, pipeline_dompet,
 
 # ===================== HEALTH CHECK ENDPOINT =====================
 
+def _performance_gauges() -> dict:
+    """Cache, latency and provider-budget gauges for /health; never raises."""
+    collectors = {
+        "answer_templates": answer_template_stats,
+        "audit_log": audit_log_stats,
+        "audio_cache": audio_cache_stats,
+        "conversation_memory": conversation_memory_stats,
+        "fast_path": fast_path_stats,
+        "groq": groq_client.budget_gauges,
+        "intent_cascade": intent_cascade_stats,
+        "ledger_index": ledger_index_stats,
+        "ledger_snapshot": ledger_snapshot_stats,
+        "llm_cache": llm_cache_stats,
+        "ocr_cache": ocr_cache_stats,
+        "prompt_tokens": prompt_token_stats,
+        "query_cache": query_cache_stats,
+        "query_followup": query_followup_stats,
+        "report_assets": report_assets_stats,
+        "report_cache": report_cache_stats,
+        "report_jobs": report_jobs_stats,
+        "vision_latency": hedge_latency_stats,
+    }
+    gauges = {}
+    for name, collect in collectors.items():
+        try:
+            gauges[name] = collect()
+        except Exception as exc:
+            gauges[name] = {"error": type(exc).__name__}
+    return gauges
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check including the transaction durability gate."""
@@ -373,6 +422,7 @@ def health_check():
                 'required': security_required,
                 'missing': security_missing,
             },
+            'performance': _performance_gauges(),
         }), 200 if serving else 503
     except Exception as exc:
         secure_log("ERROR", f"Health durable inbox check failed: {type(exc).__name__}: {exc}")
@@ -3145,48 +3195,61 @@ Balas 1 atau 2"""
 
 
         if is_prefix_match(text, Commands.EXPORT_PDF_PREFIXES, is_group) or is_command_match(text, Commands.EXPORT_PDF_PREFIXES, is_group):
-             try:
-                 parts = text.strip().split(' ', 1)
-                 arg = parts[1] if len(parts) > 1 else now_wib().strftime("%Y-%m")
-
-                 send_reply(f"⏳ Proses Membuat PDF {arg}...")
-                 from pdf_report import generate_pdf_from_input
-                 fpath = generate_pdf_from_input(arg)
+             parts = text.strip().split(' ', 1)
+             arg = parts[1] if len(parts) > 1 else now_wib().strftime("%Y-%m")
 
+             def deliver_pdf(fpath):
                  if fpath and os.path.exists(fpath):
                      if send_document:
                          send_document(reply_to, fpath, caption=f"Laporan {arg}")
                      else:
                          fname = os.path.basename(fpath)
                          send_reply(f"✅ PDF berhasil dibuat: {fname}\nDi channel ini belum bisa kirim PDF. Silakan ambil dari server.")
-                 else:
-                     send_reply(
-                         "❌ PDF tidak dibuat karena data periode kosong atau format periode tidak cocok.\n"
-                         "Contoh: exportpdf 2026-01"
-                     )
-                 return jsonify({'status': 'command_pdf'}), 200
-             except PDFNoDataError as nde:
-                 period = getattr(nde, "period", arg or "periode tersebut")
-                 send_reply(UserErrors.PDF_NO_DATA.format(period=period))
-                 return jsonify({'status': 'error_pdf_no_data'}), 200
-             except ValueError as ve:
-                 msg = str(ve).lower()
-                 if "tidak ada data" in msg:
-                     send_reply(UserErrors.PDF_NO_DATA.format(period=arg or "periode tersebut"))
-                     return jsonify({'status': 'error_pdf_no_data'}), 200
-                 send_reply(UserErrors.PDF_FORMAT_ERROR)
-                 return jsonify({'status': 'error_pdf'}), 200
-             except Exception as e:
+                     return 'command_pdf'
+                 send_reply(
+                     "❌ PDF tidak dibuat karena data periode kosong atau format periode tidak cocok.\n"
+                     "Contoh: exportpdf 2026-01"
+                 )
+                 return 'command_pdf'
+
+             def report_pdf_error(e):
                  msg = str(e).lower()
-                 secure_log("ERROR", f"PDF Error: {e}")
+                 if isinstance(e, PDFNoDataError):
+                     period = getattr(e, "period", arg or "periode tersebut")
+                     send_reply(UserErrors.PDF_NO_DATA.format(period=period))
+                     return 'error_pdf_no_data'
                  if "tidak ada data" in msg:
                      send_reply(UserErrors.PDF_NO_DATA.format(period=arg or "periode tersebut"))
-                     return jsonify({'status': 'error_pdf_no_data'}), 200
+                     return 'error_pdf_no_data'
+                 if isinstance(e, ValueError):
+                     send_reply(UserErrors.PDF_FORMAT_ERROR)
+                     return 'error_pdf'
+                 secure_log("ERROR", f"PDF Error: {e}")
                  if "tahun tidak valid" in msg or "bulan tidak valid" in msg or "format tidak" in msg:
                      send_reply(UserErrors.PDF_FORMAT_ERROR)
-                     return jsonify({'status': 'error_pdf'}), 200
+                     return 'error_pdf'
                  send_reply("❌ Gagal export PDF karena sistem pembuat PDF bermasalah. Coba lagi 1 menit.")
-                 return jsonify({'status': 'error'}), 200
+                 return 'error'
+
+             from services.report_jobs import BUSY, DUPLICATE, report_jobs_enabled, submit_report
+
+             if report_jobs_enabled():
+                 # Layout runs off the request thread; the PDF is sent when ready.
+                 queued = submit_report(reply_to, arg, deliver_pdf, report_pdf_error)
+                 if queued == DUPLICATE:
+                     send_reply(f"⏳ Laporan {arg} masih sedang diproses, mohon tunggu.")
+                 elif queued == BUSY:
+                     send_reply("⏳ Antrean laporan sedang penuh. Coba lagi beberapa menit lagi.")
+                 else:
+                     send_reply(f"⏳ Laporan {arg} sedang diproses, PDF akan dikirim setelah selesai.")
+                 return jsonify({'status': f'command_pdf_{queued}'}), 200
+
+             try:
+                 send_reply(f"⏳ Proses Membuat PDF {arg}...")
+                 from pdf_report import generate_pdf_from_input
+                 return jsonify({'status': deliver_pdf(generate_pdf_from_input(arg))}), 200
+             except Exception as e:
+                 return jsonify({'status': report_pdf_error(e)}), 200
 
         # Group image grace period: give users time to type after sending image
         if (
@@ -3375,7 +3438,9 @@ Balas 1 atau 2"""
             if message_id:
                 clear_message_duplicate(message_id)
             if input_type == 'image':
-                if "Tidak ada teks ditemukan" in msg:
+                if isinstance(e, OcrPagesFailed):
+                    send_reply(UserErrors.IMAGE_PAGES_NOT_READABLE.format(pages=", ".join(map(str, e.pages))))
+                elif "Tidak ada teks ditemukan" in msg:
                     send_reply(UserErrors.IMAGE_NOT_READABLE)
                 elif "tidak terdeteksi sebagai struk" in msg:
                     send_reply(UserErrors.IMAGE_NOT_RECEIPT)
@@ -3603,6 +3668,9 @@ def start_background_workers():
             name="transaction-inbox-recovery-worker",
         )
         inbox_thread.start()
+        from pdf_report import warm_report_assets
+
+        warm_report_assets()
         _background_workers_started = True
         secure_log("INFO", "Background transaction retry and inbox recovery workers started")
 
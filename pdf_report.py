@@ -16,6 +16,8 @@ import re
 import math
 import calendar
 import tempfile
+import threading
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Iterable
@@ -23,15 +25,18 @@ from typing import Dict, List, Tuple, Optional, Iterable
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfbase.ttfonts import TTFont
 
-# Your existing modules
-from sheets_helper import get_all_data
+# Your existing modules. Sheets and services are imported where used:
+# spawned render workers import this module for the drawing code only.
+from agent_core.topk import top_k
 from security import secure_log
 from config.wallets import extract_company_prefix, strip_company_prefix
+from utils.amounts import format_currency, format_number
 
 
 # =============================================================================
@@ -108,6 +113,8 @@ COMPANY_COLOR = {
 }
 
 OFFICE_SHEET_NAME = "Operasional Kantor"
+# Report cache scope: every report covers these companies.
+REPORT_SCOPE = "all:" + ",".join(COMPANY_KEYS)
 PELUNASAN_KEYWORDS = ["pelunasan", "lunas", "final payment", "penyelesaian", "closing"]
 PROJECT_EXCLUDE_NAMES = {"operasional", "operasional kantor", "saldo umum", "umum", "unknown", "(belum diisi)", "belum diisi"}
 _BANK_FEE_RE = re.compile(r"\b(biaya\s+transfer|fee\s+transfer|fee\s+admin|biaya\s+admin|admin\s+bank|charge)\b", re.IGNORECASE)
@@ -136,7 +143,7 @@ def _get_logo_path() -> Optional[str]:
     full_path = os.path.join(base_dir, logo_env)
     return full_path if os.path.exists(full_path) else None
 
-def register_fonts() -> Dict[str, str]:
+def _load_fonts() -> Dict[str, str]:
     base_dir = os.path.dirname(__file__)
     font_dir = os.path.join(base_dir, "assets", "fonts")
 
@@ -170,6 +177,96 @@ def register_fonts() -> Dict[str, str]:
     return fonts
 
 
+# Process-wide report assets. Fonts are parsed and registered once and the logo
+# PNG is decoded once; every report shares them read-only afterwards. drawImage
+# still deflates the cached pixels once per document, which keeps the report on
+# reportlab's public API.
+_assets_lock = threading.Lock()
+_fonts: Optional[Dict[str, str]] = None
+_logos: Dict[Tuple[str, float], "_LogoAsset"] = {}
+_asset_stats: Dict[str, int] = {"font_loads": 0, "logo_loads": 0, "logo_hits": 0, "logo_failures": 0}
+
+
+@dataclass(frozen=True)
+class _LogoAsset:
+    reader: ImageReader
+    width: int
+    height: int
+
+
+def register_fonts() -> Dict[str, str]:
+    """Report font names; the TTFs are read and registered once per process."""
+    global _fonts
+    with _assets_lock:
+        if _fonts is None:
+            _fonts = _load_fonts()
+            _asset_stats["font_loads"] += 1
+        return dict(_fonts)
+
+
+def _load_logo(path: str) -> _LogoAsset:
+    reader = ImageReader(path)
+    # Decode now: the reader keeps the pixels (and alpha) for every later drawImage.
+    reader.getRGBData()
+    width, height = reader.getSize()
+    return _LogoAsset(reader, width, height)
+
+
+def _logo_asset(path: Optional[str]) -> Optional[_LogoAsset]:
+    """The encoded logo at ``path``, reloaded only when the file changes."""
+    if not path:
+        return None
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        return None
+    with _assets_lock:
+        asset = _logos.get(key)
+        if asset is not None:
+            _asset_stats["logo_hits"] += 1
+            return asset
+    try:
+        asset = _load_logo(path)
+    except Exception as exc:
+        with _assets_lock:
+            _asset_stats["logo_failures"] += 1
+        secure_log("WARNING", f"Report logo unreadable: {type(exc).__name__}")
+        return None
+    with _assets_lock:
+        for stale in [k for k in _logos if k[0] == path]:
+            del _logos[stale]
+        _logos[key] = asset
+        _asset_stats["logo_loads"] += 1
+    return asset
+
+
+def _place_logo(c: canvas.Canvas, asset: _LogoAsset, x: float, y: float, w: float, h: float) -> None:
+    c.drawImage(asset.reader, x, y, width=w, height=h, mask="auto")
+
+
+def warm_report_assets() -> None:
+    """Load fonts and the logo ahead of the first report (worker start, render pool init)."""
+    register_fonts()
+    _logo_asset(_get_logo_path())
+
+
+def report_assets_stats() -> Dict[str, int]:
+    with _assets_lock:
+        stats = dict(_asset_stats)
+        stats["fonts_loaded"] = int(_fonts is not None)
+        stats["logos_cached"] = len(_logos)
+    return stats
+
+
+def reset_report_assets_for_tests() -> None:
+    global _fonts
+    with _assets_lock:
+        _fonts = None
+        _logos.clear()
+        for name in _asset_stats:
+            _asset_stats[name] = 0
+
+
 # =============================================================================
 # Safe helpers
 # =============================================================================
@@ -201,12 +298,6 @@ def _to_int(v: object, default: int = 0) -> int:
     except Exception:
         return default
 
-def format_number(amount: int) -> str:
-    return f"{amount:,.0f}".replace(",", ".")
-
-def format_currency(amount: int) -> str:
-    return f"Rp {format_number(amount)}"
-
 def format_currency_short(amount: int) -> str:
     abs_amt = abs(amount)
     if abs_amt >= 1_000_000_000:
@@ -338,6 +429,8 @@ def parse_range_input(text: str) -> Optional[Tuple[datetime, datetime]]:
 # =============================================================================
 
 def _get_all_data_safe() -> List[Dict]:
+    from sheets_helper import get_all_data
+
     try:
         return get_all_data(days=None)  # type: ignore
     except TypeError:
@@ -593,213 +686,351 @@ def _project_profit_map(company_txs: List[Dict]) -> Dict[str, Dict]:
     return project_map
 
 
-def _rank_company_projects_last_year(all_txs: List[Dict], company: str, end_dt: datetime) -> Dict:
+# =============================================================================
+# Aggregation cube
+# =============================================================================
+
+_INCOME, _EXPENSE, _SALARY = "income", "expense", "salary"
+
+
+class _Cell:
+    """Measures for one (company, project, kind) slot, for one day or merged over a window."""
+
+    __slots__ = ("amount", "dp", "dp2", "pelunasan", "finished",
+                 "first_dt", "last_dt", "first_seq", "max_expense", "rows")
+
+    def __init__(self, dt: Optional[datetime] = None, seq: int = 0):
+        self.amount = 0
+        self.dp = self.dp2 = self.pelunasan = 0
+        self.finished = False
+        self.first_dt = self.last_dt = dt
+        self.first_seq = seq
+        self.max_expense: Optional[Tuple[int, int, Dict]] = None  # (amount, -seq, tx)
+        self.rows: List[Tuple[int, Dict]] = []
+
+    def merge(self, other: "_Cell", with_rows: bool) -> None:
+        if self.first_dt is None:
+            self.first_dt, self.last_dt, self.first_seq = other.first_dt, other.last_dt, other.first_seq
+        else:
+            self.first_dt = min(self.first_dt, other.first_dt)
+            self.last_dt = max(self.last_dt, other.last_dt)
+            self.first_seq = min(self.first_seq, other.first_seq)
+        self.amount += other.amount
+        self.dp += other.dp
+        self.dp2 += other.dp2
+        self.pelunasan += other.pelunasan
+        self.finished = self.finished or other.finished
+        if other.max_expense is not None and (self.max_expense is None or other.max_expense[:2] > self.max_expense[:2]):
+            self.max_expense = other.max_expense
+        if with_rows:
+            self.rows.extend(other.rows)
+
+
+_Slots = Dict[Tuple[str, str, str], _Cell]
+
+
+class _ReportCube:
     """
-    Pick best/worst project by profit in trailing 365 days for one company.
-    Returns {"best": {...}|None, "worst": {...}|None}.
+    company x project x kind x day totals of the ledger, built in one pass.
+
+    Every report section is a rollup of the cube over a date window, so the
+    context builders no longer rescan all transactions per company, project
+    or window. Kind is income, expense or salary expense. Internal transfers
+    are dropped at build time (no section counts them); rows outside the four
+    companies are kept under the office sheet or "" so the period summary
+    still sees them.
     """
-    start_dt = end_dt - timedelta(days=364)
-    scoped = []
-    for tx in all_txs:
-        tx_dt = tx.get("dt")
-        if not isinstance(tx_dt, datetime):
-            continue
-        if tx_dt < start_dt or tx_dt > end_dt:
+
+    def __init__(self, transactions: Iterable[Dict]):
+        days: Dict[datetime, _Slots] = {}
+        row_dts = set()
+        # Ledgers repeat a few (sheet, project) pairs, so classify each pair once.
+        pairs: Dict[Tuple[str, str], Tuple[bool, str, str, bool]] = {}
+        for seq, tx in enumerate(transactions):
+            dt = tx.get("dt")
+            if not isinstance(dt, datetime):
+                continue
+            row_dts.add(dt)
+            sheet = tx.get("company_sheet")
+            proj_raw = (tx.get("nama_projek") or "").strip()
+            pair = pairs.get((sheet, proj_raw))
+            if pair is None:
+                probe = {"company_sheet": sheet, "nama_projek": proj_raw}
+                pair = pairs[(sheet, proj_raw)] = (
+                    _is_internal_transfer_tx(probe),
+                    OFFICE_SHEET_NAME if sheet == OFFICE_SHEET_NAME else (_company_from_tx(probe) or ""),
+                    _project_key(proj_raw),
+                    _has_finish_marker(proj_raw),
+                )
+            internal, company, project, finish_marker = pair
+            desc = (tx.get("keterangan") or "").lower()
+            # The rest of _is_internal_transfer_tx: debt movements between dompets.
+            if internal or (sheet != OFFICE_SHEET_NAME and ("hutang ke dompet" in desc or "memberi hutang ke" in desc)):
+                continue
+
+            income = _is_income(tx)
+            kind = _INCOME if income else (_SALARY if _is_salary(tx) else _EXPENSE)
+            slots = days.get(dt)
+            if slots is None:
+                slots = days[dt] = {}
+            cell = slots.get((company, project, kind))
+            if cell is None:
+                cell = slots[(company, project, kind)] = _Cell(dt, seq)
+            amt = int(tx.get("jumlah", 0) or 0)
+            cell.amount += amt
+            cell.rows.append((seq, tx))
+            if finish_marker:
+                cell.finished = True
+            if income:
+                if "dp" in desc and "2" in desc:
+                    cell.dp2 += amt
+                elif "dp" in desc:
+                    cell.dp += amt
+                if any(k in desc for k in PELUNASAN_KEYWORDS):
+                    cell.finished = True
+                    if "dp" not in desc:
+                        cell.pelunasan += amt
+            elif kind == _EXPENSE and (cell.max_expense is None or (amt, -seq) > cell.max_expense[:2]):
+                cell.max_expense = (amt, -seq, tx)
+        self._days = days
+        self._dts = sorted(days)
+        self._row_dts = sorted(row_dts)
+
+    def _window(self, start_dt: Optional[datetime], end_dt: datetime) -> List[datetime]:
+        lo = bisect_left(self._dts, start_dt) if start_dt is not None else 0
+        return self._dts[lo:bisect_right(self._dts, end_dt)]
+
+    def has_rows(self, start_dt: datetime, end_dt: datetime) -> bool:
+        """Whether any ledger row (internal transfers included) is dated inside the window."""
+        return bisect_left(self._row_dts, start_dt) < bisect_right(self._row_dts, end_dt)
+
+    def rollup(self, start_dt: Optional[datetime], end_dt: datetime, with_rows: bool = False) -> _Slots:
+        """Slots merged over ``start_dt <= dt <= end_dt`` (open start when None)."""
+        merged: _Slots = {}
+        for dt in self._window(start_dt, end_dt):
+            for key, cell in self._days[dt].items():
+                target = merged.get(key)
+                if target is None:
+                    target = merged[key] = _Cell()
+                target.merge(cell, with_rows)
+        return merged
+
+
+def _cube_summary(cells: _Slots) -> Dict:
+    """``_summarize_period`` from a rollup."""
+    income_total = expense_non_office = office_expense = 0
+    for (company, _project, kind), cell in cells.items():
+        if company == OFFICE_SHEET_NAME:
+            if kind != _INCOME:
+                office_expense += cell.amount
+        elif kind == _INCOME:
+            income_total += cell.amount
+        else:
+            expense_non_office += cell.amount
+    expense_total = expense_non_office + office_expense
+    return {
+        "income_total": income_total,
+        "expense_total": expense_total,
+        "office_expense": office_expense,
+        "profit": income_total - expense_total,
+        "expense_non_office": expense_non_office,
+    }
+
+
+def _cube_company_summaries(cells: _Slots) -> Dict[str, Dict]:
+    """``_summarize_company`` for every company from a rollup."""
+    totals = {comp: [0, 0] for comp in COMPANY_KEYS}
+    for (company, _project, kind), cell in cells.items():
+        if company in totals:
+            totals[company][0 if kind == _INCOME else 1] += cell.amount
+    return {
+        comp: {"income_total": income, "expense_total": expense, "profit": income - expense}
+        for comp, (income, expense) in totals.items()
+    }
+
+
+def _cube_tx_lists(cells: _Slots) -> Dict[str, Dict[str, List[Dict]]]:
+    """Per-company income / non-salary expense / salary rows, largest first, ledger order on ties."""
+    lists = {comp: {"income_txs": [], "expense_txs": [], "salary_txs": []} for comp in COMPANY_KEYS}
+    for (company, _project, kind), cell in cells.items():
+        if company not in lists:
             continue
-        if _company_from_tx(tx) != company:
+        if kind == _INCOME:
+            lists[company]["income_txs"].extend(cell.rows)
+            # Salary-looking income rows are listed under both.
+            lists[company]["salary_txs"].extend(row for row in cell.rows if _is_salary(row[1]))
+        else:
+            lists[company]["salary_txs" if kind == _SALARY else "expense_txs"].extend(cell.rows)
+    for comp_lists in lists.values():
+        for name, rows in comp_lists.items():
+            rows.sort(key=lambda row: (-int(row[1].get("jumlah", 0) or 0), row[0]))
+            comp_lists[name] = [row[1] for row in rows]
+    return lists
+
+
+def _cube_projects(cells: _Slots) -> Dict[str, Dict[str, Dict[str, _Cell]]]:
+    """{company: {project key: {kind: cell}}}, projects in first-seen order."""
+    found: Dict[str, Dict[str, Dict[str, _Cell]]] = {}
+    for (company, project, kind), cell in sorted(cells.items(), key=lambda item: item[1].first_seq):
+        if company not in COMPANY_KEYS or not project or project.lower() in PROJECT_EXCLUDE_NAMES:
             continue
-        scoped.append(tx)
+        found.setdefault(company, {}).setdefault(project, {})[kind] = cell
+    return found
+
+
+def _cube_finished_projects(cells: _Slots) -> Dict[str, List[str]]:
+    """``_finished_projects_by_company`` from a rollup."""
+    finished = {comp: set() for comp in COMPANY_KEYS}
+    for company, projects in _cube_projects(cells).items():
+        for project, kinds in projects.items():
+            if any(cell.finished for cell in kinds.values()):
+                finished[company].add(project)
+    return {k: sorted(v) for k, v in finished.items()}
+
 
-    project_map = _project_profit_map(scoped)
-    if not project_map:
-        return {"best": None, "worst": None}
+def _kind_amount(kinds: Dict[str, _Cell], *names: str) -> int:
+    return sum(kinds[name].amount for name in names if name in kinds)
 
-    entries = list(project_map.values())
-    best = max(entries, key=lambda x: int(x.get("profit", 0) or 0))
-    worst = min(entries, key=lambda x: int(x.get("profit", 0) or 0))
+
+def _cube_finished_card(name: str, kinds: Dict[str, _Cell]) -> Dict:
+    """A finished-project card (``_project_metrics`` + timeline + largest expense) from its slots."""
+    income = kinds.get(_INCOME) or _Cell()
+    expense = kinds.get(_EXPENSE)
+    total_income = income.amount
+    total_expense = _kind_amount(kinds, _EXPENSE, _SALARY)
+    profit = total_income - total_expense
     return {
-        "best": {"name": best.get("name", "-"), "profit": int(best.get("profit", 0) or 0)},
-        "worst": {"name": worst.get("name", "-"), "profit": int(worst.get("profit", 0) or 0)},
+        "name": _project_display_name(name),
+        "metrics": {
+            "dp": income.dp, "dp2": income.dp2, "pelunasan": income.pelunasan,
+            "total_income": total_income, "total_expense": total_expense,
+            "total_salary": _kind_amount(kinds, _SALARY), "profit": profit,
+            "margin_pct": int((profit / total_income * 100)) if total_income > 0 else 0,
+        },
+        "timeline": {
+            "start": min(cell.first_dt for cell in kinds.values()),
+            "finish": max(cell.last_dt for cell in kinds.values()),
+        },
+        "max_expense": expense.max_expense[2] if expense and expense.max_expense else None,
     }
 
-def _build_context_monthly(year: int, month: int) -> Dict:
-    start_dt, end_dt = _month_start_end(year, month)
-    period_label = format_period_label(year, month)
-    all_txs = _get_all_transactions()
-    period_txs = _filter_period(all_txs, start_dt, end_dt)
-    if not period_txs:
-        raise PDFNoDataError(period_label)
-    
-    summary = _summarize_period(period_txs)
-    prev_year, prev_month = _prev_month(year, month)
-    prev_start, prev_end = _month_start_end(prev_year, prev_month)
-    prev_txs = _filter_period(all_txs, prev_start, prev_end)
-    prev_summary = _summarize_period(prev_txs)
-
-    # Data snapshot as of period end, used for robust finished-project accumulation.
-    as_of_txs = [
-        t for t in all_txs
-        if isinstance(t.get("dt"), datetime) and t["dt"] <= end_dt
-    ]
 
-    company_txs_map = {comp: [] for comp in COMPANY_KEYS}
-    company_txs_asof_map = {comp: [] for comp in COMPANY_KEYS}
-    for tx in period_txs:
-        comp = _company_from_tx(tx)
-        if comp and comp in company_txs_map:
-            company_txs_map[comp].append(tx)
-    for tx in as_of_txs:
-        comp = _company_from_tx(tx)
-        if comp and comp in company_txs_asof_map:
-            company_txs_asof_map[comp].append(tx)
-            
-    income_by_company = {}
-    for comp in COMPANY_KEYS:
-        comp_sum = _summarize_company(company_txs_map[comp])
-        income_by_company[comp] = comp_sum["income_total"]
-    
+def _cube_project_ranks(cells: _Slots) -> Dict[str, Dict]:
+    """Best/worst project by profit per company from a rollup."""
+    ranks = {}
+    for company, projects in _cube_projects(cells).items():
+        entries = [
+            {
+                "name": _project_display_name(project),
+                "profit": int(_kind_amount(kinds, _INCOME) - _kind_amount(kinds, _EXPENSE, _SALARY)),
+            }
+            for project, kinds in projects.items()
+        ]
+        best = top_k(entries, 1, key=lambda x: x["profit"])
+        worst = top_k(entries, 1, key=lambda x: x["profit"], largest=False)
+        ranks[company] = {"best": best[0], "worst": worst[0]}
+    return ranks
+
+
+def _rank_projects_last_year(all_txs: List[Dict], end_dt: datetime, cube: Optional[_ReportCube] = None) -> Dict[str, Dict]:
+    """
+    Best/worst project by profit in trailing 365 days, for every company in one pass.
+    Returns {company: {"best": {...}|None, "worst": {...}|None}}.
+    """
+    cube = cube or _ReportCube(all_txs)
+    return _cube_project_ranks(cube.rollup(end_dt - timedelta(days=364), end_dt))
+
+
+def _rank_company_projects_last_year(all_txs: List[Dict], company: str, end_dt: datetime) -> Dict:
+    """
+    Pick best/worst project by profit in trailing 365 days for one company.
+    Returns {"best": {...}|None, "worst": {...}|None}.
+    """
+    return _rank_projects_last_year(all_txs, end_dt).get(company) or {"best": None, "worst": None}
+
+
+def _build_report_sections(
+    all_txs: List[Dict], start_dt: datetime, end_dt: datetime,
+    prev_start: datetime, prev_end: datetime, no_data_label: str,
+) -> Dict:
+    """Context shared by the monthly and range reports, from one cube over the ledger."""
+    cube = _ReportCube(all_txs)
+    if not cube.has_rows(start_dt, end_dt):
+        raise PDFNoDataError(no_data_label)
+
+    period = cube.rollup(start_dt, end_dt, with_rows=True)
+    prev = cube.rollup(prev_start, prev_end)
+    # As of period end, so finished projects accumulate their whole history.
+    as_of_projects = _cube_projects(cube.rollup(None, end_dt))
+    yearly_ranks = _rank_projects_last_year(all_txs, end_dt, cube=cube)
+
+    company_summaries = _cube_company_summaries(period)
+    prev_company_summaries = _cube_company_summaries(prev)
+    income_by_company = {comp: company_summaries[comp]["income_total"] for comp in COMPANY_KEYS}
     total_income = sum(income_by_company.values())
-    income_share = {}
-    for comp in COMPANY_KEYS:
-        income_share[comp] = (income_by_company[comp] / total_income * 100) if total_income > 0 else 0.0
-        
-    finished_projects = _finished_projects_by_company(period_txs)
+    income_share = {
+        comp: (income_by_company[comp] / total_income * 100) if total_income > 0 else 0.0
+        for comp in COMPANY_KEYS
+    }
+    finished_projects = _cube_finished_projects(period)
+    tx_lists = _cube_tx_lists(period)
+
     company_details = {}
     for comp in COMPANY_KEYS:
-        comp_txs = company_txs_map[comp]
-        comp_txs_asof = company_txs_asof_map[comp]
-        comp_summary = _summarize_company(comp_txs)
-        prev_comp_txs = [t for t in prev_txs if _company_from_tx(t) == comp]
-        prev_comp_summary = _summarize_company(prev_comp_txs)
-        
-        income_txs = sorted([t for t in comp_txs if _is_income(t)], key=lambda x: int(x.get("jumlah", 0) or 0), reverse=True)
-        expense_txs = sorted([t for t in comp_txs if _is_expense(t) and not _is_salary(t)], key=lambda x: int(x.get("jumlah", 0) or 0), reverse=True)
-        salary_txs = sorted([t for t in comp_txs if _is_salary(t)], key=lambda x: int(x.get("jumlah", 0) or 0), reverse=True)
-        
-        finished_proj_names = finished_projects.get(comp, [])
-        finished_cards = []
-        for proj_name in finished_proj_names:
-            proj_txs = [t for t in comp_txs_asof if _project_key(t.get("nama_projek", "")) == proj_name]
-            if not proj_txs:
-                continue
-            metrics = _project_metrics(proj_txs)
-            dts = [t["dt"] for t in proj_txs if isinstance(t.get("dt"), datetime)]
-            timeline = {"start": min(dts) if dts else None, "finish": max(dts) if dts else None}
-            proj_expenses = [t for t in proj_txs if _is_expense(t) and not _is_salary(t)]
-            max_expense = max(proj_expenses, key=lambda x: int(x.get("jumlah", 0) or 0)) if proj_expenses else None
-            finished_cards.append({
-                "name": _project_display_name(proj_name),
-                "metrics": metrics,
-                "timeline": timeline,
-                "max_expense": max_expense,
-            })
-        yearly_rank = _rank_company_projects_last_year(all_txs, comp, end_dt)
-             
+        comp_projects = as_of_projects.get(comp, {})
+        finished_cards = [
+            _cube_finished_card(proj_name, comp_projects[proj_name])
+            for proj_name in finished_projects.get(comp, [])
+            if proj_name in comp_projects
+        ]
+        yearly_rank = yearly_ranks.get(comp) or {"best": None, "worst": None}
         company_details[comp] = {
-            "summary": comp_summary, "prev_summary": prev_comp_summary,
-            "income_txs": income_txs, "expense_txs": expense_txs, "salary_txs": salary_txs,
+            "summary": company_summaries[comp],
+            "prev_summary": prev_company_summaries[comp],
+            **tx_lists[comp],
             "finished_cards": finished_cards,
             "year_best_project": yearly_rank.get("best"),
             "year_worst_project": yearly_rank.get("worst"),
         }
-        
+
+    return {
+        "summary": _cube_summary(period),
+        "prev_summary": _cube_summary(prev),
+        "income_share": income_share,
+        "income_by_company": income_by_company,
+        "finished_projects": finished_projects,
+        "company_details": company_details,
+    }
+
+
+def _build_context_monthly(year: int, month: int, all_txs: Optional[List[Dict]] = None) -> Dict:
+    start_dt, end_dt = _month_start_end(year, month)
+    period_label = format_period_label(year, month)
+    prev_start, prev_end = _month_start_end(*_prev_month(year, month))
+    sections = _build_report_sections(
+        _get_all_transactions() if all_txs is None else all_txs,
+        start_dt, end_dt, prev_start, prev_end, period_label,
+    )
     return {
         "mode": "monthly", "year": year, "month": month,
         "period_label": period_label, "generated_on": format_generated_on(),
-        "summary": summary, "prev_summary": prev_summary,
-        "income_share": income_share, "income_by_company": income_by_company,
-        "finished_projects": finished_projects, "company_details": company_details,
+        **sections,
     }
 
-def _build_context_range(start_dt: datetime, end_dt: datetime) -> Dict:
-    all_txs = _get_all_transactions()
-    period_txs = _filter_period(all_txs, start_dt, end_dt)
-    if not period_txs:
-        raise PDFNoDataError(f"{start_dt.date()} - {end_dt.date()}")
-    
-    summary = _summarize_period(period_txs)
+def _build_context_range(start_dt: datetime, end_dt: datetime, all_txs: Optional[List[Dict]] = None) -> Dict:
     period_seconds = max(1, int((end_dt - start_dt).total_seconds()))
     prev_end = start_dt - timedelta(seconds=1)
     prev_start = prev_end - timedelta(seconds=period_seconds)
-    prev_txs = _filter_period(all_txs, prev_start, prev_end)
-
-    # Data snapshot as of report end date, used for robust finished-project accumulation.
-    as_of_txs = [
-        t for t in all_txs
-        if isinstance(t.get("dt"), datetime) and t["dt"] <= end_dt
-    ]
-
-    company_txs_map = {comp: [] for comp in COMPANY_KEYS}
-    company_txs_asof_map = {comp: [] for comp in COMPANY_KEYS}
-    for tx in period_txs:
-        comp = _company_from_tx(tx)
-        if comp and comp in company_txs_map:
-            company_txs_map[comp].append(tx)
-    for tx in as_of_txs:
-        comp = _company_from_tx(tx)
-        if comp and comp in company_txs_asof_map:
-            company_txs_asof_map[comp].append(tx)
-            
-    income_by_company = {}
-    for comp in COMPANY_KEYS:
-        comp_sum = _summarize_company(company_txs_map[comp])
-        income_by_company[comp] = comp_sum["income_total"]
-    
-    total_income = sum(income_by_company.values())
-    income_share = {}
-    for comp in COMPANY_KEYS:
-        income_share[comp] = (income_by_company[comp] / total_income * 100) if total_income > 0 else 0.0
-        
-    finished_projects = _finished_projects_by_company(period_txs)
+    sections = _build_report_sections(
+        _get_all_transactions() if all_txs is None else all_txs,
+        start_dt, end_dt, prev_start, prev_end,
+        f"{start_dt.date()} - {end_dt.date()}",
+    )
+    sections.pop("prev_summary")
     period_label = f"{start_dt.strftime('%d %b %y')} - {end_dt.strftime('%d %b %y')}"
-
-    company_details = {}
-    for comp in COMPANY_KEYS:
-        comp_txs = company_txs_map[comp]
-        comp_txs_asof = company_txs_asof_map[comp]
-        comp_summary = _summarize_company(comp_txs)
-        prev_comp_txs = [t for t in prev_txs if _company_from_tx(t) == comp]
-        prev_comp_summary = _summarize_company(prev_comp_txs)
-
-        income_txs = sorted([t for t in comp_txs if _is_income(t)], key=lambda x: int(x.get("jumlah", 0) or 0), reverse=True)
-        expense_txs = sorted([t for t in comp_txs if _is_expense(t) and not _is_salary(t)], key=lambda x: int(x.get("jumlah", 0) or 0), reverse=True)
-        salary_txs = sorted([t for t in comp_txs if _is_salary(t)], key=lambda x: int(x.get("jumlah", 0) or 0), reverse=True)
-
-        finished_proj_names = finished_projects.get(comp, [])
-        finished_cards = []
-        for proj_name in finished_proj_names:
-            proj_txs = [t for t in comp_txs_asof if _project_key(t.get("nama_projek", "")) == proj_name]
-            if not proj_txs:
-                continue
-            metrics = _project_metrics(proj_txs)
-            dts = [t["dt"] for t in proj_txs if isinstance(t.get("dt"), datetime)]
-            timeline = {"start": min(dts) if dts else None, "finish": max(dts) if dts else None}
-            proj_expenses = [t for t in proj_txs if _is_expense(t) and not _is_salary(t)]
-            max_expense = max(proj_expenses, key=lambda x: int(x.get("jumlah", 0) or 0)) if proj_expenses else None
-            finished_cards.append({
-                "name": _project_display_name(proj_name),
-                "metrics": metrics,
-                "timeline": timeline,
-                "max_expense": max_expense,
-            })
-
-        yearly_rank = _rank_company_projects_last_year(all_txs, comp, end_dt)
-        company_details[comp] = {
-            "summary": comp_summary,
-            "prev_summary": prev_comp_summary,
-            "income_txs": income_txs,
-            "expense_txs": expense_txs,
-            "salary_txs": salary_txs,
-            "finished_cards": finished_cards,
-            "year_best_project": yearly_rank.get("best"),
-            "year_worst_project": yearly_rank.get("worst"),
-        }
-    
     return {
         "mode": "range", "generated_on": format_generated_on(),
-        "summary": summary, "income_share": income_share,
-        "income_by_company": income_by_company, "finished_projects": finished_projects,
-        "company_details": company_details,
+        **sections,
         "start_dt": start_dt, "end_dt": end_dt, "period_label": period_label,
     }
 
@@ -936,6 +1167,19 @@ def _draw_footer(c: canvas.Canvas, ui: UI, page_w: float):
 # Components
 # =============================================================================
 
+def _draw_logo(c: canvas.Canvas, logo_path: Optional[str], page_h: float, header_h: float):
+    asset = _logo_asset(logo_path)
+    if asset is None:
+        return
+    # Scale to fit 140x140 preserving aspect ratio, centered vertically in the header
+    scale = min(140 / asset.width, 140 / asset.height)
+    draw_w = asset.width * scale
+    draw_h = asset.height * scale
+    logo_y = page_h - (header_h / 2) - (draw_h / 2)
+    try:
+        _place_logo(c, asset, 20, logo_y, draw_w, draw_h)
+    except Exception: pass
+
 def _draw_header_monthly(c: canvas.Canvas, ui: UI, ctx: Dict, page_w: float, page_h: float, logo_path: Optional[str]):
     header_h = 190
     left_w = 427
@@ -947,22 +1191,7 @@ def _draw_header_monthly(c: canvas.Canvas, ui: UI, ctx: Dict, page_w: float, pag
     c.circle(left_w - 60, page_h - 40, 20, stroke=0, fill=1)
     c.circle(left_w - 120, page_h - 90, 12, stroke=0, fill=1)
     c.restoreState()
-    if logo_path and os.path.exists(logo_path):
-        try:
-            # Draw logo - BIGGER and properly centered
-            from reportlab.lib.utils import ImageReader
-            img = ImageReader(logo_path)
-            img_w, img_h = img.getSize()
-            max_h = 140
-            max_w = 140
-            # Scale to fit within bounds while preserving aspect ratio
-            scale = min(max_w / img_w, max_h / img_h)
-            draw_w = img_w * scale
-            draw_h = img_h * scale
-            # Center vertically: header is 190px, centered at page_h - 95
-            logo_y = page_h - (header_h / 2) - (draw_h / 2)
-            c.drawImage(logo_path, 20, logo_y, width=draw_w, height=draw_h, mask="auto")
-        except Exception: pass
+    _draw_logo(c, logo_path, page_h, header_h)
     _draw_text(c, ui.fonts["italic"], 10.5, THEME["white"], 140, page_h - 50, f"Generated on {ctx['generated_on']}")
     _draw_text(c, ui.fonts["bold"], 32, THEME["white"], 140, page_h - 94, "Financial")
     _draw_text(c, ui.fonts["bold"], 32, THEME["white"], 140, page_h - 134, "Report")
@@ -981,19 +1210,7 @@ def _draw_header_range(c: canvas.Canvas, ui: UI, ctx: Dict, page_w: float, page_
     c.circle(left_w - 60, page_h - 40, 20, stroke=0, fill=1)
     c.circle(left_w - 120, page_h - 90, 12, stroke=0, fill=1)
     c.restoreState()
-    if logo_path and os.path.exists(logo_path):
-        try:
-            from reportlab.lib.utils import ImageReader
-            img = ImageReader(logo_path)
-            img_w, img_h = img.getSize()
-            max_h = 140
-            max_w = 140
-            scale = min(max_w / img_w, max_h / img_h)
-            draw_w = img_w * scale
-            draw_h = img_h * scale
-            logo_y = page_h - (header_h / 2) - (draw_h / 2)
-            c.drawImage(logo_path, 20, logo_y, width=draw_w, height=draw_h, mask="auto")
-        except Exception: pass
+    _draw_logo(c, logo_path, page_h, header_h)
     _draw_text(c, ui.fonts["italic"], 10.5, THEME["white"], 140, page_h - 50, f"Generated on {ctx['generated_on']}")
     _draw_text(c, ui.fonts["bold"], 32, THEME["white"], 140, page_h - 94, "Financial")
     _draw_text(c, ui.fonts["bold"], 32, THEME["white"], 140, page_h - 134, "Report")
@@ -1554,17 +1771,16 @@ def draw_company_page(c: canvas.Canvas, ui: UI, ctx: Dict, company: str, page_h:
 # PDF generators
 # =============================================================================
 
-def generate_pdf_report_v4_monthly(year: int, month: int, output_dir: Optional[str] = None) -> str:
-    ctx = _build_context_monthly(year, month)
-    fonts = register_fonts()
-    ui = UI(fonts=fonts)
-    out_dir = output_dir or tempfile.gettempdir()
+def render_report_file(ctx: Dict, out_dir: str, fname: str) -> str:
+    """Lay out a built report context as ``out_dir/fname``. Safe to run in a render worker process."""
+    draw_cover = draw_cover_monthly if ctx["mode"] == "monthly" else draw_cover_periodical
+    ui = UI(fonts=register_fonts())
     os.makedirs(out_dir, exist_ok=True)
-    fname = _safe_filename(f"Laporan_Keuangan_{ctx['period_label']}") + ".pdf"
     output_path = os.path.join(out_dir, fname)
+    tmp_path = output_path + ".tmp"
     logo_path = _get_logo_path()
-    c = canvas.Canvas(output_path, pagesize=A4)
-    draw_cover_monthly(c, ui, ctx, logo_path=logo_path)
+    c = canvas.Canvas(tmp_path, pagesize=A4)
+    draw_cover(c, ui, ctx, logo_path=logo_path)
     c.showPage()
     for comp in COMPANY_KEYS:
         page_h = _estimate_company_page_height(ui, ctx["company_details"][comp], base_h=1700)
@@ -1572,43 +1788,73 @@ def generate_pdf_report_v4_monthly(year: int, month: int, output_dir: Optional[s
         draw_company_page(c, ui, ctx, comp, page_h=page_h)
         c.showPage()
     c.save()
+    # A crashed render must never leave a half-written PDF where the cache looks.
+    os.replace(tmp_path, output_path)
     secure_log("INFO", f"PDF generated: {output_path}")
     return output_path
 
-def generate_pdf_report_v4_range(start_dt: datetime, end_dt: datetime, output_dir: Optional[str] = None) -> str:
-    ctx = _build_context_range(start_dt, end_dt)
-    fonts = register_fonts()
-    ui = UI(fonts=fonts)
-    out_dir = output_dir or tempfile.gettempdir()
-    os.makedirs(out_dir, exist_ok=True)
+def _generate_report(period: str, end_dt: datetime, fname: str, build_context, output_dir: Optional[str], render=None) -> str:
+    """
+    Render one report, reusing a cached PDF or frozen context when the rows
+    it depends on (everything dated up to ``end_dt``) are unchanged. ``render``
+    replaces ``render_report_file`` (e.g. to lay out in a worker process).
+    """
+    from services import report_cache
+
+    render = render or render_report_file
+    all_txs = _get_all_transactions()
+    key = report_cache.build_key(period, REPORT_SCOPE, (t for t in all_txs if t["dt"] <= end_dt))
+    if output_dir is None:
+        cached = report_cache.lookup_pdf(key)
+        if cached:
+            secure_log("INFO", f"PDF served from cache: {cached}")
+            return cached
+
+    # Only closed periods are frozen; the current month keeps moving.
+    closed = end_dt < datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    ctx = report_cache.load_snapshot(key) if closed else None
+    if ctx is None:
+        ctx = build_context(all_txs)
+        if closed:
+            report_cache.store_snapshot(key, ctx)
+    ctx["generated_on"] = format_generated_on()
+
+    if output_dir is None and key is not None:
+        output_path = render(ctx, report_cache.artifact_dir(key), fname)
+        report_cache.store_pdf(key, output_path)
+        return output_path
+    return render(ctx, output_dir or tempfile.gettempdir(), fname)
+
+def generate_pdf_report_v4_monthly(year: int, month: int, output_dir: Optional[str] = None, render=None) -> str:
+    _, end_dt = _month_start_end(year, month)
+    fname = _safe_filename(f"Laporan_Keuangan_{format_period_label(year, month)}") + ".pdf"
+    return _generate_report(
+        f"monthly:{year:04d}-{month:02d}", end_dt, fname,
+        lambda all_txs: _build_context_monthly(year, month, all_txs),
+        output_dir, render,
+    )
+
+def generate_pdf_report_v4_range(start_dt: datetime, end_dt: datetime, output_dir: Optional[str] = None, render=None) -> str:
     fname = _safe_filename(f"Laporan_Keuangan_{start_dt.strftime('%Y%m%d')}_{end_dt.strftime('%Y%m%d')}") + ".pdf"
-    output_path = os.path.join(out_dir, fname)
-    logo_path = _get_logo_path()
-    c = canvas.Canvas(output_path, pagesize=A4)
-    draw_cover_periodical(c, ui, ctx, logo_path=logo_path)
-    c.showPage()
-    for comp in COMPANY_KEYS:
-        page_h = _estimate_company_page_height(ui, ctx["company_details"][comp], base_h=1700)
-        c.setPageSize((A4[0], page_h))
-        draw_company_page(c, ui, ctx, comp, page_h=page_h)
-        c.showPage()
-    c.save()
-    secure_log("INFO", f"PDF generated: {output_path}")
-    return output_path
+    return _generate_report(
+        f"range:{start_dt.isoformat()}/{end_dt.isoformat()}", end_dt, fname,
+        lambda all_txs: _build_context_range(start_dt, end_dt, all_txs),
+        output_dir, render,
+    )
 
 def generate_pdf_report(year: int, month: int, output_dir: Optional[str] = None, **kwargs) -> str:
     return generate_pdf_report_v4_monthly(year, month, output_dir=output_dir)
 
-def generate_pdf_from_input(period_input: str, output_dir: Optional[str] = None) -> str:
+def generate_pdf_from_input(period_input: str, output_dir: Optional[str] = None, render=None) -> str:
     s = _normalize_user_input(period_input)
     if not s:
         raise PDFInputError("Format perintah kosong.")
     rng = parse_range_input(s)
     if rng:
         start_dt, end_dt = rng
-        return generate_pdf_report_v4_range(start_dt, end_dt, output_dir=output_dir)
+        return generate_pdf_report_v4_range(start_dt, end_dt, output_dir=output_dir, render=render)
     year, month = parse_month_input(s)
-    return generate_pdf_report_v4_monthly(year, month, output_dir=output_dir)
+    return generate_pdf_report_v4_monthly(year, month, output_dir=output_dir, render=render)
 
 if __name__ == "__main__":
     tests = ["2026-01", "01-2026", "januari 2026", "12-01-2026 - 20-01-2026"]
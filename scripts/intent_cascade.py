@@ -0,0 +1,73 @@
+"""
+Train and evaluate the intent cascade classifier from logged LLM decisions.
+
+The intent analyzer logs the LLM decision on every ambient chatter message (the
+traffic the cascade gates) as an ``intent_decision`` event in the agent audit
+log (AGENT_AUDIT_PATH). ``train`` fits the character n-gram
+classifier on those labels, calibrates its ignore threshold on a held-out split
+and writes INTENT_CASCADE_MODEL_PATH; ``report`` replays the labels through the
+rules and the current model (shadow evaluation).
+
+Usage examples:
+  python scripts/intent_cascade.py train
+  python scripts/intent_cascade.py train --audit data/agent_audit.jsonl --max-false-ignore 0.005
+  python scripts/intent_cascade.py report
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Allow running as a script (python scripts/intent_cascade.py).
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from services.intent_cascade import (  # noqa: E402
+    NgramClassifier,
+    load_logged_decisions,
+    max_false_ignore,
+    model_path,
+    shadow_report,
+    train_classifier,
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Intent cascade classifier")
+    parser.add_argument("command", choices=["train", "report"])
+    parser.add_argument("--audit", action="append", help="audit JSONL file(s); default AGENT_AUDIT_PATH")
+    parser.add_argument("--model", default=None, help="model path; default INTENT_CASCADE_MODEL_PATH")
+    parser.add_argument("--max-false-ignore", type=float, default=None)
+    parser.add_argument("--min-examples", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    audit_paths = args.audit or [os.getenv("AGENT_AUDIT_PATH", "data/agent_audit.jsonl")]
+    path = args.model or model_path()
+    examples = load_logged_decisions(audit_paths)
+    positives = sum(1 for _text, label in examples if label)
+    print(f"Loaded {len(examples)} logged decisions ({positives} respond, {len(examples) - positives} ignore)")
+
+    if args.command == "train":
+        if len(examples) < args.min_examples or not positives or positives == len(examples):
+            print(f"Need at least {args.min_examples} decisions with both labels; not training.")
+            return 1
+        model = train_classifier(
+            examples,
+            max_false=max_false_ignore() if args.max_false_ignore is None else args.max_false_ignore,
+        )
+        model.save(path)
+        print(f"Saved model to {path} (threshold={model.threshold:.4f})")
+        print(json.dumps(model.metrics, indent=2))
+        return 0
+
+    model = NgramClassifier.load(path) if os.path.exists(path) else None
+    if model is None:
+        print(f"No model at {path}; reporting rules only.")
+    print(json.dumps(shadow_report(examples, model), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,488 @@
+"""
+Local Groq/OpenAI-compatible stand-in for offline load tests.
+
+Serves ``/openai/v1/chat/completions`` and ``/openai/v1/audio/transcriptions``
+with scripted answers for the bot's own prompts (finance agent, extraction,
+intent analyzer, NL query plan/answer and vision OCR), so the real code paths
+parse the replies. Latency, per-model slowness and rate limits are simulated:
+
+- latency is log-normal around ``--latency-ms`` with spread ``--jitter``;
+- ``--slow-model NAME=FACTOR`` multiplies the latency of one model;
+- every API key gets ``--rpm`` requests and ``--tpm`` tokens per minute and
+  the usual ``x-ratelimit-*`` headers; an exhausted key (or a random
+  ``--inject-429`` fraction of calls) gets a 429 with ``retry-after``.
+
+Replies can be overridden with ``--scenario file.json``: a list of
+``{"match": "<regex over the messages>", "reply": "<content>"}`` entries,
+tried in order before the built-in replies.
+
+Usage:
+  python scripts/llm_stub_server.py --port 8787 --latency-ms 400 --jitter 0.4 \\
+      --slow-model meta-llama/llama-4-scout-17b-16e-instruct=3 --rpm 30 --seed 7
+
+Point the bot (or a load test) at it:
+  GROQ_BASE_URL=http://127.0.0.1:8787 GROQ_API_KEYS=stub-a,stub-b GROQ_SDK_MAX_RETRIES=0
+
+Quick benchmark of the client's rotation/scheduling against the stub:
+  python scripts/llm_stub_server.py --bench 200 --bench-concurrency 16 --rpm 60 --keys 3
+
+GET /stats returns per-model and per-key counters.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# Allow running as a script (python scripts/llm_stub_server.py).
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 300.0
+    jitter: float = 0.35
+    slow_models: Dict[str, float] = field(default_factory=dict)
+    rpm: int = 30
+    tpm: int = 6000
+    inject_429: float = 0.0
+    seed: int = 7
+    scenario: List[Dict[str, str]] = field(default_factory=list)
+
+
+# ===================== SCRIPTED REPLIES =====================
+
+_AMOUNT_RE = re.compile(r"(\d+(?:[.,]\d{3})*(?:[.,]\d+)?)\s*(rb|ribu|k|jt|juta)?\b", re.IGNORECASE)
+_PROJECT_RE = re.compile(r"\b(?:proyek|projek|project)\s+([A-Za-z][\w ]{1,40}?)(?:\s+(?:dompet|pakai|dari)\b|$)", re.IGNORECASE)
+_MULTIPLIERS = {"rb": 1000, "ribu": 1000, "k": 1000, "jt": 1000000, "juta": 1000000}
+
+
+def _amount(text: str) -> int:
+    match = _AMOUNT_RE.search(text or "")
+    if not match:
+        return 0
+    number, unit = match.group(1), (match.group(2) or "").lower()
+    if unit:
+        return int(float(number.replace(",", ".")) * _MULTIPLIERS[unit])
+    return int(re.sub(r"[.,]", "", number))
+
+
+def _message_text(content: Any) -> str:
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content or "")
+
+
+def _user_text(messages: List[Dict[str, Any]]) -> str:
+    users = [_message_text(m.get("content")) for m in messages if m.get("role") == "user"]
+    text = users[-1] if users else ""
+    try:
+        payload = json.loads(text)
+        if isinstance(payload, dict) and payload.get("message"):
+            return str(payload["message"])
+    except ValueError:
+        pass
+    return re.sub(r"<[^>]+>", " ", text).strip()
+
+
+def _transaction(text: str) -> Dict[str, Any]:
+    project = _PROJECT_RE.search(text)
+    lowered = text.lower()
+    income = any(word in lowered for word in ("terima", "masuk", "dp ", "pelunasan", "transfer dari"))
+    return {
+        "tanggal": time.strftime("%Y-%m-%d"),
+        "kategori": "Lain-lain",
+        "keterangan": _AMOUNT_RE.sub("", text).strip()[:60] or "transaksi",
+        "jumlah": _amount(text),
+        "tipe": "Pemasukan" if income else "Pengeluaran",
+        "nama_projek": project.group(1).strip() if project else None,
+        "detected_dompet": None,
+    }
+
+
+def scripted_reply(messages: List[Dict[str, Any]], model: str, scenario: List[Dict[str, str]]) -> str:
+    """Reply shaped like the real model's answer for the bot prompt in use."""
+    joined = "\n".join(_message_text(m.get("content")) for m in messages)
+    for entry in scenario:
+        if re.search(entry.get("match", "$^"), joined, re.IGNORECASE | re.DOTALL):
+            return entry.get("reply", "")
+
+    text = _user_text(messages)
+    if "Finance Agent Planner" in joined:
+        tx = _transaction(text)
+        action = "PROCESS" if tx["jumlah"] and tx["nama_projek"] else "ASK_CLARIFICATION"
+        return json.dumps({
+            "action": action,
+            "confidence": 0.9 if action == "PROCESS" else 0.5,
+            "transactions": [tx] if tx["jumlah"] else [],
+            "missing_fields": [] if action == "PROCESS" else ["nama_projek"],
+            "reasoning": "stub",
+        })
+    if "financial transaction extractor" in joined:
+        tx = _transaction(text)
+        return json.dumps({"transactions": [tx] if tx["jumlah"] else []})
+    if "route Indonesian finance questions" in joined:
+        return json.dumps({
+            "intent": "summary",
+            "metric": "sum",
+            "filters": {"project": None, "category": None, "tipe": None, "company": None,
+                        "dompet": None, "date_from": None, "date_to": None},
+            "group_by": None,
+            "period_days": 30,
+            "detail": False,
+        })
+    if "answer an Indonesian finance question" in joined:
+        return "Total pengeluaran 30 hari terakhir sesuai data yang tercatat."
+    if "intelligent analyzer for" in joined:
+        tx = _transaction(text)
+        return json.dumps({
+            "should_respond": bool(tx["jumlah"]),
+            "intent": "RECORD_TRANSACTION" if tx["jumlah"] else "IGNORE",
+            "confidence": 0.9 if tx["jumlah"] else 0.3,
+            "category_scope": "PROJECT" if tx["nama_projek"] else "UNKNOWN",
+            "extracted_data": {
+                "amount": tx["jumlah"] or None,
+                "item_description": tx["keterangan"],
+                "clean_text": text,
+                "detected_project_name": tx["nama_projek"],
+            },
+            "reasoning": "stub",
+        })
+    if "FINANCIAL OCR SPECIALIST" in joined:
+        return (
+            "DocumentType: SINGLE_RECEIPT\n"
+            "Bank: BCA\n"
+            "Status: Berhasil\n"
+            f"Date: {time.strftime('%d/%m/%Y')}\n"
+            "Amount: IDR 250,000.00\n"
+            "Ref: STUB0001"
+        )
+    return "OK"
+
+
+def scripted_transcript(audio: bytes) -> str:
+    phrases = (
+        "beli semen 500 ribu proyek Taman Sari",
+        "bayar tukang satu juta lima ratus proyek Villa Ubud",
+        "terima DP 10 juta proyek Cafe Langit",
+    )
+    return phrases[int(hashlib.sha256(audio).hexdigest(), 16) % len(phrases)]
+
+
+# ===================== LATENCY & RATE LIMITS =====================
+
+class _KeyWindow:
+    __slots__ = ("window_start", "requests", "tokens")
+
+    def __init__(self, now: float):
+        self.window_start = now
+        self.requests = 0
+        self.tokens = 0
+
+
+def _duration(seconds: float) -> str:
+    return f"{max(0.0, seconds):.2f}s"
+
+
+class StubState:
+    """Seeded latency sampling, per-key minute windows and counters."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+        self._windows: Dict[str, _KeyWindow] = {}
+        self._stats: Dict[str, Dict[str, int]] = {"models": {}, "keys": {}}
+
+    def latency(self, model: str) -> float:
+        with self._lock:
+            gauss = self._rng.gauss(0.0, 1.0)
+        factor = self.config.slow_models.get(model, 1.0)
+        return self.config.latency_ms / 1000.0 * math.exp(self.config.jitter * gauss) * factor
+
+    def admit(self, key: str, tokens: int) -> Tuple[bool, Dict[str, str]]:
+        """Charge one request to ``key``; returns (allowed, rate-limit headers)."""
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window.window_start >= 60.0:
+                window = self._windows[key] = _KeyWindow(now)
+            reset = 60.0 - (now - window.window_start)
+            injected = self.config.inject_429 > 0 and self._rng.random() < self.config.inject_429
+            exhausted = (
+                window.requests >= self.config.rpm
+                or window.tokens + tokens > self.config.tpm
+            )
+            allowed = not (injected or exhausted)
+            if allowed:
+                window.requests += 1
+                window.tokens += tokens
+            headers = {
+                "x-ratelimit-limit-requests": str(self.config.rpm),
+                "x-ratelimit-remaining-requests": str(max(0, self.config.rpm - window.requests)),
+                "x-ratelimit-reset-requests": _duration(reset),
+                "x-ratelimit-limit-tokens": str(self.config.tpm),
+                "x-ratelimit-remaining-tokens": str(max(0, self.config.tpm - window.tokens)),
+                "x-ratelimit-reset-tokens": _duration(reset),
+            }
+            if not allowed:
+                headers["retry-after"] = str(max(1, math.ceil(reset if exhausted else 1)))
+            self._count("keys", key[-4:] or "none", "ok" if allowed else "rate_limited")
+        return allowed, headers
+
+    def _count(self, group: str, name: str, outcome: str) -> None:
+        bucket = self._stats[group].setdefault(name, {})
+        bucket[outcome] = bucket.get(outcome, 0) + 1
+
+    def record_model(self, model: str, outcome: str) -> None:
+        with self._lock:
+            self._count("models", model or "unknown", outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+
+def _estimate_tokens(payload: Dict[str, Any]) -> int:
+    text = json.dumps(payload.get("messages") or [], ensure_ascii=False)
+    return max(1, len(text) // 4) + int(payload.get("max_completion_tokens") or payload.get("max_tokens") or 0)
+
+
+# ===================== HTTP =====================
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - BaseHTTPRequestHandler signature
+            pass
+
+        def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _api_key(self) -> str:
+            return self.headers.get("Authorization", "").replace("Bearer ", "", 1).strip()
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                self._send(200, state.stats())
+            elif self.path.rstrip("/") == "/healthz":
+                self._send(200, {"ok": True})
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path.endswith("/chat/completions"):
+                self._chat(raw)
+            elif self.path.endswith("/audio/transcriptions"):
+                self._transcription(raw)
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+
+        def _rate_limited(self, model: str, headers: Dict[str, str]) -> None:
+            state.record_model(model, "rate_limited")
+            self._send(429, {"error": {
+                "message": f"Rate limit reached for model `{model}` (stub)",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }}, headers)
+
+        def _chat(self, raw: bytes) -> None:
+            try:
+                payload = json.loads(raw or b"{}")
+            except ValueError:
+                self._send(400, {"error": {"message": "invalid JSON"}})
+                return
+            model = str(payload.get("model") or "")
+            prompt_tokens = _estimate_tokens(payload)
+            allowed, headers = state.admit(self._api_key(), prompt_tokens)
+            if not allowed:
+                self._rate_limited(model, headers)
+                return
+            time.sleep(state.latency(model))
+            content = scripted_reply(payload.get("messages") or [], model, state.config.scenario)
+            completion_tokens = max(1, len(content) // 4)
+            state.record_model(model, "ok")
+            self._send(200, {
+                "id": f"stub-{time.time_ns()}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }, headers)
+
+        def _transcription(self, raw: bytes) -> None:
+            match = re.search(rb'name="model"\r\n\r\n([^\r]+)', raw)
+            model = match.group(1).decode("utf-8", "replace") if match else "whisper"
+            allowed, headers = state.admit(self._api_key(), 1)
+            if not allowed:
+                self._rate_limited(model, headers)
+                return
+            # Whisper time grows with the audio length; the upload size stands in for it.
+            time.sleep(state.latency(model) * (1.0 + len(raw) / 1_000_000))
+            state.record_model(model, "ok")
+            self._send(200, {"text": scripted_transcript(raw)}, headers)
+
+    return Handler
+
+
+def start_server(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread; ``server.server_address`` has the port."""
+    state = StubState(config)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    server.stub_state = state
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+
+# ===================== CLI =====================
+
+def _parse_slow_models(values: List[str]) -> Dict[str, float]:
+    parsed = {}
+    for item in values or []:
+        name, _, factor = item.rpartition("=")
+        if not name:
+            raise argparse.ArgumentTypeError(f"--slow-model expects NAME=FACTOR, got {item!r}")
+        parsed[name] = float(factor)
+    return parsed
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run_bench(base_url: str, requests_count: int, concurrency: int, keys: int) -> Dict[str, Any]:
+    """Drive finance-agent style calls through RotatingGroqClient against the stub."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ.setdefault("GROQ_SDK_MAX_RETRIES", "0")
+    from ai_helper import RotatingGroqClient
+    from services.finance_agent import FINANCE_AGENT_SYSTEM_PROMPT
+
+    client = RotatingGroqClient([f"stub-key-{idx}" for idx in range(max(1, keys))])
+    latencies: List[float] = []
+    failures: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def _one(idx: int) -> None:
+        started = time.perf_counter()
+        try:
+            client.chat.completions.create(
+                model="openai/gpt-oss-20b",
+                messages=[
+                    {"role": "system", "content": FINANCE_AGENT_SYSTEM_PROMPT},
+                    {"role": "user", "content": json.dumps({"message": f"beli semen {idx + 1}00rb proyek Taman Sari"})},
+                ],
+                temperature=0.0,
+                max_tokens=256,
+            )
+        except Exception as exc:
+            with lock:
+                failures[type(exc).__name__] = failures.get(type(exc).__name__, 0) + 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        list(pool.map(_one, range(requests_count)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests_count,
+        "ok": len(latencies),
+        "failures": failures,
+        "elapsed_s": round(elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "scheduler": client.budget_gauges()["queue"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Local Groq-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="median response latency")
+    parser.add_argument("--jitter", type=float, default=0.35, help="log-normal sigma of the latency")
+    parser.add_argument("--slow-model", action="append", default=[], metavar="NAME=FACTOR")
+    parser.add_argument("--rpm", type=int, default=30, help="requests per minute per API key")
+    parser.add_argument("--tpm", type=int, default=6000, help="tokens per minute per API key")
+    parser.add_argument("--inject-429", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--scenario", help="JSON file with [{match, reply}] overrides")
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="run N client calls and exit")
+    parser.add_argument("--bench-concurrency", type=int, default=8)
+    parser.add_argument("--keys", type=int, default=2, help="API keys used by --bench")
+    args = parser.parse_args(argv)
+
+    scenario: List[Dict[str, str]] = []
+    if args.scenario:
+        with open(args.scenario, "r", encoding="utf-8") as handle:
+            scenario = json.load(handle)
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        jitter=args.jitter,
+        slow_models=_parse_slow_models(args.slow_model),
+        rpm=args.rpm,
+        tpm=args.tpm,
+        inject_429=args.inject_429,
+        seed=args.seed,
+        scenario=scenario,
+    )
+
+    if args.bench:
+        server = start_server(config, args.host, 0)
+        host, port = server.server_address[:2]
+        result = run_bench(f"http://{host}:{port}", args.bench, args.bench_concurrency, args.keys)
+        server.shutdown()
+        print(json.dumps(result, indent=2))
+        return 0
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StubState(config)))
+    server.daemon_threads = True
+    print(f"LLM stub listening on http://{args.host}:{args.port} (set GROQ_BASE_URL to this)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -211,6 +211,7 @@ SENSITIVE_PATTERNS = [
     (r"\"refresh_token\":\s*\"[^\"]+\"", "\"refresh_token\": \"[HIDDEN]\""),
     (r"\"access_token\":\s*\"[^\"]+\"", "\"access_token\": \"[HIDDEN]\""),
 ]
+_SENSITIVE_RES = [(re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in SENSITIVE_PATTERNS]
 
 
 # ===================== RATE LIMITING =====================
@@ -574,8 +575,8 @@ def mask_sensitive_data(text: str) -> str:
     
     result = str(text)
     
-    for pattern, replacement in SENSITIVE_PATTERNS:
-        result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
+    for pattern, replacement in _SENSITIVE_RES:
+        result = pattern.sub(replacement, result)
     
     return result
 
@@ -675,6 +676,10 @@ def secure_log(level: str, message: str, **kwargs) -> None:
         **kwargs: Additional context
     """
     try:
+        logger = _get_app_logger()
+        log_level = _resolve_log_level(level)
+        if not logger.isEnabledFor(log_level):
+            return  # skip masking for records the logger would discard
         masked_message = mask_sensitive_data(str(message))
         
         # Mask additional context as full key=value pairs so secret-like keys
@@ -686,7 +691,7 @@ def secure_log(level: str, message: str, **kwargs) -> None:
         context = ' '.join(context_parts)
         
         log_message = f"{masked_message} {context}".strip()
-        _get_app_logger().log(_resolve_log_level(level), log_message)
+        logger.log(log_level, log_message)
     except Exception as exc:
         # Logging must never break transaction handling, but failures should still
         # leave a minimal trace in container stderr.
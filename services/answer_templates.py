@@ -0,0 +1,192 @@
+"""Deterministic answers for common NL query shapes.
+
+Once nl_query_handler has the facts, phrasing a single total or a short list
+does not need a model. The shapes handled here are a single total, a grouped
+breakdown, a comparison with the previous period and a top-K list. Every
+number is printed straight from the facts with ``format_number``, so the
+reply cannot misquote them. Anything else (debt, saldo, open-ended questions)
+returns None and goes to the answer LLM as before.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.amounts import format_currency, format_number
+from utils.env import truthy
+
+
+MAX_BREAKDOWN_LINES = 10
+MAX_DETAIL_LINES = 10
+
+_METRIC_LABELS = {
+    "sum": "Total",
+    "count": "Jumlah transaksi",
+    "avg": "Rata-rata",
+    "max": "Transaksi terbesar",
+    "min": "Transaksi terkecil",
+}
+
+_lock = threading.Lock()
+_stats: Dict[str, int] = {"total": 0, "breakdown": 0, "comparison": 0, "top_k": 0, "llm": 0}
+
+
+def answer_templates_enabled() -> bool:
+    return truthy(os.getenv("QUERY_TEMPLATE_ANSWERS_ENABLED", "true"))
+
+
+def _period_label(days: Optional[int]) -> str:
+    if days is None:
+        return "sepanjang riwayat"
+    if days == 1:
+        return "hari ini"
+    return f"{days} hari terakhir"
+
+
+def _value_text(metric: str, value: Any) -> str:
+    if metric == "count":
+        return f"{format_number(value)} transaksi"
+    return format_currency(value)
+
+
+def _scope_label(filters: Dict[str, str]) -> str:
+    parts = []
+    tipe = filters.get("tipe")
+    if tipe:
+        parts.append(tipe.lower())
+    if filters.get("category"):
+        parts.append(f"kategori {filters['category']}")
+    if filters.get("project"):
+        parts.append(f"projek {filters['project']}")
+    wallet = filters.get("dompet") or filters.get("company")
+    if wallet:
+        parts.append(f"dompet {wallet}")
+    if filters.get("date_from") or filters.get("date_to"):
+        parts.append(f"{filters.get('date_from') or '...'} s/d {filters.get('date_to') or '...'}")
+    return " ".join(parts)
+
+
+def _label(metric: str, filters: Dict[str, str]) -> str:
+    scope = _scope_label(filters)
+    label = _METRIC_LABELS.get(metric, "Total")
+    return f"{label} {scope}" if scope else label
+
+
+def _headline(metric: str, filters: Dict[str, str], period: str) -> str:
+    return f"{_label(metric, filters)} ({period})"
+
+
+def _row_text(row: Dict[str, Any]) -> str:
+    description = row.get("keterangan") or "-"
+    project = row.get("project")
+    suffix = f" [{project}]" if project else ""
+    return f"{row.get('tanggal') or '-'} — {format_currency(row.get('jumlah') or 0)} — {description}{suffix}"
+
+
+def _group_lines(metric: str, groups: Dict[str, Any]) -> List[str]:
+    ranked = sorted(groups.items(), key=lambda item: item[1], reverse=True)
+    lines = [f"• {label}: {_value_text(metric, value)}" for label, value in ranked[:MAX_BREAKDOWN_LINES]]
+    if len(ranked) > MAX_BREAKDOWN_LINES:
+        lines.append(f"… dan {len(ranked) - MAX_BREAKDOWN_LINES} lainnya")
+    return lines
+
+
+def _change_text(current: float, previous: float) -> str:
+    diff = current - previous
+    if not previous:
+        return "naik dari nol" if current else "tidak berubah"
+    if not diff:
+        return "tidak berubah"
+    direction = "naik" if diff > 0 else "turun"
+    percent = f"{abs(diff) / abs(previous) * 100:.1f}".replace(".", ",")
+    return f"{direction} {format_number(abs(diff))} ({percent}%)"
+
+
+def _render(plan: Dict[str, Any], facts: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    if facts.get("debt") is not None or "wallet_balances" in facts:
+        return None
+    stats = facts.get("period_stats") or {}
+    metric = str(stats.get("metric") or plan["ast"].get("metric") or "sum")
+    filters = plan["ast"].get("filters") or {}
+    period = _period_label(facts.get("period_days"))
+    groups = stats.get("groups") or {}
+
+    if not facts.get("period_row_count"):
+        if not facts.get("historical_row_count"):
+            return "total", f"Belum ada transaksi yang cocok ({period})."
+        historical = facts.get("historical_stats") or {}
+        lines = [
+            f"Belum ada transaksi yang cocok ({period}).",
+            f"{_label(metric, filters)} sepanjang riwayat: "
+            f"{_value_text(metric, historical.get('value', 0))} dari {historical.get('row_count', 0)} transaksi.",
+        ]
+        return "total", "\n".join(lines)
+
+    row_count = facts["period_row_count"]
+    previous = facts.get("previous_period_stats")
+    if plan["intent"] == "comparison":
+        if previous is None or groups:
+            return None
+        current_value, previous_value = stats.get("value", 0), previous.get("value", 0)
+        lines = [
+            _headline(metric, filters, period),
+            f"• Periode ini: {_value_text(metric, current_value)} ({row_count} transaksi)",
+            f"• Periode sebelumnya: {_value_text(metric, previous_value)} ({previous.get('row_count', 0)} transaksi)",
+            f"Perubahan: {_change_text(current_value, previous_value)}.",
+        ]
+        return "comparison", "\n".join(lines)
+
+    top_rows = facts.get("top_rows")
+    if top_rows is not None and not groups:
+        title = "Transaksi terkecil" if metric == "min" else "Transaksi terbesar"
+        scope = _scope_label(filters)
+        lines = [f"{title}{' ' + scope if scope else ''} ({period}):"]
+        lines.extend(f"{index}. {_row_text(row)}" for index, row in enumerate(top_rows, 1))
+        return "top_k", "\n".join(lines)
+
+    if groups:
+        if plan["intent"] == "project_activity":
+            lines = [f"Projek dengan transaksi ({period}): {len(groups)} projek"]
+        else:
+            lines = [_headline(metric, filters, period) + ":"]
+        lines.extend(_group_lines(metric, groups))
+        return "breakdown", "\n".join(lines)
+
+    lines = [f"{_headline(metric, filters, period)}: {_value_text(metric, stats.get('value', 0))}"]
+    if metric != "count":
+        lines[0] += f" dari {row_count} transaksi."
+    if plan.get("detail"):
+        evidence = facts.get("evidence") or []
+        lines.append("")
+        shown = evidence[:MAX_DETAIL_LINES]
+        lines.extend(f"• {_row_text(row)}" for row in shown)
+        if row_count > len(shown):
+            lines.append(f"… dan {row_count - len(shown)} transaksi lainnya")
+    return "total", "\n".join(lines)
+
+
+def render_answer(plan: Dict[str, Any], facts: Dict[str, Any]) -> Optional[str]:
+    """A deterministic answer for supported shapes, or None to ask the LLM."""
+    if not answer_templates_enabled():
+        return None
+    rendered = _render(plan, facts)
+    with _lock:
+        _stats[rendered[0] if rendered else "llm"] += 1
+    return rendered[1] if rendered else None
+
+
+def answer_template_stats() -> Dict[str, Any]:
+    with _lock:
+        stats: Dict[str, Any] = dict(_stats)
+    answered = sum(value for name, value in stats.items() if name != "llm")
+    total = answered + stats["llm"]
+    stats["template_rate"] = round(answered / total, 3) if total else 0.0
+    return stats
+
+
+def reset_answer_templates_for_tests() -> None:
+    with _lock:
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,141 @@
+"""Content-addressed cache for Whisper transcriptions.
+
+Voice notes are forwarded between groups and replayed by inbox recovery, and
+WhatsApp forwards the original audio bytes unchanged. Transcriptions are keyed
+by the SHA-256 of the audio plus the model and language, kept in a bounded
+in-process LRU with a TTL, and shared across replicas through the
+``audio_transcription_cache`` table when AUDIO_CACHE_BACKEND=postgres.
+
+The cache must never break transcription: every failure degrades to a miss.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+from services.cache_tier import PostgresTier, TtlLru
+from utils.env import env_int, truthy
+
+
+def audio_cache_enabled() -> bool:
+    return truthy(os.getenv("AUDIO_CACHE_ENABLED", "true"))
+
+
+def _ttl_seconds() -> int:
+    return env_int("AUDIO_CACHE_TTL_SECONDS", 7 * 86400, minimum=60)
+
+
+def _max_entries() -> int:
+    return env_int("AUDIO_CACHE_MAX_ENTRIES", 256, minimum=1)
+
+
+_lock = threading.Lock()
+_entries = TtlLru(_max_entries, _ttl_seconds)
+_stats: Dict[str, int] = {"hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_db = PostgresTier(
+    "AUDIO_CACHE",
+    "Audio cache",
+    """
+    CREATE TABLE IF NOT EXISTS audio_transcription_cache (
+        cache_key TEXT PRIMARY KEY,
+        transcript TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+)
+
+
+def key_for_audio(audio: bytes, model: str, language: str) -> Optional[str]:
+    """Cache key for one audio payload; None when caching is off."""
+    if not audio_cache_enabled() or not audio:
+        return None
+    digest = hashlib.sha256(audio).hexdigest()
+    return hashlib.sha256(f"{model}|{language}|{digest}".encode("utf-8")).hexdigest()
+
+
+def _remember(key: str, text: str) -> None:
+    with _lock:
+        _stats["evictions"] += _entries.put(key, text)
+
+
+def _memory_lookup(key: str) -> Optional[str]:
+    with _lock:
+        text = _entries.get(key)
+        if text is not None:
+            _stats["hits"] += 1
+        return text
+
+
+def _db_lookup(key: str) -> Optional[str]:
+    row = _db.fetchone(
+        """
+        SELECT transcript FROM audio_transcription_cache
+        WHERE cache_key = %s AND created_at > NOW() - (%s * INTERVAL '1 second')
+        """,
+        (key, _ttl_seconds()),
+    )
+    if not row:
+        return None
+    _remember(key, row[0])
+    with _lock:
+        _stats["db_hits"] += 1
+    return row[0]
+
+
+def _db_store(key: str, text: str) -> None:
+    _db.execute(
+        """
+        INSERT INTO audio_transcription_cache (cache_key, transcript, created_at)
+        VALUES (%s, %s, NOW())
+        ON CONFLICT (cache_key)
+        DO UPDATE SET transcript = EXCLUDED.transcript, created_at = NOW()
+        """,
+        (key, text),
+        prune=(
+            "DELETE FROM audio_transcription_cache WHERE created_at < NOW() - (%s * INTERVAL '1 second')",
+            (_ttl_seconds(),),
+        ),
+    )
+
+
+def lookup(key: Optional[str]) -> Optional[str]:
+    """Return the cached transcript for ``key``, or None."""
+    if key is None:
+        return None
+    hit = _memory_lookup(key)
+    if hit is None:
+        hit = _db_lookup(key)
+    if hit is None:
+        with _lock:
+            _stats["misses"] += 1
+    return hit
+
+
+def store(key: Optional[str], text: str) -> None:
+    """Remember a successful transcription. Empty text is never cached."""
+    if key is None or not str(text or "").strip():
+        return
+    _remember(key, text)
+    with _lock:
+        _stats["stores"] += 1
+    _db_store(key, text)
+
+
+def audio_cache_stats() -> Dict[str, int]:
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    stats["max_entries"] = _max_entries()
+    stats["backend"] = "postgres" if _db.database_url() else "memory"
+    return stats
+
+
+def reset_audio_cache_for_tests() -> None:
+    with _lock:
+        _entries.clear()
+        for name in _stats:
+            _stats[name] = 0
+    _db.reset_for_tests()
@@ -0,0 +1,195 @@
+"""Silence-based chunking for long voice notes.
+
+Whisper transcribes a file in one pass, so a two-minute voice memo takes
+about as long as the provider needs for the whole file. ``split_audio`` decodes
+the note to 16 kHz mono PCM, cuts it at the quietest point near every
+AUDIO_CHUNK_TARGET_SECONDS (so no word is split) and re-encodes each piece as
+WAV. ``transcribe_chunks`` runs the pieces on a ``KeyBoundedPool`` sized from
+the number of Groq keys, and ``stitch_transcripts`` joins them back in order.
+
+Decoding WhatsApp ogg/opus needs the ``ffmpeg`` binary. Without it (or for
+short notes) ``split_audio`` returns None and the caller uploads the original
+file as before. WAV input is decoded with the standard library.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import re
+import shutil
+import subprocess
+import time
+import wave
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from security import log_timing, secure_log
+from services.key_pool import KeyBoundedPool
+from utils.env import env_float, truthy
+
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+MIN_PAUSE_MS = 300
+
+
+class AudioChunk(NamedTuple):
+    data: bytes
+    seconds: float
+
+
+# One pool per process, so concurrent voice notes share the per-key bound.
+_pool = KeyBoundedPool("AUDIO_CHUNK", per_key=2, ceiling=6, thread_name_prefix="audio-chunk")
+
+
+def chunking_enabled() -> bool:
+    return truthy(os.getenv("AUDIO_CHUNK_ENABLED", "true"))
+
+
+def _min_seconds() -> float:
+    return env_float("AUDIO_CHUNK_MIN_SECONDS", 40.0, minimum=5.0)
+
+
+def _target_seconds() -> float:
+    return env_float("AUDIO_CHUNK_TARGET_SECONDS", 20.0, minimum=5.0)
+
+
+def chunk_concurrency(key_count: int) -> int:
+    """Concurrent chunk requests: AUDIO_CHUNK_PER_KEY_CONCURRENCY per Groq key."""
+    return _pool.concurrency(key_count)
+
+
+def _decode_wav(audio: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    with wave.open(io.BytesIO(audio), "rb") as reader:
+        if reader.getsampwidth() != 2:
+            return None
+        channels = reader.getnchannels()
+        rate = reader.getframerate()
+        samples = np.frombuffer(reader.readframes(reader.getnframes()), dtype="<i2")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+
+def _decode_ffmpeg(audio: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    binary = shutil.which(os.getenv("FFMPEG_BINARY", "ffmpeg"))
+    if not binary:
+        return None
+    completed = subprocess.run(
+        [binary, "-nostdin", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        input=audio,
+        capture_output=True,
+        timeout=env_float("AUDIO_DECODE_TIMEOUT_SECONDS", 20.0, minimum=1.0),
+        check=True,
+    )
+    return np.frombuffer(completed.stdout, dtype="<i2"), SAMPLE_RATE
+
+
+def decode_pcm(audio: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """Decode audio to mono int16 samples; None when it cannot be decoded."""
+    try:
+        if audio[:4] == b"RIFF" and audio[8:12] == b"WAVE":
+            return _decode_wav(audio)
+        return _decode_ffmpeg(audio)
+    except Exception as exc:
+        secure_log("WARNING", f"Audio decode failed: {type(exc).__name__}")
+        return None
+
+
+def encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def find_split_points(samples: np.ndarray, rate: int, target_seconds: float) -> List[int]:
+    """Sample offsets of the quietest pause near every ``target_seconds``.
+
+    Each cut is searched between 0.5x and 1.5x the target from the previous
+    cut, and never leaves a tail shorter than half the target.
+    """
+    frame = max(1, rate * FRAME_MS // 1000)
+    frames = len(samples) // frame
+    target = int(target_seconds * 1000 / FRAME_MS)
+    if frames <= target + target // 2:
+        return []
+    energy = (samples[: frames * frame].astype(np.float64).reshape(frames, frame) ** 2).mean(axis=1)
+    pause = max(1, MIN_PAUSE_MS // FRAME_MS)
+    # Mean energy over a pause-length window centred on each frame.
+    smoothed = np.convolve(energy, np.ones(pause) / pause, mode="same")
+
+    cuts: List[int] = []
+    start = 0
+    while frames - start > target + target // 2:
+        low = start + target // 2
+        high = min(start + target + target // 2, frames - target // 2)
+        cut = low + int(np.argmin(smoothed[low:high]))
+        cuts.append(cut * frame)
+        start = cut
+    return cuts
+
+
+def split_audio(audio: bytes) -> Optional[List[AudioChunk]]:
+    """WAV chunks for a long voice note, or None to upload it whole."""
+    if not chunking_enabled() or not audio:
+        return None
+    started_at = time.perf_counter()
+    decoded = decode_pcm(audio)
+    if decoded is None:
+        return None
+    samples, rate = decoded
+    seconds = len(samples) / float(rate or 1)
+    if seconds < _min_seconds():
+        return None
+    cuts = find_split_points(samples, rate, _target_seconds())
+    if not cuts:
+        return None
+    bounds = [0, *cuts, len(samples)]
+    chunks = [
+        AudioChunk(encode_wav(samples[begin:end], rate), (end - begin) / float(rate))
+        for begin, end in zip(bounds, bounds[1:])
+    ]
+    log_timing("audio.chunk_split", started_at, seconds=round(seconds, 1), chunks=len(chunks))
+    return chunks
+
+
+def transcribe_chunks(
+    chunks: Sequence[AudioChunk],
+    transcribe_one: Callable[[int, AudioChunk], str],
+    concurrency: int,
+) -> List[str]:
+    """Run ``transcribe_one(index, chunk)`` for every chunk, results in order.
+
+    Each chunk is timed as ``audio.transcribe_chunk``. A failing chunk raises,
+    since a transcript with a hole in it could drop an amount or a project.
+    """
+
+    def _run(index: int, chunk: AudioChunk) -> str:
+        started_at = time.perf_counter()
+        try:
+            text = transcribe_one(index, chunk) or ""
+        except Exception:
+            log_timing("audio.transcribe_chunk", started_at, chunk=index + 1,
+                       seconds=round(chunk.seconds, 1), result="error")
+            raise
+        log_timing("audio.transcribe_chunk", started_at, chunk=index + 1,
+                   seconds=round(chunk.seconds, 1), result="ok")
+        return text
+
+    return _pool.run(_run, chunks, concurrency)
+
+
+def stitch_transcripts(texts: Sequence[str]) -> str:
+    """Join chunk transcripts in order with single spaces."""
+    return re.sub(r"\s+", " ", " ".join(text.strip() for text in texts if text and text.strip())).strip()
+
+
+def reset_chunk_pool_for_tests() -> None:
+    _pool.reset()
@@ -0,0 +1,142 @@
+"""Storage tiers shared by the content caches (OCR, LLM, audio, reports).
+
+``TtlLru`` is the bounded in-process tier: least recently used entries are
+evicted past ``max_entries`` and entries older than ``ttl_seconds`` read as a
+miss. Both limits are callables so env knobs are re-read on every use. It does
+no locking of its own; callers hold their module ``_lock``, which also guards
+their stats.
+
+``PostgresTier`` is the optional tier shared across replicas, one table per
+cache, enabled with ``<PREFIX>_BACKEND=postgres`` and connecting to
+``<PREFIX>_DATABASE_URL`` (falling back to STATE_DATABASE_URL/DATABASE_URL).
+The table is created on first use, and every failure degrades to a miss so a
+cache can never break the call it fronts.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Sequence, Tuple
+
+from security import secure_log
+
+
+_PRUNE_INTERVAL_SECONDS = 3600
+
+
+class TtlLru:
+    """Bounded LRU of ``key -> value`` whose entries expire after a TTL."""
+
+    def __init__(self, max_entries: Callable[[], int], ttl_seconds: Callable[[], float]):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The value for ``key``, or None when missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.time() - stored_at > self._ttl_seconds():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> int:
+        """Store ``value`` as most recently used; returns how many entries were evicted."""
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        evicted = 0
+        limit = self._max_entries()
+        while len(self._entries) > limit:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class PostgresTier:
+    """One cache table shared across replicas."""
+
+    def __init__(self, prefix: str, label: str, schema: str):
+        self._prefix = prefix  # env prefix, e.g. "OCR_CACHE"
+        self._label = label  # log label, e.g. "OCR cache"
+        self._schema = schema  # CREATE TABLE IF NOT EXISTS ...
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._last_prune = 0.0
+
+    def database_url(self) -> str:
+        """The DSN when ``<PREFIX>_BACKEND=postgres``, otherwise ""."""
+        backend = str(os.getenv(f"{self._prefix}_BACKEND", "")).strip().lower()
+        if backend not in {"postgres", "postgresql"}:
+            return ""
+        return str(
+            os.getenv(f"{self._prefix}_DATABASE_URL")
+            or os.getenv("STATE_DATABASE_URL")
+            or os.getenv("DATABASE_URL")
+            or ""
+        ).strip()
+
+    def _ensure_table(self, dsn: str) -> None:
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            import psycopg
+
+            with psycopg.connect(dsn, autocommit=True) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(self._schema)
+            self._initialized = True
+
+    def fetchone(self, sql: str, params: Sequence[Any]) -> Optional[tuple]:
+        """First row of a lookup; None when disabled, missing or on any failure."""
+        dsn = self.database_url()
+        if not dsn:
+            return None
+        try:
+            self._ensure_table(dsn)
+            import psycopg
+
+            with psycopg.connect(dsn, autocommit=True) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql, params)
+                    return cur.fetchone()
+        except Exception as exc:
+            secure_log("WARNING", f"{self._label} Postgres lookup failed: {type(exc).__name__}")
+            return None
+
+    def execute(self, sql: str, params: Sequence[Any], prune: Optional[Tuple[str, Sequence[Any]]] = None) -> None:
+        """Run a store statement; ``prune`` (sql, params) runs at most once an hour after it."""
+        dsn = self.database_url()
+        if not dsn:
+            return
+        try:
+            self._ensure_table(dsn)
+            import psycopg
+
+            with psycopg.connect(dsn, autocommit=True) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql, params)
+                    now = time.time()
+                    if prune is not None and now - self._last_prune > _PRUNE_INTERVAL_SECONDS:
+                        self._last_prune = now
+                        cur.execute(*prune)
+        except Exception as exc:
+            secure_log("WARNING", f"{self._label} Postgres store failed: {type(exc).__name__}")
+
+    def reset_for_tests(self) -> None:
+        self._initialized = False
+        self._last_prune = 0.0
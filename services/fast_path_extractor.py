@@ -0,0 +1,187 @@
+"""Rule-based fast path for simple one-line finance messages.
+
+Messages such as "beli semen 500rb dompet TX SBY proyek Taman Sari" carry
+every field explicitly. ``match_fast_path`` extracts them with the same
+grounded helpers as the provider-outage fallback and scores the result; in
+``on`` mode the finance agent commits a match above FAST_PATH_MIN_CONFIDENCE
+without calling the LLM. Anything ambiguous (questions, plans, debts, revisions, relative
+dates, several amounts, OCR) is declined so the LLM path still handles it.
+
+FAST_PATH_MODE:
+- ``shadow`` (default): never commit; compare matches with the LLM plan and
+  count disagreements per field.
+- ``on``: commit confident matches without an LLM call. Enable it once
+  ``shadow_disagreement_rate`` in /health shows the matches are safe.
+- ``off``: disabled.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.wallets import resolve_dompet_from_text
+from services.text_transaction_fallback import build_text_transaction_fallback, extract_single_text_amount
+
+
+MAX_FAST_PATH_CHARS = 160
+VALID_FAST_PATH_MODES = {"off", "on", "shadow"}
+
+_DECLINE_PATTERNS: Tuple[Tuple[str, "re.Pattern[str]"], ...] = (
+    ("question", re.compile(r"\?|\b(?:berapa|gimana|bagaimana|cek|check|laporan|rekap|saldo|sisa)\b")),
+    ("plan", re.compile(r"\b(?:akan|mau|rencana|besok|nanti|tolong|minta|harus)\b")),
+    ("debt", re.compile(r"\b(?:utang|hutang|pinjam|minjam|minjem|kasbon|talang(?:in|an)?|piutang)\b")),
+    ("revision", re.compile(r"\b(?:revisi|ralat|koreksi|ubah|ganti|hapus|batal|salah)\b")),
+    ("relative_date", re.compile(r"\b(?:kemarin|kemaren|kmrn|lusa|minggu lalu|bulan lalu|semalam)\b")),
+    ("wallet_move", re.compile(r"\b(?:pindah|mutasi|topup|top up|isi saldo|tarik tunai)\b")),
+    ("multi_item", re.compile(r"\b(?:dan|sama|plus|lalu|terus)\b|[+&;]")),
+)
+
+# Keyword lists mirror the ALLOWED CATEGORIES section of the extraction prompt.
+_CATEGORY_KEYWORDS = {
+    "Operasi Kantor": ("listrik", "air", "internet", "sewa", "pulsa", "wifi", "telepon", "kebersihan"),
+    "Bahan Alat": ("semen", "pasir", "kayu", "cat", "besi", "keramik", "paku", "gerinda", "meteran", "bor", "gergaji"),
+    "Gaji": ("upah", "tukang", "honor", "fee", "lembur", "mandor", "kuli", "pekerja", "borongan", "karyawan"),
+    "Lain-lain": ("transport", "bensin", "makan", "parkir", "toll", "tol", "ongkir"),
+}
+_CATEGORY_RES = {
+    category: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + r")\b")
+    for category, words in _CATEGORY_KEYWORDS.items()
+}
+
+_WALLET_PHRASE_RE = re.compile(r"\s*\b(?:(?:dari|pakai|pake|via)\s+)?(?:dompet|wallet)\b.*$", re.IGNORECASE)
+
+_COMPARED_FIELDS = ("jumlah", "tipe", "kategori", "nama_projek", "detected_dompet")
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Any] = {}
+
+
+@dataclass
+class FastPathMatch:
+    transaction: Dict[str, Any]
+    confidence: float
+    signals: List[str] = field(default_factory=list)
+
+
+def fast_path_mode() -> str:
+    mode = os.getenv("FAST_PATH_MODE", "shadow").strip().lower()
+    return mode if mode in VALID_FAST_PATH_MODES else "shadow"
+
+
+def fast_path_min_confidence() -> float:
+    try:
+        return float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.85"))
+    except ValueError:
+        return 0.85
+
+
+def decline_reason(text: str) -> str:
+    """Why ``text`` is not a simple one-line transaction, or "" if it is."""
+    if not text or len(text) > MAX_FAST_PATH_CHARS:
+        return "length"
+    if "\n" in text.strip() or "Receipt/Struk content:" in text:
+        return "multiline"
+    lower = text.lower()
+    for reason, pattern in _DECLINE_PATTERNS:
+        if pattern.search(lower):
+            return reason
+    return ""
+
+
+def _category(text: str) -> Optional[str]:
+    lower = text.lower()
+    found = {category for category, pattern in _CATEGORY_RES.items() if pattern.search(lower)}
+    return found.pop() if len(found) == 1 else None
+
+
+def match_fast_path(text: str) -> Optional[FastPathMatch]:
+    """Extract one transaction from a simple message, or None.
+
+    Confidence starts at 0.55 for a grounded action + single amount +
+    description and gains 0.2 for an explicit project, 0.1 for an explicit
+    dompet and 0.1 for an unambiguous category keyword.
+    """
+    if decline_reason(text):
+        return None
+    amount = extract_single_text_amount(text)
+    transaction = build_text_transaction_fallback(text, amount)
+    if not transaction:
+        return None
+
+    transaction = dict(transaction)
+    confidence = 0.55
+    signals = ["amount", "action"]
+    if transaction.get("nama_projek") and not transaction.get("needs_project"):
+        confidence += 0.2
+        signals.append("project")
+    dompet = resolve_dompet_from_text(text)
+    if dompet:
+        transaction["detected_dompet"] = dompet
+        description = _WALLET_PHRASE_RE.sub("", transaction.get("keterangan") or "").strip(" ,.;:-")
+        if len(description) >= 3:
+            transaction["keterangan"] = description
+        confidence += 0.1
+        signals.append("dompet")
+    category = _category(text)
+    if category:
+        transaction["kategori"] = category
+        if category != "Lain-lain":
+            confidence += 0.1
+            signals.append("category")
+    return FastPathMatch(transaction=transaction, confidence=round(confidence, 2), signals=signals)
+
+
+def _normalized(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().casefold()
+
+
+def _bump(name: str, amount: int = 1) -> None:
+    _stats[name] = _stats.get(name, 0) + amount
+
+
+def record_outcome(outcome: str) -> None:
+    """Count one message: committed, below_threshold, declined or shadowed."""
+    with _stats_lock:
+        _bump("messages")
+        _bump(outcome)
+
+
+def record_shadow_comparison(match: FastPathMatch, llm_transactions: List[Dict[str, Any]]) -> List[str]:
+    """Compare a fast-path match with the LLM plan; return disagreeing fields."""
+    if len(llm_transactions) != 1:
+        fields = ["transaction_count"]
+    else:
+        llm_tx = llm_transactions[0]
+        fields = [
+            name for name in _COMPARED_FIELDS
+            if _normalized(match.transaction.get(name)) != _normalized(llm_tx.get(name))
+        ]
+    with _stats_lock:
+        _bump("shadow_compared")
+        _bump("shadow_disagree" if fields else "shadow_agree")
+        per_field = _stats.setdefault("disagree_fields", {})
+        for name in fields:
+            per_field[name] = per_field.get(name, 0) + 1
+    return fields
+
+
+def fast_path_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = {key: dict(value) if isinstance(value, dict) else value for key, value in _stats.items()}
+    messages = stats.get("messages", 0)
+    compared = stats.get("shadow_compared", 0)
+    stats["mode"] = fast_path_mode()
+    # In shadow mode "shadowed" counts the messages the fast path would have committed.
+    covered = stats.get("committed", 0) + stats.get("shadowed", 0)
+    stats["coverage"] = round(covered / messages, 3) if messages else 0.0
+    stats["shadow_disagreement_rate"] = round(stats.get("shadow_disagree", 0) / compared, 3) if compared else 0.0
+    return stats
+
+
+def reset_fast_path_stats_for_tests() -> None:
+    with _stats_lock:
+        _stats.clear()
@@ -14,12 +14,21 @@ import time
 from collections import Counter
 from dataclasses import asdict, dataclass, field
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from config.wallets import DOMPET_SHEETS, resolve_dompet_from_text
 from utils.amounts import parse_money_token
 from utils.parsers import extract_project_name_from_text, parse_revision_amount, strip_explicit_catat_command
-from security import log_timing
+from security import log_timing, secure_log
+from services.fast_path_extractor import (
+    FastPathMatch,
+    fast_path_min_confidence,
+    fast_path_mode,
+    match_fast_path,
+    record_outcome,
+    record_shadow_comparison,
+)
+from services.prompt_builder import fit_section
 
 
 ALLOWED_AGENT_CATEGORIES = {
@@ -340,6 +349,44 @@ def _deterministic_structured_decision(text: str) -> Optional[AgentDecision]:
     )
 
 
+def _fast_path_decision(text: str) -> Tuple[Optional[FastPathMatch], Optional[AgentDecision]]:
+    """Rule-based match for simple one-liners and, when confident, its decision."""
+    if fast_path_mode() == "off":
+        return None, None
+    started_at = time.perf_counter()
+    match = match_fast_path(text)
+    log_timing("finance_agent.fast_path", started_at, matched=bool(match))
+    if match is None:
+        record_outcome("declined")
+        return None, None
+
+    raw = match.transaction
+    tx = AgentTransaction(
+        tanggal=raw.get("tanggal") or "",
+        kategori=raw.get("kategori") or "Lain-lain",
+        keterangan=raw.get("keterangan") or "",
+        jumlah=int(raw.get("jumlah") or 0),
+        tipe=raw.get("tipe") or "Pengeluaran",
+        nama_projek=raw.get("nama_projek") or "",
+        company=None,
+        detected_dompet=raw.get("detected_dompet"),
+        confidence=match.confidence,
+        source="fast_path",
+    )
+    decision = AgentDecision(
+        action="PROCESS",
+        confidence=match.confidence,
+        transactions=[tx],
+        reasoning=f"Rule-based fast path ({'+'.join(match.signals)}).",
+        source="fast_path",
+        source_amounts=[tx.jumlah],
+    )
+    if match.confidence < fast_path_min_confidence() or not decision.accepted():
+        record_outcome("below_threshold")
+        return match, None
+    return match, decision
+
+
 def _safe_sheet_context() -> Dict[str, Any]:
     context: Dict[str, Any] = {
         "wallets": list(DOMPET_SHEETS),
@@ -381,9 +428,7 @@ def _conversation_context(chat_id: str = None, user_id: str = None) -> str:
         return ""
 
 
-def _agent_prompt(text: str, sender_name: str, context: Dict[str, Any],
-                  conversation_context: str = "") -> List[Dict[str, str]]:
-    system = """You are Finance Agent Planner for an Indonesian finance bot.
+FINANCE_AGENT_SYSTEM_PROMPT = """You are Finance Agent Planner for an Indonesian finance bot.
 
 Your job is to understand the user's finance message, read the supplied spreadsheet context, and return a safe plan.
 You do not write to Sheets. You only output JSON.
@@ -418,6 +463,17 @@ Rules:
 - Use conversation_context only to resolve references like "yang tadi"; explicit user text still wins.
 - If uncertain, use ASK_CLARIFICATION or FALLBACK, not a guessed transaction.
 - Output JSON only."""
+
+
+def _agent_prompt(text: str, sender_name: str, context: Dict[str, Any],
+                  conversation_context: str = "") -> List[Dict[str, str]]:
+    context = dict(context)
+    context["known_projects"] = fit_section(
+        "finance_agent", "known_projects", list(context.get("known_projects") or []), 300
+    )
+    conversation_context = fit_section(
+        "finance_agent", "conversation", conversation_context or "", 400, keep="tail"
+    )
     user = json.dumps(
         {
             "sender": sender_name,
@@ -428,7 +484,7 @@ Rules:
         ensure_ascii=True,
     )
     return [
-        {"role": "system", "content": system},
+        {"role": "system", "content": FINANCE_AGENT_SYSTEM_PROMPT},
         {"role": "user", "content": user},
     ]
 
@@ -499,6 +555,14 @@ def plan_finance_message(
     if deterministic and deterministic.accepted():
         return deterministic
 
+    fast_match, fast_decision = _fast_path_decision(text)
+    shadow_fast_path = fast_decision is not None and fast_path_mode() == "shadow"
+    if fast_decision is not None and not shadow_fast_path:
+        record_outcome("committed")
+        return fast_decision
+    if shadow_fast_path:
+        record_outcome("shadowed")
+
     if not finance_agent_allows_llm():
         return deterministic or AgentDecision(reasoning=f"Finance agent mode={finance_agent_mode()} does not allow LLM planning.")
 
@@ -512,6 +576,13 @@ def plan_finance_message(
         response = llm_call(_agent_prompt(text, sender_name, context, conversation_context))
         content = response.choices[0].message.content.strip()
         decision = _parse_agent_response(content, context, text)
+        if shadow_fast_path:
+            llm_transactions = decision.transactions if decision.action == "PROCESS" else []
+            disagreements = record_shadow_comparison(
+                fast_match, [tx.to_legacy_dict() for tx in llm_transactions]
+            )
+            if disagreements:
+                secure_log("INFO", "Fast path shadow disagreement", fields=",".join(disagreements))
         if len(decision.transactions) > MAX_AGENT_TRANSACTIONS:
             decision.action = "FALLBACK"
             decision.transactions = []
@@ -0,0 +1,289 @@
+"""Proactive Groq API-key scheduling from rate-limit response headers.
+
+Groq returns ``x-ratelimit-remaining-requests``/``-tokens`` and the matching
+``x-ratelimit-reset-*`` durations on every response (and ``retry-after`` on a
+429). Groq enforces those limits per model, so ``KeyBudgetScheduler`` keeps a
+budget per (key, model), reserves an estimate before each call, and hands out
+the key with the most headroom for the requested model. When every key is
+close to exhaustion for that model, callers wait briefly for the earliest reset
+instead of spending a round trip on a guaranteed 429.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+# Prompt-token cost of one image input; Groq bills images as prompt tokens
+# but they never show up in the message text.
+_DEFAULT_IMAGE_TOKENS = 1600
+
+
+def parse_reset_duration(value: Any) -> Optional[float]:
+    """Parse Groq reset durations such as ``2m59.56s``, ``7.66s`` or ``350ms``."""
+    text = str(value or "").strip().lower()
+    if not text:
+        return None
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for number, unit in _DURATION_PART_RE.findall(text):
+        matched = True
+        amount = float(number)
+        total += {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}[unit] * amount
+    return total if matched else None
+
+
+def _header_int(headers: Mapping[str, Any], name: str) -> Optional[int]:
+    try:
+        raw = headers.get(name)
+    except Exception:
+        return None
+    if raw is None:
+        return None
+    try:
+        return int(float(str(raw).strip()))
+    except ValueError:
+        return None
+
+
+def _header_value(headers: Mapping[str, Any], name: str) -> Any:
+    try:
+        return headers.get(name)
+    except Exception:
+        return None
+
+
+class _KeyBudget:
+    __slots__ = (
+        "remaining_requests",
+        "remaining_tokens",
+        "requests_reset_at",
+        "tokens_reset_at",
+        "cooldown_until",
+        "in_flight",
+        "rate_limited",
+        "dispatched",
+    )
+
+    def __init__(self):
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.dispatched = 0
+
+    def refresh(self, now: float) -> None:
+        # Past a reset the provider window has refilled; budgets are unknown
+        # again until the next response reports them.
+        if self.remaining_requests is not None and now >= self.requests_reset_at:
+            self.remaining_requests = None
+        if self.remaining_tokens is not None and now >= self.tokens_reset_at:
+            self.remaining_tokens = None
+
+    def ready_at(self, now: float, est_tokens: int, reserve_requests: int) -> float:
+        """Earliest time this key can take a request of ``est_tokens``."""
+        ready = max(now, self.cooldown_until)
+        if self.remaining_requests is not None and self.remaining_requests <= reserve_requests:
+            ready = max(ready, self.requests_reset_at)
+        if self.remaining_tokens is not None and self.remaining_tokens < est_tokens:
+            ready = max(ready, self.tokens_reset_at)
+        return ready
+
+
+class KeyBudgetScheduler:
+    """Thread-safe per-(key, model) budget tracker and key picker."""
+
+    def __init__(self, key_count: int):
+        self._key_count = max(0, key_count)
+        self._budgets: Dict[Tuple[int, str], _KeyBudget] = {}
+        self._cond = threading.Condition()
+        self._waiting = 0
+        self._waits = 0
+        self._wait_timeouts = 0
+
+    @staticmethod
+    def _max_wait_seconds() -> float:
+        try:
+            return max(0.0, float(os.getenv("GROQ_SCHEDULER_MAX_WAIT_SECONDS", "8")))
+        except (TypeError, ValueError):
+            return 8.0
+
+    @staticmethod
+    def _reserve_requests() -> int:
+        try:
+            return max(0, int(os.getenv("GROQ_SCHEDULER_RESERVE_REQUESTS", "1")))
+        except (TypeError, ValueError):
+            return 1
+
+    def _budget(self, idx: int, model: str) -> _KeyBudget:
+        # Caller holds self._cond.
+        key = (idx, model or "")
+        budget = self._budgets.get(key)
+        if budget is None:
+            budget = self._budgets[key] = _KeyBudget()
+        return budget
+
+    def _rank(self, idx: int, model: str, preferred: int) -> tuple:
+        budget = self._budget(idx, model)
+        requests = budget.remaining_requests if budget.remaining_requests is not None else float("inf")
+        tokens = budget.remaining_tokens if budget.remaining_tokens is not None else float("inf")
+        distance = (idx - preferred) % self._key_count
+        return (-requests, -tokens, budget.in_flight, distance)
+
+    def acquire(
+        self,
+        est_tokens: int = 0,
+        preferred: int = 0,
+        exclude: Optional[set] = None,
+        model: str = "",
+    ) -> Optional[int]:
+        """Reserve and return the best key index for ``model``, waiting briefly if all are low.
+
+        Returns None only when every key is excluded. After the bounded wait the
+        soonest-ready key is returned anyway so the call can still be attempted.
+        """
+        excluded = exclude or set()
+        candidates = [idx for idx in range(self._key_count) if idx not in excluded]
+        if not candidates:
+            return None
+        deadline = time.monotonic() + self._max_wait_seconds()
+        reserve = self._reserve_requests()
+        waited = False
+        with self._cond:
+            while True:
+                now = time.time()
+                for idx in candidates:
+                    self._budget(idx, model).refresh(now)
+                ready_times = {idx: self._budget(idx, model).ready_at(now, est_tokens, reserve) for idx in candidates}
+                available = [idx for idx in candidates if ready_times[idx] <= now]
+                if available:
+                    chosen = min(available, key=lambda idx: self._rank(idx, model, preferred))
+                    break
+                soonest = min(candidates, key=lambda idx: ready_times[idx])
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._wait_timeouts += 1
+                    chosen = soonest
+                    break
+                if not waited:
+                    waited = True
+                    self._waits += 1
+                self._waiting += 1
+                try:
+                    self._cond.wait(timeout=min(remaining, max(0.05, ready_times[soonest] - now)))
+                finally:
+                    self._waiting -= 1
+
+            budget = self._budget(chosen, model)
+            budget.in_flight += 1
+            budget.dispatched += 1
+            if budget.remaining_requests is not None:
+                budget.remaining_requests -= 1
+            if budget.remaining_tokens is not None:
+                budget.remaining_tokens -= max(0, est_tokens)
+            return chosen
+
+    def release(
+        self,
+        idx: int,
+        headers: Optional[Mapping[str, Any]] = None,
+        rate_limited: bool = False,
+        model: str = "",
+    ) -> None:
+        """Finish a call on ``idx`` for ``model`` and fold in any rate-limit headers."""
+        if not (0 <= idx < self._key_count):
+            return
+        now = time.time()
+        with self._cond:
+            budget = self._budget(idx, model)
+            budget.in_flight = max(0, budget.in_flight - 1)
+            if headers is not None:
+                self._apply_headers(budget, headers, now)
+            if rate_limited:
+                budget.rate_limited += 1
+                retry_after = parse_reset_duration(_header_value(headers or {}, "retry-after"))
+                if retry_after is None:
+                    retry_after = max(0.0, max(budget.requests_reset_at, budget.tokens_reset_at) - now) or 1.0
+                budget.cooldown_until = max(budget.cooldown_until, now + retry_after)
+            self._cond.notify_all()
+
+    @staticmethod
+    def _apply_headers(budget: _KeyBudget, headers: Mapping[str, Any], now: float) -> None:
+        remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+        reset_requests = parse_reset_duration(_header_value(headers, "x-ratelimit-reset-requests"))
+        reset_tokens = parse_reset_duration(_header_value(headers, "x-ratelimit-reset-tokens"))
+        if remaining_requests is not None:
+            budget.remaining_requests = remaining_requests
+            budget.requests_reset_at = now + (reset_requests if reset_requests is not None else 60.0)
+        if remaining_tokens is not None:
+            budget.remaining_tokens = remaining_tokens
+            budget.tokens_reset_at = now + (reset_tokens if reset_tokens is not None else 60.0)
+
+    def snapshot(self, labels: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Per-(key, model) budget gauges suitable for health/metrics output."""
+        now = time.time()
+        rows = []
+        with self._cond:
+            for (idx, model), budget in sorted(self._budgets.items()):
+                budget.refresh(now)
+                rows.append({
+                    "key": labels[idx] if labels and idx < len(labels) else str(idx),
+                    "model": model,
+                    "remaining_requests": budget.remaining_requests,
+                    "remaining_tokens": budget.remaining_tokens,
+                    "requests_reset_in_s": round(max(0.0, budget.requests_reset_at - now), 1),
+                    "tokens_reset_in_s": round(max(0.0, budget.tokens_reset_at - now), 1),
+                    "cooldown_s": round(max(0.0, budget.cooldown_until - now), 1),
+                    "in_flight": budget.in_flight,
+                    "dispatched": budget.dispatched,
+                    "rate_limited": budget.rate_limited,
+                })
+        return rows
+
+    def queue_stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"waiting": self._waiting, "waits": self._waits, "wait_timeouts": self._wait_timeouts}
+
+
+def _image_tokens() -> int:
+    try:
+        return max(0, int(os.getenv("GROQ_SCHEDULER_IMAGE_TOKENS", str(_DEFAULT_IMAGE_TOKENS))))
+    except (TypeError, ValueError):
+        return _DEFAULT_IMAGE_TOKENS
+
+
+def estimate_request_tokens(kwargs: Mapping[str, Any]) -> int:
+    """Rough token cost of a chat request: prompt chars / 4, images, plus output cap."""
+    messages = kwargs.get("messages") or []
+    prompt_chars = 0
+    images = 0
+    for message in messages if isinstance(messages, list) else []:
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            prompt_chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if not isinstance(part, dict):
+                    continue
+                if part.get("type") == "text":
+                    prompt_chars += len(str(part.get("text") or ""))
+                elif part.get("type") == "image_url":
+                    images += 1
+    try:
+        completion = int(kwargs.get("max_completion_tokens") or kwargs.get("max_tokens") or 1024)
+    except (TypeError, ValueError):
+        completion = 1024
+    return prompt_chars // 4 + images * _image_tokens() + completion
@@ -0,0 +1,189 @@
+"""Hedged execution of interchangeable provider calls.
+
+Vision OCR can be served by several models. Trying them strictly in sequence
+means a slow primary holds the user for the whole provider timeout before the
+fallback even starts. ``run_hedged`` starts the primary immediately, launches
+the next candidate after a hedge delay (or as soon as an attempt fails), and
+returns the first valid result. Losers are abandoned: queued attempts are
+cancelled and in-flight ones finish in the background with their result
+ignored. Every attempt's latency is recorded per candidate.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from security import log_timing, secure_log
+
+
+_LATENCY_WINDOW = 200
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_latency_lock = threading.Lock()
+_latencies: Dict[str, Deque[float]] = {}
+_outcomes: Dict[str, Dict[str, int]] = {}
+
+
+class HedgedCallsFailed(RuntimeError):
+    """Every candidate failed or returned an invalid result."""
+
+    def __init__(self, last_error: Optional[BaseException] = None):
+        self.last_error = last_error
+        detail = f": {type(last_error).__name__}" if last_error else ""
+        super().__init__(f"All hedged attempts failed{detail}")
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            try:
+                workers = max(2, int(os.getenv("HEDGE_MAX_WORKERS", "8")))
+            except (TypeError, ValueError):
+                workers = 8
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge")
+        return _executor
+
+
+def record_latency(name: str, seconds: float, outcome: str) -> None:
+    """Remember one attempt's latency and outcome for ``name``."""
+    with _latency_lock:
+        samples = _latencies.setdefault(name, deque(maxlen=_LATENCY_WINDOW))
+        samples.append(max(0.0, float(seconds)))
+        counters = _outcomes.setdefault(name, {})
+        counters[outcome] = counters.get(outcome, 0) + 1
+
+
+def latency_percentile(name: str, pct: float) -> Optional[float]:
+    """Return the recent latency percentile in seconds, None without samples."""
+    with _latency_lock:
+        samples = sorted(_latencies.get(name) or ())
+    if not samples:
+        return None
+    rank = min(len(samples) - 1, max(0, int(round(pct / 100.0 * (len(samples) - 1)))))
+    return samples[rank]
+
+
+def latency_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-candidate latency percentiles (ms) and outcome counters."""
+    with _latency_lock:
+        names = list(_latencies)
+        outcomes = {name: dict(_outcomes.get(name) or {}) for name in names}
+        counts = {name: len(_latencies[name]) for name in names}
+    stats: Dict[str, Dict[str, Any]] = {}
+    for name in names:
+        p50 = latency_percentile(name, 50)
+        p95 = latency_percentile(name, 95)
+        stats[name] = {
+            "samples": counts[name],
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "outcomes": outcomes[name],
+        }
+    return stats
+
+
+def reset_hedge_stats_for_tests() -> None:
+    with _latency_lock:
+        _latencies.clear()
+        _outcomes.clear()
+
+
+def run_hedged(
+    candidates: Sequence[str],
+    call: Callable[[str], Any],
+    *,
+    hedge_delay: float,
+    is_valid: Callable[[Any], bool] = bool,
+    hedge_immediately: bool = False,
+    on_launch: Optional[Callable[[str], None]] = None,
+    stage: str = "hedged_call",
+) -> Tuple[str, Any]:
+    """Run ``call(candidate)`` with hedging and return ``(candidate, result)``.
+
+    The first candidate starts at once. The next one starts when the hedge
+    delay elapses without a valid result, when an attempt fails, or right away
+    if ``hedge_immediately`` is set. Raises ``HedgedCallsFailed`` when every
+    candidate failed or produced an invalid result.
+    """
+    pending_names: List[str] = list(candidates)
+    if not pending_names:
+        raise HedgedCallsFailed()
+
+    executor = _get_executor()
+    in_flight: Dict[Future, Tuple[str, float]] = {}
+    last_error: Optional[BaseException] = None
+    next_launch_at = 0.0
+
+    def _launch() -> None:
+        nonlocal next_launch_at
+        name = pending_names.pop(0)
+        if on_launch:
+            try:
+                on_launch(name)
+            except Exception:
+                pass
+        started = time.perf_counter()
+        in_flight[executor.submit(call, name)] = (name, started)
+        next_launch_at = started + max(0.0, hedge_delay)
+
+    def _abandon() -> None:
+        for future, (name, _started) in in_flight.items():
+            if future.cancel():
+                record_latency(name, 0.0, "cancelled")
+            else:
+                future.add_done_callback(
+                    lambda fut, loser=name, began=_started: record_latency(
+                        loser, time.perf_counter() - began, "abandoned"
+                    )
+                )
+
+    _launch()
+    if hedge_immediately and pending_names:
+        _launch()
+
+    while in_flight:
+        timeout = None
+        if pending_names:
+            timeout = max(0.0, next_launch_at - time.perf_counter())
+        done, _ = wait(list(in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+
+        if not done:
+            secure_log("INFO", f"Hedging {stage}: launching {pending_names[0]} after {hedge_delay:.1f}s")
+            _launch()
+            continue
+
+        failed = False
+        for future in done:
+            name, started = in_flight.pop(future)
+            elapsed = time.perf_counter() - started
+            try:
+                result = future.result()
+            except Exception as exc:
+                last_error = exc
+                failed = True
+                record_latency(name, elapsed, "error")
+                log_timing(stage, started, candidate=name, result="error")
+                secure_log("WARNING", f"Hedged attempt {name} failed: {type(exc).__name__}")
+                continue
+            if not is_valid(result):
+                failed = True
+                record_latency(name, elapsed, "invalid")
+                log_timing(stage, started, candidate=name, result="invalid")
+                continue
+            record_latency(name, elapsed, "ok")
+            log_timing(stage, started, candidate=name, result="ok")
+            _abandon()
+            return name, result
+
+        # A failure hands over to the next candidate instead of waiting out the delay.
+        if failed and pending_names:
+            _launch()
+
+    raise HedgedCallsFailed(last_error)
@@ -0,0 +1,417 @@
+"""Cheap cascade in front of the Groq intent analyzer.
+
+In busy project groups most messages are chit-chat that the LLM only ends up
+classifying as IGNORE. For ambient messages (group, bot not addressed) without
+an amount or media the cascade decides first:
+
+1. rules: acknowledgements/laughter, casual bot mentions, and messages with no
+   finance, query, debt or wallet signal at all are ignored;
+2. classifier: a hashed character n-gram logistic regression trained from
+   logged LLM decisions ignores messages whose respond probability is below
+   its calibrated threshold;
+3. everything else goes to the LLM, whose decision is logged as a training
+   label (``intent_decision`` audit events).
+
+The cascade only ever short-circuits IGNORE; anything the bot may act on still
+reaches the LLM for extraction. The classifier threshold is picked on a
+held-out split so that at most INTENT_CASCADE_MAX_FALSE_IGNORE of messages the
+LLM answered would have been ignored.
+
+INTENT_CASCADE_MODE:
+- ``shadow`` (default): always call the LLM; count how often the cascade would
+  have skipped it and how often that would have dropped a message.
+- ``on``: skip the LLM when the cascade is confident. Switch only once
+  ``shadow_false_ignores`` in /health shows the skips are safe.
+- ``off``: disabled.
+
+Train and evaluate with ``python scripts/intent_cascade.py train|report``.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from security import secure_log
+from utils.env import truthy
+
+
+VALID_CASCADE_MODES = {"off", "on", "shadow"}
+DEFAULT_MODEL_PATH = "data/intent_cascade_model.npz"
+NGRAM_RANGE = (2, 4)
+FEATURE_DIM = 1 << 15
+MAX_LOGGED_TEXT = 500
+NOT_AMBIENT_REASON = "not_ambient_chatter"
+
+_CHITCHAT_ONLY_RE = re.compile(
+    r"^(?:(?:wk|kw|ha|he|hi|xi){2,}[a-z]*|ok(?:e|ey|ay)?|sip|siap|mantap\w*|yoi|iya|ya|yaa+|betul|"
+    r"noted|otw|thx|thanks|makasih|terima\s*kasih|nuhun|suwun|gas|aman|lanjut|"
+    r"pagi|siang|sore|malam|halo|hai|hi|bro|pak|bu|mas|mbak|kak|semua|ges|guys)$"
+)
+_SIGNAL_RE = re.compile(
+    r"\b(?:beli|bayar|transfer|tf|lunas|dp|termin|pelunasan|biaya|ongkir|saldo|dompet|uang|dana|"
+    r"keluar|masuk|total|rekap|laporan|hutang|utang|piutang|pinjam|kasbon|tagihan|invoice|nota|"
+    r"struk|kwitansi|catat|tulis|input|masukin|simpan|revisi|ralat|koreksi|ubah|hapus|batal|"
+    r"cek|lihat|info|help|fee|gaji|honor|upah|lembur|project|projek|proyek|prj|anggaran|"
+    r"kantor|operasional|listrik|wifi|internet|sewa|modal|profit|omset|rp|idr|ribu|juta)\w*"
+)
+_QUESTION_RE = re.compile(r"\?|\b(?:berapa|gimana|bagaimana|kapan|kenapa|mana|apa)\b")
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Any] = {}
+_model_lock = threading.Lock()
+_model_cache: Dict[str, Any] = {"path": None, "mtime": None, "model": None}
+
+
+@dataclass
+class CascadeDecision:
+    stage: str
+    ignore: bool
+    reason: str = ""
+    score: Optional[float] = None
+
+    @property
+    def skip_llm(self) -> bool:
+        return self.ignore and cascade_mode() == "on"
+
+    @property
+    def ambient(self) -> bool:
+        """Whether the message is the ambient chatter the cascade gates (its training population)."""
+        return self.reason != NOT_AMBIENT_REASON
+
+
+@dataclass
+class NgramClassifier:
+    """Logistic regression over hashed character n-grams (P(respond))."""
+
+    weights: np.ndarray
+    bias: float
+    threshold: float
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+    def predict_proba(self, text: str) -> float:
+        cols, vals = featurize(text, len(self.weights))
+        z = float(np.dot(self.weights[cols], vals)) + self.bias if len(cols) else self.bias
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(
+            path,
+            weights=self.weights.astype(np.float32),
+            bias=np.array([self.bias]),
+            threshold=np.array([self.threshold]),
+            metrics=np.array([json.dumps(self.metrics)]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "NgramClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                weights=data["weights"].astype(np.float64),
+                bias=float(data["bias"][0]),
+                threshold=float(data["threshold"][0]),
+                metrics=json.loads(str(data["metrics"][0])),
+            )
+
+
+def cascade_mode() -> str:
+    mode = os.getenv("INTENT_CASCADE_MODE", "shadow").strip().lower()
+    return mode if mode in VALID_CASCADE_MODES else "shadow"
+
+
+def model_path() -> str:
+    return os.getenv("INTENT_CASCADE_MODEL_PATH", DEFAULT_MODEL_PATH).strip() or DEFAULT_MODEL_PATH
+
+
+def max_false_ignore() -> float:
+    try:
+        return min(0.5, max(0.0, float(os.getenv("INTENT_CASCADE_MAX_FALSE_IGNORE", "0.01"))))
+    except ValueError:
+        return 0.01
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+def featurize(text: str, dim: int = FEATURE_DIM) -> Tuple[np.ndarray, np.ndarray]:
+    """Sparse L2-normalised n-gram counts as (column indices, values)."""
+    padded = f" {_normalize(text)} "
+    counts: Dict[int, float] = {}
+    for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+        for start in range(max(0, len(padded) - n + 1)):
+            col = zlib.crc32(padded[start:start + n].encode("utf-8")) % dim
+            counts[col] = counts.get(col, 0.0) + 1.0
+    if not counts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    vals = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    return cols, vals / np.linalg.norm(vals)
+
+
+def _design(texts: Sequence[str], dim: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rows, cols, vals = [], [], []
+    for index, text in enumerate(texts):
+        c, v = featurize(text, dim)
+        rows.append(np.full(len(c), index, dtype=np.int64))
+        cols.append(c)
+        vals.append(v)
+    if not rows:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+
+
+def _fit(texts: Sequence[str], labels: np.ndarray, dim: int, epochs: int, lr: float, l2: float) -> Tuple[np.ndarray, float]:
+    rows, cols, vals = _design(texts, dim)
+    n = len(texts)
+    positives = max(1.0, float(labels.sum()))
+    negatives = max(1.0, float(n - labels.sum()))
+    # Balanced class weights so a chatter-heavy log does not drown the positives.
+    sample_weight = np.where(labels > 0, n / (2.0 * positives), n / (2.0 * negatives))
+    weights = np.zeros(dim)
+    bias = 0.0
+    for _ in range(epochs):
+        z = np.bincount(rows, weights=weights[cols] * vals, minlength=n) + bias
+        prob = 1.0 / (1.0 + np.exp(-np.clip(z, -30.0, 30.0)))
+        error = (prob - labels) * sample_weight / n
+        weights -= lr * (np.bincount(cols, weights=error[rows] * vals, minlength=dim) + l2 * weights)
+        bias -= lr * float(error.sum())
+    return weights, bias
+
+
+def _holdout(text: str) -> bool:
+    return zlib.crc32(_normalize(text).encode("utf-8")) % 5 == 0
+
+
+def calibrate_threshold(scores: Sequence[float], labels: Sequence[bool], max_false: float) -> float:
+    """Largest threshold that ignores at most ``max_false`` of the positives."""
+    positives = sorted(score for score, label in zip(scores, labels) if label)
+    if not positives:
+        return 0.0
+    allowed = int(math.floor(max_false * len(positives)))
+    # Ignoring means score < threshold, so the threshold is the (allowed+1)-th lowest positive.
+    return float(positives[allowed]) if allowed < len(positives) else 1.0
+
+
+def train_classifier(examples: Sequence[Tuple[str, bool]], *, max_false: Optional[float] = None,
+                     epochs: int = 300, lr: float = 2.0, l2: float = 1e-4,
+                     dim: int = FEATURE_DIM) -> NgramClassifier:
+    """Fit on ~80% of the logged decisions and calibrate on the rest."""
+    max_false = max_false_ignore() if max_false is None else max_false
+    train = [(text, label) for text, label in examples if not _holdout(text)]
+    held = [(text, label) for text, label in examples if _holdout(text)]
+    if not held or not any(label for _text, label in held):
+        held = list(examples)
+    labels = np.array([1.0 if label else 0.0 for _text, label in train])
+    weights, bias = _fit([text for text, _label in train], labels, dim, epochs, lr, l2)
+    model = NgramClassifier(weights=weights, bias=bias, threshold=0.0)
+    scores = [model.predict_proba(text) for text, _label in held]
+    held_labels = [bool(label) for _text, label in held]
+    model.threshold = calibrate_threshold(scores, held_labels, max_false)
+    ignored = [score < model.threshold for score in scores]
+    model.metrics = {
+        "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "train_examples": len(train),
+        "holdout_examples": len(held),
+        "max_false_ignore": max_false,
+        "holdout_ignore_rate": round(sum(ignored) / len(held), 3) if held else 0.0,
+        "holdout_false_ignores": sum(1 for flag, label in zip(ignored, held_labels) if flag and label),
+    }
+    return model
+
+
+def load_classifier() -> Optional[NgramClassifier]:
+    """The trained model at INTENT_CASCADE_MODEL_PATH, reloaded when the file changes."""
+    path = model_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _model_lock:
+        if _model_cache["path"] == path and _model_cache["mtime"] == mtime:
+            return _model_cache["model"]
+        try:
+            model = NgramClassifier.load(path)
+        except Exception as exc:
+            secure_log("WARNING", f"Intent cascade model load failed: {type(exc).__name__}")
+            model = None
+        _model_cache.update(path=path, mtime=mtime, model=model)
+        return model
+
+
+def rule_reason(text: str, *, is_casual_mention: bool = False) -> str:
+    """Why the rules ignore ``text`` outright, or ""."""
+    normalized = _normalize(text)
+    if is_casual_mention:
+        return "casual_bot_mention"
+    tokens = re.findall(r"[a-z]+", normalized)
+    if tokens and all(_CHITCHAT_ONLY_RE.match(token) for token in tokens) and not re.search(r"\d", normalized):
+        return "chitchat_only"
+    if normalized.startswith("/") or _QUESTION_RE.search(normalized) or _SIGNAL_RE.search(normalized):
+        return ""
+    return "no_finance_signal"
+
+
+def decide(text: str, *, has_media: bool, has_amount: bool, is_ambient: bool,
+           is_saldo: bool = False, is_casual_mention: bool = False,
+           classifier: Optional[NgramClassifier] = None) -> CascadeDecision:
+    """Cascade decision for one message; ``stage`` is where it was settled."""
+    if not is_ambient or has_media or has_amount or is_saldo or not (text or "").strip():
+        decision = CascadeDecision(stage="llm", ignore=False, reason=NOT_AMBIENT_REASON)
+        if cascade_mode() == "off":
+            return decision
+    elif cascade_mode() == "off":
+        return CascadeDecision(stage="llm", ignore=False, reason="off")
+    else:
+        reason = rule_reason(text, is_casual_mention=is_casual_mention)
+        if reason:
+            decision = CascadeDecision(stage="rules", ignore=True, reason=reason)
+        else:
+            model = classifier if classifier is not None else load_classifier()
+            if model is None:
+                decision = CascadeDecision(stage="llm", ignore=False, reason="no_model")
+            else:
+                score = model.predict_proba(text)
+                if score < model.threshold:
+                    decision = CascadeDecision(stage="classifier", ignore=True, reason="below_threshold", score=score)
+                else:
+                    decision = CascadeDecision(stage="llm", ignore=False, reason="uncertain", score=score)
+    _record_decision(decision)
+    return decision
+
+
+def _bump(name: str, amount: int = 1) -> None:
+    _stats[name] = _stats.get(name, 0) + amount
+
+
+def _record_decision(decision: CascadeDecision) -> None:
+    with _stats_lock:
+        _bump("messages")
+        if decision.ignore:
+            _bump(f"{decision.stage}_ignored")
+        if not decision.skip_llm:
+            _bump("llm_calls")
+
+
+def record_llm_outcome(decision: CascadeDecision, text: str, result: Dict[str, Any]) -> None:
+    """Log the LLM's label and, in shadow mode, score the cascade against it.
+
+    Only ambient chatter is logged: direct, addressed, amount and media messages
+    never reach the rules or the classifier, and as easy positives they would
+    make the calibrated false-ignore rate look better than it is.
+    """
+    responded = bool(result.get("should_respond"))
+    if decision.ignore:
+        with _stats_lock:
+            _bump("shadow_compared")
+            if responded:
+                _bump("shadow_false_ignores")
+                per_stage = _stats.setdefault("shadow_false_ignores_by_stage", {})
+                per_stage[decision.stage] = per_stage.get(decision.stage, 0) + 1
+    if decision.ambient and truthy(os.getenv("INTENT_CASCADE_LOG_DECISIONS", "true")):
+        from agent_core.audit_log import log_event
+
+        log_event("intent_decision", {
+            "text": (text or "")[:MAX_LOGGED_TEXT],
+            "should_respond": responded,
+            "intent": result.get("intent"),
+            "cascade_stage": decision.stage,
+            "cascade_reason": decision.reason,
+            "cascade_score": None if decision.score is None else round(decision.score, 4),
+        })
+
+
+def load_logged_decisions(paths: Iterable[str]) -> List[Tuple[str, bool]]:
+    """(text, should_respond) labels of ambient chatter from ``intent_decision`` audit events.
+
+    Events without ``cascade_reason`` predate the ambient-only logging and may
+    be any message, so they are skipped along with non-ambient ones.
+    """
+    examples: List[Tuple[str, bool]] = []
+    for path in paths:
+        try:
+            handle = open(path, "r", encoding="utf-8")
+        except OSError:
+            continue
+        with handle:
+            for line in handle:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get("event_type") != "intent_decision":
+                    continue
+                payload = event.get("payload") or {}
+                if payload.get("cascade_reason") in (None, NOT_AMBIENT_REASON):
+                    continue
+                text = str(payload.get("text") or "").strip()
+                if text:
+                    examples.append((text, bool(payload.get("should_respond"))))
+    return examples
+
+
+def shadow_report(examples: Sequence[Tuple[str, bool]],
+                  classifier: Optional[NgramClassifier] = None) -> Dict[str, Any]:
+    """Replay labelled ambient messages through rules + classifier.
+
+    ``load_logged_decisions`` keeps only ambient chatter without amount or
+    media, which is the only traffic the cascade can skip.
+    """
+    counts = {"rules": 0, "classifier": 0}
+    false_ignores = {"rules": 0, "classifier": 0}
+    positives = sum(1 for _text, label in examples if label)
+    for text, label in examples:
+        stage = ""
+        if rule_reason(text):
+            stage = "rules"
+        elif classifier is not None and classifier.predict_proba(text) < classifier.threshold:
+            stage = "classifier"
+        if stage:
+            counts[stage] += 1
+            if label:
+                false_ignores[stage] += 1
+    total = len(examples)
+    skipped = counts["rules"] + counts["classifier"]
+    return {
+        "messages": total,
+        "respond_labels": positives,
+        "ignored_by_stage": counts,
+        "false_ignores_by_stage": false_ignores,
+        "false_ignore_rate": round(sum(false_ignores.values()) / positives, 4) if positives else 0.0,
+        "llm_calls_per_1000": round(1000.0 * (total - skipped) / total, 1) if total else 0.0,
+        "threshold": classifier.threshold if classifier is not None else None,
+    }
+
+
+def intent_cascade_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = {key: dict(value) if isinstance(value, dict) else value for key, value in _stats.items()}
+    for name in ("messages", "llm_calls", "rules_ignored", "classifier_ignored"):
+        stats.setdefault(name, 0)
+    messages = stats["messages"]
+    compared = stats.get("shadow_compared", 0)
+    stats["mode"] = cascade_mode()
+    stats["model_loaded"] = load_classifier() is not None
+    stats["llm_calls_per_1000"] = round(1000.0 * stats["llm_calls"] / messages, 1) if messages else 0.0
+    stats["shadow_false_ignore_rate"] = round(stats.get("shadow_false_ignores", 0) / compared, 3) if compared else 0.0
+    return stats
+
+
+def reset_intent_cascade_for_tests() -> None:
+    with _stats_lock:
+        _stats.clear()
+    with _model_lock:
+        _model_cache.update(path=None, mtime=None, model=None)
@@ -0,0 +1,73 @@
+"""Thread pools bounded per Groq key, shared by the OCR page and audio chunk fan-out.
+
+Each fan-out keeps one ``KeyBoundedPool`` per process, so concurrent batches
+share a single bound of ``<PREFIX>_PER_KEY_CONCURRENCY`` requests per Groq key,
+capped at ``<PREFIX>_MAX_CONCURRENCY``. The pool follows the concurrency its
+callers ask for: when the key count or a knob changes, the next batch gets a
+pool of the new size instead of the size of whichever batch came first.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from utils.env import env_int
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class KeyBoundedPool:
+    """One lazily created thread pool sized from the Groq key count."""
+
+    def __init__(self, prefix: str, per_key: int, ceiling: int, thread_name_prefix: str):
+        self._prefix = prefix  # env prefix, e.g. "OCR_BATCH"
+        self._per_key = per_key
+        self._ceiling = ceiling
+        self._thread_name_prefix = thread_name_prefix
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._size = 0
+
+    def concurrency(self, key_count: int) -> int:
+        """Concurrent requests: ``<PREFIX>_PER_KEY_CONCURRENCY`` per key, at most the ceiling."""
+        per_key = env_int(f"{self._prefix}_PER_KEY_CONCURRENCY", self._per_key, minimum=1)
+        ceiling = env_int(f"{self._prefix}_MAX_CONCURRENCY", self._ceiling, minimum=1)
+        return max(1, min(ceiling, per_key * max(1, key_count)))
+
+    def _get_executor(self, concurrency: int) -> ThreadPoolExecutor:
+        size = max(1, concurrency)
+        with self._lock:
+            if self._executor is None or self._size != size:
+                # Work already queued on a replaced pool still finishes there.
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=self._thread_name_prefix)
+                self._size = size
+            return self._executor
+
+    def run(self, fn: Callable[[int, T], R], items: Sequence[T], concurrency: int) -> List[R]:
+        """``fn(index, item)`` for every item, results in order; a single item runs inline.
+
+        The first exception raised by ``fn`` (in item order) propagates.
+        """
+        if len(items) <= 1:
+            return [fn(index, item) for index, item in enumerate(items)]
+        executor = self._get_executor(concurrency)
+        futures = [executor.submit(fn, index, item) for index, item in enumerate(items)]
+        return [future.result() for future in futures]
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return self._size if self._executor is not None else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._size = 0
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,247 @@
+"""Process-wide ledger indexes, kept current by sheets_helper writes.
+
+The time index (windowed totals), the text index (descriptor search) and the
+amount ranking (largest/smallest transactions) are built together from one
+``get_all_data(None)`` read and then updated in place
+by the same write paths that mirror rows to Postgres (append, amount revision,
+row delete). A rebuild after LEDGER_INDEX_MAX_AGE_SECONDS picks up writes made
+by other replicas or directly in Sheets, the same staleness bound the Sheets
+read cache already accepts.
+
+Not served from here yet (follow-up): ``get_summary`` needs kategori/oleh
+breakdowns and the internal-transfer exclusion, ``get_wallet_balances`` reads
+whole dompet sheets including hutang and operational source-wallet debits, and
+``pdf_report._build_context_range`` already makes a single pass through
+``_ReportCube``. None of those fit the (dompet, company, project, tipe) series.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent_core.text_index import TextIndex
+from agent_core.time_index import TimeIndex
+from agent_core.topk import RankedRows
+from security import log_timing, secure_log
+from utils.env import env_int, truthy
+
+
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+_Indexes = Tuple[TimeIndex, TextIndex, RankedRows]
+_indexes_built: Optional[_Indexes] = None
+_built_at = 0.0
+# Bumped by every write hook, so a build that raced a write is not installed.
+_generation = 0
+_stats: Dict[str, int] = {"builds": 0, "discarded_builds": 0, "incremental_updates": 0, "hook_errors": 0,
+                         "searches": 0, "postgres_searches": 0, "rankings": 0}
+
+
+def ledger_index_enabled() -> bool:
+    return truthy(os.getenv("LEDGER_INDEX_ENABLED", "true"))
+
+
+def _max_age() -> int:
+    return env_int("LEDGER_INDEX_MAX_AGE_SECONDS", 300, minimum=1)
+
+
+def window_start(days: Optional[int]) -> Optional[int]:
+    """First day ordinal that ``get_all_data(days)`` returns (rows have no time)."""
+    if days is None:
+        return None
+    return date.today().toordinal() - int(days) + 1
+
+
+def _indexes() -> Optional[_Indexes]:
+    """The current indexes, (re)built from the ledger when missing or expired."""
+    if not ledger_index_enabled():
+        return None
+    current = _fresh_indexes()
+    if current is not None:
+        return current
+    with _build_lock:
+        current = _fresh_indexes()
+        if current is not None:
+            return current
+        with _lock:
+            generation = _generation
+
+        from sheets_helper import get_all_data
+
+        started_at = time.perf_counter()
+        rows = get_all_data(None) or []
+        built = (TimeIndex.from_rows(rows), TextIndex.from_rows(rows), RankedRows.from_rows(rows))
+        log_timing("ledger_index.build", started_at, rows=len(built[0]))
+        _install(built, generation)
+        return built
+
+
+def get_time_index() -> Optional[TimeIndex]:
+    built = _indexes()
+    return built[0] if built else None
+
+
+def get_text_index() -> Optional[TextIndex]:
+    built = _indexes()
+    return built[1] if built else None
+
+
+def get_ranked_rows() -> Optional[RankedRows]:
+    built = _indexes()
+    return built[2] if built else None
+
+
+def _fresh_indexes() -> Optional[_Indexes]:
+    with _lock:
+        if _indexes_built is not None and time.time() - _built_at <= _max_age():
+            return _indexes_built
+    return None
+
+
+def _install(built: _Indexes, generation: int) -> None:
+    global _indexes_built, _built_at
+    with _lock:
+        if generation != _generation:
+            _stats["discarded_builds"] += 1
+            return
+        _indexes_built = built
+        _built_at = time.time()
+        _stats["builds"] += 1
+
+
+def _update(apply) -> None:
+    global _generation
+    try:
+        with _lock:
+            _generation += 1
+            if _indexes_built is not None:
+                for index in _indexes_built:
+                    apply(index)
+                _stats["incremental_updates"] += 1
+    except Exception as exc:
+        invalidate_ledger_index()
+        with _lock:
+            _stats["hook_errors"] += 1
+        secure_log("WARNING", f"Ledger index update failed; index dropped: {type(exc).__name__}")
+
+
+def record_row(row: Dict[str, Any]) -> None:
+    """Index a row that was just appended to Sheets."""
+    _update(lambda index: index.add(row))
+
+
+def record_amount(sheet: str, sheet_row: int, block: str, amount: int) -> None:
+    _update(lambda index: index.set_amount(sheet, sheet_row, block, amount))
+
+
+def record_delete(sheet: str, sheet_row: int, block: Optional[str] = None) -> None:
+    _update(lambda index: index.remove(sheet, sheet_row, block))
+
+
+def invalidate_ledger_index() -> None:
+    global _indexes_built, _generation
+    with _lock:
+        _indexes_built = None
+        _generation += 1
+
+
+def window_totals(dimension: str, days: Optional[int], **filters: Optional[str]) -> Optional[Dict[str, Tuple[int, int]]]:
+    """``{value: (amount, count)}`` over the get_all_data(days) window, or None when disabled."""
+    index = get_time_index()
+    if index is None:
+        return None
+    with _lock:
+        # Write hooks mutate series under the same lock.
+        return index.breakdown(dimension, window_start(days), None, **filters)
+
+
+def search_rows(
+    tokens: List[str],
+    days: Optional[int],
+    *,
+    match_all: bool = True,
+    prefix: bool = False,
+) -> Optional[List[Dict[str, Any]]]:
+    """Rows in the get_all_data(days) window whose text contains the tokens.
+
+    Newest first. None means the indexes are disabled and the caller should
+    scan rows itself. With LEDGER_SEARCH_BACKEND=postgres the search runs on
+    the ledger table's full-text index first (word-prefix matching only); an
+    empty hit there falls through, since a not-yet-imported table is not
+    authoritative and the substring index may still match.
+    """
+    if _search_backend() == "postgres":
+        from services.ledger_store import search_transactions
+
+        found = search_transactions(tokens, days, match_all=match_all)
+        if found:
+            with _lock:
+                _stats["postgres_searches"] += 1
+            return found
+    index = get_text_index()
+    if index is None:
+        return None
+    with _lock:
+        _stats["searches"] += 1
+        rows = index.search(tokens, match_all=match_all, prefix=prefix, start=window_start(days))
+        return [dict(row) for row in rows]
+
+
+def ranked_rows(
+    k: int,
+    days: Optional[int],
+    *,
+    tipe: Optional[str] = None,
+    largest: bool = True,
+) -> Optional[List[Dict[str, Any]]]:
+    """The k largest (or smallest) rows in the get_all_data(days) window, or None when disabled."""
+    index = get_ranked_rows()
+    if index is None:
+        return None
+    with _lock:
+        _stats["rankings"] += 1
+        return [dict(row) for row in index.top(k, start=window_start(days), tipe=tipe, largest=largest)]
+
+
+def rows_for_identities(identities: List[Tuple[str, int, str]]) -> Optional[List[Dict[str, Any]]]:
+    """Current rows for saved (sheet, row, block) identities, or None if unavailable."""
+    index = get_text_index()
+    if index is None:
+        return None
+    with _lock:
+        rows = index.rows_for(identities)
+        return [dict(row) for row in rows] if rows is not None else None
+
+
+def window_row_count(days: Optional[int]) -> Optional[int]:
+    index = get_text_index()
+    if index is None:
+        return None
+    with _lock:
+        return index.count_since(window_start(days))
+
+
+def _search_backend() -> str:
+    return os.getenv("LEDGER_SEARCH_BACKEND", "memory").strip().lower()
+
+
+def ledger_index_stats() -> Dict[str, Any]:
+    with _lock:
+        stats: Dict[str, Any] = dict(_stats)
+        stats["rows"] = len(_indexes_built[0]) if _indexes_built is not None else 0
+        stats["age_seconds"] = round(time.time() - _built_at, 1) if _indexes_built is not None else None
+    return stats
+
+
+def reset_ledger_index_for_tests() -> None:
+    global _indexes_built, _built_at, _generation
+    with _lock:
+        _indexes_built = None
+        _built_at = 0.0
+        _generation = 0
+        for name in _stats:
+            _stats[name] = 0
@@ -22,6 +22,19 @@ from utils.parsers import parse_revision_amount
 
 _INIT_LOCK = threading.Lock()
 _INITIALIZED_DSN: Optional[str] = None
+# Shared by the GIN index and search queries so the planner can use the index.
+_SEARCH_VECTOR = "to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(project, ''))"
+# Spelled out rather than formatted from _SEARCH_VECTOR so no SQL is built at
+# call time; the two expressions must stay identical (tests check it).
+_SEARCH_QUERY = """
+    SELECT transaction_date, description, amount, transaction_type, recorded_by,
+           category, company, project, source_sheet, source_row
+    FROM financial_ledger
+    WHERE is_valid
+      AND (%s <= 0 OR transaction_date >= CURRENT_DATE - %s)
+      AND to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(project, '')) @@ to_tsquery('simple', %s)
+    ORDER BY transaction_date DESC, id DESC
+"""
 
 
 def _database_url() -> str:
@@ -190,6 +203,9 @@ def _ensure_table() -> bool:
                 cur.execute(
                     "CREATE INDEX IF NOT EXISTS idx_financial_ledger_message ON financial_ledger (message_id) WHERE message_id IS NOT NULL"
                 )
+                cur.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_financial_ledger_search ON financial_ledger USING GIN ({_SEARCH_VECTOR})"
+                )
                 cur.execute(
                     """
                     CREATE TABLE IF NOT EXISTS financial_ledger_import_runs (
@@ -453,26 +469,49 @@ def read_recent_transactions(days: int) -> Optional[List[Dict[str, Any]]]:
         # change from hiding the existing Sheets ledger before the first import.
         if not rows:
             return None
-        return [
-            {
-                "tanggal": value[0].isoformat() if value[0] else "",
-                "keterangan": value[1] or "",
-                "jumlah": int(value[2] or 0),
-                "tipe": value[3] or "Pengeluaran",
-                "oleh": value[4] or "",
-                "kategori": value[5] or "Lain-lain",
-                "company_sheet": value[6] or "",
-                "nama_projek": value[7] or "",
-                "sheet_name": value[8] or "",
-                "sheet_row": value[9],
-            }
-            for value in rows
-        ]
+        return [_transaction_from_record(value) for value in rows]
     except Exception as exc:
         secure_log("ERROR", f"Financial ledger read failed; falling back to Sheets: {type(exc).__name__}: {exc}")
         return None
 
 
+def _transaction_from_record(value) -> Dict[str, Any]:
+    return {
+        "tanggal": value[0].isoformat() if value[0] else "",
+        "keterangan": value[1] or "",
+        "jumlah": int(value[2] or 0),
+        "tipe": value[3] or "Pengeluaran",
+        "oleh": value[4] or "",
+        "kategori": value[5] or "Lain-lain",
+        "company_sheet": value[6] or "",
+        "nama_projek": value[7] or "",
+        "sheet_name": value[8] or "",
+        "sheet_row": value[9],
+    }
+
+
+def search_transactions(tokens: List[str], days: Optional[int], match_all: bool = True) -> Optional[List[Dict[str, Any]]]:
+    """Full-text search over description/project via the GIN index, newest first.
+
+    Tokens match as word prefixes (tsquery ``tok:*``), not arbitrary
+    substrings. None means the read backend is off or the query failed.
+    """
+    words = [word for word in dict.fromkeys(re.findall(r"[a-z0-9]+", " ".join(tokens).casefold()))]
+    if not words or not read_backend_enabled() or not _ensure_table():
+        return None
+    query = (" & " if match_all else " | ").join(f"{word}:*" for word in words)
+    try:
+        import psycopg
+
+        with psycopg.connect(_database_url(), autocommit=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(_SEARCH_QUERY, (int(days or 0), max(0, int(days or 0)), query))
+                return [_transaction_from_record(value) for value in cur.fetchall()]
+    except Exception as exc:
+        secure_log("ERROR", f"Financial ledger search failed; using in-process index: {type(exc).__name__}: {exc}")
+        return None
+
+
 def read_project_records() -> Optional[List[Dict[str, str]]]:
     """Return the project index after a validated import, otherwise signal fallback."""
     if not read_backend_enabled() or not _ensure_table():
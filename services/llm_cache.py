@@ -0,0 +1,256 @@
+"""Deterministic LLM response cache.
+
+Identical inputs are common: "/saldo", staff message templates, and inbox
+recovery replays of an event that was already analyzed. For temperature-0
+calls the provider answer is a function of the request, so the response text
+is cached under a key built from:
+
+- the call site (extraction, finance agent, intent analyzer, ...),
+- a prompt-version fingerprint of the system messages plus LLM_CACHE_VERSION,
+- the normalized user/context messages, the model parameters and the date.
+
+Entries live in an in-process LRU with a TTL; LLM_CACHE_BACKEND=postgres adds a
+shared tier in ``llm_response_cache``. Non-deterministic calls bypass the cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from services.cache_tier import PostgresTier, TtlLru
+from services.prompt_builder import record_usage
+from utils.env import env_int, truthy
+
+
+_CACHED_PARAMS = ("model", "max_tokens", "max_completion_tokens", "response_format", "reasoning_effort", "reasoning_format")
+_INLINE_WS_RE = re.compile(r"[ \t ]+")
+
+
+class _CachedMessage:
+    def __init__(self, content: str):
+        self.content = content
+        self.role = "assistant"
+
+
+class _CachedChoice:
+    def __init__(self, content: str):
+        self.message = _CachedMessage(content)
+        self.finish_reason = "stop"
+        self.index = 0
+
+
+class CachedCompletion:
+    """Minimal stand-in for a chat completion served from the cache."""
+
+    cached = True
+
+    def __init__(self, content: str, model: str = ""):
+        self.choices = [_CachedChoice(content)]
+        self.model = model
+
+
+def llm_cache_enabled() -> bool:
+    return truthy(os.getenv("LLM_CACHE_ENABLED", "true"))
+
+
+def _ttl_seconds() -> int:
+    return env_int("LLM_CACHE_TTL_SECONDS", 6 * 3600, minimum=1)
+
+
+def _max_entries() -> int:
+    return env_int("LLM_CACHE_MAX_ENTRIES", 1024, minimum=1)
+
+
+_lock = threading.Lock()
+_entries = TtlLru(_max_entries, _ttl_seconds)
+_site_stats: Dict[str, Dict[str, int]] = {}
+_db = PostgresTier(
+    "LLM_CACHE",
+    "LLM cache",
+    """
+    CREATE TABLE IF NOT EXISTS llm_response_cache (
+        cache_key TEXT PRIMARY KEY,
+        call_site TEXT NOT NULL,
+        model TEXT,
+        content TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+)
+
+
+def normalize_message_text(text: str) -> str:
+    """Collapse inline whitespace and blank lines; keep line structure."""
+    lines = (_INLINE_WS_RE.sub(" ", line).strip() for line in str(text or "").splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _content_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, sort_keys=True, ensure_ascii=True, default=str)
+
+
+def is_deterministic_request(request: Dict[str, Any]) -> bool:
+    try:
+        return float(request.get("temperature")) == 0.0
+    except (TypeError, ValueError):
+        return False
+
+
+def prompt_fingerprint(messages: List[Dict[str, Any]]) -> str:
+    """Short hash of system messages plus LLM_CACHE_VERSION."""
+    system = "\n".join(
+        _content_text(message.get("content"))
+        for message in messages
+        if isinstance(message, dict) and message.get("role") == "system"
+    )
+    version = os.getenv("LLM_CACHE_VERSION", "1")
+    return hashlib.sha256(f"{version}\n{system}".encode("utf-8")).hexdigest()[:16]
+
+
+def build_cache_key(call_site: str, request: Dict[str, Any]) -> str:
+    messages = [m for m in (request.get("messages") or []) if isinstance(m, dict)]
+    inputs = [
+        [str(message.get("role") or ""), normalize_message_text(_content_text(message.get("content")))]
+        for message in messages
+        if message.get("role") != "system"
+    ]
+    params = {name: request.get(name) for name in _CACHED_PARAMS if request.get(name) is not None}
+    # Answers resolve relative dates ("kemarin"), so they never outlive the day.
+    day = time.strftime("%Y-%m-%d")
+    material = json.dumps(
+        {"site": call_site, "prompt": prompt_fingerprint(messages), "inputs": inputs, "params": params, "day": day},
+        sort_keys=True,
+        ensure_ascii=True,
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def json_object_response(content: str) -> bool:
+    """Validator for json_object calls: only cache parseable JSON objects."""
+    text = str(content or "").strip()
+    if text.startswith("```"):
+        text = "\n".join(text.split("\n")[1:-1])
+    try:
+        return isinstance(json.loads(text), dict)
+    except (TypeError, ValueError):
+        return False
+
+
+def _count(call_site: str, outcome: str) -> None:
+    with _lock:
+        site = _site_stats.setdefault(call_site, {"hits": 0, "db_hits": 0, "misses": 0, "bypass": 0, "stores": 0})
+        site[outcome] = site.get(outcome, 0) + 1
+
+
+def _remember(key: str, content: str, model: str) -> None:
+    with _lock:
+        _entries.put(key, {"content": content, "model": model})
+
+
+def _memory_get(key: str) -> Optional[dict]:
+    with _lock:
+        entry = _entries.get(key)
+        return dict(entry) if entry is not None else None
+
+
+def _db_get(key: str) -> Optional[dict]:
+    row = _db.fetchone(
+        """
+        SELECT content, model FROM llm_response_cache
+        WHERE cache_key = %s AND created_at > NOW() - (%s * INTERVAL '1 second')
+        """,
+        (key, _ttl_seconds()),
+    )
+    if not row:
+        return None
+    _remember(key, row[0], row[1] or "")
+    return {"content": row[0], "model": row[1] or ""}
+
+
+def _db_put(key: str, call_site: str, content: str, model: str) -> None:
+    _db.execute(
+        """
+        INSERT INTO llm_response_cache (cache_key, call_site, model, content, created_at)
+        VALUES (%s, %s, %s, %s, NOW())
+        ON CONFLICT (cache_key)
+        DO UPDATE SET content = EXCLUDED.content, model = EXCLUDED.model, created_at = NOW()
+        """,
+        (key, call_site, model, content),
+    )
+
+
+def cached_completion(
+    call_site: str,
+    create: Callable[..., Any],
+    validate: Optional[Callable[[str], bool]] = None,
+    **request: Any,
+) -> Any:
+    """Call ``create(**request)`` unless a deterministic answer is cached.
+
+    Only temperature-0 requests are cached, and only responses accepted by
+    ``validate`` (default: non-empty) are stored. Every call, cached or not,
+    is reported to ``prompt_builder.record_usage`` under ``call_site``.
+    """
+    messages = request.get("messages") or []
+    if not llm_cache_enabled() or not is_deterministic_request(request):
+        _count(call_site, "bypass")
+        response = create(**request)
+        record_usage(call_site, messages, response)
+        return response
+
+    key = build_cache_key(call_site, request)
+    entry = _memory_get(key)
+    outcome = "hits"
+    if entry is None:
+        entry = _db_get(key)
+        outcome = "db_hits"
+    if entry is not None:
+        _count(call_site, outcome)
+        record_usage(call_site, messages, cached=True)
+        return CachedCompletion(entry["content"], entry.get("model") or "")
+
+    _count(call_site, "misses")
+    response = create(**request)
+    record_usage(call_site, messages, response)
+    try:
+        content = response.choices[0].message.content
+    except (AttributeError, IndexError, TypeError):
+        return response
+    if isinstance(content, str) and content.strip() and (validate is None or validate(content)):
+        model = str(request.get("model") or "")
+        _remember(key, content, model)
+        _count(call_site, "stores")
+        _db_put(key, call_site, content, model)
+    return response
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        sites = {name: dict(counts) for name, counts in _site_stats.items()}
+        entries = len(_entries)
+    for counts in sites.values():
+        served = counts.get("hits", 0) + counts.get("db_hits", 0)
+        lookups = served + counts.get("misses", 0)
+        counts["hit_rate"] = round(served / lookups, 3) if lookups else 0.0
+    return {
+        "entries": entries,
+        "max_entries": _max_entries(),
+        "backend": "postgres" if _db.database_url() else "memory",
+        "sites": sites,
+    }
+
+
+def reset_llm_cache_for_tests() -> None:
+    with _lock:
+        _entries.clear()
+        _site_stats.clear()
+    _db.reset_for_tests()
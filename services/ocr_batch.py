@@ -0,0 +1,151 @@
+"""Page-level fan-out for multi-image OCR.
+
+A forwarded 6-page bank mutation used to go to the vision model as one large
+request, so latency grew with the page count. ``run_pages`` OCRs each page as
+its own request on a ``KeyBoundedPool`` (sized from the number of Groq keys), and
+``merge_page_texts`` stitches the results back together in page order:
+
+- statement tables are merged into one table with renumbered rows, dropping
+  the rows at the top of a page that repeat the bottom of the previous page
+  because consecutive screenshots overlap;
+- other pages are joined, skipping pages whose text repeats an earlier page.
+
+A page that fails on every model fails the whole batch (``OcrPagesFailed``):
+a statement with a missing page would silently drop its rows.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from typing import Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from security import log_timing, secure_log
+from services.key_pool import KeyBoundedPool
+from utils.env import truthy
+
+
+T = TypeVar("T")
+
+_ROW_RE = re.compile(r"^\s*row\s*\d+\s*[|:.\-]\s*(?P<body>.+)$", re.IGNORECASE)
+_DOCTYPE_RE = re.compile(r"^\s*document\s*type\s*:\s*(?P<mode>\w+)\s*$", re.IGNORECASE)
+_REF_RE = re.compile(r"\bref(?:erence)?\s*:\s*(?P<ref>[A-Za-z0-9/\-]{6,})", re.IGNORECASE)
+
+
+class OcrPagesFailed(ValueError):
+    """Some pages of a multi-image OCR batch could not be read."""
+
+    def __init__(self, pages: Sequence[int]):
+        self.pages = list(pages)  # 1-based page numbers
+        super().__init__(f"Halaman {', '.join(map(str, self.pages))} gagal dibaca")
+
+
+# One pool per process, so concurrent batches share the per-key bound.
+_pool = KeyBoundedPool("OCR_BATCH", per_key=2, ceiling=8, thread_name_prefix="ocr-page")
+
+
+def batch_enabled() -> bool:
+    return truthy(os.getenv("OCR_BATCH_ENABLED", "true"))
+
+
+def batch_concurrency(key_count: int) -> int:
+    """Concurrent page requests: OCR_BATCH_PER_KEY_CONCURRENCY per Groq key."""
+    return _pool.concurrency(key_count)
+
+
+def run_pages(pages: Sequence[T], ocr_page: Callable[[int, T], str], concurrency: int) -> List[str]:
+    """Run ``ocr_page(index, page)`` for every page on the shared page pool.
+
+    The shared pool is sized from ``concurrency``. Results come back
+    in page order. Every page runs even if one fails (so the good pages can be
+    cached for a resend); then ``OcrPagesFailed`` names the pages that raised.
+    """
+
+    def _run(index: int, page: T) -> Optional[str]:
+        try:
+            return ocr_page(index, page) or ""
+        except Exception as exc:
+            secure_log("WARNING", f"OCR page {index + 1} failed: {type(exc).__name__}")
+            return None
+
+    results = _pool.run(_run, pages, concurrency)
+    failed = [index + 1 for index, text in enumerate(results) if text is None]
+    if failed:
+        raise OcrPagesFailed(failed)
+    return [text or "" for text in results]
+
+
+def reset_page_pool_for_tests() -> None:
+    _pool.reset()
+
+
+def _row_key(body: str) -> Tuple[str, str]:
+    ref = _REF_RE.search(body)
+    if ref:
+        return ("ref", ref.group("ref").upper())
+    return ("row", re.sub(r"\s+", " ", body).strip().casefold())
+
+
+def _split_page(text: str) -> Tuple[str, List[str], List[str]]:
+    mode = ""
+    other: List[str] = []
+    rows: List[str] = []
+    for line in (text or "").splitlines():
+        doctype = _DOCTYPE_RE.match(line)
+        if doctype:
+            mode = doctype.group("mode").upper()
+            continue
+        row = _ROW_RE.match(line)
+        if row:
+            rows.append(row.group("body").strip())
+        elif line.strip():
+            other.append(line.strip())
+    return mode, other, rows
+
+
+def _overlap_length(previous: List[Tuple[str, str]], current: List[Tuple[str, str]]) -> int:
+    """Length of the longest run at the top of ``current`` that repeats the bottom of ``previous``."""
+    for size in range(min(len(previous), len(current)), 0, -1):
+        if previous[-size:] == current[:size]:
+            return size
+    return 0
+
+
+def merge_page_texts(texts: Sequence[str]) -> str:
+    """Merge per-page OCR text in page order (see module docstring)."""
+    pages = [text.strip() for text in texts if text and text.strip()]
+    if len(pages) <= 1:
+        return pages[0] if pages else ""
+
+    started_at = time.perf_counter()
+    split = [_split_page(text) for text in pages]
+    if all(mode == "STATEMENT_TABLE" for mode, _other, _rows in split):
+        header: List[str] = []
+        merged_rows: List[str] = []
+        overlap_dropped = 0
+        previous_keys: List[Tuple[str, str]] = []
+        for _mode, other, rows in split:
+            for line in other:
+                if line not in header:
+                    header.append(line)
+            page_keys = [_row_key(body) for body in rows]
+            overlap = _overlap_length(previous_keys, page_keys)
+            overlap_dropped += overlap
+            merged_rows.extend(rows[overlap:])
+            previous_keys = page_keys
+        lines = ["DocumentType: STATEMENT_TABLE", *header]
+        lines.extend(f"Row {index} | {body}" for index, body in enumerate(merged_rows, start=1))
+        log_timing("ocr.batch_merge", started_at, pages=len(pages), rows=len(merged_rows), overlap_dropped=overlap_dropped)
+        return "\n".join(lines)
+
+    seen = set()
+    unique_pages = []
+    for text in pages:
+        key = re.sub(r"\s+", " ", text).casefold()
+        if key in seen:
+            continue
+        seen.add(key)
+        unique_pages.append(text)
+    log_timing("ocr.batch_merge", started_at, pages=len(pages), kept_pages=len(unique_pages))
+    return "\n\n".join(unique_pages)
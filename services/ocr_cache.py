@@ -0,0 +1,180 @@
+"""Content-addressed cache for vision OCR results.
+
+Receipt screenshots are often resent, forwarded to another group or replayed by
+inbox recovery. Every image is keyed by its exact SHA-256, and only an exact
+hit is served: receipts from one banking app that differ only in the amount
+get the same perceptual hash, so a fuzzy match would return another receipt's
+amount. Entries live in a bounded in-process LRU with a TTL. With
+OCR_CACHE_BACKEND=postgres the same entries are shared across replicas
+through the ``ocr_cache`` table.
+
+The cache must never break OCR: every failure degrades to a miss.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Dict, NamedTuple, Optional, Sequence
+
+from security import secure_log
+from services.cache_tier import PostgresTier, TtlLru
+from utils.env import env_int, truthy
+
+
+class OcrCacheKey(NamedTuple):
+    content_hash: str
+
+
+def ocr_cache_enabled() -> bool:
+    return truthy(os.getenv("OCR_CACHE_ENABLED", "true"))
+
+
+def _ttl_seconds() -> int:
+    return env_int("OCR_CACHE_TTL_SECONDS", 7 * 86400, minimum=60)
+
+
+def _max_entries() -> int:
+    return env_int("OCR_CACHE_MAX_ENTRIES", 512, minimum=1)
+
+
+_lock = threading.Lock()
+_entries = TtlLru(_max_entries, _ttl_seconds)
+_stats: Dict[str, int] = {"hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+_db = PostgresTier(
+    "OCR_CACHE",
+    "OCR cache",
+    """
+    CREATE TABLE IF NOT EXISTS ocr_cache (
+        content_hash TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        ocr_text TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+)
+
+
+def image_fingerprint(image_bytes: bytes) -> OcrCacheKey:
+    """Return the SHA-256 key of one encoded image."""
+    return OcrCacheKey(hashlib.sha256(image_bytes).hexdigest())
+
+
+def build_key(fingerprints: Sequence[OcrCacheKey], namespace: str = "") -> Optional[OcrCacheKey]:
+    """Combine per-image fingerprints of one OCR request into a cache key.
+
+    ``namespace`` should change whenever the prompt or output contract changes
+    so stale transcriptions are never reused.
+    """
+    if not fingerprints:
+        return None
+    ns = hashlib.sha256(namespace.encode("utf-8")).hexdigest()[:12]
+    content = hashlib.sha256(
+        (ns + "|" + "|".join(fp.content_hash for fp in fingerprints)).encode("utf-8")
+    ).hexdigest()
+    return OcrCacheKey(content)
+
+
+def key_for_image_bytes(images: Sequence[bytes], namespace: str = "") -> Optional[OcrCacheKey]:
+    """Fingerprint already-loaded images in request order; None when off."""
+    if not ocr_cache_enabled() or not images:
+        return None
+    return build_key([image_fingerprint(data) for data in images], namespace)
+
+
+def key_for_images(paths: Sequence[str], namespace: str = "") -> Optional[OcrCacheKey]:
+    """Fingerprint image files in request order; None when caching is off."""
+    if not ocr_cache_enabled() or not paths:
+        return None
+    try:
+        images = []
+        for path in paths:
+            with open(path, "rb") as handle:
+                images.append(handle.read())
+    except OSError as exc:
+        secure_log("WARNING", f"OCR cache fingerprint failed: {type(exc).__name__}")
+        return None
+    return key_for_image_bytes(images, namespace)
+
+
+def _remember(key: OcrCacheKey, model: str, text: str) -> None:
+    with _lock:
+        _stats["evictions"] += _entries.put(key.content_hash, {"model": model, "text": text})
+
+
+def _memory_lookup(key: OcrCacheKey) -> Optional[dict]:
+    with _lock:
+        entry = _entries.get(key.content_hash)
+        if entry is None:
+            return None
+        _stats["hits"] += 1
+    return {"model": entry["model"], "text": entry["text"], "match": "exact"}
+
+
+def _db_lookup(key: OcrCacheKey) -> Optional[dict]:
+    row = _db.fetchone(
+        """
+        SELECT model, ocr_text FROM ocr_cache
+        WHERE content_hash = %s AND created_at > NOW() - (%s * INTERVAL '1 second')
+        """,
+        (key.content_hash, _ttl_seconds()),
+    )
+    if not row:
+        return None
+    model, text = row
+    _remember(key, model, text)
+    with _lock:
+        _stats["db_hits"] += 1
+    return {"model": model, "text": text, "match": "exact"}
+
+
+def _db_store(key: OcrCacheKey, model: str, text: str) -> None:
+    _db.execute(
+        """
+        INSERT INTO ocr_cache (content_hash, model, ocr_text, created_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (content_hash)
+        DO UPDATE SET model = EXCLUDED.model, ocr_text = EXCLUDED.ocr_text, created_at = NOW()
+        """,
+        (key.content_hash, model, text),
+        prune=("DELETE FROM ocr_cache WHERE created_at < NOW() - (%s * INTERVAL '1 second')", (_ttl_seconds(),)),
+    )
+
+
+def lookup(key: Optional[OcrCacheKey]) -> Optional[dict]:
+    """Return ``{"model", "text", "match"}`` for a cached OCR result."""
+    if key is None:
+        return None
+    hit = _memory_lookup(key) or _db_lookup(key)
+    if hit is None:
+        with _lock:
+            _stats["misses"] += 1
+    return hit
+
+
+def store(key: Optional[OcrCacheKey], model: str, text: str) -> None:
+    """Remember a successful OCR result. Empty text is never cached."""
+    if key is None or not str(text or "").strip():
+        return
+    _remember(key, model, text)
+    with _lock:
+        _stats["stores"] += 1
+    _db_store(key, model, text)
+
+
+def ocr_cache_stats() -> Dict[str, int]:
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    stats["max_entries"] = _max_entries()
+    stats["backend"] = "postgres" if _db.database_url() else "memory"
+    return stats
+
+
+def reset_ocr_cache_for_tests() -> None:
+    with _lock:
+        _entries.clear()
+        for name in _stats:
+            _stats[name] = 0
+    _db.reset_for_tests()
@@ -0,0 +1,182 @@
+"""Prompt assembly with per-section token budgets and usage accounting.
+
+Dynamic prompt context (known projects, chat history, ledger evidence) grows
+with the data, and with it LLM latency and rate-limit spend. Call sites pass
+each dynamic section through ``fit_section`` so it stays within a token budget,
+keep their static system prompts as module constants (byte-identical between
+calls, so provider-side prefix caching applies), and report every call through
+``record_usage``, which logs tokens in/out per call site.
+
+Token counts are a local estimate: word pieces of ~4 characters plus one token
+per punctuation mark, which tracks BPE tokenizers closely enough for budgeting.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from security import secure_log
+
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+_stats_lock = threading.Lock()
+_site_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def estimate_tokens(text: Any) -> int:
+    """Approximate token count of ``text`` (non-strings are JSON-encoded)."""
+    if not isinstance(text, str):
+        text = json.dumps(text, ensure_ascii=False, default=str)
+    total = 0
+    for piece in _TOKEN_RE.findall(text):
+        total += (len(piece) + 3) // 4 if piece[0].isalnum() or piece[0] == "_" else 1
+    return total
+
+
+def estimate_messages_tokens(messages: Iterable[Dict[str, Any]]) -> int:
+    """Estimate for a chat request, including ~4 tokens of per-message framing."""
+    total = 0
+    for message in messages or ():
+        if isinstance(message, dict):
+            total += 4 + estimate_tokens(message.get("content") or "")
+    return total
+
+
+def section_budget(section: str, default: int) -> int:
+    """Token budget for ``section``, overridable via PROMPT_BUDGET_<SECTION>_TOKENS."""
+    name = f"PROMPT_BUDGET_{re.sub(r'[^A-Za-z0-9]+', '_', section).upper()}_TOKENS"
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+def _fit_text(text: str, budget: int, keep: str) -> str:
+    lines = text.splitlines()
+    if keep == "tail":
+        lines = list(reversed(lines))
+    kept: List[str] = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    if not kept and lines:
+        # A single oversized line: cut by characters at ~4 chars per token.
+        line = lines[0]
+        kept = [line[-budget * 4:] if keep == "tail" else line[:budget * 4]]
+    if keep == "tail":
+        kept.reverse()
+    return "\n".join(kept)
+
+
+def _fit_items(items: List[Any], budget: int) -> List[Any]:
+    kept: List[Any] = []
+    used = 2
+    for item in items:
+        cost = estimate_tokens(item) + 1
+        if used + cost > budget:
+            break
+        kept.append(item)
+        used += cost
+    return kept
+
+
+def fit_section(call_site: str, section: str, value: Any, default_budget: int, keep: str = "head") -> Any:
+    """Trim ``value`` to the section's token budget.
+
+    Strings are cut on line boundaries (``keep="tail"`` keeps the most recent
+    lines, for chat history); lists keep their leading items, so callers
+    should order them by priority. Other values pass through unchanged.
+    """
+    budget = section_budget(section, default_budget)
+    if isinstance(value, str):
+        if estimate_tokens(value) <= budget:
+            return value
+        fitted: Any = _fit_text(value, budget, keep)
+    elif isinstance(value, list):
+        if estimate_tokens(value) <= budget:
+            return value
+        fitted = _fit_items(value, budget)
+    else:
+        return value
+    with _stats_lock:
+        site = _site(call_site)
+        site["truncations"][section] = site["truncations"].get(section, 0) + 1
+    return fitted
+
+
+def _site(call_site: str) -> Dict[str, Any]:
+    site = _site_stats.get(call_site)
+    if site is None:
+        site = {
+            "calls": 0,
+            "cached": 0,
+            "tokens_in_est": 0,
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "max_tokens_in_est": 0,
+            "truncations": {},
+        }
+        _site_stats[call_site] = site
+    return site
+
+
+def _usage_value(usage: Any, name: str) -> Optional[int]:
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def record_usage(call_site: str, messages: Iterable[Dict[str, Any]], response: Any = None, cached: bool = False) -> None:
+    """Account one LLM call: estimated input, provider-reported usage if any."""
+    tokens_in_est = estimate_messages_tokens(messages)
+    usage = getattr(response, "usage", None)
+    tokens_in = _usage_value(usage, "prompt_tokens") if usage is not None else None
+    tokens_out = _usage_value(usage, "completion_tokens") if usage is not None else None
+    with _stats_lock:
+        site = _site(call_site)
+        site["calls"] += 1
+        site["cached"] += 1 if cached else 0
+        site["tokens_in_est"] += tokens_in_est
+        site["tokens_in"] += tokens_in or 0
+        site["tokens_out"] += tokens_out or 0
+        site["max_tokens_in_est"] = max(site["max_tokens_in_est"], tokens_in_est)
+    secure_log(
+        "INFO",
+        "LLM usage",
+        call_site=call_site,
+        # Key names avoid "token", which secure_log masks as a secret.
+        input_est=tokens_in_est,
+        input=tokens_in if tokens_in is not None else "-",
+        output=tokens_out if tokens_out is not None else "-",
+        cached=cached,
+    )
+
+
+def prompt_token_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-call-site token totals and averages for /health."""
+    with _stats_lock:
+        snapshot = {
+            name: dict(site, truncations=dict(site["truncations"]))
+            for name, site in _site_stats.items()
+        }
+    for site in snapshot.values():
+        live = site["calls"] - site["cached"]
+        site["avg_tokens_in_est"] = round(site["tokens_in_est"] / site["calls"], 1) if site["calls"] else 0.0
+        site["avg_tokens_out"] = round(site["tokens_out"] / live, 1) if live else 0.0
+    return snapshot
+
+
+def reset_prompt_stats_for_tests() -> None:
+    with _stats_lock:
+        _site_stats.clear()
@@ -0,0 +1,129 @@
+"""Two-level cache for natural-language finance queries.
+
+``handle_nl_query`` spends one LLM call planning a question and another
+phrasing the answer. Teams ask the same things repeatedly ("total pengeluaran
+proyek X bulan ini"), so:
+
+- level 1 maps the normalized question (plus default period and today's date)
+  to its normalized plan, and skips the planning call;
+- level 2 maps the plan, the question-derived retrieval inputs and the ledger
+  data version to the rendered answer, and skips retrieval and the answer call.
+
+``sheets_helper`` bumps the data version on every ledger write, so a cached
+answer is never served after a write in this process. The answer TTL bounds
+staleness from writes made elsewhere (another replica or a manual Sheets
+edit), in the same way as the Sheets read cache.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from services.cache_tier import TtlLru
+from utils.env import env_int, truthy
+
+
+def query_cache_enabled() -> bool:
+    return truthy(os.getenv("QUERY_CACHE_ENABLED", "true"))
+
+
+def _plan_ttl() -> int:
+    return env_int("QUERY_PLAN_CACHE_TTL_SECONDS", 6 * 3600, minimum=1)
+
+
+def _answer_ttl() -> int:
+    return env_int("QUERY_ANSWER_CACHE_TTL_SECONDS", 300, minimum=1)
+
+
+def _max_entries() -> int:
+    return env_int("QUERY_CACHE_MAX_ENTRIES", 512, minimum=1)
+
+
+_lock = threading.Lock()
+_plans = TtlLru(_max_entries, _plan_ttl)
+_answers = TtlLru(_max_entries, _answer_ttl)
+_stats: Dict[str, int] = {
+    "plan_hits": 0, "plan_misses": 0, "answer_hits": 0, "answer_misses": 0,
+    "answer_bypass": 0, "evictions": 0,
+}
+
+
+def normalize_question(question: str) -> str:
+    """Casefold, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r"\s+", " ", str(question or "").casefold()).strip()
+    return text.rstrip(" ?!.")
+
+
+def _today() -> str:
+    return time.strftime("%Y-%m-%d")
+
+
+def _plan_key(question: str, default_days: Optional[int]) -> Tuple:
+    return (normalize_question(question), default_days, _today())
+
+
+def lookup_plan(question: str, default_days: Optional[int]) -> Optional[Dict[str, Any]]:
+    if not query_cache_enabled():
+        return None
+    with _lock:
+        plan = _plans.get(_plan_key(question, default_days))
+        _stats["plan_hits" if plan is not None else "plan_misses"] += 1
+    return copy.deepcopy(plan) if plan is not None else None
+
+
+def store_plan(question: str, default_days: Optional[int], plan: Dict[str, Any]) -> None:
+    if not query_cache_enabled():
+        return
+    with _lock:
+        _stats["evictions"] += _plans.put(_plan_key(question, default_days), copy.deepcopy(plan))
+
+
+def answer_key(plan: Dict[str, Any], features: Dict[str, Any], data_version: Any) -> Tuple:
+    """Key for a rendered answer: what the facts depend on, not the wording."""
+    return (
+        json.dumps(plan, sort_keys=True, default=str),
+        json.dumps(features, sort_keys=True, default=str),
+        str(data_version),
+        _today(),
+    )
+
+
+def lookup_answer(key: Optional[Tuple]) -> Optional[str]:
+    if key is None or not query_cache_enabled():
+        with _lock:
+            _stats["answer_bypass"] += 1
+        return None
+    with _lock:
+        answer = _answers.get(key)
+        _stats["answer_hits" if answer is not None else "answer_misses"] += 1
+    return answer
+
+
+def store_answer(key: Optional[Tuple], answer: str) -> None:
+    if key is None or not query_cache_enabled() or not str(answer or "").strip():
+        return
+    with _lock:
+        _stats["evictions"] += _answers.put(key, answer)
+
+
+def query_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        stats: Dict[str, Any] = dict(_stats)
+        stats["plans"] = len(_plans)
+        stats["answers"] = len(_answers)
+    stats["max_entries"] = _max_entries()
+    return stats
+
+
+def reset_query_cache_for_tests() -> None:
+    with _lock:
+        _plans.clear()
+        _answers.clear()
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,242 @@
+"""Per-chat result sets for conversational query refinement.
+
+After an NL query answers, the chat's result is kept as the plan plus the
+(sheet, row, block) identities of the matching rows. A follow-up that only
+narrows that answer ("detailnya", "khusus proyek X", "yang pengeluaran aja",
+"yang bulan ini") is turned into the same plan with extra filters and answered
+from those rows, without planning, reading the ledger or scanning it again.
+
+Entries carry the ledger data version they were built from, so any ledger
+write in this process retires them; a short TTL bounds everything else.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agent_core.query_engine import norm_text, parse_ast
+from agent_core.time_index import row_identity
+from utils.env import env_int, truthy
+
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, Tuple[float, Any, Dict[str, Any], Tuple]]" = OrderedDict()
+_active_chat = contextvars.ContextVar("query_followup_chat", default=None)
+_stats: Dict[str, int] = {
+    "stored": 0, "unstorable": 0, "hits": 0, "misses": 0, "expired": 0,
+    "invalidated": 0, "not_narrowing": 0, "evictions": 0,
+}
+
+# A follow-up is short and opens with one of these; full questions go through
+# the planner even when they happen to mention a project or period.
+_FOLLOWUP_OPENERS = {
+    "yang", "yg", "khusus", "hanya", "cuma", "kalau", "kalo", "terus", "trus",
+    "detail", "detailnya", "rincian", "rinciannya", "rinci", "rincikan",
+}
+_MAX_FOLLOWUP_WORDS = 8
+_PROJECT_RE = re.compile(r"\b(?:proyek|projek|project)\s+(.+)$")
+_DAYS_RE = re.compile(r"\b(\d{1,3})\s*hari\b")
+
+
+def query_followup_enabled() -> bool:
+    return truthy(os.getenv("QUERY_FOLLOWUP_ENABLED", "true"))
+
+
+def _ttl() -> int:
+    return env_int("QUERY_FOLLOWUP_TTL_SECONDS", 180, minimum=1)
+
+
+def _max_chats() -> int:
+    return env_int("QUERY_FOLLOWUP_MAX_CHATS", 512, minimum=1)
+
+
+@contextmanager
+def followup_scope(chat_id: Optional[str]):
+    """Attribute NL query results inside the block to ``chat_id``."""
+    token = _active_chat.set(str(chat_id) if chat_id else None)
+    try:
+        yield
+    finally:
+        _active_chat.reset(token)
+
+
+def remember(plan: Dict[str, Any], rows: Optional[Iterable[Dict[str, Any]]], data_version: Any) -> None:
+    """Keep the active chat's result set. ``rows=None`` (an answer that cannot be
+    narrowed) or a row without a sheet identity drops the previous one instead."""
+    chat_id = _active_chat.get()
+    if not chat_id or not query_followup_enabled():
+        return
+    if rows is None:
+        with _lock:
+            _entries.pop(chat_id, None)
+        return
+    identities = []
+    for row in rows:
+        identity = row_identity(row)
+        if identity is None:
+            with _lock:
+                _entries.pop(chat_id, None)
+                _stats["unstorable"] += 1
+            return
+        identities.append(identity)
+    with _lock:
+        _entries[chat_id] = (time.time(), data_version, copy.deepcopy(plan), tuple(identities))
+        _entries.move_to_end(chat_id)
+        _stats["stored"] += 1
+        while len(_entries) > _max_chats():
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def lookup(data_version: Any) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """(plan, rows) of the active chat's last answer, if still valid."""
+    chat_id = _active_chat.get()
+    if not chat_id or not query_followup_enabled():
+        return None
+    with _lock:
+        entry = _entries.get(chat_id)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        stored_at, version, plan, identities = entry
+        if version != data_version:
+            _entries.pop(chat_id, None)
+            _stats["invalidated"] += 1
+            return None
+        if time.time() - stored_at > _ttl():
+            _entries.pop(chat_id, None)
+            _stats["expired"] += 1
+            return None
+
+    from services.ledger_index import rows_for_identities
+
+    rows = rows_for_identities(list(identities))
+    if rows is None:
+        with _lock:
+            _entries.pop(chat_id, None)
+            _stats["invalidated"] += 1
+        return None
+    return copy.deepcopy(plan), rows
+
+
+def _period_range(text: str, today: date) -> Optional[Tuple[date, date]]:
+    if "hari ini" in text:
+        return today, today
+    if "kemarin" in text:
+        return today - timedelta(days=1), today - timedelta(days=1)
+    if "minggu ini" in text:
+        return today - timedelta(days=6), today
+    if "bulan ini" in text:
+        return today.replace(day=1), today
+    if "bulan lalu" in text:
+        last_month_end = today.replace(day=1) - timedelta(days=1)
+        return last_month_end.replace(day=1), last_month_end
+    match = _DAYS_RE.search(text)
+    if match and int(match.group(1)) > 0:
+        return today - timedelta(days=int(match.group(1)) - 1), today
+    return None
+
+
+_PERIOD_PHRASES = re.compile(r"\b(hari ini|kemarin|minggu ini|bulan ini|bulan lalu|\d{1,3}\s*hari(?: terakhir)?)\b")
+
+
+def _cached_range(plan: Dict[str, Any], today: date) -> Tuple[Optional[date], date]:
+    filters = plan["ast"].get("filters") or {}
+    low = None
+    if plan.get("period_days") is not None:
+        low = today - timedelta(days=int(plan["period_days"]) - 1)
+    if filters.get("date_from"):
+        date_from = date.fromisoformat(filters["date_from"])
+        low = max(low, date_from) if low else date_from
+    high = date.fromisoformat(filters["date_to"]) if filters.get("date_to") else today
+    return low, min(high, today)
+
+
+def narrow_plan(question: str, plan: Dict[str, Any], today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+    """The cached plan narrowed by a follow-up, or None when it is not a pure narrowing."""
+    from config.wallets import resolve_dompet_from_text
+
+    text = " ".join(re.sub(r"[?!.,]", " ", str(question or "").casefold()).split())
+    words = text.split()
+    if not words or len(words) > _MAX_FOLLOWUP_WORDS or words[0] not in _FOLLOWUP_OPENERS:
+        return _not_narrowing()
+
+    today = today or date.today()
+    narrowed = copy.deepcopy(plan)
+    filters = narrowed["ast"]["filters"]
+    changed = False
+
+    if any(word.startswith(("detail", "rinci")) for word in words):
+        narrowed["detail"] = True
+        changed = True
+
+    period = _period_range(text, today)
+    if period is not None:
+        low, high = _cached_range(plan, today)
+        if (low is not None and period[0] < low) or period[1] > high:
+            return _not_narrowing()
+        filters["date_from"], filters["date_to"] = period[0].isoformat(), period[1].isoformat()
+        changed = True
+    text = _PERIOD_PHRASES.sub(" ", text)
+
+    additions: Dict[str, str] = {}
+    if re.search(r"\b(pengeluaran|keluar)\b", text):
+        additions["tipe"] = "Pengeluaran"
+    elif re.search(r"\b(pemasukan|masuk)\b", text):
+        additions["tipe"] = "Pemasukan"
+    project = _PROJECT_RE.search(text)
+    if project:
+        name = " ".join(word for word in project.group(1).split() if word not in {"aja", "saja", "doang"})
+        if name:
+            additions["project"] = name
+    dompet = resolve_dompet_from_text(text)
+    if dompet:
+        additions["dompet"] = dompet
+
+    for key, value in additions.items():
+        current = filters.get(key)
+        # Narrowing only: a different tipe, or a project that does not refine
+        # the cached one, needs a fresh query.
+        if current and norm_text(current) not in norm_text(value):
+            return _not_narrowing()
+        filters[key] = value
+        changed = True
+
+    if not changed:
+        return _not_narrowing()
+    try:
+        narrowed["ast"] = parse_ast(narrowed["ast"])
+    except ValueError:
+        return _not_narrowing()
+    with _lock:
+        _stats["hits"] += 1
+    return narrowed
+
+
+def _not_narrowing() -> None:
+    with _lock:
+        _stats["not_narrowing"] += 1
+    return None
+
+
+def query_followup_stats() -> Dict[str, Any]:
+    with _lock:
+        stats: Dict[str, Any] = dict(_stats)
+        stats["chats"] = len(_entries)
+    return stats
+
+
+def reset_query_followup_for_tests() -> None:
+    with _lock:
+        _entries.clear()
+        for name in _stats:
+            _stats[name] = 0
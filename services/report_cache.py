@@ -0,0 +1,237 @@
+"""Disk cache for generated PDF reports and frozen period snapshots.
+
+A report only depends on ledger rows dated up to its period end, so the key
+is the period, the report scope and a SHA-256 over those rows in ledger order.
+A repeated ``/laporan`` for an unchanged period is served from the finished
+PDF on disk; any edit to a contributing row (even a late fix to an old month)
+changes the hash and renders anew. Closed periods additionally keep their
+aggregated report context as a JSON snapshot, so a re-render (evicted PDF,
+explicit output dir) skips aggregation. The current month is never frozen.
+
+With REPORT_CACHE_BACKEND=postgres the ``report_artifacts`` table records
+where each PDF was written, so replicas sharing the cache volume find PDFs
+rendered elsewhere. Every failure degrades to rendering as before.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+
+from security import secure_log
+from services.cache_tier import PostgresTier
+from utils.env import env_int, truthy
+
+
+SNAPSHOT_VERSION = 1  # bump when the report context shape changes
+
+_lock = threading.Lock()
+_stats: Dict[str, int] = {
+    "pdf_hits": 0, "pointer_hits": 0, "snapshot_hits": 0, "misses": 0,
+    "pdf_stores": 0, "snapshot_stores": 0, "evictions": 0,
+}
+_db = PostgresTier(
+    "REPORT_CACHE",
+    "Report cache",
+    """
+    CREATE TABLE IF NOT EXISTS report_artifacts (
+        cache_key TEXT PRIMARY KEY,
+        period TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        rows_hash TEXT NOT NULL,
+        path TEXT NOT NULL,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+)
+
+_ROW_FIELDS = ("tanggal", "keterangan", "jumlah", "tipe", "kategori", "company_sheet", "nama_projek")
+
+
+class ReportKey(NamedTuple):
+    period: str
+    scope: str
+    rows_hash: str
+
+    @property
+    def digest(self) -> str:
+        raw = f"v{SNAPSHOT_VERSION}|{self.period}|{self.scope}|{self.rows_hash}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def report_cache_enabled() -> bool:
+    return truthy(os.getenv("REPORT_CACHE_ENABLED", "true"))
+
+
+def _cache_dir() -> str:
+    return os.getenv("REPORT_CACHE_DIR", "data/report_cache")
+
+
+def _max_artifacts() -> int:
+    return env_int("REPORT_CACHE_MAX_ARTIFACTS", 64, minimum=1)
+
+
+def rows_hash(rows: Iterable[Dict[str, Any]]) -> str:
+    """SHA-256 over the report-relevant fields of ``rows``, in order."""
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(json.dumps([row.get(name) for name in _ROW_FIELDS], default=str).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def build_key(period: str, scope: str, rows: Iterable[Dict[str, Any]]) -> Optional[ReportKey]:
+    """Cache key for one report; None when caching is off."""
+    if not report_cache_enabled():
+        return None
+    return ReportKey(period, scope, rows_hash(rows))
+
+
+def artifact_dir(key: ReportKey) -> str:
+    """Directory the PDF for ``key`` is rendered into (keeps the human file name)."""
+    return os.path.join(_cache_dir(), "pdf", key.digest)
+
+
+def _snapshot_path(key: ReportKey) -> str:
+    return os.path.join(_cache_dir(), "snapshots", f"{key.digest}.json")
+
+
+def lookup_pdf(key: Optional[ReportKey]) -> Optional[str]:
+    """Path of a finished PDF for ``key``, from disk or a Postgres pointer."""
+    if key is None:
+        return None
+    local = _pdf_in(artifact_dir(key))
+    if local:
+        try:
+            os.utime(artifact_dir(key))  # most recently used survives pruning
+        except OSError:
+            pass
+        with _lock:
+            _stats["pdf_hits"] += 1
+        return local
+    pointed = _db_lookup(key)
+    if pointed and os.path.exists(pointed):
+        with _lock:
+            _stats["pointer_hits"] += 1
+        return pointed
+    with _lock:
+        _stats["misses"] += 1
+    return None
+
+
+def _pdf_in(directory: str) -> Optional[str]:
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(".pdf")]
+    except OSError:
+        return None
+    return os.path.join(directory, names[0]) if names else None
+
+
+def store_pdf(key: Optional[ReportKey], path: str) -> None:
+    """Record a PDF rendered into ``artifact_dir(key)`` and prune old artifacts."""
+    if key is None:
+        return
+    with _lock:
+        _stats["pdf_stores"] += 1
+    _db_store(key, path)
+    _prune(os.path.join(_cache_dir(), "pdf"), is_dir=True)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(type(value).__name__)
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def load_snapshot(key: Optional[ReportKey]) -> Optional[Dict[str, Any]]:
+    """The frozen report context for ``key``, if one was stored."""
+    if key is None:
+        return None
+    try:
+        with open(_snapshot_path(key), "r", encoding="utf-8") as handle:
+            context = json.load(handle, object_hook=_decode)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        secure_log("WARNING", f"Report snapshot unreadable: {type(exc).__name__}")
+        return None
+    with _lock:
+        _stats["snapshot_hits"] += 1
+    return context
+
+
+def store_snapshot(key: Optional[ReportKey], context: Dict[str, Any]) -> None:
+    """Freeze the aggregated context of a closed period."""
+    if key is None:
+        return
+    path = _snapshot_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(context, handle, default=_encode, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as exc:
+        secure_log("WARNING", f"Report snapshot store failed: {type(exc).__name__}")
+        return
+    with _lock:
+        _stats["snapshot_stores"] += 1
+    _prune(os.path.dirname(path), is_dir=False)
+
+
+def _prune(directory: str, is_dir: bool) -> None:
+    """Keep the most recently used ``REPORT_CACHE_MAX_ARTIFACTS`` entries."""
+    try:
+        entries = [os.path.join(directory, name) for name in os.listdir(directory)]
+        entries = [path for path in entries if os.path.isdir(path) == is_dir and not path.endswith(".tmp")]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for stale in entries[_max_artifacts():]:
+            if is_dir:
+                shutil.rmtree(stale, ignore_errors=True)
+            else:
+                os.remove(stale)
+            with _lock:
+                _stats["evictions"] += 1
+    except OSError as exc:
+        secure_log("WARNING", f"Report cache prune failed: {type(exc).__name__}")
+
+
+def _db_lookup(key: ReportKey) -> Optional[str]:
+    row = _db.fetchone("SELECT path FROM report_artifacts WHERE cache_key = %s", (key.digest,))
+    return row[0] if row else None
+
+
+def _db_store(key: ReportKey, path: str) -> None:
+    _db.execute(
+        """
+        INSERT INTO report_artifacts (cache_key, period, scope, rows_hash, path, created_at)
+        VALUES (%s, %s, %s, %s, %s, NOW())
+        ON CONFLICT (cache_key) DO UPDATE SET path = EXCLUDED.path, created_at = NOW()
+        """,
+        (key.digest, key.period, key.scope, key.rows_hash, os.path.abspath(path)),
+    )
+
+
+def report_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        stats: Dict[str, Any] = dict(_stats)
+    stats["backend"] = "postgres" if _db.database_url() else "disk"
+    return stats
+
+
+def reset_report_cache_for_tests() -> None:
+    with _lock:
+        for name in _stats:
+            _stats[name] = 0
+    _db.reset_for_tests()
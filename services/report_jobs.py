@@ -0,0 +1,215 @@
+"""Background PDF report jobs.
+
+Reportlab layout holds the GIL for seconds on a large report, which used to
+stall every other webhook on the same gunicorn worker. ``submit_report``
+returns at once so the chat gets a "sedang diproses" reply; a small thread
+pool prepares the report (cache lookup, aggregation) and the layout itself
+runs in a spawn-based process pool. The finished PDF, or the failure, goes
+back through the caller's delivery callbacks. A render that outlives
+REPORT_RENDER_TIMEOUT_SECONDS fails the job and its worker is killed; it is not
+retried inline, which would put the layout back on the webhook worker's GIL.
+
+Jobs are deduplicated per chat and period while pending, and the number of
+pending jobs is bounded so a burst of requests is refused instead of queued
+without limit.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from security import log_timing, secure_log
+from utils.env import env_int, truthy
+
+
+QUEUED, DUPLICATE, BUSY = "queued", "duplicate", "busy"
+
+_lock = threading.Lock()
+_pending: Set[Tuple[str, str]] = set()
+_stats: Dict[str, int] = {
+    "queued": 0, "deduplicated": 0, "rejected": 0, "completed": 0,
+    "failed": 0, "pool_renders": 0, "inline_renders": 0, "render_timeouts": 0,
+}
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class ReportRenderTimeout(RuntimeError):
+    """The render pool did not finish the layout within REPORT_RENDER_TIMEOUT_SECONDS."""
+
+
+def report_jobs_enabled() -> bool:
+    return truthy(os.getenv("REPORT_JOBS_ENABLED", "true"))
+
+
+def _max_pending() -> int:
+    return env_int("REPORT_JOBS_MAX_PENDING", 4, minimum=1)
+
+
+def _render_timeout() -> int:
+    return env_int("REPORT_RENDER_TIMEOUT_SECONDS", 180, minimum=10)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            threads = env_int("REPORT_JOBS_THREADS", 2, minimum=1)
+            _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="report-job")
+        return _executor
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    workers = env_int("REPORT_RENDER_WORKERS", 1)
+    if workers <= 0:
+        return None
+    with _executor_lock:
+        if _pool is None:
+            import multiprocessing
+
+            from pdf_report import warm_report_assets
+
+            # spawn, not fork: gunicorn workers are multi-threaded.
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_report_assets,
+            )
+        return _pool
+
+
+def _reset_pool(terminate: bool = False) -> None:
+    global _pool
+    with _executor_lock:
+        pool, _pool = _pool, None
+    if pool is None:
+        return
+    if terminate:
+        # shutdown() leaves a running render alone; a hung one must be killed.
+        if hasattr(pool, "terminate_workers"):  # Python 3.14+
+            pool.terminate_workers()
+            return
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_in_pool(ctx: Dict, out_dir: str, fname: str) -> str:
+    """``pdf_report.render_report_file`` on the render pool, inline if the pool is off or broken.
+
+    Raises ReportRenderTimeout when the pool does not finish in time.
+    """
+    from pdf_report import render_report_file
+
+    pool = _get_pool()
+    if pool is not None:
+        timeout = _render_timeout()
+        try:
+            path = pool.submit(render_report_file, ctx, out_dir, fname).result(timeout=timeout)
+        except FutureTimeout:
+            _reset_pool(terminate=True)
+            with _lock:
+                _stats["render_timeouts"] += 1
+            secure_log("WARNING", f"Report render exceeded {timeout}s; worker terminated")
+            raise ReportRenderTimeout(f"Report render exceeded {timeout}s") from None
+        except BrokenProcessPool as exc:
+            _reset_pool()
+            secure_log("WARNING", f"Report render pool unavailable, rendering inline: {type(exc).__name__}")
+        else:
+            with _lock:
+                _stats["pool_renders"] += 1
+            return path
+    with _lock:
+        _stats["inline_renders"] += 1
+    return render_report_file(ctx, out_dir, fname)
+
+
+def _job_key(chat_id: str, period_input: str) -> Tuple[str, str]:
+    return str(chat_id or ""), re.sub(r"\s+", " ", str(period_input or "").strip().lower())
+
+
+def submit_report(
+    chat_id: str,
+    period_input: str,
+    on_done: Callable[[str], None],
+    on_error: Callable[[Exception], None],
+) -> str:
+    """Queue a report; returns QUEUED, DUPLICATE (same chat and period pending) or BUSY."""
+    key = _job_key(chat_id, period_input)
+    with _lock:
+        if key in _pending:
+            _stats["deduplicated"] += 1
+            return DUPLICATE
+        if len(_pending) >= _max_pending():
+            _stats["rejected"] += 1
+            return BUSY
+        _pending.add(key)
+        _stats["queued"] += 1
+    try:
+        _get_executor().submit(_run, key, period_input, on_done, on_error)
+    except RuntimeError:
+        with _lock:
+            _pending.discard(key)
+        raise
+    return QUEUED
+
+
+def _run(key: Tuple[str, str], period_input: str, on_done, on_error) -> None:
+    from pdf_report import generate_pdf_from_input
+
+    started = time.perf_counter()
+    try:
+        path = generate_pdf_from_input(period_input, render=render_in_pool)
+    except Exception as exc:
+        with _lock:
+            _stats["failed"] += 1
+        _deliver(on_error, exc)
+    else:
+        with _lock:
+            _stats["completed"] += 1
+        _deliver(on_done, path)
+    finally:
+        with _lock:
+            _pending.discard(key)
+        log_timing("report_jobs.run", started)
+
+
+def _deliver(callback, value) -> None:
+    try:
+        callback(value)
+    except Exception as exc:
+        secure_log("ERROR", f"Report delivery failed: {type(exc).__name__}")
+
+
+def report_jobs_stats() -> Dict[str, int]:
+    with _lock:
+        stats = dict(_stats)
+        stats["pending"] = len(_pending)
+    stats["max_pending"] = _max_pending()
+    return stats
+
+
+def shutdown_report_jobs() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+    _reset_pool()
+
+
+def reset_report_jobs_for_tests() -> None:
+    shutdown_report_jobs()
+    with _lock:
+        _pending.clear()
+        for name in _stats:
+            _stats[name] = 0
@@ -4,6 +4,9 @@ import os
 import time
 import hashlib
 import threading
+import contextvars
+import inspect
+from contextlib import contextmanager
 from functools import wraps
 import gspread
 from datetime import datetime, timedelta
@@ -30,6 +33,20 @@ def _mirror_financial_ledger(row: Dict) -> None:
     except Exception as exc:
         secure_log("ERROR", f"Financial ledger mirror wrapper failed: {type(exc).__name__}: {exc}")
 
+    from services.ledger_index import record_row
+
+    # Index under the company name get_all_data() reports for this sheet.
+    record_row({**row, 'company_sheet': _ledger_company_name(row.get('sheet_name'))})
+
+
+def _ledger_company_name(sheet_name) -> str:
+    from config.wallets import DOMPET_COMPANIES
+
+    sheet_name = str(sheet_name or '')
+    if sheet_name == OPERASIONAL_SHEET_NAME:
+        return 'Operasional Kantor'
+    return next((k for k in DOMPET_COMPANIES if k.lower() in sheet_name.lower()), sheet_name)
+
 
 def _serialized_ledger_write(func):
     """Serialize read-before-append idempotency checks within one process."""
@@ -375,6 +392,8 @@ ALL_DATA_CACHE_TTL_SECONDS = int(os.getenv("ALL_DATA_CACHE_TTL_SECONDS", "30"))
 WALLET_BALANCE_CACHE_TTL_SECONDS = int(os.getenv("WALLET_BALANCE_CACHE_TTL_SECONDS", "20"))
 _state_sheet_backoff_until = 0
 _STATE_SHEET_RATE_LIMIT_BACKOFF_SECONDS = 75
+# Bumped on every ledger write; read-side caches (services/query_cache) key on it.
+_ledger_data_version = 0
 
 
 def _is_google_rate_limit_error(error: Exception) -> bool:
@@ -406,6 +425,99 @@ def _set_all_data_cache(days, data: List[Dict]) -> None:
         _all_data_cache[cache_key] = (time.time(), _cache_copy(data))
 
 
+def ledger_data_version() -> int:
+    """Monotonic token that changes whenever this process writes the ledger."""
+    with _read_cache_lock:
+        return _ledger_data_version
+
+
+def bump_ledger_data_version() -> int:
+    global _ledger_data_version
+    with _read_cache_lock:
+        _ledger_data_version += 1
+        return _ledger_data_version
+
+
+class LedgerSnapshot:
+    """Request-scoped memo of ledger reads; see ledger_snapshot()."""
+
+    def __init__(self):
+        self.version = ledger_data_version()
+        self.values = {}
+        self.loads = 0
+        self.reuses = 0
+
+    def read(self, key, loader):
+        version = ledger_data_version()
+        if version != self.version:
+            # A write landed inside the request: later reads must see it.
+            self.values.clear()
+            self.version = version
+        if key in self.values:
+            self.reuses += 1
+            value = self.values[key]
+        else:
+            self.loads += 1
+            value = self.values[key] = loader()
+        # Shallow copy so in-place sort/append by one helper cannot leak into
+        # the next; row dicts are shared and must be treated as read-only.
+        return copy.copy(value) if isinstance(value, (list, dict)) else value
+
+
+_active_ledger_snapshot = contextvars.ContextVar("ledger_snapshot", default=None)
+_ledger_snapshot_stats = {"snapshots": 0, "loads": 0, "reuses": 0}
+
+
+@contextmanager
+def ledger_snapshot():
+    """
+    Materialize each ledger dataset at most once for the enclosed request.
+
+    Inside the block, get_all_data / get_summary / get_wallet_balances /
+    get_dashboard_summary / get_hutang_summary / find_open_hutang return the
+    first result for the same arguments instead of re-reading Sheets and
+    deep-copying the read cache. Nested blocks share the outer snapshot.
+    """
+    snapshot = _active_ledger_snapshot.get()
+    if snapshot is not None:
+        yield snapshot
+        return
+    snapshot = LedgerSnapshot()
+    token = _active_ledger_snapshot.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        _active_ledger_snapshot.reset(token)
+        with _read_cache_lock:
+            _ledger_snapshot_stats["snapshots"] += 1
+            _ledger_snapshot_stats["loads"] += snapshot.loads
+            _ledger_snapshot_stats["reuses"] += snapshot.reuses
+        secure_log("DEBUG", f"Ledger snapshot closed: loads={snapshot.loads} reuses={snapshot.reuses}")
+
+
+def ledger_snapshot_stats() -> Dict:
+    with _read_cache_lock:
+        return dict(_ledger_snapshot_stats)
+
+
+def _snapshot_read(func):
+    """Serve repeated calls from the active ledger_snapshot(), if any."""
+    signature = inspect.signature(func)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        snapshot = _active_ledger_snapshot.get()
+        if snapshot is None:
+            return func(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        if bound.arguments.pop("force_refresh", False):
+            return func(*args, **kwargs)
+        key = (func.__name__, repr(sorted(bound.arguments.items())))
+        return snapshot.read(key, lambda: func(*args, **kwargs))
+    return wrapper
+
+
 def _get_wallet_balances_cache() -> Optional[Dict]:
     now_ts = time.time()
     with _read_cache_lock:
@@ -823,6 +935,7 @@ def settle_hutang(no: int, sender_name: str = "System", source: str = "WhatsApp"
     return info
 
 
+@_snapshot_read
 def find_open_hutang(
     yang_hutang: Optional[str] = None,
     yang_dihutangi: Optional[str] = None,
@@ -882,6 +995,7 @@ def _parse_hutang_date(value: str) -> Optional[datetime]:
     return None
 
 
+@_snapshot_read
 def get_hutang_summary(days: int = 0) -> Dict:
     """
     Summarize hutang antar dompet.
@@ -1268,6 +1382,7 @@ def move_finish_marker_to_latest(
             return 0
 
         sheet.update_cells(updates, value_input_option="USER_ENTERED")
+        bump_ledger_data_version()
         secure_log(
             "INFO",
             f"Finish marker moved for '{project_name}' in {dompet_sheet}: cleared {len(updates)} old marker(s)",
@@ -1663,7 +1778,10 @@ def update_transaction_amount(dompet_sheet: str, row: int, new_amount: int) -> b
             sheet = get_or_create_operational_sheet()
             sheet.update_cell(row, OPERASIONAL_COLS['JUMLAH'], new_amount)
             from services.ledger_store import update_amount_by_source
+            from services.ledger_index import record_amount
             update_amount_by_source(dompet_sheet, row, 'operasional', new_amount)
+            record_amount(dompet_sheet, row, 'operasional', new_amount)
+            bump_ledger_data_version()
             secure_log("INFO", f"Operational TX updated: {dompet_sheet} row {row} -> {new_amount}")
             return True
         
@@ -1687,12 +1805,11 @@ def update_transaction_amount(dompet_sheet: str, row: int, new_amount: int) -> b
         
         sheet.update_cell(row, target_col, new_amount)
         from services.ledger_store import update_amount_by_source
-        update_amount_by_source(
-            dompet_sheet,
-            row,
-            'pemasukan' if target_col == SPLIT_PEMASUKAN['JUMLAH'] else 'pengeluaran',
-            new_amount,
-        )
+        from services.ledger_index import record_amount
+        source_block = 'pemasukan' if target_col == SPLIT_PEMASUKAN['JUMLAH'] else 'pengeluaran'
+        update_amount_by_source(dompet_sheet, row, source_block, new_amount)
+        record_amount(dompet_sheet, row, source_block, new_amount)
+        bump_ledger_data_version()
         
         secure_log("INFO", f"Transaction updated: {dompet_sheet} row {row} -> {new_amount}")
         return True
@@ -1916,6 +2033,7 @@ def get_raw_rows_for_audit() -> List[Dict]:
         raise RuntimeError("Audit read failed: " + "; ".join(read_errors))
 
     return rows
+@_snapshot_read
 def get_all_data(days: int = 30, force_refresh: bool = False) -> List[Dict]:
     """
     Get all transaction data from ALL dompet sheets.
@@ -2019,7 +2137,7 @@ def get_all_data(days: int = 30, force_refresh: bool = False) -> List[Dict]:
                 # Get Company Name mapping
                 # Use the canonical Dompet Name (key) as the Company Name
                 # DOMPET_COMPANIES values are lists, so we must use 'k' (string) not 'v' (list)
-                company_name = next((k for k,v in DOMPET_COMPANIES.items() if k.lower() in dompet.lower()), dompet)
+                company_name = _ledger_company_name(dompet)
                 
                 # Skip up to data start
                 for idx, row in enumerate(all_values[SPLIT_LAYOUT_DATA_START-1:], start=SPLIT_LAYOUT_DATA_START):
@@ -2210,6 +2328,7 @@ def check_duplicate_transaction(new_amount: int, new_desc: str, new_project: str
         return False, None
 
 
+@_snapshot_read
 def get_summary(days: int = 30) -> Dict:
     """Get summary statistics for all transactions."""
     raw_data = get_all_data(days)
@@ -2524,6 +2643,7 @@ def format_report_message(report: Dict) -> str:
     return '\n'.join(lines)
 
 
+@_snapshot_read
 def get_wallet_balances(force_refresh: bool = False) -> Dict:
     """
     Calculate REAL wallet balances using Virtual Balance formula:
@@ -2736,9 +2856,11 @@ def invalidate_dashboard_cache():
         _all_data_cache.clear()
         _wallet_balances_cache = None
         _wallet_balances_cache_at = 0
+    bump_ledger_data_version()
     secure_log("INFO", "Dashboard cache invalidated")
 
 
+@_snapshot_read
 def get_dashboard_summary():
     """Get dashboard summary with caching."""
     global _dashboard_cache, _dashboard_last_update
@@ -3017,7 +3139,9 @@ def delete_transaction_row(dompet_sheet: str, row: int) -> bool:
         
         sheet.delete_rows(row)
         from services.ledger_store import delete_by_source
+        from services.ledger_index import record_delete
         delete_by_source(dompet_sheet, row)
+        record_delete(dompet_sheet, row)
         invalidate_dashboard_cache()
         secure_log("INFO", f"Transaction deleted: {dompet_sheet} row {row}")
         return True
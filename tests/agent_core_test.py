@@ -6,9 +6,11 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from unittest.mock import patch
 
+from agent_core import conversation_memory
 from agent_core.conversation_memory import get_recent, record_message, render_for_prompt
 from agent_core.intent_router import record_intent_shadow, route_intent
-from agent_core.query_engine import execute, parse_ast
+from agent_core import query_engine
+from agent_core.query_engine import compile_plan, execute, parse_ast
 from agent_core.semantic_dedup import find_likely_duplicates
 from services.finance_agent import plan_finance_message
 
@@ -44,6 +46,42 @@ class AgentCoreTests(unittest.TestCase):
 
         self.assertEqual(result["value"], 1600000)
 
+    def test_compiled_plan_matches_interpreted_filters(self):
+        rows = [
+            {"tanggal": "2026-07-02", "nama_projek": "Villa  PUNCAK", "tipe": "Pengeluaran", "kategori": "Gaji",
+             "sheet_name": "CV HB(101)", "jumlah": 100000},
+            {"tanggal": "02/07/2026", "project": "villa puncak", "tipe": " pengeluaran ", "category": "Gaji",
+             "company_sheet": "CV HB", "jumlah": "250rb"},
+            {"tanggal": "", "nama_projek": "Villa Puncak", "tipe": "Pengeluaran", "jumlah": 1},
+            {"tanggal": "bukan tanggal", "nama_projek": "Villa Puncak", "tipe": "Pengeluaran", "jumlah": 2},
+            {"tanggal": "2026-08-01", "nama_projek": "Taman Sari", "tipe": "Pemasukan", "dompet": "TX SBY(216)", "jumlah": 5},
+        ]
+        filter_sets = [
+            {},
+            {"project": "villa puncak", "tipe": "Pengeluaran"},
+            {"date_from": "2026-07-01", "date_to": "31/07/2026"},
+            {"date_to": "2026-07-31", "category": "gaji", "dompet": "cv hb"},
+            {"company": "cv", "date_from": "2026-07-02"},
+            {"dompet": "tx sby", "tipe": "pemasukan"},
+        ]
+        for filters in filter_sets:
+            with self.subTest(filters=filters):
+                parsed = parse_ast({"filters": filters})
+                predicate = compile_plan(parsed)
+                expected = [row for row in rows if query_engine._matches(row, parsed["filters"])]
+                self.assertEqual([row for row in rows if predicate(row)], expected)
+
+    def test_compiled_plans_are_cached_by_shape(self):
+        first = compile_plan(parse_ast({"filters": {"project": "villa", "date_from": "2026-07-01"}}))
+        again = compile_plan(parse_ast({"filters": {"date_from": "2026-07-01", "project": "Villa"}}))
+        self.assertIs(first, again)
+
+        shapes_before = query_engine._plan_shape.cache_info()
+        compile_plan(parse_ast({"filters": {"project": "taman sari", "date_from": "2026-08-01"}}))
+        shapes_after = query_engine._plan_shape.cache_info()
+        self.assertEqual(shapes_after.hits, shapes_before.hits + 1)
+        self.assertEqual(shapes_after.misses, shapes_before.misses)
+
     def test_conversation_memory_roundtrip(self):
         with tempfile.TemporaryDirectory() as tmp:
             path = os.path.join(tmp, "memory.jsonl")
@@ -97,6 +135,42 @@ class AgentCoreTests(unittest.TestCase):
             self.assertTrue(rotated.exists())
             self.assertIn("catat semen 50rb", path.read_text(encoding="utf-8"))
 
+    def test_conversation_memory_follows_appends_from_other_workers(self):
+        conversation_memory.reset_conversation_memory_for_tests()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "memory.jsonl"
+            with patch.dict(os.environ, {"CONVERSATION_MEMORY_PATH": str(path), "CONVERSATION_MEMORY_RING_SIZE": "3"}):
+                for n in range(5):
+                    record_message("chat-1", "user-1", "user", f"pesan {n}")
+                other_worker = {"ts": datetime.now().isoformat(timespec="seconds"), "chat_id": "chat-1",
+                                "user_id": "user-1", "role": "bot", "text": "dari worker lain"}
+                with path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(other_worker) + "\n")
+
+                recent = get_recent("chat-1", "user-1", limit=10)
+                stats = conversation_memory.conversation_memory_stats()
+
+        self.assertEqual([item["text"] for item in recent], ["pesan 3", "pesan 4", "dari worker lain"])
+        self.assertEqual(stats["loads"], 1)
+
+    def test_conversation_memory_compaction_keeps_served_turns(self):
+        conversation_memory.reset_conversation_memory_for_tests()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "memory.jsonl"
+            env = {"CONVERSATION_MEMORY_PATH": str(path), "CONVERSATION_MEMORY_RING_SIZE": "2",
+                   "CONVERSATION_MEMORY_MAX_BYTES": "400"}
+            with patch.dict(os.environ, env):
+                for n in range(8):
+                    record_message(f"chat-{n % 2}", "user-1", "user", f"pesan {n}")
+                self.assertGreater(conversation_memory.conversation_memory_stats()["compactions"], 0)
+                sealed = Path(str(path) + ".1").read_text(encoding="utf-8").splitlines()
+                self.assertLessEqual(len(sealed), 4)
+
+                conversation_memory.reset_conversation_memory_for_tests()  # cold process
+                recent = get_recent("chat-1", "user-1", limit=6)
+
+        self.assertEqual([item["text"] for item in recent], ["pesan 5", "pesan 7"])
+
     def test_intent_router_routes_common_finance_messages(self):
         self.assertEqual(route_intent("catat beli semen 50rb project Villa").intent, "RECORD")
         self.assertEqual(route_intent("total pengeluaran project Villa bulan ini?").intent, "QUERY")
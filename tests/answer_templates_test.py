@@ -0,0 +1,100 @@
+import os
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from handlers import nl_query_handler
+from services import answer_templates, query_cache
+from tests.ledger_fixtures import ledger_row, window
+
+
+ROWS = [
+    ledger_row(1, 1250000),
+    ledger_row(3, 500000, project="Kafe Kuta", keterangan="cat tembok"),
+    ledger_row(5, 2000000, tipe="Pemasukan", keterangan="DP klien"),
+    ledger_row(40, 750000),
+    ledger_row(45, 250000, project="Kafe Kuta"),
+]
+
+
+class AnswerTemplateTests(unittest.TestCase):
+    def setUp(self):
+        query_cache.reset_query_cache_for_tests()
+        answer_templates.reset_answer_templates_for_tests()
+        self._env = patch.dict(os.environ, {"QUERY_CACHE_ENABLED": "false", "AGENT_AUDIT_BACKEND": "off"})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+
+    def _ask(self, plan, question="pertanyaan"):
+        with patch.object(nl_query_handler, "_ask_llm_for_plan", return_value=plan), \
+             patch.object(nl_query_handler, "get_all_data", side_effect=lambda days: window(ROWS, days) if days else list(ROWS)), \
+             patch.object(nl_query_handler, "_answer_from_facts", return_value="jawaban llm") as answer_llm:
+            answer = nl_query_handler.handle_nl_query(question, default_days=30)
+        return answer, answer_llm.call_count
+
+    def test_single_total_is_rendered_without_llm(self):
+        answer, llm_calls = self._ask({
+            "intent": "summary", "metric": "sum", "filters": {"tipe": "Pengeluaran"},
+            "group_by": None, "period_days": 30,
+        })
+
+        self.assertEqual(llm_calls, 0)
+        self.assertEqual(answer, "Total pengeluaran (30 hari terakhir): Rp 1.750.000 dari 2 transaksi.")
+
+    def test_breakdown_lists_groups_largest_first(self):
+        answer, llm_calls = self._ask({
+            "intent": "category", "metric": "sum", "filters": {"tipe": "Pengeluaran"},
+            "group_by": "project", "period_days": 30,
+        })
+
+        self.assertEqual(llm_calls, 0)
+        self.assertEqual(answer.splitlines()[1:], ["• Villa Canggu: Rp 1.250.000", "• Kafe Kuta: Rp 500.000"])
+
+    def test_comparison_uses_previous_window(self):
+        answer, llm_calls = self._ask({
+            "intent": "comparison", "metric": "sum", "filters": {"tipe": "Pengeluaran"},
+            "group_by": None, "period_days": 30,
+        })
+
+        self.assertEqual(llm_calls, 0)
+        self.assertIn("• Periode ini: Rp 1.750.000 (2 transaksi)", answer)
+        self.assertIn("• Periode sebelumnya: Rp 1.000.000 (2 transaksi)", answer)
+        self.assertIn("Perubahan: naik 750.000 (75,0%).", answer)
+
+    def test_ranking_lists_top_rows(self):
+        answer, llm_calls = self._ask({
+            "intent": "ranking", "metric": "max", "filters": {},
+            "group_by": None, "period_days": 30,
+        })
+
+        self.assertEqual(llm_calls, 0)
+        lines = answer.splitlines()
+        self.assertTrue(lines[1].startswith("1. ") and "Rp 2.000.000 — DP klien" in lines[1])
+        self.assertIn("Rp 500.000 — cat tembok [Kafe Kuta]", lines[3])
+
+    def test_empty_period_reports_history(self):
+        answer, llm_calls = self._ask({
+            "intent": "summary", "metric": "sum", "filters": {"project": "Villa Canggu"},
+            "group_by": None, "period_days": 1,
+        })
+
+        self.assertEqual(llm_calls, 0)
+        self.assertIn("Belum ada transaksi yang cocok (hari ini).", answer)
+        self.assertIn("Total projek Villa Canggu sepanjang riwayat: Rp 4.000.000 dari 3 transaksi.", answer)
+
+    def test_unsupported_shapes_still_use_llm(self):
+        with patch.object(nl_query_handler, "get_wallet_balances", return_value={}):
+            answer, llm_calls = self._ask({
+                "intent": "wallet", "metric": "sum", "filters": {},
+                "group_by": None, "period_days": 30,
+            }, question="sisa saldo")
+
+        self.assertEqual((answer, llm_calls), ("jawaban llm", 1))
+        self.assertEqual(answer_templates.answer_template_stats()["llm"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import ai_helper
+from services import audio_cache, audio_chunking
+
+
+RATE = 16000
+
+
+def _speech(seconds, seed):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * RATE)) * 8000).astype(np.int16)
+
+
+def _pause(seconds):
+    return np.zeros(int(seconds * RATE), dtype=np.int16)
+
+
+def _voice_note(*segments):
+    """Alternating speech/pause durations, starting with speech."""
+    parts = [
+        _speech(seconds, idx) if idx % 2 == 0 else _pause(seconds)
+        for idx, seconds in enumerate(segments)
+    ]
+    return np.concatenate(parts)
+
+
+class SilenceSplitTests(unittest.TestCase):
+    def test_cuts_land_inside_pauses(self):
+        samples = _voice_note(17, 1, 19, 1, 18)
+
+        cuts = audio_chunking.find_split_points(samples, RATE, target_seconds=20)
+
+        self.assertEqual(len(cuts), 2)
+        pauses = [(17 * RATE, 18 * RATE), (37 * RATE, 38 * RATE)]
+        for cut, (start, end) in zip(cuts, pauses):
+            self.assertGreaterEqual(cut, start)
+            self.assertLessEqual(cut, end)
+
+    def test_short_note_is_not_split(self):
+        wav = audio_chunking.encode_wav(_voice_note(10, 1, 10), RATE)
+
+        with patch.dict(os.environ, {"AUDIO_CHUNK_MIN_SECONDS": "40"}):
+            self.assertIsNone(audio_chunking.split_audio(wav))
+
+    def test_undecodable_audio_falls_back_to_whole_upload(self):
+        with patch.object(audio_chunking.shutil, "which", return_value=None):
+            self.assertIsNone(audio_chunking.split_audio(b"OggS\x00not-really-opus"))
+
+    def test_stitch_joins_in_order(self):
+        self.assertEqual(
+            audio_chunking.stitch_transcripts([" beli semen ", "", "500 ribu\n", "proyek Taman Sari"]),
+            "beli semen 500 ribu proyek Taman Sari",
+        )
+
+
+class TranscribeAudioTests(unittest.TestCase):
+    def setUp(self):
+        audio_cache.reset_audio_cache_for_tests()
+        audio_chunking.reset_chunk_pool_for_tests()
+        self._env = patch.dict(os.environ, {
+            "AUDIO_CACHE_BACKEND": "",
+            "AUDIO_CHUNK_ENABLED": "true",
+            "AUDIO_CHUNK_MIN_SECONDS": "40",
+            "AUDIO_CHUNK_TARGET_SECONDS": "20",
+        })
+        self._env.start()
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+        self._env.stop()
+        audio_chunking.reset_chunk_pool_for_tests()
+        audio_cache.reset_audio_cache_for_tests()
+
+    def _write(self, name, data):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, "wb") as handle:
+            handle.write(data)
+        return path
+
+    def test_forwarded_voice_note_is_transcribed_once(self):
+        path = self._write("note.ogg", b"OggS-voice-note")
+        forwarded = self._write("forwarded.ogg", b"OggS-voice-note")
+        response = SimpleNamespace(text=" catat beli semen 500 ribu ")
+
+        with patch.object(audio_chunking.shutil, "which", return_value=None), \
+                patch.object(ai_helper.groq_client.audio.transcriptions, "create", return_value=response) as create:
+            first = ai_helper.transcribe_audio(path)
+            second = ai_helper.transcribe_audio(forwarded)
+
+        self.assertEqual(first, "catat beli semen 500 ribu")
+        self.assertEqual(second, first)
+        create.assert_called_once()
+        self.assertEqual(audio_cache.audio_cache_stats()["hits"], 1)
+
+    def test_long_note_chunks_run_concurrently_and_stitch_in_order(self):
+        samples = _voice_note(17, 1, 19, 1, 18)
+        path = self._write("memo.wav", audio_chunking.encode_wav(samples, RATE))
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def fake_create(file, model, language):
+            name, data = file
+            index = int(name[len("chunk"):-len(".wav")])
+            with lock:
+                active.append(index)
+                peak.append(len(active))
+            time.sleep(0.05 * (4 - index))
+            with lock:
+                active.remove(index)
+            return SimpleNamespace(text=f"bagian {index}")
+
+        with patch.object(ai_helper.groq_client.audio.transcriptions, "create", side_effect=fake_create) as create:
+            text = ai_helper.transcribe_audio(path)
+
+        self.assertEqual(text, "bagian 1 bagian 2 bagian 3")
+        self.assertEqual(create.call_count, 3)
+        self.assertGreater(max(peak), 1)
+
+    def test_failed_chunk_retries_whole_file(self):
+        samples = _voice_note(17, 1, 19, 1, 18)
+        path = self._write("memo.wav", audio_chunking.encode_wav(samples, RATE))
+
+        def fake_create(file, model, language):
+            if file[0] == "chunk2.wav":
+                raise TimeoutError()
+            return SimpleNamespace(text=f"teks {file[0]}")
+
+        with patch.object(ai_helper.groq_client.audio.transcriptions, "create", side_effect=fake_create):
+            text = ai_helper.transcribe_audio(path)
+
+        self.assertEqual(text, "teks memo.wav")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from agent_core import audit_log
+
+
+class AuditLogTests(unittest.TestCase):
+    def setUp(self):
+        audit_log.reset_audit_log_for_tests()
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = Path(self._dir.name) / "audit.jsonl"
+        self._env = patch.dict(os.environ, {
+            "AGENT_AUDIT_BACKEND": "local",
+            "AGENT_AUDIT_PATH": str(self.path),
+            "AGENT_AUDIT_FLUSH_INTERVAL_MS": "60000",
+        })
+        self._env.start()
+
+    def tearDown(self):
+        audit_log.reset_audit_log_for_tests()
+        self._env.stop()
+        self._dir.cleanup()
+
+    def _events(self, path=None):
+        lines = (path or self.path).read_text(encoding="utf-8").splitlines()
+        return [json.loads(line)["payload"]["n"] for line in lines]
+
+    def test_events_are_written_in_order_as_one_batch(self):
+        for n in range(5):
+            audit_log.log_event("intent_decision", {"n": n})
+        self.assertFalse(self.path.exists())
+
+        self.assertEqual(audit_log.flush_audit_log(), 5)
+        self.assertEqual(self._events(), [0, 1, 2, 3, 4])
+        stats = audit_log.audit_log_stats()
+        self.assertEqual((stats["batches"], stats["fsyncs"], stats["pending"]), (1, 1, 0))
+
+    def test_full_batch_wakes_the_writer(self):
+        written = threading.Event()
+        original = audit_log._write_batch_locked
+
+        def record(batch, fsync=None):
+            count = original(batch, fsync)
+            written.set()
+            return count
+
+        with patch.dict(os.environ, {"AGENT_AUDIT_BATCH_SIZE": "3"}), \
+             patch.object(audit_log, "_write_batch_locked", side_effect=record):
+            for n in range(3):
+                audit_log.log_event("intent_decision", {"n": n})
+            self.assertTrue(written.wait(5))
+        self.assertEqual(self._events(), [0, 1, 2])
+
+    def test_full_queue_drops_new_events_and_counts_them(self):
+        with patch.dict(os.environ, {"AGENT_AUDIT_QUEUE_SIZE": "2", "AGENT_AUDIT_BATCH_SIZE": "100"}):
+            for n in range(4):
+                audit_log.log_event("intent_decision", {"n": n})
+            audit_log.flush_audit_log()
+        self.assertEqual(self._events(), [0, 1])
+        self.assertEqual(audit_log.audit_log_stats()["dropped"], 2)
+
+    def test_shutdown_writes_out_pending_events(self):
+        audit_log.log_event("intent_decision", {"n": 1})
+        audit_log.shutdown_audit_log()
+        self.assertEqual(self._events(), [1])
+
+        audit_log.log_event("intent_decision", {"n": 2})  # after shutdown: written inline
+        self.assertEqual(self._events(), [1, 2])
+
+    def test_large_file_is_rotated(self):
+        self.path.write_text("x" * 32, encoding="utf-8")
+        with patch.dict(os.environ, {"AGENT_AUDIT_MAX_BYTES": "10"}):
+            audit_log.log_event("intent_decision", {"n": 1})
+            audit_log.flush_audit_log()
+        self.assertTrue(Path(str(self.path) + ".1").exists())
+        self.assertEqual(self._events(), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from services.cache_tier import PostgresTier, TtlLru
+from utils.env import env_int, truthy
+
+
+class TtlLruTests(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        entries = TtlLru(lambda: 2, lambda: 60)
+        entries.put("a", 1)
+        entries.put("b", 2)
+        entries.get("a")
+
+        self.assertEqual(entries.put("c", 3), 1)
+        self.assertIsNone(entries.get("b"))
+        self.assertEqual((entries.get("a"), entries.get("c"), len(entries)), (1, 3, 2))
+
+    def test_expired_entry_reads_as_a_miss_and_is_dropped(self):
+        entries = TtlLru(lambda: 10, lambda: 60)
+        entries.put("a", 1)
+
+        with patch("services.cache_tier.time.time", return_value=time.time() + 120):
+            self.assertIsNone(entries.get("a"))
+        self.assertEqual(len(entries), 0)
+
+
+class PostgresTierTests(unittest.TestCase):
+    def setUp(self):
+        self.tier = PostgresTier("TEST_CACHE", "Test cache", "CREATE TABLE IF NOT EXISTS test_cache (k TEXT)")
+
+    def test_disabled_without_the_postgres_backend(self):
+        with patch.dict(os.environ, {"TEST_CACHE_BACKEND": "", "DATABASE_URL": "postgresql://db"}), \
+             patch("psycopg.connect") as connect:
+            self.assertEqual(self.tier.database_url(), "")
+            self.assertIsNone(self.tier.fetchone("SELECT 1", ()))
+            self.tier.execute("SELECT 1", ())
+        connect.assert_not_called()
+
+    def test_failures_degrade_to_a_miss(self):
+        env = {"TEST_CACHE_BACKEND": "postgres", "TEST_CACHE_DATABASE_URL": "postgresql://unavailable"}
+        with patch.dict(os.environ, env), patch("psycopg.connect", side_effect=RuntimeError("db unavailable")):
+            self.assertEqual(self.tier.database_url(), "postgresql://unavailable")
+            self.assertIsNone(self.tier.fetchone("SELECT 1", ()))
+            self.tier.execute("SELECT 1", ())
+
+
+class EnvTests(unittest.TestCase):
+    def test_malformed_values_fall_back_to_the_default(self):
+        with patch.dict(os.environ, {"TEST_KNOB": "lots", "TEST_FLAG": " Yes "}):
+            self.assertEqual(env_int("TEST_KNOB", 5), 5)
+            self.assertTrue(truthy(os.getenv("TEST_FLAG")))
+        with patch.dict(os.environ, {"TEST_KNOB": "-3"}):
+            self.assertEqual(env_int("TEST_KNOB", 5, minimum=1), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
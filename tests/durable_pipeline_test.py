@@ -376,6 +376,7 @@ class DurablePipelineTests(unittest.TestCase):
         self.assertEqual(status_code, 200)
         self.assertEqual(response.get_json()["status"], "degraded")
         self.assertTrue(response.get_json()["security"]["ready"])
+        self.assertIn("keys", response.get_json()["performance"]["groq"])
 
     def test_health_fails_closed_when_production_security_is_missing(self):
         import main
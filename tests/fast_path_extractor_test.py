@@ -0,0 +1,102 @@
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import ai_helper
+from services import fast_path_extractor
+from services.fast_path_extractor import decline_reason, fast_path_stats, match_fast_path
+from services.finance_agent import plan_finance_message
+
+
+def _llm_response(transactions):
+    content = json.dumps({"action": "PROCESS", "confidence": 0.9, "transactions": transactions, "missing_fields": []})
+    message = type("Message", (), {"content": content})()
+    return type("Response", (), {"choices": [type("Choice", (), {"message": message})()]})()
+
+
+class FastPathExtractorTests(unittest.TestCase):
+    def setUp(self):
+        fast_path_extractor.reset_fast_path_stats_for_tests()
+        self._env = patch.dict(os.environ, {"FAST_PATH_MODE": "on", "FINANCE_AGENT_MODE": "hybrid"})
+        self._env.start()
+        self._context = patch("services.finance_agent._safe_sheet_context", return_value={
+            "wallets": [], "known_projects": [], "sheet_context_available": False,
+        })
+        self._context.start()
+
+    def tearDown(self):
+        self._context.stop()
+        self._env.stop()
+        fast_path_extractor.reset_fast_path_stats_for_tests()
+
+    def test_fully_specified_one_liner_scores_high(self):
+        match = match_fast_path("beli semen 500rb dompet TX SBY proyek Taman Sari")
+
+        self.assertEqual(match.confidence, 0.95)
+        self.assertEqual(match.transaction["jumlah"], 500000)
+        self.assertEqual(match.transaction["kategori"], "Bahan Alat")
+        self.assertEqual(match.transaction["nama_projek"], "Taman Sari")
+        self.assertEqual(match.transaction["detected_dompet"], "TX SBY(216)")
+        self.assertEqual(match.transaction["keterangan"], "beli semen")
+
+    def test_missing_project_stays_below_threshold(self):
+        self.assertLess(match_fast_path("beli semen 500rb").confidence, fast_path_extractor.fast_path_min_confidence())
+
+    def test_ambiguous_messages_are_declined(self):
+        cases = {
+            "berapa pengeluaran proyek Taman Sari": "question",
+            "besok beli semen 500rb proyek Taman Sari": "plan",
+            "beli semen 500rb pinjam dari TX SBY proyek Taman Sari": "debt",
+            "kemarin beli semen 500rb proyek Taman Sari": "relative_date",
+            "beli semen 500rb dan pasir 300rb proyek Taman Sari": "multi_item",
+            "beli semen 500rb\nproyek Taman Sari": "multiline",
+        }
+        for text, reason in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(decline_reason(text), reason)
+                self.assertIsNone(match_fast_path(text))
+
+    def test_confident_match_commits_without_llm_call(self):
+        llm_call = MagicMock()
+
+        decision = plan_finance_message("bayar tukang 1.500.000 projek Villa Ubud", "Budi", llm_call=llm_call)
+
+        llm_call.assert_not_called()
+        self.assertTrue(decision.accepted())
+        self.assertEqual(decision.source, "fast_path")
+        self.assertEqual(decision.transactions[0].kategori, "Gaji")
+        stats = fast_path_stats()
+        self.assertEqual((stats["messages"], stats["committed"], stats["coverage"]), (1, 1, 1.0))
+
+    def test_shadow_mode_calls_llm_and_counts_disagreement(self):
+        llm_call = MagicMock(return_value=_llm_response([{
+            "tanggal": "2026-01-05", "kategori": "Bahan Alat", "keterangan": "beli semen",
+            "jumlah": 550000, "tipe": "Pengeluaran", "nama_projek": "Taman Sari",
+        }]))
+
+        with patch.dict(os.environ, {"FAST_PATH_MODE": "shadow"}):
+            decision = plan_finance_message("beli semen 500rb proyek Taman Sari", "Budi", llm_call=llm_call)
+            stats = fast_path_stats()
+
+        llm_call.assert_called_once()
+        self.assertEqual(decision.source, "llm_agent")
+        self.assertEqual((stats["shadowed"], stats["shadow_disagree"]), (1, 1))
+        self.assertEqual(stats["disagree_fields"], {"jumlah": 1})
+        self.assertEqual(stats["shadow_disagreement_rate"], 1.0)
+
+    def test_extract_from_text_commits_fast_path_transaction(self):
+        with patch.object(ai_helper, "call_groq_api") as call:
+            transactions = ai_helper.extract_from_text("beli semen 500rb dompet TX SBY proyek Taman Sari", "Budi")
+
+        call.assert_not_called()
+        self.assertEqual(len(transactions), 1)
+        self.assertEqual(transactions[0]["jumlah"], 500000)
+        self.assertEqual(transactions[0]["nama_projek"], "Taman Sari")
+        self.assertEqual(transactions[0]["detected_dompet"], "TX SBY(216)")
+
+
+if __name__ == "__main__":
+    unittest.main()
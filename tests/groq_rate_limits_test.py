@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import ai_helper
+from services.groq_rate_limits import KeyBudgetScheduler, estimate_request_tokens, parse_reset_duration
+
+
+class _RawResponse:
+    def __init__(self, value, headers):
+        self._value = value
+        self.headers = headers
+
+    def parse(self):
+        return self._value
+
+
+class _FakeRateLimit(Exception):
+    def __init__(self, headers):
+        super().__init__("Error code: 429 - rate limit")
+        self.response = type("Response", (), {"headers": headers})()
+
+
+def _headers(requests, tokens, reset="30s"):
+    return {
+        "x-ratelimit-remaining-requests": str(requests),
+        "x-ratelimit-remaining-tokens": str(tokens),
+        "x-ratelimit-reset-requests": reset,
+        "x-ratelimit-reset-tokens": reset,
+    }
+
+
+class GroqRateLimitSchedulerTests(unittest.TestCase):
+    def test_parse_reset_duration_formats(self):
+        self.assertAlmostEqual(parse_reset_duration("2m59.56s"), 179.56)
+        self.assertAlmostEqual(parse_reset_duration("7.66s"), 7.66)
+        self.assertAlmostEqual(parse_reset_duration("350ms"), 0.35)
+        self.assertEqual(parse_reset_duration("12"), 12.0)
+        self.assertIsNone(parse_reset_duration(""))
+
+    def test_picks_key_with_most_remaining_budget(self):
+        scheduler = KeyBudgetScheduler(3)
+        for idx, remaining in enumerate((5, 900, 40)):
+            scheduler.release(scheduler.acquire(exclude={i for i in range(3) if i != idx}), _headers(remaining, 10000))
+
+        self.assertEqual(scheduler.acquire(est_tokens=100), 1)
+
+    def test_exhausted_key_is_skipped_without_a_round_trip(self):
+        scheduler = KeyBudgetScheduler(2)
+        scheduler.release(scheduler.acquire(exclude={1}), _headers(0, 10000))
+        scheduler.release(scheduler.acquire(exclude={0}), _headers(50, 10000))
+
+        self.assertEqual(scheduler.acquire(preferred=0), 1)
+
+    def test_waits_for_reset_when_every_key_is_exhausted(self):
+        scheduler = KeyBudgetScheduler(1)
+        scheduler.release(scheduler.acquire(), _headers(0, 0, reset="150ms"))
+
+        started = time.monotonic()
+        with patch.dict(os.environ, {"GROQ_SCHEDULER_MAX_WAIT_SECONDS": "2"}):
+            self.assertEqual(scheduler.acquire(est_tokens=10), 0)
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertEqual(scheduler.queue_stats()["waits"], 1)
+        self.assertEqual(scheduler.queue_stats()["wait_timeouts"], 0)
+
+    def test_release_from_other_thread_wakes_waiter(self):
+        scheduler = KeyBudgetScheduler(1)
+        first, in_flight = scheduler.acquire(), scheduler.acquire()
+        scheduler.release(first, _headers(0, 0, reset="10s"))
+        threading.Timer(0.1, lambda: scheduler.release(in_flight, _headers(20, 5000))).start()
+
+        with patch.dict(os.environ, {"GROQ_SCHEDULER_MAX_WAIT_SECONDS": "2"}):
+            started = time.monotonic()
+            self.assertEqual(scheduler.acquire(est_tokens=10), 0)
+
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_estimate_request_tokens_counts_text_and_image_parts(self):
+        kwargs = {
+            "messages": [{"role": "user", "content": [{"type": "text", "text": "x" * 400}, {"type": "image_url"}]}],
+            "max_completion_tokens": 256,
+        }
+        self.assertEqual(estimate_request_tokens(kwargs), 356 + 1600)
+
+    def test_budgets_are_tracked_per_model(self):
+        scheduler = KeyBudgetScheduler(2)
+        scheduler.release(scheduler.acquire(exclude={1}, model="vision"), _headers(0, 10000), model="vision")
+        scheduler.release(scheduler.acquire(exclude={0}, model="vision"), _headers(50, 10000), model="vision")
+
+        # Key 0 is exhausted for the vision model only.
+        self.assertEqual(scheduler.acquire(preferred=0, model="vision"), 1)
+        self.assertEqual(scheduler.acquire(preferred=0, model="text"), 0)
+
+
+class RotatingGroqClientTests(unittest.TestCase):
+    def _client(self, *behaviours):
+        router = ai_helper.RotatingGroqClient(["key-aaaa-1111", "key-bbbb-2222"])
+        for client, behaviour in zip(router._clients, behaviours):
+            patcher = patch.object(client.chat.completions.with_raw_response, "create", side_effect=behaviour)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return router
+
+    def test_headers_steer_next_call_to_key_with_budget(self):
+        calls = []
+
+        def first(**_kwargs):
+            calls.append(0)
+            return _RawResponse("from-0", _headers(0, 100))
+
+        def second(**_kwargs):
+            calls.append(1)
+            return _RawResponse("from-1", _headers(100, 10000))
+
+        router = self._client(first, second)
+        self.assertEqual(router.chat.completions.create(messages=[]), "from-0")
+        self.assertEqual(router.chat.completions.create(messages=[]), "from-1")
+        self.assertEqual(calls, [0, 1])
+        gauges = router.budget_gauges()
+        self.assertEqual([row["model"] for row in gauges["keys"]], ["", ""])
+        self.assertEqual(gauges["keys"][1]["remaining_requests"], 100)
+        self.assertNotIn("key-aaaa-1111", str(gauges))
+
+    def test_rate_limit_still_falls_back_and_cools_key_down(self):
+        def limited(**_kwargs):
+            raise _FakeRateLimit({"retry-after": "20"})
+
+        router = self._client(limited, lambda **_kwargs: _RawResponse("ok", {}))
+        self.assertEqual(router.chat.completions.create(messages=[]), "ok")
+        self.assertGreater(router.budget_gauges()["keys"][0]["cooldown_s"], 10)
+        self.assertEqual(router.budget_gauges()["keys"][0]["rate_limited"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
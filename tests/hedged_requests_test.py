@@ -0,0 +1,88 @@
+import threading
+import time
+import unittest
+
+from services import hedged_requests
+from services.hedged_requests import HedgedCallsFailed, run_hedged
+
+
+class HedgedRequestsTests(unittest.TestCase):
+    def setUp(self):
+        hedged_requests.reset_hedge_stats_for_tests()
+
+    def test_fast_primary_never_launches_secondary(self):
+        launched = []
+
+        name, result = run_hedged(
+            ["primary", "secondary"],
+            lambda model: f"text from {model}",
+            hedge_delay=5.0,
+            on_launch=launched.append,
+        )
+
+        self.assertEqual((name, result), ("primary", "text from primary"))
+        self.assertEqual(launched, ["primary"])
+
+    def test_slow_primary_is_hedged_after_delay_and_loser_abandoned(self):
+        release = threading.Event()
+
+        def call(model):
+            if model == "primary":
+                release.wait(2)
+                return "late primary"
+            return "secondary wins"
+
+        started = time.perf_counter()
+        name, result = run_hedged(["primary", "secondary"], call, hedge_delay=0.05)
+        elapsed = time.perf_counter() - started
+        release.set()
+
+        self.assertEqual((name, result), ("secondary", "secondary wins"))
+        self.assertLess(elapsed, 1.0)
+        deadline = time.time() + 2
+        while "primary" not in hedged_requests.latency_stats() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(hedged_requests.latency_stats()["primary"]["outcomes"], {"abandoned": 1})
+        self.assertEqual(hedged_requests.latency_stats()["secondary"]["outcomes"], {"ok": 1})
+
+    def test_failure_hands_over_without_waiting_for_delay(self):
+        def call(model):
+            if model == "primary":
+                raise RuntimeError("decommissioned")
+            return "ok"
+
+        started = time.perf_counter()
+        name, _ = run_hedged(["primary", "secondary"], call, hedge_delay=30.0)
+
+        self.assertEqual(name, "secondary")
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+    def test_invalid_results_from_every_candidate_raise(self):
+        with self.assertRaises(HedgedCallsFailed) as ctx:
+            run_hedged(["a", "b"], lambda model: "", hedge_delay=0.01, is_valid=bool)
+
+        self.assertIsNone(ctx.exception.last_error)
+        self.assertEqual(hedged_requests.latency_stats()["a"]["outcomes"], {"invalid": 1})
+
+    def test_hedge_immediately_launches_both_candidates(self):
+        launched = []
+        barrier = threading.Barrier(2, timeout=2)
+
+        def call(model):
+            barrier.wait()
+            return model
+
+        # Names of its own, and wait for the loser's late "abandoned" record so
+        # it cannot land in the stats of a later test.
+        run_hedged(["left", "right"], call, hedge_delay=30.0, hedge_immediately=True, on_launch=launched.append)
+        deadline = time.time() + 2
+        while len(hedged_requests.latency_stats()) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(launched, ["left", "right"])
+        outcomes = [stats["outcomes"] for stats in hedged_requests.latency_stats().values()]
+        self.assertCountEqual(outcomes, [{"ok": 1}, {"abandoned": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
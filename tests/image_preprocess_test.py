@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from utils import image_preprocess
+
+
+def _noisy_photo(width: int, height: int) -> bytes:
+    rng = np.random.default_rng(7)
+    image = rng.integers(110, 150, size=(height, width, 3), dtype=np.uint8)
+    cv2.putText(image, "Rp 1.250.000", (20, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (20, 20, 20), 2)
+    ok, buffer = cv2.imencode(".png", image)
+    return buffer.tobytes()
+
+
+class ImagePreprocessTests(unittest.TestCase):
+    def setUp(self):
+        self._env = patch.dict(os.environ, {"OCR_PREPROCESS_WORKERS": "0"})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+
+    def test_small_thumbnail_is_upscaled_to_min_side(self):
+        settings = image_preprocess.preprocess_settings()
+        output = image_preprocess.preprocess_image_bytes(_noisy_photo(300, 200), settings)
+
+        decoded = cv2.imdecode(np.frombuffer(output, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        self.assertEqual(decoded.ndim, 3)
+        self.assertEqual(max(decoded.shape[:2]), 1200)
+
+    def test_grayscale_is_opt_in(self):
+        with patch.dict(os.environ, {"OCR_PREPROCESS_GRAYSCALE": "true"}):
+            settings = image_preprocess.preprocess_settings()
+        output = image_preprocess.preprocess_image_bytes(_noisy_photo(300, 200), settings)
+
+        decoded = cv2.imdecode(np.frombuffer(output, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        self.assertEqual(decoded.ndim, 2)
+
+    def test_large_photo_respects_byte_budget(self):
+        with patch.dict(os.environ, {"OCR_IMAGE_BYTE_BUDGET": "400000"}):
+            settings = image_preprocess.preprocess_settings()
+        source = _noisy_photo(3000, 2000)
+        output = image_preprocess.preprocess_image_bytes(source, settings)
+
+        self.assertLessEqual(len(output), 400000)
+        decoded = cv2.imdecode(np.frombuffer(output, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        self.assertLessEqual(max(decoded.shape), settings["max_side"])
+
+    def test_contrast_is_stretched_for_faded_images(self):
+        faded = np.linspace(100, 150, 256, dtype=np.uint8).reshape(16, 16)
+
+        stretched = image_preprocess._normalize_contrast(faded)
+
+        self.assertLessEqual(int(stretched.min()), 5)
+        self.assertGreaterEqual(int(stretched.max()), 250)
+
+    def test_duplicates_are_dropped_and_undecodable_bytes_pass_through(self):
+        photo = _noisy_photo(400, 300)
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for name, data in (("a.png", photo), ("b.png", photo), ("c.webp", b"not an image")):
+                path = os.path.join(tmp, name)
+                with open(path, "wb") as handle:
+                    handle.write(data)
+                paths.append(path)
+
+            images = image_preprocess.read_unique_images(paths)
+            prepared = image_preprocess.prepare_images(images)
+
+        self.assertEqual([os.path.basename(path) for path, _ in images], ["a.png", "c.webp"])
+        self.assertEqual(prepared[0].mime_type, "image/jpeg")
+        self.assertEqual(prepared[1], image_preprocess.PreparedImage(b"not an image", "image/webp", 12))
+
+    def test_process_pool_matches_inline_output(self):
+        photo = _noisy_photo(500, 400)
+        inline = image_preprocess.preprocess_image_bytes(photo, image_preprocess.preprocess_settings())
+        try:
+            with patch.dict(os.environ, {"OCR_PREPROCESS_WORKERS": "1"}):
+                prepared = image_preprocess.prepare_images([("a.png", photo)])
+        finally:
+            image_preprocess.shutdown_preprocess_pool()
+
+        self.assertEqual(prepared[0].data, inline)
+
+
+if __name__ == "__main__":
+    unittest.main()
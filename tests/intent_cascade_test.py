@@ -0,0 +1,167 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from services import intent_cascade
+from services.intent_cascade import (
+    calibrate_threshold,
+    decide,
+    load_logged_decisions,
+    rule_reason,
+    shadow_report,
+    train_classifier,
+)
+from utils.groq_analyzer import GroqContextAnalyzer
+
+
+CHATTER = [
+    "besok berangkat jam 8 ya", "nanti ketemu di lokasi", "lagi macet parah", "fotonya bagus banget",
+    "udah sampe belum", "hujan deres di sini", "cat temboknya udah kering", "tukang datang siang",
+    "meeting diundur sore", "warnanya kurang terang", "jangan lupa bawa tangga", "klien minta revisi desain",
+]
+FINANCE = [
+    "bayar tukang hari ini", "transfer ke vendor cat", "dp dari klien sudah masuk", "beli semen buat proyek",
+    "catat biaya bensin", "lunas pembayaran termin", "bayar sewa scaffolding", "beli kuas dan roll cat",
+    "pelunasan proyek kafe masuk", "upah harian tukang", "ongkir material ke lokasi", "kasbon tukang minggu ini",
+]
+
+
+def _examples():
+    return [(text, False) for text in CHATTER] * 3 + [(text, True) for text in FINANCE] * 3
+
+
+def _llm_response(payload):
+    message = type("Message", (), {"content": json.dumps(payload)})()
+    return type("Response", (), {"choices": [type("Choice", (), {"message": message})()]})()
+
+
+class IntentCascadeRulesTests(unittest.TestCase):
+    def test_rules_ignore_acknowledgements_and_signal_free_chatter(self):
+        self.assertEqual(rule_reason("wkwkwk oke siap"), "chitchat_only")
+        self.assertEqual(rule_reason("Makasih pak"), "chitchat_only")
+        self.assertEqual(rule_reason("lagi di jalan, macet"), "no_finance_signal")
+
+    def test_rules_escalate_finance_questions_and_commands(self):
+        for text in ("udah bayar tukang belum", "berapa sisa anggaran", "/status", "dp masuk hari ini"):
+            with self.subTest(text=text):
+                self.assertEqual(rule_reason(text), "")
+
+    def test_messages_with_amount_media_or_address_always_reach_llm(self):
+        with patch.dict(os.environ, {"INTENT_CASCADE_MODE": "on"}):
+            self.assertFalse(decide("oke siap", has_media=False, has_amount=False, is_ambient=False).ignore)
+            self.assertFalse(decide("oke siap", has_media=True, has_amount=False, is_ambient=True).ignore)
+            self.assertFalse(decide("siap 50rb", has_media=False, has_amount=True, is_ambient=True).ignore)
+
+
+class IntentCascadeClassifierTests(unittest.TestCase):
+    def setUp(self):
+        intent_cascade.reset_intent_cascade_for_tests()
+
+    def tearDown(self):
+        intent_cascade.reset_intent_cascade_for_tests()
+
+    def test_calibrated_threshold_bounds_false_ignores(self):
+        scores = [0.1, 0.2, 0.3, 0.6, 0.7, 0.8, 0.9]
+        labels = [False, False, True, True, True, True, True]
+
+        self.assertEqual(calibrate_threshold(scores, labels, 0.0), 0.3)
+        self.assertEqual(calibrate_threshold(scores, labels, 0.2), 0.6)
+
+    def test_classifier_separates_chatter_from_finance_and_round_trips(self):
+        model = train_classifier(_examples(), max_false=0.0, epochs=200)
+
+        self.assertLess(model.predict_proba("besok ketemu di lokasi jam 8"), 0.5)
+        self.assertGreater(model.predict_proba("bayar tukang proyek kafe"), 0.5)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.npz")
+            model.save(path)
+            with patch.dict(os.environ, {"INTENT_CASCADE_MODEL_PATH": path}):
+                loaded = intent_cascade.load_classifier()
+        self.assertAlmostEqual(loaded.threshold, model.threshold)
+        self.assertAlmostEqual(loaded.predict_proba("lagi macet"), model.predict_proba("lagi macet"), places=5)
+
+    def test_shadow_report_counts_llm_calls_and_false_ignores(self):
+        model = train_classifier(_examples(), max_false=0.0, epochs=200)
+        examples = [("oke siap", False), ("besok ketemu di lokasi", False), ("bayar tukang", True)]
+
+        report = shadow_report(examples, model)
+
+        self.assertEqual(report["ignored_by_stage"]["rules"], 2)
+        self.assertEqual(report["false_ignore_rate"], 0.0)
+        self.assertAlmostEqual(report["llm_calls_per_1000"], 333.3)
+
+    def test_logged_decisions_are_loaded_from_audit_log(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as handle:
+            for text, reason in (("bayar", "uncertain"), ("transfer 50rb", "not_ambient_chatter"), ("lama", None)):
+                payload = {"text": text, "should_respond": True, "cascade_reason": reason}
+                handle.write(json.dumps({"event_type": "intent_decision", "payload": payload}) + "\n")
+            handle.write(json.dumps({"event_type": "query_agent", "payload": {"question": "x"}}) + "\n")
+            path = handle.name
+        try:
+            self.assertEqual(load_logged_decisions([path]), [("bayar", True)])
+        finally:
+            os.unlink(path)
+
+
+class AnalyzerCascadeTests(unittest.TestCase):
+    def setUp(self):
+        intent_cascade.reset_intent_cascade_for_tests()
+        self._env = patch.dict(os.environ, {"AGENT_AUDIT_BACKEND": "off"})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        intent_cascade.reset_intent_cascade_for_tests()
+
+    def test_ambient_chatter_skips_llm(self):
+        client = MagicMock()
+        analyzer = GroqContextAnalyzer(client)
+
+        with patch.dict(os.environ, {"INTENT_CASCADE_MODE": "on"}):
+            result = analyzer.analyze_message({"text": "wkwk siap bos"}, {"chat_type": "GROUP", "is_ambient": True})
+            stats = intent_cascade.intent_cascade_stats()
+
+        client.chat.completions.create.assert_not_called()
+        self.assertFalse(result["should_respond"])
+        self.assertEqual(result["cascade_stage"], "rules")
+        self.assertEqual((stats["rules_ignored"], stats["llm_calls"]), (1, 0))
+
+    def test_shadow_mode_calls_llm_and_counts_false_ignore(self):
+        client = MagicMock()
+        client.chat.completions.create.return_value = _llm_response(
+            {"should_respond": True, "intent": "CONVERSATIONAL_QUERY", "confidence": 0.8}
+        )
+        analyzer = GroqContextAnalyzer(client)
+
+        with patch.dict(os.environ, {"INTENT_CASCADE_MODE": "shadow", "LLM_CACHE_ENABLED": "false"}):
+            analyzer.analyze_message({"text": "halo semua"}, {"chat_type": "GROUP", "is_ambient": True})
+            stats = intent_cascade.intent_cascade_stats()
+
+        client.chat.completions.create.assert_called_once()
+        self.assertEqual((stats["shadow_compared"], stats["shadow_false_ignores"]), (1, 1))
+        self.assertEqual(stats["shadow_false_ignores_by_stage"], {"rules": 1})
+
+    def test_only_ambient_chatter_is_logged_as_a_label(self):
+        client = MagicMock()
+        client.chat.completions.create.return_value = _llm_response(
+            {"should_respond": True, "intent": "CONVERSATIONAL_QUERY", "confidence": 0.8}
+        )
+        analyzer = GroqContextAnalyzer(client)
+
+        with patch.dict(os.environ, {"INTENT_CASCADE_MODE": "shadow", "LLM_CACHE_ENABLED": "false"}), \
+             patch("agent_core.audit_log.log_event") as log_event:
+            analyzer.analyze_message({"text": "halo semua"}, {"chat_type": "GROUP", "is_ambient": True})
+            analyzer.analyze_message({"text": "halo bot, saldo berapa"}, {"chat_type": "GROUP", "is_ambient": False})
+
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+        payloads = [call.args[1] for call in log_event.call_args_list if call.args[0] == "intent_decision"]
+        self.assertEqual([(p["text"], p["cascade_reason"]) for p in payloads], [("halo semua", "chitchat_only")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch
+
+from services.key_pool import KeyBoundedPool
+
+
+class KeyBoundedPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.pool = KeyBoundedPool("TEST_POOL", per_key=2, ceiling=6, thread_name_prefix="test-pool")
+
+    def tearDown(self):
+        self.pool.reset()
+
+    def test_concurrency_scales_with_keys_and_ignores_malformed_knobs(self):
+        with patch.dict(os.environ, {"TEST_POOL_PER_KEY_CONCURRENCY": "lots", "TEST_POOL_MAX_CONCURRENCY": "5"}):
+            self.assertEqual([self.pool.concurrency(keys) for keys in (0, 1, 2, 4)], [2, 2, 4, 5])
+
+    def test_pool_follows_the_requested_concurrency(self):
+        self.assertEqual(self.pool.run(lambda index, item: item * 10, [1, 2, 3], 2), [10, 20, 30])
+        self.assertEqual(self.pool.size, 2)
+
+        self.pool.run(lambda index, item: item, [1, 2], 6)
+        self.assertEqual(self.pool.size, 6)
+
+    def test_items_run_concurrently_up_to_the_bound(self):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def wait_for_peers(index, item):
+            barrier.wait()
+            return index
+
+        self.assertEqual(self.pool.run(wait_for_peers, ["a", "b", "c"], 3), [0, 1, 2])
+
+    def test_single_item_runs_inline(self):
+        self.assertEqual(self.pool.run(lambda index, item: threading.current_thread().name, ["a"], 4),
+                         [threading.current_thread().name])
+        self.assertEqual(self.pool.size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Synthetic ledger rows shared by the query, index and report tests.
+
+``ledger_row`` builds one hand-written row dated relative to today and
+``window`` applies the ``get_all_data(days)`` cut to a list of them.
+``random_ledger`` builds a seeded ledger for checking an index against a
+plain scan over the same rows; ``redate_recent`` moves such a ledger into the
+last few days so handler windows relative to today see it.
+"""
+
+import random
+from datetime import date, timedelta
+
+SHEETS = ("CV HB(101)", "TX SBY(216)", "TX BALI(087)")
+PROJECTS = ("Villa Canggu", "Villa Canggu (Finish)", "Kafe Kuta", "Operasional", "")
+DESCRIPTIONS = ("beli semen", "cat tembok", "dp klien", "ongkir", "upah tukang")
+LEDGER_START = date(2024, 1, 1)
+
+
+def ledger_row(days_ago, amount, *, project="Villa Canggu", tipe="Pengeluaran", keterangan="beli semen",
+               sheet="CV HB(101)", sheet_row=None):
+    """One row dated ``days_ago`` days before today; ``sheet_row`` also gives it a row identity."""
+    row = {
+        "tanggal": (date.today() - timedelta(days=days_ago)).isoformat(),
+        "jumlah": amount,
+        "tipe": tipe,
+        "nama_projek": project,
+        "keterangan": keterangan,
+        "company_sheet": sheet,
+    }
+    if sheet_row is not None:
+        row.update(sheet_name=sheet, sheet_row=sheet_row)
+    return row
+
+
+def window(rows, days):
+    """The rows ``get_all_data(days)`` returns: dated within the last ``days`` days."""
+    return [row for row in rows if date.fromisoformat(row["tanggal"]) > date.today() - timedelta(days=days)]
+
+
+def random_ledger(count, seed, *, sheets=SHEETS, projects=PROJECTS, descriptions=DESCRIPTIONS,
+                  span_days=900, amount_step=10000, max_steps=50):
+    """``count`` seeded rows from LEDGER_START on; sheet rows are numbered from 10."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        sheet = rng.choice(sheets)
+        rows.append({
+            "tanggal": (LEDGER_START + timedelta(days=rng.randrange(span_days))).isoformat(),
+            "keterangan": rng.choice(descriptions),
+            "jumlah": rng.randrange(1, max_steps) * amount_step,
+            "tipe": rng.choice(("Pemasukan", "Pengeluaran")),
+            "nama_projek": rng.choice(projects),
+            "company_sheet": sheet,
+            "sheet_name": sheet,
+            "sheet_row": 10 + i,
+        })
+    return rows
+
+
+def redate_recent(rows, days):
+    """Copies of ``rows`` dated round-robin over the last ``days`` days, today first."""
+    return [dict(row, tanggal=(date.today() - timedelta(days=i % days)).isoformat()) for i, row in enumerate(rows)]
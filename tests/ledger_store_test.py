@@ -1,5 +1,6 @@
 import unittest
 
+from services import ledger_store
 from services.ledger_store import build_source_key, normalize_row
 
 
@@ -65,5 +66,11 @@ class LedgerStoreNormalizationTests(unittest.TestCase):
         self.assertIsNone(normalized["source_row"])
 
 
+class LedgerStoreSearchTests(unittest.TestCase):
+    def test_search_query_uses_the_indexed_vector(self):
+        # The GIN index only serves the query if both spell the same expression.
+        self.assertIn(ledger_store._SEARCH_VECTOR + " @@ ", ledger_store._SEARCH_QUERY)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,122 @@
+import os
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import ai_helper
+from services import llm_cache
+from utils.groq_analyzer import GroqContextAnalyzer
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        message = type("Message", (), {"content": text})()
+        self.choices = [type("Choice", (), {"message": message})()]
+
+
+def _request(user_text: str, system: str = "system prompt", temperature: float = 0.0) -> dict:
+    return {
+        "model": "model-a",
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user_text},
+        ],
+        "temperature": temperature,
+        "max_tokens": 512,
+        "response_format": {"type": "json_object"},
+    }
+
+
+class LlmCacheTests(unittest.TestCase):
+    def setUp(self):
+        llm_cache.reset_llm_cache_for_tests()
+        self._env = patch.dict(os.environ, {"LLM_CACHE_BACKEND": "", "LLM_CACHE_ENABLED": "true"})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        llm_cache.reset_llm_cache_for_tests()
+
+    def test_repeat_request_is_served_from_cache(self):
+        create = MagicMock(return_value=_FakeResponse('{"intent": "QUERY_STATUS"}'))
+
+        first = llm_cache.cached_completion("site", create, **_request("/saldo"))
+        second = llm_cache.cached_completion("site", create, **_request("  /saldo \n\n"))
+
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(second.choices[0].message.content, first.choices[0].message.content)
+        self.assertTrue(getattr(second, "cached", False))
+        stats = llm_cache.llm_cache_stats()["sites"]["site"]
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_prompt_version_site_and_params_separate_entries(self):
+        create = MagicMock(return_value=_FakeResponse('{"ok": true}'))
+        llm_cache.cached_completion("site", create, **_request("beli semen 50rb"))
+
+        llm_cache.cached_completion("site", create, **_request("beli semen 50rb", system="system prompt v2"))
+        llm_cache.cached_completion("other", create, **_request("beli semen 50rb"))
+        with patch.dict(os.environ, {"LLM_CACHE_VERSION": "2"}):
+            llm_cache.cached_completion("site", create, **_request("beli semen 50rb"))
+
+        self.assertEqual(create.call_count, 4)
+
+    def test_entries_expire_at_day_boundary_and_ttl(self):
+        request = _request("kemarin beli semen 50rb")
+        key_today = llm_cache.build_cache_key("site", request)
+        with patch.object(llm_cache.time, "strftime", return_value="2099-01-01"):
+            self.assertNotEqual(llm_cache.build_cache_key("site", request), key_today)
+
+        create = MagicMock(return_value=_FakeResponse('{"ok": true}'))
+        with patch.dict(os.environ, {"LLM_CACHE_TTL_SECONDS": "60"}):
+            llm_cache.cached_completion("site", create, **request)
+            later = time.time() + 120
+            with patch("services.cache_tier.time.time", return_value=later):
+                llm_cache.cached_completion("site", create, **request)
+        self.assertEqual(create.call_count, 2)
+
+    def test_nonzero_temperature_and_invalid_responses_are_not_cached(self):
+        create = MagicMock(return_value=_FakeResponse('{"ok": true}'))
+        for _ in range(2):
+            llm_cache.cached_completion("site", create, **_request("halo", temperature=0.7))
+        self.assertEqual(create.call_count, 2)
+        self.assertEqual(llm_cache.llm_cache_stats()["sites"]["site"]["bypass"], 2)
+
+        broken = MagicMock(return_value=_FakeResponse("not json"))
+        for _ in range(2):
+            llm_cache.cached_completion(
+                "site", broken, validate=llm_cache.json_object_response, **_request("halo")
+            )
+        self.assertEqual(broken.call_count, 2)
+
+    def test_legacy_extraction_repeat_skips_second_llm_call(self):
+        payload = (
+            '{"transactions": [{"tanggal": "2026-01-05", "kategori": "Bahan Alat", '
+            '"keterangan": "beli semen", "jumlah": 50000, "tipe": "Pengeluaran", "nama_projek": ""}]}'
+        )
+        with patch.object(ai_helper, "finance_agent_enabled", return_value=False), \
+                patch.object(ai_helper, "call_groq_api", return_value=_FakeResponse(payload)) as call:
+            first = ai_helper.extract_from_text("beli semen 50rb", "Budi")
+            second = ai_helper.extract_from_text("beli semen 50rb", "Budi")
+
+        self.assertEqual(call.call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_intent_analyzer_uses_cache(self):
+        client = MagicMock()
+        client.chat.completions.create.return_value = _FakeResponse(
+            '{"should_respond": false, "intent": "IGNORE", "confidence": 0.9}'
+        )
+        analyzer = GroqContextAnalyzer(client)
+
+        message = {"text": "oke siap", "sender": "Budi"}
+        analyzer.analyze_message(message, {"chat_type": "GROUP", "is_ambient": True})
+        analyzer.analyze_message(dict(message), {"chat_type": "GROUP", "is_ambient": True})
+
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+        self.assertEqual(llm_cache.llm_cache_stats()["sites"]["intent_analyzer"]["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
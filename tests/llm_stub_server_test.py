@@ -0,0 +1,91 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from groq import Groq, RateLimitError
+
+from scripts import llm_stub_server
+from scripts.llm_stub_server import StubConfig, scripted_reply, start_server
+from services.finance_agent import FINANCE_AGENT_SYSTEM_PROMPT
+from services.groq_rate_limits import parse_reset_duration
+
+
+class LlmStubServerTests(unittest.TestCase):
+    def _start(self, **overrides):
+        config = StubConfig(latency_ms=0.0, jitter=0.0, **overrides)
+        server = start_server(config)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address[:2]
+        return server, f"http://{host}:{port}"
+
+    def _client(self, base_url, key="stub-key"):
+        return Groq(api_key=key, base_url=base_url, max_retries=0)
+
+    def test_finance_agent_reply_is_parseable_plan(self):
+        reply = scripted_reply([
+            {"role": "system", "content": FINANCE_AGENT_SYSTEM_PROMPT},
+            {"role": "user", "content": json.dumps({"message": "beli semen 500rb proyek Taman Sari"})},
+        ], "openai/gpt-oss-20b", [])
+
+        plan = json.loads(reply)
+        self.assertEqual(plan["action"], "PROCESS")
+        self.assertEqual(plan["transactions"][0]["jumlah"], 500000)
+        self.assertEqual(plan["transactions"][0]["nama_projek"], "Taman Sari")
+
+    def test_scenario_entries_override_builtin_replies(self):
+        reply = scripted_reply(
+            [{"role": "user", "content": "halo bot"}], "m", [{"match": "halo", "reply": "scripted"}]
+        )
+
+        self.assertEqual(reply, "scripted")
+
+    def test_chat_completion_round_trip_carries_rate_limit_headers(self):
+        _server, base_url = self._start(rpm=5)
+
+        raw = self._client(base_url).chat.completions.with_raw_response.create(
+            model="openai/gpt-oss-20b",
+            messages=[{"role": "user", "content": "ping"}],
+        )
+
+        self.assertEqual(raw.parse().choices[0].message.content, "OK")
+        self.assertEqual(raw.headers["x-ratelimit-remaining-requests"], "4")
+        self.assertIsNotNone(parse_reset_duration(raw.headers["x-ratelimit-reset-requests"]))
+
+    def test_exhausted_key_gets_429_while_other_key_still_serves(self):
+        server, base_url = self._start(rpm=1)
+        exhausted = self._client(base_url, "key-a")
+        exhausted.chat.completions.create(model="m", messages=[{"role": "user", "content": "1"}])
+
+        with self.assertRaises(RateLimitError) as caught:
+            exhausted.chat.completions.create(model="m", messages=[{"role": "user", "content": "2"}])
+        self.assertGreaterEqual(int(caught.exception.response.headers["retry-after"]), 1)
+
+        self._client(base_url, "key-b").chat.completions.create(model="m", messages=[{"role": "user", "content": "3"}])
+        self.assertEqual(server.stub_state.stats()["models"]["m"], {"ok": 2, "rate_limited": 1})
+
+    def test_slow_model_latency_is_scaled(self):
+        state = llm_stub_server.StubState(StubConfig(latency_ms=100.0, jitter=0.0, slow_models={"slow": 3.0}))
+
+        self.assertAlmostEqual(state.latency("fast"), 0.1)
+        self.assertAlmostEqual(state.latency("slow"), 0.3)
+
+    def test_rotating_client_uses_configured_base_url(self):
+        _server, base_url = self._start()
+        import ai_helper
+
+        with patch.object(ai_helper, "GROQ_BASE_URL", base_url), \
+                patch.dict(os.environ, {"GROQ_SDK_MAX_RETRIES": "0"}):
+            client = ai_helper.RotatingGroqClient(["stub-a", "stub-b"])
+            response = client.chat.completions.create(model="m", messages=[{"role": "user", "content": "ping"}])
+            transcript = client.audio.transcriptions.create(file=("note.ogg", b"OggS"), model="whisper-large-v3")
+
+        self.assertEqual(response.choices[0].message.content, "OK")
+        self.assertTrue(transcript.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
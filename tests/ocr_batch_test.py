@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import ai_helper
+from services import ocr_batch, ocr_cache
+from services.hedged_requests import HedgedCallsFailed
+from utils.image_preprocess import PreparedImage
+
+
+def _table(*rows):
+    lines = ["DocumentType: STATEMENT_TABLE", "Mutasi Rekening 216"]
+    lines.extend(f"Row {idx} | {row}" for idx, row in enumerate(rows, start=1))
+    return "\n".join(lines)
+
+
+class MergePageTextsTests(unittest.TestCase):
+    def test_statement_pages_merge_and_drop_overlapping_rows(self):
+        page1 = _table(
+            "Date Transfer: 01/06 | Amount: IDR 100,000 | Ref: FT001AAA",
+            "Date Transfer: 01/06 | Amount: IDR 250,000 | Ref: FT002BBB",
+        )
+        page2 = _table(
+            "Date Transfer: 01/06 | Amount: IDR 250,000.00 | Ref: FT002BBB",
+            "Date Transfer: 02/06 | Amount: IDR 75,000 | Ref: FT003CCC",
+        )
+
+        merged = ocr_batch.merge_page_texts([page1, page2])
+
+        self.assertEqual(merged.splitlines(), [
+            "DocumentType: STATEMENT_TABLE",
+            "Mutasi Rekening 216",
+            "Row 1 | Date Transfer: 01/06 | Amount: IDR 100,000 | Ref: FT001AAA",
+            "Row 2 | Date Transfer: 01/06 | Amount: IDR 250,000 | Ref: FT002BBB",
+            "Row 3 | Date Transfer: 02/06 | Amount: IDR 75,000 | Ref: FT003CCC",
+        ])
+
+    def test_only_the_leading_overlap_is_dropped(self):
+        page1 = _table("01/10 | TRSF | 50.000", "02/10 | TRSF | 20.000", "03/10 | TRSF | 10.000")
+        page2 = _table("03/10 | TRSF | 10.000", "01/10 | TRSF | 50.000", "04/10 | X | 5.000")
+
+        rows = [line for line in ocr_batch.merge_page_texts([page1, page2]).splitlines() if line.startswith("Row")]
+
+        self.assertEqual(rows, [
+            "Row 1 | 01/10 | TRSF | 50.000",
+            "Row 2 | 02/10 | TRSF | 20.000",
+            "Row 3 | 03/10 | TRSF | 10.000",
+            "Row 4 | 01/10 | TRSF | 50.000",
+            "Row 5 | 04/10 | X | 5.000",
+        ])
+
+    def test_identical_rows_within_one_page_are_kept(self):
+        row = "Date Transfer: 01/06 | Amount: IDR 50,000 | Status: Berhasil"
+        merged = ocr_batch.merge_page_texts([_table(row, row), _table("Date Transfer: 03/06 | Amount: IDR 9,000")])
+
+        self.assertEqual(merged.count("IDR 50,000"), 2)
+
+    def test_receipt_pages_join_in_order_without_repeats(self):
+        first = "DocumentType: SINGLE_RECEIPT\nAmount: IDR 200,000.00"
+        second = "DocumentType: SINGLE_RECEIPT\nAmount: IDR 90,000.00"
+
+        merged = ocr_batch.merge_page_texts([first, "", second, first])
+
+        self.assertEqual(merged, f"{first}\n\n{second}")
+
+    def test_concurrency_scales_with_keys_up_to_ceiling(self):
+        with patch.dict(os.environ, {"OCR_BATCH_PER_KEY_CONCURRENCY": "2", "OCR_BATCH_MAX_CONCURRENCY": "8"}):
+            self.assertEqual(ocr_batch.batch_concurrency(1), 2)
+            self.assertEqual(ocr_batch.batch_concurrency(3), 6)
+            self.assertEqual(ocr_batch.batch_concurrency(10), 8)
+
+
+class OcrImageBatchTests(unittest.TestCase):
+    def setUp(self):
+        ocr_cache.reset_ocr_cache_for_tests()
+        ocr_batch.reset_page_pool_for_tests()
+        self._tmp = tempfile.TemporaryDirectory()
+        self._env = patch.dict(os.environ, {"OCR_CACHE_BACKEND": "", "OCR_BATCH_ENABLED": "true"})
+        self._env.start()
+        self.paths = []
+        for idx in range(4):
+            path = os.path.join(self._tmp.name, f"page{idx}.jpg")
+            with open(path, "wb") as handle:
+                handle.write(f"page-{idx}".encode())
+            self.paths.append(path)
+
+    def tearDown(self):
+        self._env.stop()
+        self._tmp.cleanup()
+        ocr_batch.reset_page_pool_for_tests()
+        ocr_cache.reset_ocr_cache_for_tests()
+
+    def _fake_prepare(self, images):
+        return [PreparedImage(data, "image/jpeg", len(data)) for _path, data in images]
+
+    def test_pages_run_concurrently_and_merge_in_page_order(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def fake_transcribe(prepared, _announce):
+            page = int(prepared[0].data.decode().split("-")[1])
+            with lock:
+                active.append(page)
+                peak.append(len(active))
+            time.sleep(0.05 * (4 - page))
+            with lock:
+                active.remove(page)
+            return "model-a", f"DocumentType: SINGLE_RECEIPT\nAmount: IDR {page + 1}00,000.00"
+
+        with patch.object(ai_helper, "prepare_images", side_effect=self._fake_prepare), \
+                patch.object(ai_helper, "_vision_transcribe", side_effect=fake_transcribe):
+            text = ai_helper.ocr_image(self.paths)
+
+        amounts = [line for line in text.splitlines() if line.startswith("Amount")]
+        self.assertEqual(amounts, [f"Amount: IDR {idx}00,000.00" for idx in range(1, 5)])
+        self.assertGreater(max(peak), 1)
+
+    def test_failed_page_raises_and_readable_pages_are_cached(self):
+        def fake_transcribe(prepared, _announce):
+            if prepared[0].data == b"page-2":
+                raise HedgedCallsFailed(TimeoutError())
+            return "model-a", f"text {prepared[0].data.decode()}"
+
+        with patch.object(ai_helper, "prepare_images", side_effect=self._fake_prepare), \
+                patch.object(ai_helper, "_vision_transcribe", side_effect=fake_transcribe) as transcribe:
+            with self.assertRaises(ocr_batch.OcrPagesFailed) as failure:
+                ai_helper.ocr_image(self.paths)
+            self.assertEqual(failure.exception.pages, [3])
+
+            with self.assertRaises(ocr_batch.OcrPagesFailed):
+                ai_helper.ocr_image(self.paths)
+
+        # The resend reuses the three cached pages and retries only the failed one.
+        self.assertEqual(transcribe.call_count, 5)
+
+if __name__ == "__main__":
+    unittest.main()
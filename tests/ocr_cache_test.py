@@ -0,0 +1,104 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import ai_helper
+from services import ocr_cache
+
+
+def _receipt_image(amount: str) -> np.ndarray:
+    image = np.full((640, 360, 3), 255, dtype=np.uint8)
+    cv2.rectangle(image, (0, 0), (360, 90), (180, 110, 20), -1)
+    cv2.putText(image, "Transfer Berhasil", (20, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    cv2.putText(image, amount, (20, 260), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (0, 0, 0), 3)
+    return image
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        message = type("Message", (), {"content": text})()
+        self.choices = [type("Choice", (), {"message": message})()]
+
+
+class OcrCacheTests(unittest.TestCase):
+    def setUp(self):
+        ocr_cache.reset_ocr_cache_for_tests()
+        self._tmp = tempfile.TemporaryDirectory()
+        self._env = patch.dict(os.environ, {"OCR_CACHE_BACKEND": "", "OCR_CACHE_ENABLED": "true", "OCR_PREPROCESS_WORKERS": "0"})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        self._tmp.cleanup()
+        ocr_cache.reset_ocr_cache_for_tests()
+
+    def _write(self, name: str, image: np.ndarray, quality: int = 95) -> str:
+        path = os.path.join(self._tmp.name, name)
+        cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return path
+
+    def test_exact_repeat_hits_without_vision_call(self):
+        path = self._write("a.jpg", _receipt_image("Rp 200.000"))
+        with patch.object(ai_helper, "call_groq_api", return_value=_FakeResponse("Amount: IDR 200,000.00")) as call:
+            first = ai_helper.ocr_image(path)
+            second = ai_helper.ocr_image(path)
+
+        self.assertEqual(first, second)
+        self.assertEqual(call.call_count, 1)
+        self.assertEqual(ocr_cache.ocr_cache_stats()["hits"], 1)
+
+    def test_recompressed_forward_is_ocr_again(self):
+        image = _receipt_image("Rp 200.000")
+        key = ocr_cache.key_for_images([self._write("orig.jpg", image, 95)])
+        ocr_cache.store(key, "model-a", "Amount: IDR 200,000.00")
+
+        forwarded = ocr_cache.key_for_images([self._write("fwd.jpg", image, 70)])
+        self.assertNotEqual(key.content_hash, forwarded.content_hash)
+        self.assertIsNone(ocr_cache.lookup(forwarded))
+
+    def test_same_layout_with_different_amount_misses(self):
+        key = ocr_cache.key_for_images([self._write("a.jpg", _receipt_image("Rp 1.500.000"))])
+        ocr_cache.store(key, "model-a", "Amount: IDR 1,500,000.00")
+
+        for idx, amount in enumerate(("Rp 1.600.000", "Rp 1.508.000", "Rp 1.500.500", "Rp 1.300.000")):
+            other = ocr_cache.key_for_images([self._write(f"b{idx}.jpg", _receipt_image(amount))])
+            self.assertIsNone(ocr_cache.lookup(other))
+
+    def test_namespace_change_invalidates_entries(self):
+        path = self._write("a.jpg", _receipt_image("Rp 200.000"))
+        ocr_cache.store(ocr_cache.key_for_images([path], namespace="v1"), "model-a", "text")
+
+        self.assertIsNone(ocr_cache.lookup(ocr_cache.key_for_images([path], namespace="v2")))
+
+    def test_ttl_and_size_bound_evict_entries(self):
+        with patch.dict(os.environ, {"OCR_CACHE_MAX_ENTRIES": "2", "OCR_CACHE_TTL_SECONDS": "60"}):
+            keys = [
+                ocr_cache.build_key([ocr_cache.OcrCacheKey(f"hash-{idx}")])
+                for idx in range(3)
+            ]
+            for key in keys:
+                ocr_cache.store(key, "model-a", "text")
+
+            self.assertIsNone(ocr_cache.lookup(keys[0]))
+            self.assertIsNotNone(ocr_cache.lookup(keys[2]))
+            self.assertEqual(ocr_cache.ocr_cache_stats()["evictions"], 1)
+
+            with patch("services.cache_tier.time.time", return_value=time.time() + 120):
+                self.assertIsNone(ocr_cache.lookup(keys[1]))
+
+    def test_empty_ocr_text_is_not_cached(self):
+        key = ocr_cache.build_key([ocr_cache.OcrCacheKey("hash")])
+        ocr_cache.store(key, "model-a", "   ")
+
+        self.assertIsNone(ocr_cache.lookup(key))
+
+
+if __name__ == "__main__":
+    unittest.main()
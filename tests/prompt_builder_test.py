@@ -0,0 +1,90 @@
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import ai_helper
+from services import finance_agent, llm_cache, prompt_builder
+
+
+class PromptBuilderTests(unittest.TestCase):
+    def setUp(self):
+        prompt_builder.reset_prompt_stats_for_tests()
+        llm_cache.reset_llm_cache_for_tests()
+
+    def tearDown(self):
+        prompt_builder.reset_prompt_stats_for_tests()
+        llm_cache.reset_llm_cache_for_tests()
+
+    def test_estimate_tracks_words_and_punctuation(self):
+        self.assertEqual(prompt_builder.estimate_tokens(""), 0)
+        self.assertEqual(prompt_builder.estimate_tokens("beli semen"), 3)
+        self.assertEqual(prompt_builder.estimate_tokens({"a": 1}), 7)
+
+    def test_conversation_keeps_most_recent_lines(self):
+        history = "\n".join(f"user: pesan nomor {idx} tentang semen" for idx in range(50))
+
+        fitted = prompt_builder.fit_section("site", "conversation", history, 40, keep="tail")
+
+        self.assertLessEqual(prompt_builder.estimate_tokens(fitted), 40)
+        self.assertTrue(fitted.endswith("pesan nomor 49 tentang semen"))
+        self.assertEqual(prompt_builder.prompt_token_stats()["site"]["truncations"], {"conversation": 1})
+
+    def test_list_section_keeps_leading_items_and_env_overrides_budget(self):
+        rows = [{"keterangan": f"row {idx}", "jumlah": idx * 1000} for idx in range(100)]
+
+        fitted = prompt_builder.fit_section("site", "evidence", rows, 200)
+        self.assertEqual(fitted, rows[:len(fitted)])
+        self.assertLess(len(fitted), len(rows))
+
+        with patch.dict(os.environ, {"PROMPT_BUDGET_EVIDENCE_TOKENS": "100000"}):
+            self.assertEqual(prompt_builder.fit_section("site", "evidence", rows, 200), rows)
+
+    def test_finance_agent_prompt_is_budgeted_with_stable_system_prefix(self):
+        context = {"wallets": [], "known_projects": [f"Project {idx:03d} Renovasi" for idx in range(400)]}
+        history = "\n".join(f"user: chat lama {idx}" for idx in range(400))
+
+        first = finance_agent._agent_prompt("beli semen 50rb", "Budi", context, history)
+        second = finance_agent._agent_prompt("bayar tukang 1jt", "Sari", context, "")
+
+        self.assertEqual(first[0]["content"], second[0]["content"])
+        payload = json.loads(first[1]["content"])
+        self.assertLess(len(payload["spreadsheet_context"]["known_projects"]), 400)
+        self.assertIn("chat lama 399", payload["conversation_context"])
+        self.assertNotIn("chat lama 0\n", payload["conversation_context"])
+        self.assertEqual(len(context["known_projects"]), 400)
+
+    def test_extraction_prompt_keeps_static_prefix_and_puts_context_last(self):
+        budi = ai_helper.get_extraction_prompt("Budi")
+        sari = ai_helper.get_extraction_prompt("Sari")
+        static = ai_helper._extraction_prompt_static()
+
+        self.assertTrue(budi.startswith(static) and sari.startswith(static))
+        self.assertTrue(budi.rstrip().endswith("Sender: Budi"))
+
+    def test_cached_completion_records_usage_per_call_site(self):
+        usage = type("Usage", (), {"prompt_tokens": 120, "completion_tokens": 30})()
+        message = type("Message", (), {"content": '{"ok": true}'})()
+        response = type("Response", (), {"choices": [type("Choice", (), {"message": message})()], "usage": usage})()
+        create = MagicMock(return_value=response)
+        request = {
+            "model": "model-a",
+            "temperature": 0.0,
+            "messages": [{"role": "system", "content": "s"}, {"role": "user", "content": "halo"}],
+        }
+
+        with patch.dict(os.environ, {"LLM_CACHE_BACKEND": "", "LLM_CACHE_ENABLED": "true"}):
+            llm_cache.cached_completion("extract", create, **request)
+            llm_cache.cached_completion("extract", create, **request)
+
+        stats = prompt_builder.prompt_token_stats()["extract"]
+        self.assertEqual((stats["calls"], stats["cached"]), (2, 1))
+        self.assertEqual((stats["tokens_in"], stats["tokens_out"]), (120, 30))
+        self.assertEqual(stats["avg_tokens_out"], 30.0)
+        self.assertGreater(stats["tokens_in_est"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
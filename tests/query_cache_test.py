@@ -0,0 +1,82 @@
+import os
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import sheets_helper
+from handlers import nl_query_handler
+from services import query_cache
+
+
+PLAN = {
+    "intent": "summary",
+    "metric": "sum",
+    "filters": {"tipe": "Pengeluaran"},
+    "group_by": None,
+    "period_days": 30,
+}
+ROWS = [{"tanggal": "2026-08-02", "nama_projek": "Villa", "jumlah": 500000, "tipe": "Pengeluaran"}]
+
+
+class QueryCacheTests(unittest.TestCase):
+    def setUp(self):
+        query_cache.reset_query_cache_for_tests()
+        self._env = patch.dict(os.environ, {
+            "QUERY_CACHE_ENABLED": "true",
+            "AGENT_AUDIT_BACKEND": "off",
+            # These tests count answer-LLM calls; keep every shape on the LLM path.
+            "QUERY_TEMPLATE_ANSWERS_ENABLED": "false",
+        })
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        query_cache.reset_query_cache_for_tests()
+
+    def _ask(self, question):
+        with patch.object(nl_query_handler, "get_all_data", return_value=list(ROWS)):
+            return nl_query_handler.handle_nl_query(question, default_days=30)
+
+    def test_repeat_question_is_answered_without_llm_calls(self):
+        with patch.object(nl_query_handler, "_ask_llm_for_plan", return_value=PLAN) as plan_llm, \
+             patch.object(nl_query_handler, "_answer_from_facts", return_value="total 500rb") as answer_llm:
+            first = self._ask("Total pengeluaran bulan ini?")
+            second = self._ask("total  pengeluaran bulan ini")
+
+        self.assertEqual((first, second), ("total 500rb", "total 500rb"))
+        self.assertEqual((plan_llm.call_count, answer_llm.call_count), (1, 1))
+        stats = query_cache.query_cache_stats()
+        self.assertEqual((stats["plan_hits"], stats["answer_hits"]), (1, 1))
+
+    def test_ledger_write_invalidates_cached_answer_but_keeps_plan(self):
+        with patch.object(nl_query_handler, "_ask_llm_for_plan", return_value=PLAN) as plan_llm, \
+             patch.object(nl_query_handler, "_answer_from_facts", side_effect=["lama", "baru"]) as answer_llm:
+            self._ask("total pengeluaran")
+            sheets_helper.invalidate_dashboard_cache()
+            answer = self._ask("total pengeluaran")
+
+        self.assertEqual(answer, "baru")
+        self.assertEqual((plan_llm.call_count, answer_llm.call_count), (1, 2))
+
+    def test_supplied_rows_bypass_answer_cache(self):
+        with patch.object(nl_query_handler, "_ask_llm_for_plan", return_value=PLAN), \
+             patch.object(nl_query_handler, "_answer_from_facts", return_value="jawaban") as answer_llm:
+            nl_query_handler.handle_nl_query("total pengeluaran", rows=ROWS, default_days=30)
+            nl_query_handler.handle_nl_query("total pengeluaran", rows=ROWS, default_days=30)
+
+        self.assertEqual(answer_llm.call_count, 2)
+        self.assertEqual(query_cache.query_cache_stats()["answer_bypass"], 2)
+
+    def test_question_wallet_inputs_are_part_of_answer_key(self):
+        plan = nl_query_handler._normalize_plan(PLAN, 30)
+        inputs = nl_query_handler._question_inputs("total pengeluaran", plan)
+        key = query_cache.answer_key(plan, inputs, 1)
+        saldo_key = query_cache.answer_key(plan, nl_query_handler._question_inputs("sisa saldo", plan), 1)
+
+        self.assertNotEqual(key, saldo_key)
+        self.assertNotEqual(key, query_cache.answer_key(plan, inputs, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
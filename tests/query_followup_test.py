@@ -0,0 +1,131 @@
+import os
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import sheets_helper
+from handlers import nl_query_handler
+from services import ledger_index, query_cache, query_followup
+from tests.ledger_fixtures import ledger_row, window
+
+
+ROWS = [
+    ledger_row(1, 1250000, sheet_row=10),
+    ledger_row(3, 500000, project="Kafe Kuta", keterangan="cat tembok", sheet_row=11),
+    ledger_row(5, 2000000, tipe="Pemasukan", keterangan="DP klien", sheet_row=12),
+    ledger_row(20, 300000, project="Kafe Kuta", keterangan="ongkir", sheet_row=13),
+    ledger_row(40, 750000, sheet_row=14),
+]
+
+SPENDING_PLAN = {
+    "intent": "summary", "metric": "sum", "filters": {"tipe": "Pengeluaran"},
+    "group_by": None, "period_days": 30,
+}
+
+
+class NarrowPlanTests(unittest.TestCase):
+    def setUp(self):
+        query_followup.reset_query_followup_for_tests()
+        self.plan = nl_query_handler._normalize_plan(dict(SPENDING_PLAN), 30)
+
+    def test_project_and_detail_are_added_as_filters(self):
+        narrowed = query_followup.narrow_plan("khusus proyek kafe kuta aja", self.plan)
+        self.assertEqual(narrowed["ast"]["filters"]["project"], "kafe kuta")
+        self.assertEqual(narrowed["ast"]["filters"]["tipe"], "Pengeluaran")
+
+        detailed = query_followup.narrow_plan("detailnya", self.plan)
+        self.assertTrue(detailed["detail"])
+
+    def test_questions_that_widen_or_change_scope_are_not_narrowing(self):
+        for question in (
+            "berapa total pemasukan proyek villa canggu bulan lalu",  # a full new question
+            "yang pemasukan",  # conflicts with the cached tipe
+            "yang 90 hari",  # outside the cached 30-day window
+            "yang lain",
+        ):
+            with self.subTest(question=question):
+                self.assertIsNone(query_followup.narrow_plan(question, self.plan))
+
+    def test_contained_period_becomes_a_date_filter(self):
+        today = date(2026, 3, 20)
+        narrowed = query_followup.narrow_plan("yang 7 hari terakhir", self.plan, today=today)
+        self.assertEqual(narrowed["ast"]["filters"]["date_from"], "2026-03-14")
+        self.assertEqual(narrowed["ast"]["filters"]["date_to"], "2026-03-20")
+
+
+class FollowupAnswerTests(unittest.TestCase):
+    def setUp(self):
+        query_cache.reset_query_cache_for_tests()
+        query_followup.reset_query_followup_for_tests()
+        ledger_index.reset_ledger_index_for_tests()
+        self._env = patch.dict(os.environ, {"QUERY_CACHE_ENABLED": "false", "AGENT_AUDIT_BACKEND": "off"})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        ledger_index.reset_ledger_index_for_tests()
+
+    def _ask_first(self):
+        with patch.object(nl_query_handler, "_ask_llm_for_plan", return_value=dict(SPENDING_PLAN)), \
+             patch.object(nl_query_handler, "get_all_data", side_effect=lambda days: window(ROWS, days) if days else list(ROWS)):
+            return nl_query_handler.handle_nl_query("pengeluaran 30 hari", default_days=30)
+
+    def _follow(self, question):
+        with patch.object(nl_query_handler, "_ask_llm_for_plan") as plan_llm, \
+             patch.object(nl_query_handler, "get_all_data") as read:
+            answer = nl_query_handler.handle_nl_followup(question)
+        self.assertEqual((plan_llm.call_count, read.call_count), (0, 0))
+        return answer
+
+    def test_followups_narrow_the_previous_result_without_reading_the_ledger(self):
+        with patch("sheets_helper.get_all_data", return_value=list(ROWS)), query_followup.followup_scope("chat-1"):
+            first = self._ask_first()
+            project = self._follow("khusus proyek kafe kuta")
+            detail = self._follow("detailnya")
+
+        self.assertEqual(first, "Total pengeluaran (30 hari terakhir): Rp 2.050.000 dari 3 transaksi.")
+        self.assertEqual(project, "Total pengeluaran projek kafe kuta (30 hari terakhir): Rp 800.000 dari 2 transaksi.")
+        detail_lines = detail.splitlines()
+        self.assertEqual(len(detail_lines), 4)
+        self.assertIn("cat tembok [Kafe Kuta]", detail_lines[2])
+        self.assertEqual(query_followup.query_followup_stats()["hits"], 2)
+
+    def test_operational_rows_resolve_after_an_appended_row_was_indexed(self):
+        operational = dict(ledger_row(2, 400000, project="", keterangan="listrik kantor"),
+                           sheet_name="Operasional Kantor", sheet_row=4)
+        with patch("sheets_helper.get_all_data", return_value=list(ROWS)):
+            ledger_index.get_time_index()
+            # The append hook mirrors the row with its block; get_all_data rows carry only tipe.
+            ledger_index.record_row(dict(operational, source_block="operasional"))
+        ROWS.append(operational)
+        try:
+            with query_followup.followup_scope("chat-1"):
+                first = self._ask_first()
+                detail = self._follow("detailnya")
+        finally:
+            ROWS.remove(operational)
+
+        self.assertIn("dari 4 transaksi", first)
+        self.assertIn("listrik kantor", detail)
+
+    def test_ledger_write_retires_the_result_set(self):
+        with patch("sheets_helper.get_all_data", return_value=list(ROWS)), query_followup.followup_scope("chat-1"):
+            self._ask_first()
+            sheets_helper.bump_ledger_data_version()
+            self.assertIsNone(nl_query_handler.handle_nl_followup("detailnya"))
+
+        self.assertEqual(query_followup.query_followup_stats()["invalidated"], 1)
+
+    def test_result_sets_are_per_chat(self):
+        with patch("sheets_helper.get_all_data", return_value=list(ROWS)):
+            with query_followup.followup_scope("chat-1"):
+                self._ask_first()
+            with query_followup.followup_scope("chat-2"):
+                self.assertIsNone(nl_query_handler.handle_nl_followup("detailnya"))
+            self.assertIsNone(nl_query_handler.handle_nl_followup("detailnya"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,7 @@ from unittest.mock import patch
 
 from handlers import query_handler
 from handlers import nl_query_handler
+from services import query_cache
 
 
 def _project_row(
@@ -29,9 +30,11 @@ class QueryHandlerTests(unittest.TestCase):
     def setUp(self):
         self._agent_env = patch.dict(os.environ, {"QUERY_AGENT_ENABLED": "false"})
         self._agent_env.start()
+        query_cache.reset_query_cache_for_tests()
 
     def tearDown(self):
         self._agent_env.stop()
+        query_cache.reset_query_cache_for_tests()
 
     def test_project_activity_phrase_is_not_treated_as_project_name(self):
         with patch.object(
@@ -105,7 +108,8 @@ class QueryHandlerTests(unittest.TestCase):
             "period_days": 30,
             "detail": False,
         }), patch.object(nl_query_handler, "get_all_data", return_value=rows), \
-             patch.object(nl_query_handler, "_answer_from_facts", side_effect=answer_from_facts):
+             patch.object(nl_query_handler, "_answer_from_facts", side_effect=answer_from_facts), \
+             patch.dict(os.environ, {"QUERY_TEMPLATE_ANSWERS_ENABLED": "false"}):
             answer = nl_query_handler.handle_nl_query(
                 "project yang dikerjakan",
                 default_days=30,
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import pdf_report
+
+
+LOGO = os.path.join(os.path.dirname(pdf_report.__file__), "assets", "Hollawall Logo-white-06.png")
+LEDGER = [
+    pdf_report._normalize_tx({"tanggal": "2025-01-05", "company_sheet": "TX SBY(216)", "nama_projek": "Villa A",
+                              "keterangan": "dp klien", "jumlah": 5000000, "tipe": "Pemasukan"}),
+]
+
+
+class ReportAssetTests(unittest.TestCase):
+    def setUp(self):
+        pdf_report.reset_report_assets_for_tests()
+        self._dir = tempfile.TemporaryDirectory()
+        self._env = patch.dict(os.environ, {"HOLLAWALL_LOGO_PATH": LOGO})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        self._dir.cleanup()
+        pdf_report.reset_report_assets_for_tests()
+
+    def _render(self, fname):
+        ctx = pdf_report._build_context_monthly(2025, 1, LEDGER)
+        with open(pdf_report.render_report_file(ctx, self._dir.name, fname), "rb") as handle:
+            return handle.read()
+
+    def test_fonts_and_logo_load_once_per_process(self):
+        pdf_report.warm_report_assets()
+        self._render("a.pdf")
+        self._render("b.pdf")
+
+        stats = pdf_report.report_assets_stats()
+        self.assertEqual((stats["font_loads"], stats["logo_loads"]), (1, 1))
+        self.assertGreaterEqual(stats["logo_hits"], 2)
+
+    def test_cached_logo_output_matches_a_fresh_reader(self):
+        from reportlab import rl_config
+        from reportlab.lib.utils import ImageReader
+
+        def draw_image(c, asset, x, y, w, h):
+            c.drawImage(ImageReader(LOGO), x, y, width=w, height=h, mask="auto")
+
+        with patch.object(rl_config, "invariant", 1):
+            cached = self._render("cached.pdf")
+            with patch.object(pdf_report, "_place_logo", draw_image):
+                direct = self._render("direct.pdf")
+        self.assertEqual(cached, direct)
+
+    def test_register_fonts_returns_a_private_copy(self):
+        fonts = pdf_report.register_fonts()
+        fonts["bold"] = "Courier"
+        self.assertNotEqual(pdf_report.register_fonts()["bold"], "Courier")
+
+    def test_missing_logo_is_skipped(self):
+        self.assertIsNone(pdf_report._logo_asset(os.path.join(self._dir.name, "missing.png")))
+        self.assertEqual(pdf_report.report_assets_stats()["logo_loads"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
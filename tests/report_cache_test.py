@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import pdf_report
+from services import report_cache
+
+
+def _ledger(extra_amount=0):
+    rows = [
+        {"tanggal": "2025-01-05", "company_sheet": "TX SBY(216)", "nama_projek": "Villa A", "keterangan": "dp klien", "jumlah": 5000000, "tipe": "Pemasukan"},
+        {"tanggal": "2025-01-09", "company_sheet": "TX SBY(216)", "nama_projek": "Villa A", "keterangan": "material", "jumlah": 1200000 + extra_amount, "tipe": "Pengeluaran"},
+        {"tanggal": "2025-01-20", "company_sheet": "CV HB(101)", "nama_projek": "HOJJA - Kafe B (Finish)", "keterangan": "pelunasan", "jumlah": 3000000, "tipe": "Pemasukan"},
+        {"tanggal": "2025-02-03", "company_sheet": "Operasional Kantor", "nama_projek": "", "keterangan": "listrik", "jumlah": 400000, "tipe": "Pengeluaran"},
+    ]
+    return [pdf_report._normalize_tx(row) for row in rows]
+
+
+class ReportCacheTests(unittest.TestCase):
+    def setUp(self):
+        report_cache.reset_report_cache_for_tests()
+        self._dir = tempfile.TemporaryDirectory()
+        self._env = patch.dict(os.environ, {"REPORT_CACHE_DIR": self._dir.name, "REPORT_CACHE_BACKEND": ""})
+        self._env.start()
+
+    def tearDown(self):
+        self._env.stop()
+        self._dir.cleanup()
+
+    def _generate(self, ledger, output_dir=None):
+        with patch.object(pdf_report, "_get_all_transactions", return_value=ledger), \
+             patch.object(pdf_report, "_build_context_monthly", wraps=pdf_report._build_context_monthly) as build, \
+             patch.object(pdf_report, "render_report_file", wraps=pdf_report.render_report_file) as render:
+            path = pdf_report.generate_pdf_report_v4_monthly(2025, 1, output_dir=output_dir)
+        return path, build.call_count, render.call_count
+
+    def test_repeat_request_is_served_from_disk(self):
+        first, builds, renders = self._generate(_ledger())
+        self.assertEqual((builds, renders), (1, 1))
+        self.assertTrue(first.startswith(self._dir.name))
+        self.assertEqual(os.path.basename(first), "Laporan_Keuangan_JAN_25.pdf")
+
+        again, builds, renders = self._generate(_ledger())
+        self.assertEqual((again, builds, renders), (first, 0, 0))
+        self.assertEqual(report_cache.report_cache_stats()["pdf_hits"], 1)
+
+    def test_edit_to_a_contributing_row_renders_again(self):
+        first, _, _ = self._generate(_ledger())
+        edited, builds, renders = self._generate(_ledger(extra_amount=1000))
+        self.assertNotEqual(edited, first)
+        self.assertEqual((builds, renders), (1, 1))
+
+    def test_rows_after_the_period_do_not_change_the_key(self):
+        ledger = _ledger()
+        first, _, _ = self._generate(ledger[:3])
+        again, builds, _ = self._generate(ledger)
+        self.assertEqual((again, builds), (first, 0))
+
+    def test_closed_period_context_is_frozen(self):
+        with tempfile.TemporaryDirectory() as out_dir:
+            self._generate(_ledger(), output_dir=out_dir)
+            _, builds, renders = self._generate(_ledger(), output_dir=out_dir)
+        self.assertEqual((builds, renders), (0, 1))
+        self.assertEqual(report_cache.report_cache_stats()["snapshot_hits"], 1)
+
+    def test_snapshot_round_trips_datetimes(self):
+        key = report_cache.build_key("monthly:2025-01", "all", [])
+        context = {"start_dt": datetime(2025, 1, 1), "rows": [{"dt": datetime(2025, 1, 5), "jumlah": 5}]}
+        report_cache.store_snapshot(key, context)
+        self.assertEqual(report_cache.load_snapshot(key), context)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import pdf_report
+from tests.ledger_fixtures import random_ledger
+
+
+SHEETS = ("CV HB(101)", "TX SBY(216)", "TX BALI(087)", "Operasional Kantor", "Dompet Lain")
+PROJECTS = ("HOJJA - Villa A", "HOLLA - Kafe B", "Rumah C", "Rumah C (Finish)", "Saldo Umum", "")
+DESCRIPTIONS = ("material", "dp klien", "dp 2 klien", "pelunasan proyek", "gaji tukang", "hutang ke dompet X", "biaya transfer")
+
+
+def _ledger(count=600, seed=5):
+    rows = random_ledger(count, seed, sheets=SHEETS, projects=PROJECTS, descriptions=DESCRIPTIONS,
+                         span_days=700, amount_step=50000, max_steps=20)
+    return [
+        pdf_report._normalize_tx(dict(
+            row,
+            # Half the salary rows are only recognisable by their description.
+            kategori="Gaji" if row["keterangan"].startswith("gaji") and row["sheet_row"] % 2 else "Lain-lain",
+        ))
+        for row in rows
+    ]
+
+
+def _reference_sections(all_txs, start_dt, end_dt, prev_start, prev_end):
+    """The per-company scans the cube replaced."""
+    period_txs = pdf_report._filter_period(all_txs, start_dt, end_dt)
+    prev_txs = pdf_report._filter_period(all_txs, prev_start, prev_end)
+    as_of_txs = [t for t in all_txs if t["dt"] <= end_dt]
+    finished_projects = pdf_report._finished_projects_by_company(period_txs)
+    company_details = {}
+    for comp in pdf_report.COMPANY_KEYS:
+        comp_txs = [t for t in period_txs if pdf_report._company_from_tx(t) == comp]
+        comp_txs_asof = [t for t in as_of_txs if pdf_report._company_from_tx(t) == comp]
+        by_amount = lambda rows: sorted(rows, key=lambda x: x["jumlah"], reverse=True)
+        finished_cards = []
+        for proj_name in finished_projects[comp]:
+            proj_txs = [t for t in comp_txs_asof if pdf_report._project_key(t["nama_projek"]) == proj_name]
+            expenses = [t for t in proj_txs if pdf_report._is_expense(t) and not pdf_report._is_salary(t)]
+            finished_cards.append({
+                "name": pdf_report._project_display_name(proj_name),
+                "metrics": pdf_report._project_metrics(proj_txs),
+                "timeline": {"start": min(t["dt"] for t in proj_txs), "finish": max(t["dt"] for t in proj_txs)},
+                "max_expense": max(expenses, key=lambda x: x["jumlah"]) if expenses else None,
+            })
+        company_details[comp] = {
+            "summary": pdf_report._summarize_company(comp_txs),
+            "prev_summary": pdf_report._summarize_company([t for t in prev_txs if pdf_report._company_from_tx(t) == comp]),
+            "income_txs": by_amount([t for t in comp_txs if pdf_report._is_income(t)]),
+            "expense_txs": by_amount([t for t in comp_txs if pdf_report._is_expense(t) and not pdf_report._is_salary(t)]),
+            "salary_txs": by_amount([t for t in comp_txs if pdf_report._is_salary(t)]),
+            "finished_cards": finished_cards,
+        }
+    return {
+        "summary": pdf_report._summarize_period(period_txs),
+        "prev_summary": pdf_report._summarize_period(prev_txs),
+        "finished_projects": finished_projects,
+        "company_details": company_details,
+    }
+
+
+class ReportCubeTests(unittest.TestCase):
+    def test_monthly_sections_match_per_company_scans(self):
+        all_txs = _ledger()
+        for year, month in ((2024, 3), (2025, 1), (2025, 11)):
+            start_dt, end_dt = pdf_report._month_start_end(year, month)
+            prev_start, prev_end = pdf_report._month_start_end(*pdf_report._prev_month(year, month))
+            with self.subTest(month=f"{year}-{month}"), \
+                 patch.object(pdf_report, "_get_all_transactions", return_value=all_txs):
+                ctx = pdf_report._build_context_monthly(year, month)
+                expected = _reference_sections(all_txs, start_dt, end_dt, prev_start, prev_end)
+
+                self.assertEqual(ctx["summary"], expected["summary"])
+                self.assertEqual(ctx["prev_summary"], expected["prev_summary"])
+                self.assertEqual(ctx["finished_projects"], expected["finished_projects"])
+                for comp, details in expected["company_details"].items():
+                    for name, value in details.items():
+                        self.assertEqual(ctx["company_details"][comp][name], value, f"{comp} {name}")
+
+    def test_range_without_rows_raises_no_data(self):
+        with patch.object(pdf_report, "_get_all_transactions", return_value=_ledger(50)):
+            with self.assertRaises(pdf_report.PDFNoDataError):
+                pdf_report._build_context_range(datetime(2030, 1, 1), datetime(2030, 1, 31, 23, 59, 59))
+
+
+if __name__ == "__main__":
+    unittest.main()
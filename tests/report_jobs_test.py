@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import pdf_report
+from services import report_cache, report_jobs
+
+
+LEDGER = [
+    pdf_report._normalize_tx({"tanggal": "2025-01-05", "company_sheet": "TX SBY(216)", "nama_projek": "Villa A",
+                              "keterangan": "dp klien", "jumlah": 5000000, "tipe": "Pemasukan"}),
+    pdf_report._normalize_tx({"tanggal": "2025-01-09", "company_sheet": "TX BALI(087)", "nama_projek": "Kafe B",
+                              "keterangan": "material", "jumlah": 1200000, "tipe": "Pengeluaran"}),
+]
+
+
+class ReportJobTests(unittest.TestCase):
+    def setUp(self):
+        report_jobs.reset_report_jobs_for_tests()
+        report_cache.reset_report_cache_for_tests()
+        self._dir = tempfile.TemporaryDirectory()
+        self._env = patch.dict(os.environ, {"REPORT_CACHE_DIR": self._dir.name, "REPORT_JOBS_MAX_PENDING": "2"})
+        self._env.start()
+
+    def tearDown(self):
+        report_jobs.reset_report_jobs_for_tests()
+        self._env.stop()
+        self._dir.cleanup()
+
+    def test_pending_jobs_are_deduplicated_per_chat_and_bounded(self):
+        release = threading.Event()
+        done = []
+        finished = threading.Event()
+
+        def slow_report(period_input, render=None):
+            release.wait(5)
+            return os.path.join("reports", f"{period_input}.pdf")
+
+        def on_done(path):
+            done.append(path)
+            if len(done) == 2:
+                finished.set()
+
+        with patch.object(pdf_report, "generate_pdf_from_input", side_effect=slow_report):
+            self.assertEqual(report_jobs.submit_report("chat-1", "2025-01", on_done, self.fail), report_jobs.QUEUED)
+            self.assertEqual(report_jobs.submit_report("chat-1", " 2025-01 ", on_done, self.fail), report_jobs.DUPLICATE)
+            self.assertEqual(report_jobs.submit_report("chat-2", "2025-01", on_done, self.fail), report_jobs.QUEUED)
+            self.assertEqual(report_jobs.submit_report("chat-3", "2025-02", on_done, self.fail), report_jobs.BUSY)
+            release.set()
+            self.assertTrue(finished.wait(5))
+
+        self.assertEqual(done, [os.path.join("reports", "2025-01.pdf")] * 2)
+        stats = report_jobs.report_jobs_stats()
+        self.assertEqual((stats["deduplicated"], stats["rejected"], stats["pending"]), (1, 1, 0))
+
+    def test_failures_reach_the_error_callback(self):
+        errors = []
+        failed = threading.Event()
+
+        def on_error(exc):
+            errors.append(exc)
+            failed.set()
+
+        with patch.object(pdf_report, "_get_all_transactions", return_value=LEDGER):
+            report_jobs.submit_report("chat-1", "2030-01", self.fail, on_error)
+            self.assertTrue(failed.wait(10))
+
+        self.assertIsInstance(errors[0], pdf_report.PDFNoDataError)
+
+    def test_layout_runs_in_a_worker_process(self):
+        with patch.dict(os.environ, {"REPORT_RENDER_WORKERS": "1"}), \
+             patch.object(pdf_report, "_get_all_transactions", return_value=LEDGER):
+            path = pdf_report.generate_pdf_from_input("2025-01", render=report_jobs.render_in_pool)
+
+        self.assertTrue(os.path.getsize(path) > 0)
+        self.assertEqual(report_jobs.report_jobs_stats()["pool_renders"], 1)
+
+    def test_render_timeout_fails_the_job_instead_of_rendering_inline(self):
+        class HungFuture:
+            def result(self, timeout=None):
+                raise report_jobs.FutureTimeout()
+
+        pool = MagicMock()
+        pool.submit.return_value = HungFuture()
+        with patch.object(report_jobs, "_get_pool", return_value=pool), \
+             patch.object(report_jobs, "_reset_pool") as reset_pool, \
+             patch.object(pdf_report, "render_report_file") as render_inline:
+            with self.assertRaises(report_jobs.ReportRenderTimeout):
+                report_jobs.render_in_pool({}, self._dir.name, "report.pdf")
+
+        render_inline.assert_not_called()
+        reset_pool.assert_called_once_with(terminate=True)
+        stats = report_jobs.report_jobs_stats()
+        self.assertEqual((stats["render_timeouts"], stats["inline_renders"]), (1, 0))
+
+    def test_broken_pool_falls_back_to_inline_render(self):
+        pool = MagicMock()
+        pool.submit.side_effect = report_jobs.BrokenProcessPool()
+        with patch.object(report_jobs, "_get_pool", return_value=pool), \
+             patch.object(pdf_report, "render_report_file", return_value="report.pdf") as render_inline:
+            self.assertEqual(report_jobs.render_in_pool({}, self._dir.name, "report.pdf"), "report.pdf")
+
+        render_inline.assert_called_once()
+        self.assertEqual(report_jobs.report_jobs_stats()["inline_renders"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -134,5 +134,45 @@ class SheetsCacheTests(unittest.TestCase):
         self.assertEqual(dompet_sheets[failing_dompet].get_all_values_calls, 2)
 
 
+class LedgerSnapshotTests(unittest.TestCase):
+    def test_snapshot_reads_each_dataset_once_and_shares_derived_views(self):
+        rows = [{"tanggal": "2026-08-02", "jumlah": 100, "tipe": "Pengeluaran", "nama_projek": "Villa"}]
+        with patch.object(sheets, "_get_all_data_cache", return_value=None), \
+             patch("services.ledger_store.read_recent_transactions", return_value=rows) as reader:
+            with sheets.ledger_snapshot() as snapshot:
+                first = sheets.get_all_data(30)
+                first.sort(key=lambda row: row["jumlah"], reverse=True)
+                first.append({"jumlah": 1})
+                second = sheets.get_all_data(days=30)
+                summary = sheets.get_summary(30)
+                self.assertIs(sheets.get_summary(days=30)["by_projek"], summary["by_projek"])
+                sheets.get_all_data(None)
+
+        self.assertEqual(reader.call_count, 2)
+        self.assertEqual(second, rows)
+        self.assertEqual(summary["total_pengeluaran"], 100)
+        self.assertEqual((snapshot.loads, snapshot.reuses), (3, 3))
+
+    def test_write_inside_snapshot_drops_memoized_reads(self):
+        with patch("services.ledger_store.read_recent_transactions", side_effect=[[], [{"jumlah": 5}]]) as reader:
+            with sheets.ledger_snapshot():
+                self.assertEqual(sheets.get_all_data(7), [])
+                sheets.bump_ledger_data_version()
+                self.assertEqual(sheets.get_all_data(7), [{"jumlah": 5}])
+
+        self.assertEqual(reader.call_count, 2)
+
+    def test_reads_outside_snapshot_are_not_memoized_and_nested_snapshots_share(self):
+        with patch("services.ledger_store.read_recent_transactions", return_value=[]) as reader:
+            sheets.get_all_data(7)
+            sheets.get_all_data(7)
+            with sheets.ledger_snapshot():
+                with sheets.ledger_snapshot():
+                    sheets.get_all_data(7)
+                sheets.get_all_data(7)
+
+        self.assertEqual(reader.call_count, 3)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,104 @@
+import os
+import unittest
+from datetime import date
+from itertools import combinations
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from agent_core.text_index import TextIndex
+from handlers import query_handler
+from services import ledger_index
+from tests.ledger_fixtures import random_ledger, redate_recent, window
+
+
+WORDS = ("semen", "pasir", "fee", "sugeng", "azen", "cat", "kayu", "besi", "ongkir", "tukang")
+DESCRIPTIONS = tuple(" ".join(words).title() for size in (1, 2, 3) for words in combinations(WORDS, size))
+
+
+def _rows(count=300, seed=11):
+    return random_ledger(count, seed, sheets=("CV HB(101)",), projects=("Villa Canggu", "Kafe Kuta", "Rumah Sanur", ""),
+                         descriptions=DESCRIPTIONS, span_days=700)
+
+
+def _keys(rows):
+    return sorted((row["sheet_name"], row["sheet_row"]) for row in rows)
+
+
+class TextIndexTests(unittest.TestCase):
+    def test_search_matches_descriptor_scan(self):
+        rows = _rows()
+        index = TextIndex.from_rows(rows)
+        for tokens in (["semen"], ["fee", "sugeng"], ["canggu", "cat"], ["ngkir"], ["nothing"]):
+            with self.subTest(tokens=tokens):
+                strict, mode = query_handler._filter_rows_by_descriptors(rows, tokens)
+                expected = strict if mode == "strict" else []
+                self.assertEqual(_keys(index.search(tokens)), _keys(expected))
+                loose = [row for row in rows if any(t in f"{row['keterangan']} {row['nama_projek']}".lower() for t in tokens)]
+                self.assertEqual(_keys(index.search(tokens, match_all=False)), _keys(loose))
+
+    def test_window_is_a_suffix_and_results_are_newest_first(self):
+        rows = _rows()
+        index = TextIndex.from_rows(rows)
+        start = date(2025, 3, 1).toordinal()
+
+        found = index.search(["semen"], start=start)
+
+        expected = [row for row in rows if "semen" in row["keterangan"].lower() and date.fromisoformat(row["tanggal"]).toordinal() >= start]
+        self.assertEqual(_keys(found), _keys(expected))
+        self.assertEqual([row["tanggal"] for row in found], sorted((row["tanggal"] for row in found), reverse=True))
+        self.assertEqual(index.count_since(start), sum(1 for row in rows if date.fromisoformat(row["tanggal"]).toordinal() >= start))
+
+    def test_slang_alias_and_prefix_mode(self):
+        index = TextIndex.from_rows([
+            {"tanggal": "2025-01-02", "keterangan": "tf ke sugeng", "sheet_name": "S", "sheet_row": 2},
+            {"tanggal": "2025-01-03", "keterangan": "beli semen", "sheet_name": "S", "sheet_row": 3},
+        ])
+
+        self.assertEqual([row["sheet_row"] for row in index.search(["transfer"])], [2])
+        self.assertEqual([row["sheet_row"] for row in index.search(["sem"], prefix=True)], [3])
+        self.assertEqual(index.search(["emen"], prefix=True), [])
+        self.assertEqual([row["sheet_row"] for row in index.search(["emen"])], [3])
+
+    def test_incremental_updates_match_rebuild(self):
+        rows = _rows(120)
+        index = TextIndex.from_rows(rows[:80])
+        for row in rows[80:]:
+            index.add(row)
+        index.add(dict(rows[5], keterangan="Ongkir Truk"))  # re-mirrored row replaces the old text
+        index.remove("CV HB(101)", rows[20]["sheet_row"])
+
+        expected = [dict(row) for row in rows]
+        expected[5]["keterangan"] = "Ongkir Truk"
+        deleted = expected.pop(20)
+        for row in expected:
+            if row["sheet_row"] > deleted["sheet_row"]:
+                row["sheet_row"] -= 1
+        rebuilt = TextIndex.from_rows(expected)
+
+        for tokens in (["semen"], ["truk"], ["fee", "azen"]):
+            with self.subTest(tokens=tokens):
+                self.assertEqual(_keys(index.search(tokens)), _keys(rebuilt.search(tokens)))
+
+
+class DescriptorQueryTests(unittest.TestCase):
+    def setUp(self):
+        ledger_index.reset_ledger_index_for_tests()
+
+    def tearDown(self):
+        ledger_index.reset_ledger_index_for_tests()
+
+    def test_person_query_matches_row_scan(self):
+        rows = redate_recent(_rows(80), 40)
+        with patch("sheets_helper.get_all_data", return_value=rows), \
+             patch.object(query_handler, "get_all_data", return_value=window(rows, 30)):
+            indexed = query_handler._handle_person_query("fee sugeng", "fee sugeng", 30, "30 hari")
+            with patch.dict(os.environ, {"LEDGER_INDEX_ENABLED": "false"}):
+                scanned = query_handler._handle_person_query("fee sugeng", "fee sugeng", 30, "30 hari")
+
+        self.assertEqual(indexed, scanned)
+        self.assertIn("transaksi ditemukan", indexed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from agent_core.time_index import TimeIndex, row_identity
+from handlers import query_handler
+from services import ledger_index
+from tests.ledger_fixtures import random_ledger, redate_recent
+
+
+def _rows(count=400, seed=7):
+    return random_ledger(count, seed)
+
+
+def _brute(rows, start, end, **filters):
+    amount = count = 0
+    for row in rows:
+        day = date.fromisoformat(row["tanggal"]).toordinal()
+        if (start is not None and day < start) or (end is not None and day > end):
+            continue
+        if filters.get("dompet") and row["sheet_name"] != filters["dompet"]:
+            continue
+        if filters.get("tipe") and row["tipe"] != filters["tipe"]:
+            continue
+        if filters.get("project") is not None:
+            name = row["nama_projek"].replace(" (Finish)", "").casefold()
+            if name != filters["project"].casefold():
+                continue
+        amount += row["jumlah"]
+        count += 1
+    return amount, count
+
+
+class TimeIndexTests(unittest.TestCase):
+    def test_window_totals_match_row_scan(self):
+        rows = _rows()
+        index = TimeIndex.from_rows(rows)
+        start = date(2024, 6, 1).toordinal()
+        end = date(2025, 2, 28).toordinal()
+
+        cases = [
+            {},
+            {"dompet": "TX SBY(216)"},
+            {"tipe": "Pengeluaran"},
+            {"dompet": "CV HB(101)", "project": "villa canggu", "tipe": "Pemasukan"},
+        ]
+        for filters in cases:
+            with self.subTest(filters=filters):
+                self.assertEqual(index.total(start, end, **filters), _brute(rows, start, end, **filters))
+                self.assertEqual(index.total(None, None, **filters), _brute(rows, None, None, **filters))
+
+    def test_incremental_updates_match_rebuild(self):
+        rows = _rows(200)
+        index = TimeIndex.from_rows(rows[:150])
+        for row in rows[150:]:
+            index.add(row)
+        index.set_amount(rows[3]["sheet_name"], rows[3]["sheet_row"], rows[3]["tipe"], 999)
+        index.remove(rows[10]["sheet_name"], rows[10]["sheet_row"])
+
+        expected = [dict(row) for row in rows]
+        expected[3]["jumlah"] = 999
+        deleted = expected.pop(10)
+        for row in expected:
+            if row["sheet_name"] == deleted["sheet_name"] and row["sheet_row"] > deleted["sheet_row"]:
+                row["sheet_row"] -= 1
+        rebuilt = TimeIndex.from_rows(expected)
+
+        self.assertEqual(index.breakdown("company"), rebuilt.breakdown("company"))
+        self.assertEqual(index.breakdown("project", tipe="Pengeluaran"), rebuilt.breakdown("project", tipe="Pengeluaran"))
+        # Row numbers shifted with the delete, so a later revision still lands.
+        shifted = next(row for row in expected if row["sheet_name"] == deleted["sheet_name"] and row["sheet_row"] >= deleted["sheet_row"])
+        self.assertTrue(index.set_amount(shifted["sheet_name"], shifted["sheet_row"], shifted["tipe"], 1))
+
+
+class LedgerIndexServiceTests(unittest.TestCase):
+    def setUp(self):
+        ledger_index.reset_ledger_index_for_tests()
+
+    def tearDown(self):
+        ledger_index.reset_ledger_index_for_tests()
+
+    def test_index_is_built_once_and_updated_by_write_hooks(self):
+        today = date.today().isoformat()
+        rows = [{"tanggal": today, "jumlah": 100, "tipe": "Pengeluaran", "company_sheet": "CV HB(101)",
+                 "sheet_name": "CV HB(101)", "sheet_row": 9}]
+        with patch("sheets_helper.get_all_data", return_value=rows) as reader:
+            self.assertEqual(ledger_index.window_totals("company", 30), {"CV HB(101)": (100, 1)})
+            ledger_index.record_row({**rows[0], "jumlah": 50, "sheet_row": 10})
+            ledger_index.record_amount("CV HB(101)", 9, "pengeluaran", 300)
+            totals = ledger_index.window_totals("company", 30)
+
+        self.assertEqual(reader.call_count, 1)
+        self.assertEqual(totals, {"CV HB(101)": (350, 2)})
+
+    def test_operational_revision_updates_every_index(self):
+        today = date.today().isoformat()
+        # get_all_data operational rows carry only tipe; the revision hook says "operasional".
+        row = {"tanggal": today, "jumlah": 100000, "tipe": "Pengeluaran", "keterangan": "listrik kantor",
+               "company_sheet": "CV HB(101)", "sheet_name": "Operasional Kantor", "sheet_row": 7}
+        with patch("sheets_helper.get_all_data", return_value=[row]):
+            identity = row_identity(row)
+            self.assertEqual(identity, ("Operasional Kantor", 7, "operasional"))
+            self.assertEqual(ledger_index.window_totals("company", 30), {"CV HB(101)": (100000, 1)})
+            ledger_index.record_amount("Operasional Kantor", 7, "operasional", 250000)
+
+            self.assertEqual(ledger_index.window_totals("company", 30), {"CV HB(101)": (250000, 1)})
+            self.assertEqual([r["jumlah"] for r in ledger_index.search_rows(["listrik"], 30)], [250000])
+            self.assertEqual([r["jumlah"] for r in ledger_index.ranked_rows(5, 30)], [250000])
+            self.assertEqual([r["jumlah"] for r in ledger_index.rows_for_identities([identity])], [250000])
+
+            ledger_index.record_delete("Operasional Kantor", 7)
+            self.assertEqual(ledger_index.window_totals("company", 30), {})
+            self.assertIsNone(ledger_index.rows_for_identities([identity]))
+
+    def test_build_that_races_a_write_is_not_installed(self):
+        def read_and_write(_days):
+            ledger_index.record_row({"tanggal": date.today().isoformat(), "jumlah": 5, "sheet_name": "X", "sheet_row": 2})
+            return []
+
+        with patch("sheets_helper.get_all_data", side_effect=read_and_write) as reader:
+            ledger_index.get_time_index()
+            ledger_index.get_time_index()
+
+        self.assertEqual(reader.call_count, 2)
+        self.assertEqual(ledger_index.ledger_index_stats()["discarded_builds"], 2)
+
+    def test_cross_dompet_answer_matches_row_scan(self):
+        rows = redate_recent(_rows(60), 20)
+        with patch("sheets_helper.get_all_data", return_value=rows), \
+             patch.object(query_handler, "get_all_data", return_value=rows), \
+             patch.object(query_handler, "get_wallet_balances", return_value={}):
+            indexed = query_handler._handle_cross_dompet_query("bandingkan dompet", 30, "30 hari")
+            with patch.dict(os.environ, {"LEDGER_INDEX_ENABLED": "false"}):
+                scanned = query_handler._handle_cross_dompet_query("bandingkan dompet", 30, "30 hari")
+
+        self.assertEqual(indexed, scanned)
+
+
+if __name__ == "__main__":
+    unittest.main()
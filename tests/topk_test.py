@@ -0,0 +1,147 @@
+import os
+import random
+import unittest
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import pdf_report
+from agent_core.topk import RankedRows, TopK, top_k
+from handlers import query_handler
+from services import ledger_index
+from tests.ledger_fixtures import random_ledger, redate_recent, window
+
+
+def _rows(count=300, seed=5):
+    # Coarse amounts: plenty of ties.
+    return random_ledger(count, seed, span_days=500, amount_step=50000, max_steps=20)
+
+
+def _amount(row):
+    return row["jumlah"]
+
+
+class TopKTests(unittest.TestCase):
+    def test_matches_stable_sorted_slice(self):
+        rows = _rows()
+        for k in (0, 1, 7, 500):
+            with self.subTest(k=k):
+                self.assertEqual(top_k(rows, k, key=_amount), sorted(rows, key=_amount, reverse=True)[:k])
+                self.assertEqual(top_k(rows, k, key=_amount, largest=False), sorted(rows, key=_amount)[:k])
+
+    def test_partitions_merge_in_stream_order(self):
+        rows = _rows()
+        parts = [TopK(10, _amount).extend(rows[i:i + 70]) for i in range(0, len(rows), 70)]
+        merged = TopK(10, _amount)
+        for part in parts:
+            merged.merge(part)
+        self.assertEqual(merged.results(), top_k(rows, 10, key=_amount))
+
+
+class RankedRowsTests(unittest.TestCase):
+    def _scan(self, rows, k, start, tipe, largest):
+        window = [
+            row for row in rows
+            if date.fromisoformat(row["tanggal"]).toordinal() >= start and (tipe is None or row["tipe"] == tipe)
+        ]
+        return sorted(window, key=_amount, reverse=largest)[:k]
+
+    def test_top_matches_window_scan(self):
+        rows = _rows()
+        index = RankedRows.from_rows(rows)
+        start = date(2024, 10, 1).toordinal()
+        for tipe in (None, "Pengeluaran"):
+            for largest in (True, False):
+                with self.subTest(tipe=tipe, largest=largest):
+                    self.assertEqual(index.top(8, start=start, tipe=tipe, largest=largest), self._scan(rows, 8, start, tipe, largest))
+
+    def test_incremental_updates_match_rebuild(self):
+        rows = _rows(150)
+        index = RankedRows.from_rows(rows[:100])
+        for row in rows[100:]:
+            index.add(row)
+        target = rows[4]
+        index.set_amount(target["sheet_name"], target["sheet_row"], target["tipe"], 10_000_000)
+        index.remove(rows[9]["sheet_name"], rows[9]["sheet_row"])
+
+        expected = [dict(row) for row in rows]
+        expected[4]["jumlah"] = 10_000_000
+        deleted = expected.pop(9)
+        for row in expected:
+            if row["sheet_name"] == deleted["sheet_name"] and row["sheet_row"] > deleted["sheet_row"]:
+                row["sheet_row"] -= 1
+
+        self.assertEqual(index.top(12), RankedRows.from_rows(expected).top(12))
+        self.assertEqual(index.top(1)[0]["sheet_row"], target["sheet_row"])
+
+    def test_repeated_identity_keeps_the_later_row(self):
+        rows = [
+            {"tanggal": "2024-05-01", "jumlah": 900, "tipe": "Pengeluaran", "sheet_name": "A", "sheet_row": 5},
+            {"tanggal": "2024-05-02", "jumlah": 100, "tipe": "Pengeluaran", "sheet_name": "A", "sheet_row": 6},
+            {"tanggal": "2024-05-01", "jumlah": 400, "tipe": "Pengeluaran", "sheet_name": "A", "sheet_row": 5},
+        ]
+        index = RankedRows.from_rows(rows)
+
+        self.assertEqual(len(index), 2)
+        self.assertEqual([row["jumlah"] for row in index.top(5)], [400, 100])
+        self.assertEqual([row["jumlah"] for row in index.top(5, largest=False)], [100, 400])
+
+
+class RankingQueryTests(unittest.TestCase):
+    def setUp(self):
+        ledger_index.reset_ledger_index_for_tests()
+
+    def tearDown(self):
+        ledger_index.reset_ledger_index_for_tests()
+
+    def test_minmax_answer_matches_row_scan(self):
+        rows = redate_recent(_rows(90), 45)
+        for question in ("pengeluaran terbesar", "transaksi terkecil"):
+            with self.subTest(question=question), \
+                 patch("sheets_helper.get_all_data", return_value=rows), \
+                 patch.object(query_handler, "get_all_data", return_value=window(rows, 30)):
+                indexed = query_handler._handle_minmax_query(question, 30, "30 hari")
+                with patch.dict(os.environ, {"LEDGER_INDEX_ENABLED": "false"}):
+                    scanned = query_handler._handle_minmax_query(question, 30, "30 hari")
+                self.assertEqual(indexed, scanned)
+
+
+class PdfProjectRankTests(unittest.TestCase):
+    def test_one_pass_ranking_matches_per_company_scan(self):
+        rng = random.Random(3)
+        end_dt = datetime(2025, 6, 30, 23, 59)
+        txs = []
+        for i in range(200):
+            sheet = rng.choice(("TX SBY(216)", "TX BALI(087)"))
+            txs.append({
+                "dt": end_dt - timedelta(days=rng.randrange(500)),
+                "company_sheet": sheet,
+                "nama_projek": rng.choice(("Villa A", "Kafe B", "Rumah C")),
+                "keterangan": "material",
+                "jumlah": rng.randrange(1, 30) * 100000,
+                "tipe": rng.choice(("Pemasukan", "Pengeluaran")),
+            })
+
+        ranks = pdf_report._rank_projects_last_year(txs, end_dt)
+
+        for company in ("Texturin Surabaya", "Texturin Bali", "Hojja"):
+            scoped = [
+                tx for tx in txs
+                if end_dt - timedelta(days=364) <= tx["dt"] <= end_dt and pdf_report._company_from_tx(tx) == company
+            ]
+            entries = list(pdf_report._project_profit_map(scoped).values())
+            expected = {"best": None, "worst": None}
+            if entries:
+                best = max(entries, key=lambda x: x["profit"])
+                worst = min(entries, key=lambda x: x["profit"])
+                expected = {
+                    "best": {"name": best["name"], "profit": best["profit"]},
+                    "worst": {"name": worst["name"], "profit": worst["profit"]},
+                }
+            with self.subTest(company=company):
+                self.assertEqual(ranks.get(company) or {"best": None, "worst": None}, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
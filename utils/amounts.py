@@ -112,3 +112,12 @@ def has_amount_pattern(text: str, patterns: Iterable[Pattern[str]] = AMOUNT_PATT
         if re.search(r"\d{4,}", compact):
             return True
     return False
+
+
+def format_number(amount: int) -> str:
+    """Indonesian thousands separators: 1250000 -> 1.250.000."""
+    return f"{amount:,.0f}".replace(",", ".")
+
+
+def format_currency(amount: int) -> str:
+    return f"Rp {format_number(amount)}"
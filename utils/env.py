@@ -0,0 +1,29 @@
+"""Environment knob parsing shared by the tunable services.
+
+Knobs are read on every use rather than at import, so a deploy-time change or
+a test's ``patch.dict(os.environ, ...)`` takes effect immediately. A malformed
+value falls back to the default instead of failing the request.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+
+def truthy(value: Optional[str]) -> bool:
+    return str(value or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def env_int(name: str, default: int, minimum: int = 0) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_float(name: str, default: float, minimum: float = 0.0) -> float:
+    try:
+        return max(minimum, float(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
@@ -145,7 +145,29 @@ class GroqContextAnalyzer:
         is_human_cmd = is_command_to_human(text)
         op_keyword = detect_operational_keyword(text)
         is_saldo = is_saldo_update(text)
-        
+
+        # Rules + local classifier settle ambient chatter before the LLM.
+        from services import intent_cascade
+
+        cascade = intent_cascade.decide(
+            text,
+            has_media=has_media,
+            has_amount=has_amount,
+            is_ambient=is_ambient,
+            is_saldo=is_saldo,
+            is_casual_mention=is_casual_bot_mention(text),
+        )
+        if cascade.skip_llm:
+            return {
+                "should_respond": False,
+                "intent": "IGNORE",
+                "confidence": 0.9 if cascade.score is None else round(1.0 - cascade.score, 2),
+                "category_scope": "UNKNOWN",
+                "extracted_data": {},
+                "reasoning": f"Cascade {cascade.stage}: {cascade.reason}",
+                "cascade_stage": cascade.stage,
+            }
+
         # LAYER 3: Multi-layer context detection
         context_analysis = self.context_detector.detect_context(text)
         category_scope = context_analysis.get("category_scope")
@@ -473,7 +495,12 @@ REMEMBER:
 """
 
         try:
-            response = self.client.chat.completions.create(
+            from services.llm_cache import cached_completion, json_object_response
+
+            response = cached_completion(
+                "intent_analyzer",
+                self.client.chat.completions.create,
+                validate=json_object_response,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -565,7 +592,9 @@ REMEMBER:
             
             # Post-processing safety: Apply rule-based overrides
             result = self._apply_safety_overrides(result, text, context, has_amount, is_future, is_human_cmd)
-            
+            result['cascade_stage'] = cascade.stage
+            intent_cascade.record_llm_outcome(cascade, text, result)
+
             return result
             
         except Exception as e:
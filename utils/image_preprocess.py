@@ -0,0 +1,179 @@
+"""
+utils/image_preprocess.py - Receipt image preparation for vision OCR.
+
+Decoding, resizing and re-encoding screenshots is CPU-bound and holds the GIL,
+so it runs in a small spawn-based process pool instead of the gunicorn request
+thread. This module deliberately imports only OpenCV/numpy: spawned workers
+re-import it and must not pull in Sheets, state or logging side effects.
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from utils.env import env_int, truthy
+
+
+class PreparedImage(NamedTuple):
+    data: bytes
+    mime_type: str
+    source_bytes: int
+
+
+_MIME_BY_EXT = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def preprocess_settings() -> dict:
+    """Read tuning knobs in the parent so workers never depend on their env."""
+    return {
+        "min_side": env_int("OCR_PREPROCESS_MIN_SIDE", 1600, minimum=256),
+        "max_side": env_int("OCR_PREPROCESS_MAX_SIDE", 2560, minimum=512),
+        "max_upscale": env_int("OCR_PREPROCESS_MAX_UPSCALE", 4, minimum=1),
+        "byte_budget": env_int("OCR_IMAGE_BYTE_BUDGET", 900_000, minimum=50_000),
+        "grayscale": truthy(os.getenv("OCR_PREPROCESS_GRAYSCALE", "false")),
+    }
+
+
+def _normalize_contrast(gray: np.ndarray) -> np.ndarray:
+    """Stretch the 1st..99th percentile to full range; faded photos gain most."""
+    low, high = np.percentile(gray, (1, 99))
+    if high - low < 1 or (low <= 8 and high >= 247):
+        return gray
+    stretched = (gray.astype(np.float32) - low) * (255.0 / (high - low))
+    return np.clip(stretched, 0, 255).astype(np.uint8)
+
+
+def _encode_within_budget(image: np.ndarray, byte_budget: int, min_side: int = 1024) -> bytes:
+    """Lower JPEG quality, then resolution, until the image fits the budget.
+
+    Resolution never drops below ``min_side`` on the longest edge; past that
+    the smallest encoding is returned even if it overshoots.
+    """
+    while True:
+        for quality in (90, 82, 74, 66, 58):
+            ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if not ok:
+                raise ValueError("JPEG encode failed")
+            encoded = buffer.tobytes()
+            if len(encoded) <= byte_budget:
+                return encoded
+        height, width = image.shape[:2]
+        if max(height, width) * 0.85 < min_side:
+            return encoded
+        image = cv2.resize(image, (int(width * 0.85), int(height * 0.85)), interpolation=cv2.INTER_AREA)
+
+
+def preprocess_image_bytes(data: bytes, settings: dict) -> Optional[bytes]:
+    """Return a JPEG sized and normalized for OCR, or None if undecodable.
+
+    Small WhatsApp thumbnails are upscaled (up to ``max_upscale``) so table text
+    is legible; oversized photos are downscaled. Runs inside pool workers.
+    """
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None or image.size == 0:
+        return None
+
+    if settings.get("grayscale", False):
+        image = _normalize_contrast(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY))
+
+    height, width = image.shape[:2]
+    longest = max(width, height)
+    scale = 1.0
+    if longest < settings["min_side"]:
+        scale = min(float(settings["max_upscale"]), settings["min_side"] / longest)
+    elif longest > settings["max_side"]:
+        scale = settings["max_side"] / longest
+    if abs(scale - 1.0) > 0.01:
+        interpolation = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+        image = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=interpolation)
+
+    return _encode_within_budget(image, int(settings["byte_budget"]))
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    workers = env_int("OCR_PREPROCESS_WORKERS", 2)
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+
+            # spawn, not fork: gunicorn workers are multi-threaded.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_preprocess_pool() -> None:
+    _reset_pool()
+
+
+def read_unique_images(paths: Sequence[str]) -> List[Tuple[str, bytes]]:
+    """Read image files in order, dropping byte-identical duplicates."""
+    seen = set()
+    unique: List[Tuple[str, bytes]] = []
+    for path in paths:
+        with open(path, "rb") as handle:
+            data = handle.read()
+        digest = hashlib.sha256(data).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        unique.append((path, data))
+    return unique
+
+
+def _raw_image(path: str, data: bytes) -> PreparedImage:
+    ext = os.path.splitext(path)[1].lower()
+    return PreparedImage(data, _MIME_BY_EXT.get(ext, "image/jpeg"), len(data))
+
+
+def prepare_images(images: Sequence[Tuple[str, bytes]]) -> List[PreparedImage]:
+    """Preprocess ``(path, bytes)`` pairs concurrently, preserving order.
+
+    Falls back to inline work when the pool is disabled or broken, and to the
+    original bytes when an image cannot be decoded.
+    """
+    settings = preprocess_settings()
+    payloads = [data for _path, data in images]
+    results: Optional[List[Optional[bytes]]] = None
+    pool = _get_pool() if payloads else None
+    if pool is not None:
+        try:
+            results = list(pool.map(preprocess_image_bytes, payloads, [settings] * len(payloads), timeout=60))
+        except Exception as exc:
+            _reset_pool()
+            from security import secure_log
+
+            secure_log("WARNING", f"Image preprocess pool unavailable, running inline: {type(exc).__name__}")
+    if results is None:
+        results = []
+        for data in payloads:
+            try:
+                results.append(preprocess_image_bytes(data, settings))
+            except Exception:
+                results.append(None)
+
+    prepared: List[PreparedImage] = []
+    for (path, data), processed in zip(images, results):
+        if processed:
+            prepared.append(PreparedImage(processed, "image/jpeg", len(data)))
+        else:
+            prepared.append(_raw_image(path, data))
+    return prepared